@@ -0,0 +1,5 @@
+from twisted.python.deprecate import deprecatedModuleAttribute
+from twisted.python.versions import Version
+
+deprecatedModuleAttribute(
+    Version('Package', 1, 2, 3), 'message', __name__, 'module')
@@ -0,0 +1,14 @@
+
+"A module string"
+
+from twisted.python import deprecate
+
+def testFunction():
+    "A doc string"
+    a = 1 + 2
+    return a
+
+def callTestFunction():
+    b = testFunction()
+    if b == 3:
+        deprecate.warnAboutFunction(testFunction, "A Warning String")
@@ -0,0 +1,3 @@
+#!/root/.pyenv/versions/2.7.18/bin/python
+# bogus script w/ Python sh-bang
+pass
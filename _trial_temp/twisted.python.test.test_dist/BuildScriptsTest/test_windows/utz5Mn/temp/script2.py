@@ -0,0 +1,3 @@
+#!/usr/bin/python
+# bogus script w/ Python sh-bang
+pass
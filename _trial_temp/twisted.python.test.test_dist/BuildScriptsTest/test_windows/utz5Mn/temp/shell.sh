@@ -0,0 +1,3 @@
+#!/bin/sh
+# bogus shell script w/ sh-bang
+exit 0
@@ -0,0 +1,6 @@
+from twisted.python.dist import ConditionalExtension
+extensions = [
+    ConditionalExtension(
+        'twisted.sorcery', ['twisted/some/thing.c'],
+        condition=lambda builder: True)
+    ]
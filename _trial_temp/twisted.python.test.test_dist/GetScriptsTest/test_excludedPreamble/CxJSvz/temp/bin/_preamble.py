@@ -0,0 +1 @@
+some preamble code
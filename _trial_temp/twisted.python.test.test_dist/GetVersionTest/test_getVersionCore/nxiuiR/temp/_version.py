@@ -0,0 +1,3 @@
+
+from twisted.python import versions
+version = versions.Version("twisted", 0, 1, 2)
@@ -0,0 +1,3 @@
+
+from twisted.python import versions
+version = versions.Version("twisted.blat", 9, 8, 10)
@@ -0,0 +1 @@
+foo.py
\ No newline at end of file
@@ -0,0 +1 @@
+import CORE
\ No newline at end of file
@@ -0,0 +1 @@
+plugin
\ No newline at end of file
@@ -0,0 +1 @@
+include!
\ No newline at end of file
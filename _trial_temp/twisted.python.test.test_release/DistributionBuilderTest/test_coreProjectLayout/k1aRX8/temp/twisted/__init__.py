@@ -0,0 +1 @@
+twisted
\ No newline at end of file
@@ -0,0 +1 @@
+conch
\ No newline at end of file
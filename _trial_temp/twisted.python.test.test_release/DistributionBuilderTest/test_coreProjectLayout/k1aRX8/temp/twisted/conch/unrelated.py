@@ -0,0 +1 @@
+import conch
\ No newline at end of file
@@ -0,0 +1 @@
+webplug
\ No newline at end of file
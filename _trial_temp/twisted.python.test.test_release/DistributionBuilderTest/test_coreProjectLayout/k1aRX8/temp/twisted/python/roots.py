@@ -0,0 +1 @@
+roots!
\ No newline at end of file
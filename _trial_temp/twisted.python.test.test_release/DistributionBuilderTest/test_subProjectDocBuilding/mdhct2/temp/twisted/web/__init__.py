@@ -0,0 +1 @@
+import WEB
\ No newline at end of file
@@ -0,0 +1 @@
+import WEBINST
\ No newline at end of file
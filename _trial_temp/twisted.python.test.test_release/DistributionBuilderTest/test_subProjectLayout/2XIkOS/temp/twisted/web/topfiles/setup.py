@@ -0,0 +1 @@
+import WEBINSTALL
\ No newline at end of file
@@ -0,0 +1 @@
+import WEBPLUG
\ No newline at end of file
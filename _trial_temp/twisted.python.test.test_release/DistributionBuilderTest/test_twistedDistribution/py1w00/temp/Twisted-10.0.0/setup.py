@@ -0,0 +1 @@
+import toplevel
\ No newline at end of file
@@ -0,0 +1 @@
+import WORDPLUG
\ No newline at end of file
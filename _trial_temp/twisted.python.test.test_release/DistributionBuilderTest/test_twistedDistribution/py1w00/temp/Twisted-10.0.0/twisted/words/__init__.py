@@ -0,0 +1 @@
+import WORDS
\ No newline at end of file
@@ -0,0 +1,2 @@
+from twisted.python.versions import Version
+version = Version('twisted_python_versions_package', 1, 0, 0)
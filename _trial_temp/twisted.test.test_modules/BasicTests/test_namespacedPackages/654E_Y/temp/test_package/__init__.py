@@ -0,0 +1 @@
+import pkgutil; __path__ = pkgutil.extend_path(__path__, __name__)
\ No newline at end of file
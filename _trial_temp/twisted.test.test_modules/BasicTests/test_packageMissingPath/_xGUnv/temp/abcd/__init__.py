@@ -0,0 +1 @@
+del __path__
@@ -0,0 +1 @@
+__path__.append('twisted.test.test_modules/PathModificationTest/test_underUnderPathAlreadyImport/XmZDiR/temp')
@@ -0,0 +1 @@
+__path__.append('twisted.test.test_modules/RebindingTest/test_underUnderPathAlreadyImport/VyFJXv/temp')
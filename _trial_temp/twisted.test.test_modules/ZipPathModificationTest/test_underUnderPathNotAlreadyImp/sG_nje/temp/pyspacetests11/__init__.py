@@ -0,0 +1 @@
+__path__.append('twisted.test.test_modules/ZipPathModificationTest/test_underUnderPathNotAlreadyImp/qArG9_/temp')
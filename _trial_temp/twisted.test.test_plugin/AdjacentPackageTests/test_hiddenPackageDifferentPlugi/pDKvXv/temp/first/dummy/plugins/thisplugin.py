@@ -0,0 +1,6 @@
+from zope.interface import classProvides
+from twisted.plugin import IPlugin
+from twisted.test.test_plugin import ITestPlugin
+
+class first(object):
+    classProvides(IPlugin, ITestPlugin)
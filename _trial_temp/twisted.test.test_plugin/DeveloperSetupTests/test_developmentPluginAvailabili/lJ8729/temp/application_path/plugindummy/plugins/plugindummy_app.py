@@ -0,0 +1,6 @@
+from zope.interface import classProvides
+from twisted.plugin import IPlugin
+from twisted.test.test_plugin import ITestPlugin
+
+class app(object):
+    classProvides(IPlugin, ITestPlugin)
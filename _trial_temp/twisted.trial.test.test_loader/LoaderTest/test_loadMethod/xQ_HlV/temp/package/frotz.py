@@ -0,0 +1 @@
+frotz
@@ -0,0 +1 @@
+import frotz
\ No newline at end of file
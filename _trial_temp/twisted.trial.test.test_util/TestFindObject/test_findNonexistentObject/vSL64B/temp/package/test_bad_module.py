@@ -0,0 +1 @@
+raise ZeroDivisionError("fake error")
\ No newline at end of file
@@ -0,0 +1,4 @@
+
+import warnings
+def foo():
+    warnings.warn("oh no")
@@ -0,0 +1 @@
+plain
\ No newline at end of file
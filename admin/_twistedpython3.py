@@ -41,6 +41,8 @@ modules = [
     "twisted.internet.pollreactor",
     "twisted.internet.reactor",
     "twisted.internet.selectreactor",
+    "twisted.internet._sendfile",
+    "twisted.internet._writev",
     "twisted.internet._signals",
     "twisted.internet.ssl",
     "twisted.internet.task",
@@ -76,6 +78,7 @@ modules = [
     "twisted.python.failure",
     "twisted.python.filepath",
     "twisted.python.log",
+    "twisted.python._lru",
     "twisted.python.monkey",
     "twisted.python.randbytes",
     "twisted.python._reflectpy3",
@@ -134,6 +137,8 @@ testModules = [
     "twisted.internet.test.test_newtls",
     "twisted.internet.test.test_posixbase",
     "twisted.internet.test.test_protocol",
+    "twisted.internet.test.test_sendfile",
+    "twisted.internet.test.test_writev",
     "twisted.internet.test.test_sigchld",
     "twisted.internet.test.test_tcp",
     "twisted.internet.test.test_threads",
@@ -150,6 +155,7 @@ testModules = [
     "twisted.protocols.test.test_tls",
     "twisted.python.test.test_components",
     "twisted.python.test.test_deprecate",
+    "twisted.python.test.test_lru",
     "twisted.python.test.test_reflectpy3",
     "twisted.python.test.test_runtime",
     "twisted.python.test.test_util",
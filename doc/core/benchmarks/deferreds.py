@@ -133,6 +133,89 @@ def pauseUnpause(n):
     d.unpause()
 pauseUnpause = benchmarkNFunc(20, ns)(pauseUnpause)
 
+def succeed():
+    """
+    Create a deferred which already has a result, and add a callback to it
+    """
+    defer.succeed(1).addCallback(lambda x: x)
+succeed = benchmarkFunc(100000)(succeed)
+
+def failHandled():
+    """
+    Create a deferred which already has a failure result, and handle it with
+    an errback
+    """
+    defer.fail(ZeroDivisionError()).addErrback(lambda f: None)
+failHandled = benchmarkFunc(100000)(failHandled)
+
+def raiseHandled():
+    """
+    Raise an exception from a callback, and handle it with the next errback
+    """
+    def raiser(result):
+        raise ZeroDivisionError()
+    d = defer.Deferred()
+    d.addCallback(raiser)
+    d.addErrback(lambda f: None)
+    d.callback(None)
+raiseHandled = benchmarkFunc(10000)(raiseHandled)
+
+def chain(n):
+    """
+    Fire a deferred whose callbacks each return another deferred which already
+    has a result, the given number of times.
+    """
+    d = defer.Deferred()
+    for i in xrange(n):
+        d.addCallback(defer.succeed)
+    d.callback(1)
+chain = benchmarkNFunc(20, ns)(chain)
+
+def waitingChain(n):
+    """
+    Fire a deferred whose callback returns a deferred which is waiting on
+    another one, and so on the given number of times.
+    """
+    first = last = defer.Deferred()
+    for i in xrange(n):
+        d = defer.Deferred()
+        last.addCallback(lambda ignored, d=d: d)
+        last = d
+    first.callback(None)
+    last.callback(None)
+waitingChain = benchmarkNFunc(20, ns)(waitingChain)
+
+def deferredList(n):
+    """
+    Wait for the given number of deferreds with a L{defer.DeferredList}, then
+    fire them.
+    """
+    ds = [defer.Deferred() for i in xrange(n)]
+    defer.DeferredList(ds)
+    for d in ds:
+        d.callback(None)
+deferredList = benchmarkNFunc(20, ns)(deferredList)
+
+def gatherResults(n):
+    """
+    Gather the results of the given number of deferreds which already have
+    them.
+    """
+    defer.gatherResults([defer.succeed(i) for i in xrange(n)])
+gatherResults = benchmarkNFunc(20, ns)(gatherResults)
+
+def inlineCallbacks(n):
+    """
+    Run an L{defer.inlineCallbacks} generator which waits for the given number
+    of deferreds which already have results.
+    """
+    @defer.inlineCallbacks
+    def waiter():
+        for i in xrange(n):
+            yield defer.succeed(i)
+    waiter()
+inlineCallbacks = benchmarkNFunc(20, ns)(inlineCallbacks)
+
 def benchmark():
     """
     Run all of the benchmarks registered in the benchmarkFuncs list
@@ -0,0 +1,38 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast jelly serializes and unserializes typical PB arguments and
+results.
+
+Trees of builtin types are jellied by a fast path which skips reference
+tracking; the "general" figures use the full jellier for comparison.
+"""
+
+from timer import timeit
+from twisted.spread import jelly
+
+ITERATIONS = 2000
+
+samples = [
+    ("small call", ('method', 1, 'argument', {'key': 'value'})),
+    ("int list", range(1000)),
+    ("rows", [(i, 'name %d' % (i,), i * 1.5, None, True)
+              for i in range(200)]),
+    ("nested dicts", dict([('key%d' % (i,), {'a': [i, u'x'], 'b': (i,)})
+                           for i in range(100)])),
+    ]
+
+taster = jelly.globalSecurity
+
+def generalJelly(obj, taster):
+    return jelly._Jellier(taster, None, None).jelly(obj)
+
+for name, sample in samples:
+    sexp = jelly.jelly(sample, taster)
+    for label, func, arg in [
+        ("jelly", jelly.jelly, sample),
+        ("general jelly", generalJelly, sample),
+        ("unjelly", jelly.unjelly, sexp)]:
+        elapsed = timeit(func, ITERATIONS, arg, taster)
+        print "%-14s %-13s: %10d cps" % (name, label, ITERATIONS / elapsed)
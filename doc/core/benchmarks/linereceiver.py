@@ -1,23 +1,31 @@
 import math, time
 
 from twisted.protocols import basic
+from twisted.test.proto_helpers import StringTransport
 
 class CollectingLineReceiver(basic.LineReceiver):
     def __init__(self):
         self.lines = []
         self.lineReceived = self.lines.append
 
+class CollectingLineOnlyReceiver(basic.LineOnlyReceiver):
+    def __init__(self):
+        self.lines = []
+        self.lineReceived = self.lines.append
+
 def deliver(proto, chunks):
     map(proto.dataReceived, chunks)
 
-def benchmark(chunkSize, lineLength, numLines):
+def benchmark(chunkSize, lineLength, numLines,
+              factory=CollectingLineReceiver):
     bytes = ('x' * lineLength + '\r\n') * numLines
     chunkCount = len(bytes) / chunkSize + 1
     chunks = []
     for n in xrange(chunkCount):
         chunks.append(bytes[n*chunkSize:(n+1)*chunkSize])
     assert ''.join(chunks) == bytes, (chunks, bytes)
-    p = CollectingLineReceiver()
+    p = factory()
+    p.makeConnection(StringTransport())
 
     before = time.clock()
     deliver(p, chunks)
@@ -25,6 +33,7 @@ def benchmark(chunkSize, lineLength, numLines):
 
     assert bytes.splitlines() == p.lines, (bytes.splitlines(), p.lines)
 
+    print factory.__name__,
     print 'chunkSize:', chunkSize,
     print 'lineLength:', lineLength,
     print 'numLines:', numLines,
@@ -43,5 +52,11 @@ def main():
             for chunkSize in (51, 500, 5000):
                 benchmark(chunkSize, lineLength, numLines)
 
+    # Many short lines per read, as line based protocols like SMTP, IRC and
+    # memcache see them.
+    for factory in CollectingLineReceiver, CollectingLineOnlyReceiver:
+        for chunkSize in (4096, 65536):
+            benchmark(chunkSize, 30, 200000, factory)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,50 @@
+# -*- test-case-name: twisted.internet.test.test_sendfile -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Access to the sendfile(2) system call.
+
+L{os.sendfile} is used where it exists.  Otherwise, on Linux, sendfile(2) is
+called through ctypes.  On other platforms, or if ctypes is unavailable,
+L{sendfile} is C{None}.
+"""
+
+import os
+import sys
+
+__all__ = ['sendfile']
+
+
+sendfile = getattr(os, 'sendfile', None)
+
+if sendfile is None and sys.platform.startswith('linux'):
+    try:
+        import ctypes
+        import ctypes.util
+    except ImportError:
+        pass
+    else:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _sendfile64 = getattr(_libc, 'sendfile64', None)
+        if _sendfile64 is not None:
+            _sendfile64.argtypes = [
+                ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int64),
+                ctypes.c_size_t]
+            _sendfile64.restype = ctypes.c_ssize_t
+
+            def sendfile(outFileno, inFileno, offset, count):
+                """
+                Copy up to C{count} bytes, starting at C{offset}, from the
+                file descriptor C{inFileno} to C{outFileno} in the kernel.
+
+                @return: The number of bytes copied.
+                @raise OSError: If sendfile(2) fails.
+                """
+                position = ctypes.c_int64(offset)
+                result = _sendfile64(
+                    outFileno, inFileno, ctypes.byref(position), count)
+                if result < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno))
+                return result
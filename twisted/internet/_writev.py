@@ -0,0 +1,92 @@
+# -*- test-case-name: twisted.internet.test.test_writev -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Access to the writev(2) system call, which writes several buffers to a file
+descriptor at once without first joining them.
+
+L{os.writev} is used where it exists.  Otherwise, on POSIX platforms,
+writev(2) is called through ctypes.  Elsewhere, or if ctypes is unavailable,
+L{writev} is C{None}.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+
+__all__ = ['writev', 'IOV_MAX']
+
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+if IOV_MAX < 1:
+    # The smallest value POSIX allows.
+    IOV_MAX = 16
+
+writev = None
+
+if getattr(os, 'writev', None) is not None:
+    def writev(fileno, buffers, offset=0):
+        """
+        Write C{buffers} to C{fileno}, skipping the first C{offset} bytes of
+        the first one.
+
+        @return: The number of bytes written.
+        @raise OSError: If writev(2) fails.
+        """
+        if offset:
+            buffers = [memoryview(buffers[0])[offset:]] + list(buffers[1:])
+        return os.writev(fileno, buffers)
+
+elif os.name == 'posix':
+    try:
+        import ctypes
+    except ImportError:
+        pass
+    else:
+        class _IOVector(ctypes.Structure):
+            _fields_ = [('iov_base', ctypes.c_void_p),
+                        ('iov_len', ctypes.c_size_t)]
+
+        # The C library is already loaded into the process, and looking it up
+        # by name with ctypes.util.find_library leaks a file descriptor.
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _writev = getattr(_libc, 'writev', None)
+        if _writev is not None:
+            _writev.argtypes = [
+                ctypes.c_int, ctypes.POINTER(_IOVector), ctypes.c_int]
+            _writev.restype = ctypes.c_ssize_t
+
+            def writev(fileno, buffers, offset=0):
+                """
+                Write C{buffers} to C{fileno}, skipping the first C{offset}
+                bytes of the first one.
+
+                @return: The number of bytes written.
+                @raise OSError: If writev(2) fails.
+                """
+                count = len(buffers)
+                vectors = (_IOVector * count)()
+                # The pointers refer to the strings' own storage, so keep
+                # them alive until the call returns.
+                pointers = []
+                for i in range(count):
+                    data = buffers[i]
+                    if not isinstance(data, bytes):
+                        data = bytes(data)
+                    pointer = ctypes.c_char_p(data)
+                    pointers.append(pointer)
+                    vectors[i].iov_base = ctypes.cast(
+                        pointer, ctypes.c_void_p).value
+                    vectors[i].iov_len = len(data)
+                if offset:
+                    vectors[0].iov_base += offset
+                    vectors[0].iov_len -= offset
+                result = _writev(fileno, vectors, count)
+                if result < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno))
+                return result
@@ -15,7 +15,7 @@ from zope.interface import implementer
 # Twisted Imports
 from twisted.python.compat import _PY3, unicode, lazyByteSlice
 from twisted.python import _reflectpy3 as reflect, failure
-from twisted.internet import interfaces, main
+from twisted.internet import interfaces, main, _writev
 
 if _PY3:
     def _concatenate(bObj, offset, bArray):
@@ -235,20 +235,10 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @see: L{twisted.internet.interfaces.IWriteDescriptor.doWrite}.
         """
-        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
-            # If there is currently less than SEND_LIMIT bytes left to send
-            # in the string, extend it with the array data.
-            self.dataBuffer = _concatenate(
-                self.dataBuffer, self.offset, self._tempDataBuffer)
-            self.offset = 0
-            self._tempDataBuffer = []
-            self._tempDataLen = 0
-
-        # Send as much data as you can.
-        if self.offset:
-            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
+        if self._canWriteVectors():
+            l = self._doWriteVectors()
         else:
-            l = self.writeSomeData(self.dataBuffer)
+            l = self._doWriteData()
 
         # There is no writeSomeData implementation in Twisted which returns
         # < 0, but the documentation for writeSomeData used to claim negative
@@ -256,7 +246,6 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         # although it may be worth deprecating and removing at some point.
         if isinstance(l, Exception) or l < 0:
             return l
-        self.offset += l
         # If there is nothing left to send,
         if self.offset == len(self.dataBuffer) and not self._tempDataLen:
             self.dataBuffer = b""
@@ -283,6 +272,116 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                 return result
         return None
 
+    def _doWriteData(self):
+        """
+        Join the buffered data into one string and send as much of it as
+        possible with L{writeSomeData}.
+
+        @return: The result of L{writeSomeData}.
+        """
+        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
+            # If there is currently less than SEND_LIMIT bytes left to send
+            # in the string, extend it with the array data.
+            self.dataBuffer = _concatenate(
+                self.dataBuffer, self.offset, self._tempDataBuffer)
+            self.offset = 0
+            self._tempDataBuffer = []
+            self._tempDataLen = 0
+
+        # Send as much data as you can.
+        if self.offset:
+            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
+        else:
+            l = self.writeSomeData(self.dataBuffer)
+        if not (isinstance(l, Exception) or l < 0):
+            self.offset += l
+        return l
+
+
+    def _canWriteVectors(self):
+        """
+        Determine whether the buffered data can be sent with
+        L{_writeSomeVectors}, without being joined first.
+
+        @return: C{False}; subclasses which implement L{_writeSomeVectors}
+            override this.
+        """
+        return False
+
+
+    def _writeSomeVectors(self, vectors, offset):
+        """
+        Write as much as possible of several strings, immediately, as if they
+        had been joined, skipping the first C{offset} bytes of the first one.
+
+        @return: As for L{writeSomeData}.
+        """
+        raise NotImplementedError("%s does not implement _writeSomeVectors" %
+                                  reflect.qual(self.__class__))
+
+
+    def _doWriteVectors(self):
+        """
+        Send as much of the buffered data as possible with
+        L{_writeSomeVectors}, a string at a time rather than joined into one.
+
+        The unsent part of a partly sent string is kept in C{dataBuffer},
+        starting at C{offset}, and the strings after it stay in
+        C{_tempDataBuffer}.
+
+        @return: The result of L{_writeSomeVectors}.
+        """
+        buffers = self._tempDataBuffer
+        dataBuffer = self.dataBuffer
+        offset = self.offset
+        limit = _writev.IOV_MAX
+        partial = offset < len(dataBuffer)
+        if partial:
+            vectors = [dataBuffer]
+            size = len(dataBuffer) - offset
+        else:
+            vectors = []
+            size = offset = 0
+        for data in buffers:
+            if len(vectors) >= limit or size >= self.SEND_LIMIT:
+                break
+            vectors.append(data)
+            size += len(data)
+        if not vectors:
+            return 0
+
+        l = self._writeSomeVectors(vectors, offset)
+        if isinstance(l, Exception) or l < 0:
+            return l
+
+        written = l
+        if partial:
+            left = len(dataBuffer) - offset
+            if written < left:
+                self.offset += written
+                return l
+            written -= left
+        self.dataBuffer = b""
+        self.offset = 0
+        # Drop the strings sent entirely, keeping the partly sent one.
+        index = 0
+        count = len(buffers)
+        while index < count:
+            size = len(buffers[index])
+            if written < size:
+                break
+            written -= size
+            self._tempDataLen -= size
+            index += 1
+        if written:
+            self.dataBuffer = buffers[index]
+            self.offset = written
+            self._tempDataLen -= len(buffers[index])
+            index += 1
+        del buffers[:index]
+        return l
+
+
     def _postLoseConnection(self):
         """Called after a loseConnection(), when all data has been written.
 
@@ -211,6 +211,297 @@ class DelayedCall:
 
 
 
+class HeapTimerQueue(object):
+    """
+    The default timer queue used by L{ReactorBase} to keep track of
+    L{DelayedCall}s.
+
+    Newly scheduled calls are collected in a list and only pushed onto a
+    binary heap, ordered by their scheduled time, the next time the reactor
+    asks for the next timeout or runs its timed calls.  Cancelled calls are
+    left in the heap and discarded lazily.
+
+    A timer queue implements the following methods, which L{ReactorBase}
+    uses to manage its delayed calls:
+
+      - C{add(call)}: schedule a new L{DelayedCall}.
+      - C{cancel(call)}: note that C{call} is being cancelled.
+      - C{moveSooner(call)}: note that C{call} is now scheduled for an
+        earlier time than before.
+      - C{getDelayedCalls()}: return a list of all outstanding calls.
+      - C{nextTime()}: return the time at which the earliest outstanding call
+        should be run, or C{None} if there are no calls.
+      - C{expired(now)}: return an iterator over the calls which should be
+        run at time C{now}, in the order they should be run in.  Calls
+        added while this iterator is being consumed are not included.
+
+    @ivar _pendingTimedCalls: A heap of L{DelayedCall}s, possibly including
+        cancelled ones.
+
+    @ivar _newTimedCalls: A list of L{DelayedCall}s added since the last time
+        they were moved into C{_pendingTimedCalls}.
+
+    @ivar _cancellations: The number of cancelled calls which are still in
+        C{_pendingTimedCalls} or C{_newTimedCalls}.
+    """
+
+    def __init__(self):
+        self._pendingTimedCalls = []
+        self._newTimedCalls = []
+        self._cancellations = 0
+
+
+    def add(self, call):
+        """
+        Schedule C{call}.
+        """
+        self._newTimedCalls.append(call)
+
+
+    def cancel(self, call):
+        """
+        Note that C{call} has been cancelled.
+        """
+        self._cancellations += 1
+
+
+    def moveSooner(self, call):
+        """
+        Move C{call} up the heap after its time has been decreased.
+        """
+        # Linear time find: slow.
+        heap = self._pendingTimedCalls
+        try:
+            pos = heap.index(call)
+
+            # Move elt up the heap until it rests at the right place.
+            elt = heap[pos]
+            while pos != 0:
+                parent = (pos-1) // 2
+                if heap[parent] <= elt:
+                    break
+                # move parent down
+                heap[pos] = heap[parent]
+                pos = parent
+            heap[pos] = elt
+        except ValueError:
+            # element was not found in heap - oh well...
+            pass
+
+
+    def getDelayedCalls(self):
+        """
+        Return all the outstanding delayed calls, in no particular order.
+        """
+        return [x for x in (self._pendingTimedCalls + self._newTimedCalls)
+                if not x.cancelled]
+
+
+    def _insertNewDelayedCalls(self):
+        for call in self._newTimedCalls:
+            if call.cancelled:
+                self._cancellations-=1
+            else:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+        self._newTimedCalls = []
+
+
+    def nextTime(self):
+        """
+        Return the time of the earliest call in the heap, or C{None} if it is
+        empty.
+        """
+        # insert new delayed calls to make sure to include them in timeout value
+        self._insertNewDelayedCalls()
+
+        if not self._pendingTimedCalls:
+            return None
+        return self._pendingTimedCalls[0].time
+
+
+    def expired(self, now):
+        """
+        Pop the calls which are due at C{now} off the heap, yielding them in
+        order, then compact the heap if many cancelled calls have
+        accumulated in it.
+        """
+        # insert new delayed calls now
+        self._insertNewDelayedCalls()
+
+        while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
+            call = heappop(self._pendingTimedCalls)
+            if call.cancelled:
+                self._cancellations-=1
+                continue
+
+            if call.delayed_time > 0:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+                continue
+
+            yield call
+
+        if (self._cancellations > 50 and
+             self._cancellations > len(self._pendingTimedCalls) >> 1):
+            self._cancellations = 0
+            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
+                                       if not x.cancelled]
+            heapify(self._pendingTimedCalls)
+
+
+
+class TimingWheel(object):
+    """
+    A hashed timing wheel which can be used by L{ReactorBase} in place of
+    L{HeapTimerQueue}, see L{ReactorBase.installTimerQueue}.
+
+    Time is divided into ticks of C{resolution} seconds and each outstanding
+    call is kept in a bucket for the tick it falls in.  Adding, cancelling
+    and resetting a call therefore take constant time regardless of how many
+    calls are outstanding; only the first call into a tick which has no
+    bucket yet pays for a push onto a heap of occupied ticks.  Buckets are
+    not searched when a call is cancelled or moved to an earlier time:
+    stale entries are simply skipped when their bucket expires.  As with
+    L{HeapTimerQueue}, moving a call to a later time costs nothing until its
+    original time comes around.
+
+    The price is precision: the reactor is only asked to wake up at the end
+    of the earliest occupied tick, so a call may run up to C{resolution}
+    seconds late.  Calls are never run early, and calls in the same bucket
+    are run in the order of their scheduled times.
+
+    @ivar resolution: The length of a tick, in seconds.
+
+    @ivar _buckets: A C{dict} mapping tick numbers to lists of L{DelayedCall}s,
+        possibly including calls which have since been cancelled or moved to
+        another tick.
+
+    @ivar _ticks: A heap of the tick numbers in C{_buckets}.
+
+    @ivar _scheduled: A C{dict} mapping each outstanding L{DelayedCall} which
+        is in a bucket to the tick of the bucket it currently belongs to.
+
+    @ivar _newTimedCalls: A list of L{DelayedCall}s added since the last time
+        they were moved into buckets.
+    """
+
+    def __init__(self, resolution=0.01):
+        self.resolution = resolution
+        self._buckets = {}
+        self._ticks = []
+        self._scheduled = {}
+        self._newTimedCalls = []
+
+
+    def _schedule(self, call):
+        """
+        Put C{call} in the bucket of the tick its time falls in.
+        """
+        tick = int(call.time // self.resolution)
+        self._scheduled[call] = tick
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            self._buckets[tick] = [call]
+            heappush(self._ticks, tick)
+        else:
+            bucket.append(call)
+
+
+    def _insertNewDelayedCalls(self):
+        for call in self._newTimedCalls:
+            if not call.cancelled:
+                call.activate_delay()
+                self._schedule(call)
+        self._newTimedCalls = []
+
+
+    def add(self, call):
+        """
+        Schedule C{call}.
+        """
+        self._newTimedCalls.append(call)
+
+
+    def cancel(self, call):
+        """
+        Forget about C{call}.  Its entry in its bucket will be skipped.
+        """
+        self._scheduled.pop(call, None)
+
+
+    def moveSooner(self, call):
+        """
+        Put C{call} in the bucket for its new time.  Its entry in its old
+        bucket will be skipped.
+        """
+        if call in self._scheduled:
+            self._schedule(call)
+
+
+    def getDelayedCalls(self):
+        """
+        Return all the outstanding delayed calls, in no particular order.
+        """
+        return list(self._scheduled) + [
+            x for x in self._newTimedCalls if not x.cancelled]
+
+
+    def nextTime(self):
+        """
+        Return the end of the earliest occupied tick, or C{None} if there are
+        no outstanding calls.
+        """
+        self._insertNewDelayedCalls()
+
+        ticks = self._ticks
+        while ticks:
+            tick = ticks[0]
+            for call in self._buckets[tick]:
+                if self._scheduled.get(call) == tick:
+                    return (tick + 1) * self.resolution
+            # Nothing but stale entries in this bucket; drop it.
+            heappop(ticks)
+            del self._buckets[tick]
+        return None
+
+
+    def expired(self, now):
+        """
+        Yield the calls which are due at C{now}, emptying every bucket for a
+        tick which has ended.
+        """
+        self._insertNewDelayedCalls()
+
+        nowTick = int(now // self.resolution)
+        ticks = self._ticks
+        buckets = self._buckets
+        scheduled = self._scheduled
+        notDue = []
+        while ticks and ticks[0] <= nowTick:
+            tick = heappop(ticks)
+            bucket = buckets.pop(tick)
+            bucket.sort()
+            for call in bucket:
+                if scheduled.get(call) != tick:
+                    # Cancelled, moved sooner, or already run.
+                    continue
+                if call.delayed_time > 0:
+                    call.activate_delay()
+                    self._schedule(call)
+                    continue
+                if call.time > now:
+                    # The current tick has not ended yet.
+                    notDue.append(call)
+                    continue
+                del scheduled[call]
+                yield call
+        for call in notDue:
+            if scheduled.get(call) == nowTick:
+                self._schedule(call)
+
+
+
 @implementer(IResolverSimple)
 class ThreadedResolver(object):
     """
@@ -462,9 +753,17 @@ class ReactorBase(object):
     @ivar _registerAsIOThread: A flag controlling whether the reactor will
         register the thread it is running in as the I/O thread when it starts.
         If C{True}, registration will be done, otherwise it will not be.
+
+    @ivar timerQueueFactory: A no-argument callable returning the timer queue
+        a new reactor keeps its L{DelayedCall}s in.  See L{HeapTimerQueue}
+        for the methods a timer queue must provide.
+
+    @ivar _timerQueue: The timer queue this reactor keeps its L{DelayedCall}s
+        in.
     """
 
     _registerAsIOThread = True
+    timerQueueFactory = HeapTimerQueue
 
     _stopped = True
     installed = False
@@ -476,9 +775,7 @@ class ReactorBase(object):
     def __init__(self):
         self.threadCallQueue = []
         self._eventTriggers = {}
-        self._pendingTimedCalls = []
-        self._newTimedCalls = []
-        self._cancellations = 0
+        self._timerQueue = self.timerQueueFactory()
         self.running = False
         self._started = False
         self._justStopped = False
@@ -513,6 +810,19 @@ class ReactorBase(object):
         self.resolver = resolver
         return oldResolver
 
+    def installTimerQueue(self, timerQueue):
+        """
+        Keep delayed calls in C{timerQueue} from now on, for example a
+        L{TimingWheel}.  All outstanding delayed calls are moved into it.
+
+        @return: The previously installed timer queue.
+        """
+        oldTimerQueue = self._timerQueue
+        for call in oldTimerQueue.getDelayedCalls():
+            timerQueue.add(call)
+        self._timerQueue = timerQueue
+        return oldTimerQueue
+
     def wakeUp(self):
         """
         Wake up the event loop.
@@ -711,31 +1021,14 @@ class ReactorBase(object):
                            self._cancelCallLater,
                            self._moveCallLaterSooner,
                            seconds=self.seconds)
-        self._newTimedCalls.append(tple)
+        self._timerQueue.add(tple)
         return tple
 
     def _moveCallLaterSooner(self, tple):
-        # Linear time find: slow.
-        heap = self._pendingTimedCalls
-        try:
-            pos = heap.index(tple)
-
-            # Move elt up the heap until it rests at the right place.
-            elt = heap[pos]
-            while pos != 0:
-                parent = (pos-1) // 2
-                if heap[parent] <= elt:
-                    break
-                # move parent down
-                heap[pos] = heap[parent]
-                pos = parent
-            heap[pos] = elt
-        except ValueError:
-            # element was not found in heap - oh well...
-            pass
+        self._timerQueue.moveSooner(tple)
 
     def _cancelCallLater(self, tple):
-        self._cancellations+=1
+        self._timerQueue.cancel(tple)
 
 
     def getDelayedCalls(self):
@@ -743,25 +1036,14 @@ class ReactorBase(object):
         They are returned in no particular order.
         This method is not efficient -- it is really only meant for
         test cases."""
-        return [x for x in (self._pendingTimedCalls + self._newTimedCalls) if not x.cancelled]
-
-    def _insertNewDelayedCalls(self):
-        for call in self._newTimedCalls:
-            if call.cancelled:
-                self._cancellations-=1
-            else:
-                call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
-        self._newTimedCalls = []
+        return self._timerQueue.getDelayedCalls()
 
     def timeout(self):
-        # insert new delayed calls to make sure to include them in timeout value
-        self._insertNewDelayedCalls()
-
-        if not self._pendingTimedCalls:
+        nextTime = self._timerQueue.nextTime()
+        if nextTime is None:
             return None
 
-        return max(0, self._pendingTimedCalls[0].time - self.seconds())
+        return max(0, nextTime - self.seconds())
 
 
     def runUntilCurrent(self):
@@ -785,21 +1067,8 @@ class ReactorBase(object):
             if self.threadCallQueue:
                 self.wakeUp()
 
-        # insert new delayed calls now
-        self._insertNewDelayedCalls()
-
         now = self.seconds()
-        while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
-            call = heappop(self._pendingTimedCalls)
-            if call.cancelled:
-                self._cancellations-=1
-                continue
-
-            if call.delayed_time > 0:
-                call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
-                continue
-
+        for call in self._timerQueue.expired(now):
             try:
                 call.called = 1
                 call.func(*call.args, **call.kw)
@@ -814,14 +1083,6 @@ class ReactorBase(object):
                     e += "\n"
                     log.msg(e)
 
-
-        if (self._cancellations > 50 and
-             self._cancellations > len(self._pendingTimedCalls) >> 1):
-            self._cancellations = 0
-            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
-                                       if not x.cancelled]
-            heapify(self._pendingTimedCalls)
-
         if self._justStopped:
             self._justStopped = False
             self.fireSystemEvent("shutdown")
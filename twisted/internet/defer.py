@@ -182,7 +182,7 @@ _CONTINUE = object()
 
 
 
-class Deferred:
+class Deferred(object):
     """
     This is a callback which will be put off until later.
 
@@ -224,24 +224,21 @@ class Deferred:
 
     @ivar _chainedTo: If this Deferred is waiting for the result of another
         Deferred, this is a reference to the other Deferred.  Otherwise, C{None}.
-    """
 
-    called = False
-    paused = 0
-    _debugInfo = None
-    _suppressAlreadyCalled = False
+    @note: Instances have no C{__dict__}, which makes them smaller and quicker
+        to create.  Setting an attribute which is not defined here raises
+        C{AttributeError}.  Subclasses which do not define C{__slots__}
+        themselves still get one.
+    """
 
-    # Are we currently running a user-installed callback?  Meant to prevent
-    # recursive running of callbacks when a reentrant call to add a callback is
-    # used.
-    _runningCallbacks = False
+    __slots__ = ('callbacks', 'result', 'called', 'paused', '_canceller',
+                 '_debugInfo', '_suppressAlreadyCalled', '_runningCallbacks',
+                 '_chainedTo', '__weakref__')
 
     # Keep this class attribute for now, for compatibility with code that
     # sets it directly.
     debug = False
 
-    _chainedTo = None
-
     def __init__(self, canceller=None):
         """
         Initialize a L{Deferred}.
@@ -267,7 +264,16 @@ class Deferred:
             return result is ignored.
         """
         self.callbacks = []
+        self.called = False
+        self.paused = 0
         self._canceller = canceller
+        self._debugInfo = None
+        self._suppressAlreadyCalled = False
+        # Are we currently running a user-installed callback?  Meant to prevent
+        # recursive running of callbacks when a reentrant call to add a
+        # callback is used.
+        self._runningCallbacks = False
+        self._chainedTo = None
         if self.debug:
             self._debugInfo = DebugInfo()
             self._debugInfo.creator = traceback.format_stack()[:-1]
@@ -285,10 +291,10 @@ class Deferred:
         @rtype: a L{Deferred}
         """
         assert callable(callback)
-        assert errback == None or callable(errback)
-        cbs = ((callback, callbackArgs, callbackKeywords),
-               (errback or (passthru), errbackArgs, errbackKeywords))
-        self.callbacks.append(cbs)
+        assert errback is None or callable(errback)
+        self.callbacks.append(
+            ((callback, callbackArgs, callbackKeywords),
+             (errback or passthru, errbackArgs, errbackKeywords)))
 
         if self.called:
             self._runCallbacks()
@@ -486,7 +492,13 @@ class Deferred:
             self._debugInfo.invoker = traceback.format_stack()[:-2]
         self.called = True
         self.result = result
-        self._runCallbacks()
+        # With no callbacks yet, there is nothing to run for a successful
+        # result; succeed() relies on this being quick.
+        if self.callbacks or isinstance(result, failure.Failure):
+            self._runCallbacks()
+        elif not self.paused:
+            # This Deferred is no longer waiting on any other.
+            self._chainedTo = None
 
 
     def _continuation(self):
@@ -546,12 +558,20 @@ class Deferred:
 
             finished = True
             current._chainedTo = None
-            while current.callbacks:
-                item = current.callbacks.pop(0)
-                callback, args, kw = item[
+            # Walk the callbacks with an index rather than popping each one
+            # off the front of the list, which would move the rest of them
+            # every time.  Whenever the loop is left, the callbacks which have
+            # been run are removed, since another call may look at the list.
+            callbacks = current.callbacks
+            index = 0
+            while index < len(callbacks):
+                callback, args, kw = callbacks[index][
                     isinstance(current.result, failure.Failure)]
-                args = args or ()
-                kw = kw or {}
+                index += 1
+
+                if callback is passthru and not args and not kw:
+                    # The result would come back unchanged; skip the call.
+                    continue
 
                 # Avoid recursion if we can.
                 if callback is _CONTINUE:
@@ -570,17 +590,22 @@ class Deferred:
                     finished = False
                     break
 
+                current._runningCallbacks = True
                 try:
-                    current._runningCallbacks = True
-                    try:
-                        current.result = callback(current.result, *args, **kw)
-                    finally:
-                        current._runningCallbacks = False
+                    if args or kw:
+                        current.result = callback(
+                            current.result, *(args or ()), **(kw or {}))
+                    else:
+                        current.result = callback(current.result)
                 except:
-                    # Including full frame information in the Failure is quite
-                    # expensive, so we avoid it unless self.debug is set.
+                    current._runningCallbacks = False
+                    # Errbacks, and anything chained to this Deferred, are
+                    # given a Failure, so one is always made here.  Including
+                    # full frame information in it is quite expensive, so we
+                    # avoid that unless self.debug is set.
                     current.result = failure.Failure(captureVars=self.debug)
                 else:
+                    current._runningCallbacks = False
                     if isinstance(current.result, Deferred):
                         # The result is another Deferred.  If it has a result,
                         # we can take it and keep going.
@@ -603,6 +628,8 @@ class Deferred:
                                 current.result._debugInfo.failResult = None
                             current.result = resultResult
 
+            del callbacks[:index]
+
             if finished:
                 # As much of the callback chain - perhaps all of it - as can be
                 # processed right now has been.  The current Deferred is waiting on
@@ -610,8 +637,10 @@ class Deferred:
                 # make sure its _debugInfo is in the proper state.
                 if isinstance(current.result, failure.Failure):
                     # Stash the Failure in the _debugInfo for unhandled error
-                    # reporting.
-                    current.result.cleanFailure()
+                    # reporting.  Only a Failure with a traceback refers to
+                    # anything cleanFailure needs to replace.
+                    if getattr(current.result, 'tb', None) is not None:
+                        current.result.cleanFailure()
                     if current._debugInfo is None:
                         current._debugInfo = DebugInfo()
                     current._debugInfo.failResult = current.result
@@ -26,7 +26,9 @@ from twisted.internet.interfaces import IStreamServerEndpointStringParser
 from twisted.internet.interfaces import IStreamClientEndpointStringParser
 from twisted.python.filepath import FilePath
 from twisted.python.systemd import ListenFDs
-from twisted.internet.abstract import isIPv6Address
+from twisted.internet.abstract import isIPAddress, isIPv6Address
+from twisted.python.failure import Failure
+from twisted.python._lru import LRUCache
 
 if not _PY3:
     from twisted.plugin import IPlugin, getPlugins
@@ -40,12 +42,14 @@ else:
 __all__ = ["clientFromString", "serverFromString",
            "TCP4ServerEndpoint", "TCP6ServerEndpoint",
            "TCP4ClientEndpoint", "TCP6ClientEndpoint",
+           "HostnameEndpoint", "CachingHostResolver",
            "UNIXServerEndpoint", "UNIXClientEndpoint",
            "SSL4ServerEndpoint", "SSL4ClientEndpoint",
            "AdoptedStreamServerEndpoint", "StandardIOEndpoint"]
 
 __all3__ = ["TCP4ServerEndpoint", "TCP6ServerEndpoint",
             "TCP4ClientEndpoint", "TCP6ClientEndpoint",
+            "HostnameEndpoint", "CachingHostResolver",
             "SSL4ServerEndpoint", "SSL4ClientEndpoint",
             ]
 
@@ -68,7 +72,8 @@ class _WrappingProtocol(Protocol):
         self._wrappedProtocol = wrappedProtocol
 
         for iface in [interfaces.IHalfCloseableProtocol,
-                      interfaces.IFileDescriptorReceiver]:
+                      interfaces.IFileDescriptorReceiver,
+                      interfaces.IMemoryViewReceiver]:
             if iface.providedBy(self._wrappedProtocol):
                 directlyProvides(self, iface)
 
@@ -252,8 +257,13 @@ class StandardIOEndpoint(object):
 class _TCPServerEndpoint(object):
     """
     A TCP server endpoint interface
+
+    @ivar _reusePort: If C{True}, listen with C{SO_REUSEPORT}.  twistd sets
+        this for the endpoints of an application run with C{--workers}.
     """
 
+    _reusePort = False
+
     def __init__(self, reactor, port, backlog, interface):
         """
         @param reactor: An L{IReactorTCP} provider.
@@ -277,11 +287,15 @@ class _TCPServerEndpoint(object):
         """
         Implement L{IStreamServerEndpoint.listen} to listen on a TCP socket
         """
+        kwargs = {}
+        if self._reusePort:
+            kwargs['reusePort'] = True
         return defer.execute(self._reactor.listenTCP,
                              self._port,
                              protocolFactory,
                              backlog=self._backlog,
-                             interface=self._interface)
+                             interface=self._interface,
+                             **kwargs)
 
 
 
@@ -446,6 +460,454 @@ class TCP6ClientEndpoint(object):
 
 
 
+class CachingHostResolver(object):
+    """
+    Resolve host names to addresses for L{HostnameEndpoint}, remembering the
+    results so that new connections to the same host do not wait for name
+    resolution.
+
+    By default names are resolved with C{getaddrinfo} in the reactor's thread
+    pool.  Since C{getaddrinfo} does not report how long its answers may be
+    used for, they are kept for C{ttl} seconds.  Given a L{twisted.names}
+    resolver instead, C{A} and C{AAAA} records are looked up concurrently and
+    kept for as long as the records' own time to live allows.
+
+    Concurrent lookups of the same name share a single resolution.
+
+    The resolver also remembers the address family of the last successful
+    connection to each host, and puts addresses of that family first.
+
+    @ivar ttl: The number of seconds results from C{getaddrinfo} are cached.
+    @type ttl: C{float}
+
+    @ivar resolver: An L{IResolver <twisted.internet.interfaces.IResolver>}
+        provider used instead of C{getaddrinfo}, or C{None}.
+
+    @ivar _getaddrinfo: A hook used for testing name resolution.
+
+    @ivar _deferToThread: A hook used for testing deferToThread.
+
+    @ivar _addresses: An L{LRUCache} mapping host names to a C{list} holding
+        the time the entry expires and a C{list} of C{(family, address)}
+        tuples.
+
+    @ivar _families: An L{LRUCache} mapping host names to the address family
+        of the last successful connection to them.
+
+    @ivar _pending: A C{dict} mapping host names being resolved to a C{list}
+        of L{Deferred}s waiting for the result.
+    """
+
+    _getaddrinfo = staticmethod(socket.getaddrinfo)
+    _deferToThread = staticmethod(threads.deferToThread)
+
+    def __init__(self, reactor, ttl=60.0, maxSize=1000, resolver=None):
+        """
+        @param reactor: An L{IReactorTime} provider used to expire entries.
+
+        @param ttl: See L{CachingHostResolver.ttl}.
+
+        @param maxSize: The largest number of host names cached.
+        @type maxSize: C{int}
+
+        @param resolver: See L{CachingHostResolver.resolver}.
+        """
+        self._reactor = reactor
+        self.ttl = ttl
+        self.resolver = resolver
+        self._addresses = LRUCache(maxSize)
+        self._families = LRUCache(maxSize)
+        self._pending = {}
+
+
+    def resolve(self, host):
+        """
+        Find the addresses of C{host}.
+
+        @param host: A host name or an IPv4 or IPv6 address literal.
+        @type host: C{str}
+
+        @return: A L{Deferred} which fires with a non-empty C{list} of
+            C{(family, address)} tuples, ordered so that consecutive
+            addresses alternate between address families, starting with the
+            preferred one.  It fails with L{error.DNSLookupError} if
+            C{host} has no addresses.
+        """
+        if isIPv6Address(host):
+            return defer.succeed([(socket.AF_INET6, host)])
+        if isIPAddress(host):
+            return defer.succeed([(socket.AF_INET, host)])
+
+        entry = self._addresses.get(host)
+        if entry is not None:
+            if entry[0] > self._reactor.seconds():
+                return defer.succeed(self._order(host, entry[1]))
+            del self._addresses[host]
+
+        d = defer.Deferred()
+        waiting = self._pending.get(host)
+        if waiting is None:
+            self._pending[host] = [d]
+            if self.resolver is None:
+                lookup = self._lookupWithGetaddrinfo(host)
+            else:
+                lookup = self._lookupWithResolver(host)
+            lookup.addBoth(self._resolved, host)
+        else:
+            waiting.append(d)
+        return d
+
+
+    def _lookupWithGetaddrinfo(self, host):
+        """
+        Resolve C{host} with C{getaddrinfo} in a thread.
+
+        @return: A L{Deferred} which fires with a C{list} of C{(family,
+            address)} tuples and the number of seconds they may be cached for.
+        """
+        def collect(results):
+            addresses = []
+            for family, socktype, proto, canonname, sockaddr in results:
+                if family in (socket.AF_INET, socket.AF_INET6):
+                    address = (family, sockaddr[0])
+                    if address not in addresses:
+                        addresses.append(address)
+            return addresses, self.ttl
+        d = self._deferToThread(
+            self._getaddrinfo, host, 0, 0, socket.SOCK_STREAM)
+        return d.addCallback(collect)
+
+
+    def _lookupWithResolver(self, host):
+        """
+        Resolve C{host} by looking up its C{A} and C{AAAA} records with
+        C{self.resolver}.
+
+        @return: A L{Deferred} which fires with a C{list} of C{(family,
+            address)} tuples and the smallest time to live of the records
+            they came from.
+        """
+        from twisted.names import dns
+        def collect(results):
+            addresses = []
+            ttls = []
+            for success, result in results:
+                if not success:
+                    continue
+                for record in result[0]:
+                    if record.type == dns.A:
+                        addresses.append(
+                            (socket.AF_INET, record.payload.dottedQuad()))
+                    elif record.type == dns.AAAA:
+                        addresses.append(
+                            (socket.AF_INET6, socket.inet_ntop(
+                                    socket.AF_INET6, record.payload.address)))
+                    else:
+                        continue
+                    ttls.append(record.ttl)
+            return addresses, min(ttls or [0])
+        return defer.DeferredList(
+            [self.resolver.lookupAddress(host),
+             self.resolver.lookupIPV6Address(host)],
+            consumeErrors=True).addCallback(collect)
+
+
+    def _resolved(self, result, host):
+        """
+        Cache the outcome of resolving C{host} and deliver it to everyone
+        waiting for it.
+        """
+        waiting = self._pending.pop(host)
+        if isinstance(result, Failure):
+            if not result.check(error.DNSLookupError):
+                result = Failure(error.DNSLookupError(host))
+        else:
+            addresses, ttl = result
+            if not addresses:
+                result = Failure(error.DNSLookupError(host))
+            else:
+                if ttl > 0:
+                    self._addresses[host] = [
+                        self._reactor.seconds() + ttl, addresses]
+                result = self._order(host, addresses)
+        for d in waiting:
+            d.callback(result)
+
+
+    def _order(self, host, addresses):
+        """
+        Interleave C{addresses} by family, starting with the family C{host}
+        was last successfully connected with or, failing that, the family of
+        the first address.
+        """
+        preferred = self._families.peek(host, addresses[0][0])
+        first = [address for address in addresses if address[0] == preferred]
+        second = [address for address in addresses if address[0] != preferred]
+        ordered = []
+        for i in range(max(len(first), len(second))):
+            ordered.extend(first[i:i + 1])
+            ordered.extend(second[i:i + 1])
+        return ordered
+
+
+    def connected(self, host, family):
+        """
+        Record that a connection to C{host} using an address of C{family}
+        succeeded, so that later connections try that family first.
+        """
+        self._families[host] = family
+
+
+    def failed(self, host):
+        """
+        Record that no address of C{host} could be connected to, so that the
+        next connection resolves it again.
+        """
+        self._addresses.pop(host, None)
+
+
+
+class _DiscardingProtocol(Protocol):
+    """
+    A protocol which disconnects as soon as it is connected, used for
+    connection attempts which succeed after another one already did.
+    """
+
+    def connectionMade(self):
+        self.transport.loseConnection()
+
+
+
+class _RacingWrappingFactory(_WrappingFactory):
+    """
+    A L{_WrappingFactory} for one of the connection attempts made by a
+    L{_ConnectionRace}.  Only the first attempt to connect builds a protocol
+    with the wrapped factory.
+
+    @ivar _race: The L{_ConnectionRace} this attempt belongs to.
+    """
+
+    def __init__(self, wrappedFactory, race):
+        _WrappingFactory.__init__(self, wrappedFactory)
+        self._race = race
+
+
+    def buildProtocol(self, addr):
+        if not self._race._won(self):
+            return _DiscardingProtocol()
+        return _WrappingFactory.buildProtocol(self, addr)
+
+
+
+class _ConnectionRace(object):
+    """
+    Connect to the first reachable address of a host name, trying a new
+    address whenever an attempt fails or C{attemptDelay} seconds pass without
+    one succeeding, as described in RFC 6555.
+
+    @ivar deferred: The L{Deferred} which fires with the connected protocol.
+
+    @ivar _attempts: A C{dict} mapping the L{_RacingWrappingFactory} of each
+        attempt in progress to its address family.
+
+    @ivar _winner: The L{_RacingWrappingFactory} of the attempt which
+        connected first, or C{None}.
+    """
+
+    def __init__(self, endpoint, protocolFactory):
+        self._endpoint = endpoint
+        self._protocolFactory = protocolFactory
+        self._reactor = endpoint._reactor
+        self._remaining = []
+        self._attempts = {}
+        self._winner = None
+        self._delayedCall = None
+        self._lastFailure = None
+        self._finished = False
+        self.deferred = defer.Deferred(self._cancel)
+        self._resolution = endpoint._resolver.resolve(endpoint._host)
+        self._resolution.addCallbacks(self._resolved, self._fail)
+
+
+    def _resolved(self, addresses):
+        self._resolution = None
+        self._remaining = list(addresses)
+        self._startAttempt()
+
+
+    def _startAttempt(self):
+        """
+        Start connecting to the next address and, if there are more, arrange
+        to try the one after it unless this attempt finishes first.
+        """
+        self._delayedCall = None
+        family, address = self._remaining.pop(0)
+        factory = _RacingWrappingFactory(self._protocolFactory, self)
+        self._attempts[factory] = family
+        try:
+            self._endpoint._connectTo(address, factory)
+        except:
+            self._attemptFailed(Failure(), factory)
+        else:
+            factory._onConnection.addCallbacks(
+                self._attemptSucceeded, self._attemptFailed,
+                callbackArgs=(factory,), errbackArgs=(factory,))
+        if (self._remaining and self._delayedCall is None and
+            not self._finished):
+            self._delayedCall = self._reactor.callLater(
+                self._endpoint.attemptDelay, self._startAttempt)
+
+
+    def _won(self, factory):
+        """
+        Called when the attempt using C{factory} has connected.  The first
+        attempt to do so wins and the others are abandoned.
+
+        @return: C{True} if the attempt won, C{False} otherwise.
+        """
+        if self._winner is not None or self._finished:
+            return False
+        self._winner = factory
+        family = self._attempts.pop(factory)
+        self._endpoint._resolver.connected(self._endpoint._host, family)
+        self._abandon()
+        return True
+
+
+    def _abandon(self):
+        """
+        Stop all attempts in progress and do not start any more.
+        """
+        if self._delayedCall is not None:
+            self._delayedCall.cancel()
+            self._delayedCall = None
+        self._remaining = []
+        attempts = list(self._attempts)
+        self._attempts.clear()
+        for factory in attempts:
+            factory._onConnection.cancel()
+
+
+    def _attemptSucceeded(self, protocol, factory):
+        self._finished = True
+        self.deferred.callback(protocol)
+
+
+    def _attemptFailed(self, reason, factory):
+        if factory is self._winner:
+            self._fail(reason)
+            return
+        if self._attempts.pop(factory, None) is None:
+            # An abandoned attempt.
+            return
+        self._lastFailure = reason
+        if self._remaining:
+            if self._delayedCall is not None:
+                self._delayedCall.cancel()
+            self._startAttempt()
+        elif not self._attempts and self._delayedCall is None:
+            self._endpoint._resolver.failed(self._endpoint._host)
+            self._fail(self._lastFailure)
+
+
+    def _fail(self, reason):
+        self._resolution = None
+        self._finished = True
+        if not self.deferred.called:
+            self.deferred.errback(reason)
+
+
+    def _cancel(self, deferred):
+        """
+        Stop resolving or connecting when the connection L{Deferred} is
+        cancelled, and fail it with L{error.ConnectingCancelledError}.
+        """
+        self._finished = True
+        deferred.errback(error.ConnectingCancelledError(
+                (self._endpoint._host, self._endpoint._port)))
+        if self._resolution is not None:
+            self._resolution.cancel()
+        self._abandon()
+
+
+
+@implementer(interfaces.IStreamClientEndpoint)
+class HostnameEndpoint(object):
+    """
+    TCP client endpoint for a host name, connecting over IPv4 or IPv6.
+
+    Addresses come from a L{CachingHostResolver}, which should be shared
+    between endpoints so its cache can be of use.  Connection attempts to
+    the host's addresses are started C{attemptDelay} seconds apart, or as
+    soon as the previous one fails, and the first to succeed is used.
+
+    @ivar attemptDelay: The number of seconds to wait for a connection
+        attempt before starting another one in parallel.
+    @type attemptDelay: C{float}
+    """
+
+    attemptDelay = 0.3
+
+    def __init__(self, reactor, host, port, timeout=30, bindAddress=None,
+                 resolver=None):
+        """
+        @param reactor: An L{IReactorTCP} and L{IReactorTime} provider.
+
+        @param host: A host name or an IPv4 or IPv6 address literal.
+        @type host: C{str}
+
+        @param resolver: The L{CachingHostResolver} used to resolve C{host},
+            or C{None} to create one just for this endpoint.
+
+        @see: L{twisted.internet.interfaces.IReactorTCP.connectTCP}
+        """
+        if resolver is None:
+            resolver = CachingHostResolver(reactor)
+        self._reactor = reactor
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._bindAddress = bindAddress
+        self._resolver = resolver
+
+
+    def connect(self, protocolFactory):
+        """
+        Implement L{IStreamClientEndpoint.connect} to connect via TCP to the
+        first address of the host name which can be reached.
+        """
+        return _ConnectionRace(self, protocolFactory).deferred
+
+
+    def _connectTo(self, address, factory):
+        """
+        Start connecting to one of the host's addresses.
+        """
+        self._reactor.connectTCP(
+            address, self._port, factory,
+            timeout=self._timeout, bindAddress=self._bindAddress)
+
+
+
+class _SSLHostnameEndpoint(HostnameEndpoint):
+    """
+    A L{HostnameEndpoint} which connects with SSL.
+    """
+
+    def __init__(self, reactor, host, port, sslContextFactory, timeout=30,
+                 bindAddress=None, resolver=None):
+        HostnameEndpoint.__init__(self, reactor, host, port, timeout,
+                                  bindAddress, resolver)
+        self._sslContextFactory = sslContextFactory
+
+
+    def _connectTo(self, address, factory):
+        self._reactor.connectSSL(
+            address, self._port, factory, self._sslContextFactory,
+            timeout=self._timeout, bindAddress=self._bindAddress)
+
+
+
 @implementer(interfaces.IStreamServerEndpoint)
 class SSL4ServerEndpoint(object):
     """
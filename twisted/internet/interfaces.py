@@ -191,7 +191,7 @@ class IResolver(IResolverSimple):
 
 class IReactorTCP(Interface):
 
-    def listenTCP(port, factory, backlog=50, interface=''):
+    def listenTCP(port, factory, backlog=50, interface='', reusePort=False):
         """
         Connects a given protocol factory to the given numeric TCP/IP port.
 
@@ -205,12 +205,20 @@ class IReactorTCP(Interface):
             defaults to '', ie all IPv4 addresses.  To bind to all IPv4 and IPv6
             addresses, you must call this method twice.
 
+        @param reusePort: If true, bind with C{SO_REUSEPORT}, so that several
+            processes can listen on the same address and have the kernel
+            distribute incoming connections among them.  This argument is
+            optional; reactors or platforms which cannot do this raise
+            L{NotImplementedError} if it is true.  (Since 12.3)
+
         @return: an object that provides L{IListeningPort}.
 
         @raise CannotListenError: as defined here
                                   L{twisted.internet.error.CannotListenError},
                                   if it cannot listen on this port (e.g., it
                                   cannot bind to the required port number)
+
+        @raise NotImplementedError: If C{reusePort} is true and not supported.
         """
 
     def connectTCP(host, port, factory, timeout=30, bindAddress=None):
@@ -409,11 +417,20 @@ class IReactorUDP(Interface):
     UDP socket methods.
     """
 
-    def listenUDP(port, protocol, interface='', maxPacketSize=8192):
+    def listenUDP(port, protocol, interface='', maxPacketSize=8192,
+                  reusePort=False):
         """
         Connects a given DatagramProtocol to the given numeric UDP port.
 
+        @param reusePort: If true, bind with C{SO_REUSEPORT}, so that several
+            sockets can be bound to the same address and have the kernel
+            distribute incoming datagrams among them.  This argument is
+            optional; reactors or platforms which cannot do this raise
+            L{NotImplementedError} if it is true.  (Since 12.3)
+
         @return: object which provides L{IListeningPort}.
+
+        @raise NotImplementedError: If C{reusePort} is true and not supported.
         """
 
 
@@ -1458,6 +1475,25 @@ class IFileDescriptorReceiver(Interface):
 
 
 
+class IMemoryViewReceiver(Interface):
+    """
+    Protocols may implement L{IMemoryViewReceiver} to have the data read from
+    a TCP connection passed to them without first being copied into a new
+    string.
+    """
+    def dataReceived(data):
+        """
+        Called whenever data is received.
+
+        @param data: The bytes received, as a C{memoryview} of a buffer which
+            is reused for later reads.  It is only valid until this method
+            returns; copy any part of it which must be kept, for example with
+            C{data.tobytes()}.
+        @type data: C{memoryview}
+        """
+
+
+
 class IProtocolFactory(Interface):
     """
     Interface for protocol factories.
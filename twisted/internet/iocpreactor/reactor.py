@@ -150,10 +150,17 @@ class IOCPReactor(base._SignalReactorMixin, base.ReactorBase,
         return skt
 
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
         """
         @see: twisted.internet.interfaces.IReactorTCP.listenTCP
+
+        @raise NotImplementedError: If C{reusePort} is true; this reactor does
+            not support it.
         """
+        if reusePort:
+            raise NotImplementedError(
+                "reusePort is not supported by the IOCP reactor.")
         p = tcp.Port(port, factory, backlog, interface, self)
         p.startListening()
         return p
@@ -214,12 +221,19 @@ class IOCPReactor(base._SignalReactorMixin, base.ReactorBase,
                 "SSL APIs.")
 
 
-    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192):
+    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192,
+                  reusePort=False):
         """
         Connects a given L{DatagramProtocol} to the given numeric UDP port.
 
         @returns: object conforming to L{IListeningPort}.
+
+        @raise NotImplementedError: If C{reusePort} is true; this reactor does
+            not support it.
         """
+        if reusePort:
+            raise NotImplementedError(
+                "reusePort is not supported by the IOCP reactor.")
         p = udp.Port(port, protocol, interface, maxPacketSize, self)
         p.startListening()
         return p
@@ -365,12 +365,19 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
 
     # IReactorUDP
 
-    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192):
+    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192,
+                  reusePort=False):
         """Connects a given L{DatagramProtocol} to the given numeric UDP port.
 
+        @see: twisted.internet.interfaces.IReactorUDP.listenUDP
+
         @returns: object conforming to L{IListeningPort}.
         """
-        p = udp.Port(port, protocol, interface, maxPacketSize, self)
+        if reusePort and getattr(socket, "SO_REUSEPORT", None) is None:
+            raise NotImplementedError(
+                "SO_REUSEPORT is not supported on this platform.")
+        p = udp.Port(port, protocol, interface, maxPacketSize, self,
+                     reusePort=reusePort)
         p.startListening()
         return p
 
@@ -482,10 +489,14 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
 
     # IReactorTCP
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
         """@see: twisted.internet.interfaces.IReactorTCP.listenTCP
         """
-        p = tcp.Port(port, factory, backlog, interface, self)
+        if reusePort and getattr(socket, "SO_REUSEPORT", None) is None:
+            raise NotImplementedError(
+                "SO_REUSEPORT is not supported on this platform.")
+        p = tcp.Port(port, factory, backlog, interface, self, reusePort)
         p.startListening()
         return p
 
@@ -100,6 +100,8 @@ from twisted.python import log, failure, _reflectpy3 as reflect
 from twisted.python.util import unsignedID, untilConcludes
 from twisted.internet.error import CannotListenError
 from twisted.internet import abstract, main, interfaces, error
+from twisted.internet._sendfile import sendfile as _sendfile
+from twisted.internet._writev import writev as _writev
 
 # Not all platforms have, or support, this flag.
 _AI_NUMERICSERV = getattr(socket, "AI_NUMERICSERV", 0)
@@ -180,8 +182,40 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
 
     @ivar logstr: prefix used when logging events related to this connection.
     @type logstr: C{str}
+
+    @ivar minimumReadSize: The fewest bytes L{doRead} asks the socket for at
+        once.
+    @type minimumReadSize: C{int}
+
+    @ivar maximumReadSize: The most bytes L{doRead} asks the socket for at
+        once.
+    @type maximumReadSize: C{int}
+
+    @ivar readsPerEvent: The most times L{doRead} reads from the socket before
+        returning to the reactor, so that a busy connection cannot starve the
+        others.
+    @type readsPerEvent: C{int}
+
+    @ivar _readSize: The number of bytes the next read asks for.  It starts at
+        C{bufferSize}, is doubled after each read which fills it, and halved
+        after each read which uses less than a quarter of it, within
+        C{minimumReadSize} and C{maximumReadSize}.
+    @type _readSize: C{int}
+
+    @ivar _readBuffer: The C{bytearray} data is read into for protocols which
+        provide L{interfaces.IMemoryViewReceiver}, or C{None} before the first
+        such read.
+
+    @ivar _reading: C{True} while this connection is waiting for its socket to
+        become readable.
     """
 
+    minimumReadSize = 2 ** 12
+    maximumReadSize = 2 ** 20
+    readsPerEvent = 4
+
+    _readBuffer = None
+    _reading = False
 
     def __init__(self, skt, protocol, reactor=None):
         abstract.FileDescriptor.__init__(self, reactor=reactor)
@@ -189,6 +223,7 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         self.socket.setblocking(0)
         self.fileno = skt.fileno
         self.protocol = protocol
+        self._readSize = self.bufferSize
 
 
     def getHandle(self):
@@ -196,23 +231,61 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         return self.socket
 
 
+    def startReading(self):
+        self._reading = True
+        abstract.FileDescriptor.startReading(self)
+
+
+    def stopReading(self):
+        self._reading = False
+        abstract.FileDescriptor.stopReading(self)
+
+
     def doRead(self):
         """Calls self.protocol.dataReceived with all available data.
 
-        This reads up to self.bufferSize bytes of data from its socket, then
-        calls self.dataReceived(data) to process it.  If the connection is not
-        lost through an error in the physical recv(), this function will return
-        the result of the dataReceived call.
+        This reads up to C{self._readSize} bytes of data from its socket, then
+        calls self.dataReceived(data) to process it.  As long as each read
+        fills the buffer, and the protocol neither stops reading nor loses the
+        connection, this is repeated up to C{self.readsPerEvent} times.  If
+        the connection is not lost through an error in the physical recv(),
+        this function will return the result of the last dataReceived call.
+
+        If the protocol provides L{interfaces.IMemoryViewReceiver}, the data
+        is read into a buffer reused by every read and passed to it as a
+        C{memoryview}.  This is checked before each read, since the protocol
+        may start TLS or be replaced while handling the data of the last one.
         """
-        try:
-            data = self.socket.recv(self.bufferSize)
-        except socket.error as se:
-            if se.args[0] == EWOULDBLOCK:
-                return
-            else:
-                return main.CONNECTION_LOST
+        for i in range(self.readsPerEvent):
+            intoBuffer = (
+                not self.TLS and
+                interfaces.IMemoryViewReceiver.providedBy(self.protocol))
+            size = self._readSize
+            try:
+                if intoBuffer:
+                    buf = self._readBuffer
+                    if buf is None or len(buf) < size:
+                        buf = self._readBuffer = bytearray(size)
+                    count = self.socket.recv_into(buf, size)
+                    data = memoryview(buf)[:count]
+                else:
+                    data = self.socket.recv(size)
+                    count = len(data)
+            except socket.error as se:
+                if se.args[0] == EWOULDBLOCK:
+                    return
+                else:
+                    return main.CONNECTION_LOST
+
+            if count == size:
+                self._readSize = max(size, min(size * 2, self.maximumReadSize))
+            elif count < size // 4:
+                self._readSize = min(size, max(size // 2, self.minimumReadSize))
 
-        return self._dataReceived(data)
+            rval = self._dataReceived(data)
+            if (rval is not None or count < size or not self._reading or
+                self.disconnecting or not self.connected):
+                return rval
 
 
     def _dataReceived(self, data):
@@ -252,6 +325,86 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
                 return main.CONNECTION_LOST
 
 
+    def _canWriteVectors(self):
+        """
+        Determine whether buffered data can be sent with writev(2), without
+        being joined first.
+
+        @return: C{True} if writev(2) is available on this platform and TLS
+            has not been started on this connection, C{False} otherwise.
+        """
+        return _writev is not None and not self.TLS
+
+
+    def _writeSomeVectors(self, vectors, offset):
+        """
+        Write as much as possible of several strings to this TCP connection
+        with a single writev(2) call, skipping the first C{offset} bytes of
+        the first one.
+
+        If the connection is lost, an exception is returned.  Otherwise, the
+        number of bytes successfully written is returned.
+        """
+        try:
+            return untilConcludes(
+                _writev, self.socket.fileno(), vectors, offset)
+        except (OSError, IOError, socket.error) as se:
+            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
+    def canSendfile(self):
+        """
+        Determine whether L{sendfile} can be used on this connection.
+
+        @return: C{True} if sendfile(2) is available on this platform and TLS
+            has not been started on this connection, C{False} otherwise.
+        """
+        return _sendfile is not None and not self.TLS
+
+
+    def sendfile(self, fileObject, offset, count):
+        """
+        Send up to C{count} bytes of C{fileObject}, starting at C{offset},
+        straight from the file to the socket with sendfile(2), so that they
+        are never copied into a Python string.
+
+        This is meant to be called from the C{resumeProducing} method of a
+        pull producer registered with this connection, in place of L{write}.
+        Nothing is sent from the file while data written with L{write} is
+        still buffered; that data is sent first.  Either way, the producer is
+        resumed again once the socket is writable.
+
+        @param fileObject: A file object with a C{fileno} method.
+        @param offset: The position in the file of the first byte to send.
+        @param count: The largest number of bytes to send.
+
+        @return: The number of bytes sent, possibly 0.
+
+        @raise RuntimeError: If L{canSendfile} returns C{False}.
+        @raise OSError: If sendfile(2) fails for any reason other than the
+            socket's send buffer being full; for example because the file
+            system does not support it or because the connection was lost.
+            The caller should send the rest of the file with L{write}
+            instead, which also reports a lost connection.
+        """
+        if not self.canSendfile():
+            raise RuntimeError("sendfile cannot be used on %r" % (self,))
+        self.startWriting()
+        if self.dataBuffer or self._tempDataLen:
+            return 0
+        try:
+            return untilConcludes(
+                _sendfile, self.socket.fileno(), fileObject.fileno(), offset,
+                min(count, self.SEND_LIMIT))
+        except (OSError, IOError) as e:
+            if e.errno in (EWOULDBLOCK, EAGAIN):
+                return 0
+            raise
+
+
     def _closeWriteConnection(self):
         try:
             getattr(self.socket, self._socketShutdownMethod)(1)
@@ -888,9 +1041,15 @@ class Port(base.BasePort, _SocketCloser):
         was created and initialized outside of the reactor and will be used to
         listen for connections (instead of a new socket being created by this
         L{Port}).
+
+    @ivar reusePort: If C{True}, set C{SO_REUSEPORT} on the listening socket
+        so that several processes can listen on the same address and have
+        the kernel distribute incoming connections among them.
+    @type reusePort: C{bool}
     """
 
     socketType = socket.SOCK_STREAM
+    reusePort = False
 
     transport = Server
     sessionno = 0
@@ -910,12 +1069,14 @@ class Port(base.BasePort, _SocketCloser):
     addressFamily = socket.AF_INET
     _addressType = address.IPv4Address
 
-    def __init__(self, port, factory, backlog=50, interface='', reactor=None):
+    def __init__(self, port, factory, backlog=50, interface='', reactor=None,
+                 reusePort=False):
         """Initialize with a numeric port to listen on.
         """
         base.BasePort.__init__(self, reactor=reactor)
         self.port = port
         self.factory = factory
+        self.reusePort = reusePort
         self.backlog = backlog
         if abstract.isIPv6Address(interface):
             self.addressFamily = socket.AF_INET6
@@ -958,6 +1119,8 @@ class Port(base.BasePort, _SocketCloser):
         s = base.BasePort.createInternetSocket(self)
         if platformType == "posix" and sys.platform != "cygwin":
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reusePort:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         return s
 
 
@@ -17,7 +17,8 @@ from twisted.python.threadpool import ThreadPool
 from twisted.python.util import setIDFunction
 from twisted.internet.interfaces import IReactorTime, IReactorThreads
 from twisted.internet.error import DNSLookupError
-from twisted.internet.base import ThreadedResolver, DelayedCall
+from twisted.internet.base import ThreadedResolver, DelayedCall, ReactorBase
+from twisted.internet.base import HeapTimerQueue, TimingWheel
 from twisted.internet.task import Clock
 from twisted.trial.unittest import TestCase
 
@@ -277,3 +278,229 @@ class DelayedCallTests(TestCase):
         self.assertTrue(self.zero != self.one)
         self.assertFalse(self.zero != self.zero)
         self.assertFalse(self.one != self.one)
+
+
+
+class TimerReactor(ReactorBase):
+    """
+    A reactor which runs no event loop, only timed calls, with a clock under
+    the control of the test.
+
+    @ivar now: The current time.
+    """
+    now = 0
+
+    def installWaker(self):
+        pass
+
+
+    def seconds(self):
+        return self.now
+
+
+    def advance(self, amount):
+        """
+        Move the clock forward by C{amount} seconds and run the calls which
+        are then due.
+        """
+        self.now += amount
+        self.runUntilCurrent()
+
+
+
+class TimerQueueTestsMixin:
+    """
+    Tests for timer queues used by L{ReactorBase}.  Mix into a L{TestCase}
+    and define C{createTimerQueue} to return the timer queue to test.
+    """
+
+    def setUp(self):
+        self.reactor = TimerReactor()
+        self.reactor.installTimerQueue(self.createTimerQueue())
+
+
+    def test_order(self):
+        """
+        Delayed calls are run once they are due, in the order of their
+        scheduled times.
+        """
+        called = []
+        self.reactor.callLater(2, called.append, 2)
+        self.reactor.callLater(1, called.append, 1)
+        self.reactor.callLater(3, called.append, 3)
+        self.reactor.advance(0.5)
+        self.assertEqual(called, [])
+        self.reactor.advance(2)
+        self.assertEqual(called, [1, 2])
+        self.reactor.advance(1)
+        self.assertEqual(called, [1, 2, 3])
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+    def test_timeout(self):
+        """
+        L{ReactorBase.timeout} returns C{None} when there are no delayed
+        calls and otherwise the time until the earliest one is due.
+        """
+        self.assertEqual(self.reactor.timeout(), None)
+        self.reactor.callLater(5, lambda: None)
+        self.assertApproximates(self.reactor.timeout(), 5, 0.1)
+        self.reactor.advance(10)
+        self.assertEqual(self.reactor.timeout(), None)
+
+
+    def test_cancel(self):
+        """
+        A cancelled delayed call is not run and not returned by
+        L{ReactorBase.getDelayedCalls}.
+        """
+        called = []
+        call = self.reactor.callLater(1, called.append, 1)
+        other = self.reactor.callLater(1, called.append, 2)
+        self.reactor.advance(0.5)
+        call.cancel()
+        self.assertEqual(self.reactor.getDelayedCalls(), [other])
+        self.reactor.advance(1)
+        self.assertEqual(called, [2])
+
+
+    def test_cancelNew(self):
+        """
+        A delayed call cancelled before the reactor has looked at its timed
+        calls is never run.
+        """
+        called = []
+        self.reactor.callLater(1, called.append, 1).cancel()
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+        self.assertEqual(self.reactor.timeout(), None)
+        self.reactor.advance(2)
+        self.assertEqual(called, [])
+
+
+    def test_resetSooner(self):
+        """
+        A delayed call reset to an earlier time is run at that time.
+        """
+        called = []
+        call = self.reactor.callLater(10, called.append, 1)
+        self.reactor.advance(1)
+        call.reset(1)
+        self.assertApproximates(self.reactor.timeout(), 1, 0.1)
+        self.reactor.advance(1.5)
+        self.assertEqual(called, [1])
+        self.reactor.advance(10)
+        self.assertEqual(called, [1])
+
+
+    def test_resetLater(self):
+        """
+        A delayed call reset to a later time is not run at its original time.
+        """
+        called = []
+        call = self.reactor.callLater(1, called.append, 1)
+        self.reactor.advance(0.5)
+        call.reset(2)
+        self.reactor.advance(1)
+        self.assertEqual(called, [])
+        self.assertEqual(self.reactor.getDelayedCalls(), [call])
+        self.reactor.advance(1.5)
+        self.assertEqual(called, [1])
+
+
+    def test_addedWhileRunning(self):
+        """
+        A delayed call added while timed calls are being run is not run until
+        the next time the reactor runs timed calls, even if it is already due.
+        """
+        called = []
+        self.reactor.callLater(
+            1, self.reactor.callLater, 0, called.append, 1)
+        self.reactor.advance(1)
+        self.assertEqual(called, [])
+        self.reactor.advance(0)
+        self.assertEqual(called, [1])
+
+
+    def test_installTimerQueue(self):
+        """
+        L{ReactorBase.installTimerQueue} moves the outstanding delayed calls
+        into the new timer queue and returns the old one.
+        """
+        called = []
+        self.reactor.callLater(1, called.append, 1)
+        self.reactor.timeout()
+        self.reactor.callLater(2, called.append, 2)
+        self.reactor.callLater(2, called.append, 3).cancel()
+        old = self.reactor._timerQueue
+        new = self.createTimerQueue()
+        self.assertIdentical(self.reactor.installTimerQueue(new), old)
+        self.assertEqual(len(self.reactor.getDelayedCalls()), 2)
+        self.reactor.advance(3)
+        self.assertEqual(called, [1, 2])
+
+
+
+class HeapTimerQueueTests(TimerQueueTestsMixin, TestCase):
+    """
+    Tests for L{HeapTimerQueue}.
+    """
+    createTimerQueue = HeapTimerQueue
+
+
+    def test_default(self):
+        """
+        L{ReactorBase} uses a L{HeapTimerQueue} by default.
+        """
+        self.assertIsInstance(TimerReactor()._timerQueue, HeapTimerQueue)
+
+
+
+class TimingWheelTests(TimerQueueTestsMixin, TestCase):
+    """
+    Tests for L{TimingWheel}.
+    """
+    def createTimerQueue(self):
+        return TimingWheel(resolution=0.1)
+
+
+    def test_sameTime(self):
+        """
+        Delayed calls scheduled for the same time are run in the order they
+        were scheduled in.
+        """
+        called = []
+        for i in range(10):
+            self.reactor.callLater(1, called.append, i)
+        self.reactor.advance(1)
+        self.assertEqual(called, list(range(10)))
+
+
+    def test_endOfTick(self):
+        """
+        The reactor is asked to wake up at the end of the tick the earliest
+        call falls in, and the call is not run before it is due even if the
+        reactor runs its timed calls earlier within that tick.
+        """
+        called = []
+        self.reactor.callLater(1.02, called.append, 1)
+        self.assertApproximates(self.reactor.timeout(), 1.1, 0.0001)
+        self.reactor.advance(1.01)
+        self.assertEqual(called, [])
+        self.reactor.advance(0.02)
+        self.assertEqual(called, [1])
+
+
+    def test_staleBuckets(self):
+        """
+        Buckets only holding calls which were cancelled or moved are
+        discarded without affecting the timeout.
+        """
+        call = self.reactor.callLater(1, lambda: None)
+        self.reactor.callLater(5, lambda: None).cancel()
+        self.reactor.timeout()
+        call.reset(0.55)
+        self.reactor.callLater(2, lambda: None).cancel()
+        self.assertApproximates(self.reactor.timeout(), 0.6, 0.0001)
+        call.cancel()
+        self.assertEqual(self.reactor.timeout(), None)
+        self.assertEqual(self.reactor._timerQueue._buckets, {})
@@ -10,7 +10,7 @@ L{twisted.internet.endpoints}.
 from __future__ import division, absolute_import
 
 from errno import EPERM
-from socket import AF_INET, AF_INET6, SOCK_STREAM, IPPROTO_TCP
+from socket import AF_INET, AF_INET6, SOCK_STREAM, IPPROTO_TCP, gaierror
 from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
@@ -20,6 +20,7 @@ from twisted.internet import error, interfaces, defer
 from twisted.internet import endpoints
 from twisted.internet.address import IPv4Address, IPv6Address, UNIXAddress
 from twisted.internet.protocol import ClientFactory, Protocol
+from twisted.internet.task import Clock
 from twisted.test.proto_helpers import (
     MemoryReactor, RaisingMemoryReactor, StringTransport)
 from twisted.python.failure import Failure
@@ -735,6 +736,22 @@ class TCP4EndpointsTestCase(EndpointTestCaseMixin, unittest.TestCase):
         return {'backlog': 100, 'interface': '127.0.0.1'}
 
 
+    def test_reusePort(self):
+        """
+        If its C{_reusePort} attribute is set, L{TCP4ServerEndpoint.listen}
+        passes C{reusePort} to L{IReactorTCP.listenTCP}.
+        """
+        calls = []
+        class Reactor(object):
+            def listenTCP(self, port, factory, **kwargs):
+                calls.append(kwargs)
+        endpoint = endpoints.TCP4ServerEndpoint(Reactor(), 0)
+        endpoint._reusePort = True
+        endpoint.listen(object())
+        self.assertEqual(
+            [{'backlog': 50, 'interface': '', 'reusePort': True}], calls)
+
+
     def createServerEndpoint(self, reactor, factory, **listenArgs):
         """
         Create an L{TCP4ServerEndpoint} and return the values needed to verify
@@ -994,6 +1011,416 @@ class TCP6EndpointNameResolutionTestCase(ClientEndpointTestCaseMixin,
 
 
 
+class MemoryClockReactor(MemoryReactor, Clock):
+    """
+    A L{MemoryReactor} which also provides L{IReactorTime}.
+    """
+
+    def __init__(self):
+        MemoryReactor.__init__(self)
+        Clock.__init__(self)
+
+
+
+def fakeGetaddrinfo(results):
+    """
+    Make a replacement for C{getaddrinfo} which records its calls.
+
+    @param results: A C{dict} mapping host names to the addresses
+        C{getaddrinfo} returns for them, as C{(family, address)} tuples.
+
+    @return: A C{tuple} of the replacement and the C{list} its calls are
+        recorded in.
+    """
+    calls = []
+    def getaddrinfo(host, port, family, socktype):
+        calls.append((host, port, family, socktype))
+        if host not in results:
+            raise gaierror(-2, "Name or service not known")
+        return [(addressFamily, socktype, IPPROTO_TCP, '', (address, port))
+                for (addressFamily, address) in results[host]]
+    return getaddrinfo, calls
+
+
+
+def synchronousDeferToThread(f, *args, **kwargs):
+    """
+    Replace C{deferToThread} by calling C{f} right away.
+    """
+    return defer.maybeDeferred(f, *args, **kwargs)
+
+
+
+class CachingHostResolverTests(unittest.TestCase):
+    """
+    Tests for L{endpoints.CachingHostResolver}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.resolver = endpoints.CachingHostResolver(self.clock, ttl=30)
+        self.resolver._getaddrinfo, self.calls = fakeGetaddrinfo({
+                "example.com": [(AF_INET6, "::1"), (AF_INET6, "::2"),
+                                (AF_INET, "127.0.0.1")],
+                "v4.example.com": [(AF_INET, "127.0.0.2")]})
+        self.resolver._deferToThread = synchronousDeferToThread
+
+
+    def resolve(self, host):
+        result = []
+        self.resolver.resolve(host).addBoth(result.append)
+        return result[0]
+
+
+    def test_interleaveFamilies(self):
+        """
+        L{endpoints.CachingHostResolver.resolve} gives the addresses of a
+        host alternating between address families, starting with the family
+        of the first address C{getaddrinfo} returns.
+        """
+        self.assertEqual(
+            self.resolve("example.com"),
+            [(AF_INET6, "::1"), (AF_INET, "127.0.0.1"), (AF_INET6, "::2")])
+        self.assertEqual(
+            self.calls, [("example.com", 0, 0, SOCK_STREAM)])
+
+
+    def test_addressLiteral(self):
+        """
+        IPv4 and IPv6 address literals are not resolved.
+        """
+        self.assertEqual(self.resolve("::5"), [(AF_INET6, "::5")])
+        self.assertEqual(self.resolve("10.0.0.1"), [(AF_INET, "10.0.0.1")])
+        self.assertEqual(self.calls, [])
+
+
+    def test_cached(self):
+        """
+        The addresses of a host are cached for C{ttl} seconds.
+        """
+        first = self.resolve("v4.example.com")
+        self.clock.advance(29)
+        self.assertEqual(self.resolve("v4.example.com"), first)
+        self.assertEqual(len(self.calls), 1)
+        self.clock.advance(1)
+        self.assertEqual(self.resolve("v4.example.com"), first)
+        self.assertEqual(len(self.calls), 2)
+
+
+    def test_maxSize(self):
+        """
+        No more than C{maxSize} host names are cached.
+        """
+        resolver = endpoints.CachingHostResolver(self.clock, maxSize=1)
+        resolver._getaddrinfo = self.resolver._getaddrinfo
+        resolver._deferToThread = synchronousDeferToThread
+        resolver.resolve("example.com")
+        resolver.resolve("v4.example.com")
+        resolver.resolve("example.com")
+        self.assertEqual(len(self.calls), 3)
+
+
+    def test_concurrentLookups(self):
+        """
+        Lookups of a host name made while it is being resolved share the
+        result of that resolution.
+        """
+        lookups = []
+        def deferToThread(f, *args):
+            d = defer.Deferred()
+            lookups.append(d)
+            return d
+        self.resolver._deferToThread = deferToThread
+        results = []
+        self.resolver.resolve("v4.example.com").addCallback(results.append)
+        self.resolver.resolve("v4.example.com").addCallback(results.append)
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(results, [])
+
+        lookups[0].callback(
+            [(AF_INET, SOCK_STREAM, IPPROTO_TCP, '', ('127.0.0.2', 0))])
+        self.assertEqual(results, [[(AF_INET, '127.0.0.2')]] * 2)
+
+
+    def test_namesResolver(self):
+        """
+        Given a L{twisted.names} resolver, L{endpoints.CachingHostResolver}
+        looks up C{A} and C{AAAA} records and caches the addresses for the
+        smallest time to live of the records.
+        """
+        from twisted.names import dns
+        class FakeResolver(object):
+            def lookupAddress(self, name):
+                return defer.succeed(([
+                            dns.RRHeader(name, dns.CNAME, ttl=100,
+                                         payload=dns.Record_CNAME(name)),
+                            dns.RRHeader(name, dns.A, ttl=20,
+                                         payload=dns.Record_A("10.0.0.1"))],
+                                      [], []))
+            def lookupIPV6Address(self, name):
+                return defer.succeed(([
+                            dns.RRHeader(name, dns.AAAA, ttl=50,
+                                         payload=dns.Record_AAAA("::1"))],
+                                      [], []))
+        self.resolver.resolver = FakeResolver()
+        addresses = self.resolve("example.com")
+        self.assertEqual(addresses, [(AF_INET, "10.0.0.1"), (AF_INET6, "::1")])
+        self.assertEqual(self.calls, [])
+
+        self.resolver.resolver = None
+        self.clock.advance(19)
+        self.assertEqual(self.resolve("example.com"), addresses)
+        self.clock.advance(1)
+        self.resolve("example.com")
+        self.assertEqual(len(self.calls), 1)
+
+    if _PY3:
+        test_namesResolver.skip = "twisted.names is not ported to Python 3"
+
+
+    def test_lookupFailure(self):
+        """
+        If a host name cannot be resolved, the L{Deferred} returned by
+        L{endpoints.CachingHostResolver.resolve} fails with
+        L{error.DNSLookupError}, and the failure is not cached.
+        """
+        self.resolve("missing.example.com").trap(error.DNSLookupError)
+        self.resolve("missing.example.com").trap(error.DNSLookupError)
+        self.assertEqual(len(self.calls), 2)
+
+
+    def test_preferConnectedFamily(self):
+        """
+        After L{endpoints.CachingHostResolver.connected} is called for a host,
+        addresses of the given family are given first.
+        """
+        self.resolver.connected("example.com", AF_INET)
+        self.assertEqual(
+            self.resolve("example.com"),
+            [(AF_INET, "127.0.0.1"), (AF_INET6, "::1"), (AF_INET6, "::2")])
+
+
+    def test_failed(self):
+        """
+        L{endpoints.CachingHostResolver.failed} discards the cached addresses
+        of a host.
+        """
+        self.resolve("example.com")
+        self.resolver.failed("example.com")
+        self.resolve("example.com")
+        self.assertEqual(len(self.calls), 2)
+
+
+
+class HostnameEndpointTestCase(ClientEndpointTestCaseMixin,
+                               unittest.TestCase):
+    """
+    Tests for L{endpoints.HostnameEndpoint} with a host name which has a
+    single address.
+    """
+
+    def createClientEndpoint(self, reactor, clientFactory, **connectArgs):
+        """
+        Create a L{HostnameEndpoint} and return the values needed to verify
+        its behavior.
+        """
+        resolver = endpoints.CachingHostResolver(Clock())
+        resolver._getaddrinfo = fakeGetaddrinfo(
+            {"example.com": [(AF_INET, "127.0.0.1")]})[0]
+        resolver._deferToThread = synchronousDeferToThread
+        endpoint = endpoints.HostnameEndpoint(
+            reactor, "example.com", 80, resolver=resolver, **connectArgs)
+        return (endpoint,
+                ("127.0.0.1", 80, clientFactory,
+                 connectArgs.get('timeout', 30),
+                 connectArgs.get('bindAddress', None)),
+                ("example.com", 80))
+
+
+    def connectArgs(self):
+        """
+        @return: C{dict} of keyword arguments to pass to connect.
+        """
+        return {'timeout': 10, 'bindAddress': ('localhost', 49595)}
+
+
+    def expectedClients(self, reactor):
+        """
+        @return: List of calls to L{IReactorTCP.connectTCP}
+        """
+        return reactor.tcpClients
+
+
+    def assertConnectArgs(self, receivedArgs, expectedArgs):
+        """
+        Compare host, port, timeout, and bindAddress in C{receivedArgs}
+        to C{expectedArgs}.  We ignore the factory because we don't
+        only care what protocol comes out of the
+        C{IStreamClientEndpoint.connect} call.
+        """
+        (host, port, ignoredFactory, timeout, bindAddress) = receivedArgs
+        (expectedHost, expectedPort, _ignoredFactory,
+         expectedTimeout, expectedBindAddress) = expectedArgs
+
+        self.assertEqual(host, expectedHost)
+        self.assertEqual(port, expectedPort)
+        self.assertEqual(timeout, expectedTimeout)
+        self.assertEqual(bindAddress, expectedBindAddress)
+
+
+
+class HostnameEndpointRaceTests(unittest.TestCase):
+    """
+    Tests for how L{endpoints.HostnameEndpoint} races connection attempts to
+    the addresses of a host.
+    """
+
+    def setUp(self):
+        self.reactor = MemoryClockReactor()
+        self.resolver = endpoints.CachingHostResolver(self.reactor)
+        self.resolver._getaddrinfo, self.calls = fakeGetaddrinfo({
+                "example.com": [(AF_INET6, "::1"), (AF_INET, "127.0.0.1"),
+                                (AF_INET6, "::2")]})
+        self.resolver._deferToThread = synchronousDeferToThread
+        self.endpoint = endpoints.HostnameEndpoint(
+            self.reactor, "example.com", 80, resolver=self.resolver)
+        self.result = []
+        self.deferred = self.endpoint.connect(TestFactory())
+        self.deferred.addBoth(self.result.append)
+
+
+    def attempts(self):
+        """
+        @return: The addresses connected to so far.
+        """
+        return [client[0] for client in self.reactor.tcpClients]
+
+
+    def connectAttempt(self, index):
+        """
+        Make a connection attempt succeed.
+
+        @return: The protocol connected, without the wrapper the endpoint
+            uses to learn about the connection.
+        """
+        factory = self.reactor.tcpClients[index][2]
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(StringTransport())
+        return getattr(protocol, "_wrappedProtocol", protocol)
+
+
+    def failAttempt(self, index):
+        """
+        Make a connection attempt fail.
+        """
+        factory = self.reactor.tcpClients[index][2]
+        factory.clientConnectionFailed(
+            None, Failure(error.ConnectionRefusedError(string=str(index))))
+
+
+    def test_staggeredAttempts(self):
+        """
+        L{endpoints.HostnameEndpoint} connects to the first address right
+        away, and starts a new attempt every C{attemptDelay} seconds until
+        one succeeds.
+        """
+        self.assertEqual(self.attempts(), ["::1"])
+        self.reactor.advance(self.endpoint.attemptDelay)
+        self.assertEqual(self.attempts(), ["::1", "127.0.0.1"])
+        self.reactor.advance(self.endpoint.attemptDelay)
+        self.assertEqual(self.attempts(), ["::1", "127.0.0.1", "::2"])
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+    def test_nextAttemptOnFailure(self):
+        """
+        When a connection attempt fails, the next one starts right away.
+        """
+        self.failAttempt(0)
+        self.assertEqual(self.attempts(), ["::1", "127.0.0.1"])
+        self.assertEqual(self.result, [])
+
+
+    def test_firstConnectionWins(self):
+        """
+        The first attempt to connect is used, the others are stopped, the
+        family of its address is preferred for the host from then on, and
+        later attempts which connect anyway are closed.
+        """
+        self.reactor.advance(self.endpoint.attemptDelay)
+        protocol = self.connectAttempt(1)
+        self.assertEqual(self.result, [protocol])
+        self.assertIsInstance(protocol, TestProtocol)
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+        self.assertEqual(self.attempts(), ["::1", "127.0.0.1"])
+        self.assertTrue(
+            self.reactor.tcpClients[0][2]._connector.stoppedConnecting)
+        self.assertEqual(
+            self.resolver.resolve("example.com").result[0],
+            (AF_INET, "127.0.0.1"))
+
+        loser = self.connectAttempt(0)
+        self.assertNotIsInstance(loser, TestProtocol)
+        self.assertTrue(loser.transport.disconnecting)
+
+
+    def test_allFail(self):
+        """
+        If every attempt fails, the L{Deferred} returned by C{connect} fails
+        with the reason the last one failed, and the host's addresses are
+        no longer cached.
+        """
+        self.failAttempt(0)
+        self.failAttempt(1)
+        self.assertEqual(self.result, [])
+        self.failAttempt(2)
+        self.result[0].trap(error.ConnectionRefusedError)
+        self.assertEqual(self.result[0].value.args, ("2",))
+        self.resolver.resolve("example.com")
+        self.assertEqual(len(self.calls), 2)
+
+
+    def test_lookupFailure(self):
+        """
+        If the host name cannot be resolved, the L{Deferred} returned by
+        C{connect} fails with L{error.DNSLookupError}.
+        """
+        endpoint = endpoints.HostnameEndpoint(
+            self.reactor, "missing.example.com", 80, resolver=self.resolver)
+        d = endpoint.connect(TestFactory())
+        return self.assertFailure(d, error.DNSLookupError)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the L{Deferred} returned by C{connect} stops all attempts
+        in progress and fails it with L{error.ConnectingCancelledError}.
+        """
+        self.reactor.advance(self.endpoint.attemptDelay)
+        self.deferred.cancel()
+        self.result[0].trap(error.ConnectingCancelledError)
+        self.assertEqual(self.result[0].value.address, ("example.com", 80))
+        for client in self.reactor.tcpClients:
+            self.assertTrue(client[2]._connector.stoppedConnecting)
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+    def test_cancelWhileResolving(self):
+        """
+        Cancelling the L{Deferred} returned by C{connect} while the host name
+        is being resolved fails it with L{error.ConnectingCancelledError}.
+        """
+        self.resolver._deferToThread = lambda *args: defer.Deferred()
+        endpoint = endpoints.HostnameEndpoint(
+            self.reactor, "other.example.com", 80, resolver=self.resolver)
+        attempts = self.attempts()
+        d = endpoint.connect(TestFactory())
+        d.cancel()
+        self.assertEqual(self.attempts(), attempts)
+        return self.assertFailure(d, error.ConnectingCancelledError)
+
+
+
 class SSL4EndpointsTestCase(EndpointTestCaseMixin,
                             unittest.TestCase):
     """
@@ -0,0 +1,195 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet._sendfile} and
+L{twisted.internet.tcp.Connection.sendfile}.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+import socket
+from errno import EAGAIN, EINVAL
+from tempfile import TemporaryFile
+
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.internet import _sendfile, tcp
+from twisted.internet.tcp import Connection
+
+if _sendfile.sendfile is None:
+    skip = "sendfile(2) is not available on this platform"
+elif getattr(socket, 'socketpair', None) is None:
+    skip = "socket.socketpair is not available on this platform"
+
+
+
+class FakeReactor(object):
+    """
+    Just enough of a reactor for a L{Connection} to start and stop writing.
+
+    @ivar writers: The set of writers added with C{addWriter}.
+    """
+    def __init__(self):
+        self.writers = set()
+
+
+    def addWriter(self, writer):
+        self.writers.add(writer)
+
+
+    def removeWriter(self, writer):
+        self.writers.discard(writer)
+
+
+
+class SendfileTestsMixin(object):
+    """
+    Helpers for making a connected pair of sockets and a file to send.
+    """
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.client.close)
+        self.client.settimeout(5)
+        self.fileObject = TemporaryFile()
+        self.addCleanup(self.fileObject.close)
+        self.fileObject.write(b"0123456789")
+        self.fileObject.flush()
+
+
+    def receive(self, count):
+        """
+        Read exactly C{count} bytes from the client socket.
+        """
+        received = []
+        while count:
+            data = self.client.recv(count)
+            received.append(data)
+            count -= len(data)
+        return b"".join(received)
+
+
+
+class SendfileTests(SendfileTestsMixin, SynchronousTestCase):
+    """
+    Tests for L{_sendfile.sendfile}.
+    """
+
+    def test_sendfile(self):
+        """
+        L{_sendfile.sendfile} copies the given number of bytes, starting at
+        the given offset, from a file to a socket and returns the number of
+        bytes copied.
+        """
+        sent = _sendfile.sendfile(
+            self.server.fileno(), self.fileObject.fileno(), 2, 5)
+        self.assertEqual(5, sent)
+        self.assertEqual(b"23456", self.receive(5))
+
+
+    def test_endOfFile(self):
+        """
+        L{_sendfile.sendfile} copies nothing and returns C{0} if the offset is
+        at the end of the file.
+        """
+        self.assertEqual(
+            0, _sendfile.sendfile(
+                self.server.fileno(), self.fileObject.fileno(), 10, 5))
+
+
+    def test_error(self):
+        """
+        L{_sendfile.sendfile} raises L{OSError} if the system call fails.
+        """
+        self.assertRaises(
+            OSError, _sendfile.sendfile, -1, self.fileObject.fileno(), 0, 5)
+
+
+
+class ConnectionSendfileTests(SendfileTestsMixin, SynchronousTestCase):
+    """
+    Tests for L{Connection.sendfile}.
+    """
+
+    def setUp(self):
+        SendfileTestsMixin.setUp(self)
+        self.reactor = FakeReactor()
+        self.connection = Connection(self.server, None, self.reactor)
+
+
+    def test_canSendfile(self):
+        """
+        L{Connection.canSendfile} returns C{True} for a connection which has
+        not started TLS and C{False} for one which has.
+        """
+        self.assertTrue(self.connection.canSendfile())
+        self.connection.TLS = True
+        self.assertFalse(self.connection.canSendfile())
+
+
+    def test_sendfile(self):
+        """
+        L{Connection.sendfile} sends part of a file over the connection,
+        returns the number of bytes sent and starts writing, so that the
+        producer calling it is resumed once the socket is writable.
+        """
+        self.assertEqual(4, self.connection.sendfile(self.fileObject, 3, 4))
+        self.assertEqual(b"3456", self.receive(4))
+        self.assertIn(self.connection, self.reactor.writers)
+
+
+    def test_bufferedData(self):
+        """
+        L{Connection.sendfile} sends nothing while data written with
+        L{Connection.write} is still buffered.
+        """
+        self.connection.connected = True
+        self.connection.write(b"abc")
+        self.assertEqual(0, self.connection.sendfile(self.fileObject, 0, 4))
+
+
+    def test_wouldBlock(self):
+        """
+        L{Connection.sendfile} returns C{0} if the socket's send buffer is
+        full.
+        """
+        def sendfile(outFileno, inFileno, offset, count):
+            raise OSError(EAGAIN, os.strerror(EAGAIN))
+        self.patch(tcp, '_sendfile', sendfile)
+        self.assertEqual(0, self.connection.sendfile(self.fileObject, 0, 4))
+
+
+    def test_unsupported(self):
+        """
+        L{Connection.sendfile} raises L{OSError} if the system call fails
+        because it is not supported for the file, so that the caller can
+        fall back to L{Connection.write} rather than trying again.
+        """
+        def sendfile(outFileno, inFileno, offset, count):
+            raise OSError(EINVAL, os.strerror(EINVAL))
+        self.patch(tcp, '_sendfile', sendfile)
+        exc = self.assertRaises(
+            OSError, self.connection.sendfile, self.fileObject, 0, 4)
+        self.assertEqual(EINVAL, exc.errno)
+
+
+    def test_connectionLost(self):
+        """
+        L{Connection.sendfile} raises L{OSError} if the system call fails
+        because the connection was lost.
+        """
+        self.server.shutdown(socket.SHUT_WR)
+        self.assertRaises(
+            OSError, self.connection.sendfile, self.fileObject, 0, 4)
+
+
+    def test_tls(self):
+        """
+        L{Connection.sendfile} raises L{RuntimeError} on a connection which
+        has started TLS.
+        """
+        self.connection.TLS = True
+        self.assertRaises(
+            RuntimeError, self.connection.sendfile, self.fileObject, 0, 4)
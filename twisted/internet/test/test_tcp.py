@@ -32,7 +32,7 @@ from twisted.internet.defer import (
 from twisted.internet.endpoints import TCP4ServerEndpoint, TCP4ClientEndpoint
 from twisted.internet.protocol import ServerFactory, ClientFactory, Protocol
 from twisted.internet.interfaces import (
-    IPushProducer, IPullProducer, IHalfCloseableProtocol)
+    IPushProducer, IPullProducer, IHalfCloseableProtocol, IMemoryViewReceiver)
 from twisted.internet.tcp import Connection, Server, _resolveIPv6
 
 from twisted.internet.test.connectionmixins import (
@@ -331,6 +331,221 @@ class TCPConnectionTests(TestCase):
 
 
 
+class ChunkedFakeSocket(FakeSocket):
+    """
+    A L{FakeSocket} which returns the bytes it holds a read at a time.
+
+    @ivar sizes: A C{list} of the sizes asked for by each read.
+    """
+    def __init__(self, data):
+        FakeSocket.__init__(self, data)
+        self.sizes = []
+
+
+    def recv(self, size):
+        """
+        Return up to C{size} of the bytes not read yet, or raise
+        C{EWOULDBLOCK} if there are none.
+        """
+        self.sizes.append(size)
+        if not self.data:
+            raise socket.error(errno.EWOULDBLOCK, None)
+        data, self.data = self.data[:size], self.data[size:]
+        return data
+
+
+    def recv_into(self, buffer, size):
+        """
+        Copy up to C{size} of the bytes not read yet into C{buffer}.
+        """
+        data = self.recv(size)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+
+class RecordingProtocol(Protocol):
+    """
+    A protocol which records the data it receives.
+
+    @ivar received: A C{list} of the objects passed to C{dataReceived}.
+    """
+    def __init__(self):
+        self.received = []
+
+
+    def dataReceived(self, data):
+        self.received.append(data)
+
+
+
+@implementer(IMemoryViewReceiver)
+class MemoryViewProtocol(RecordingProtocol):
+    """
+    A protocol which records copies of the data it receives as memoryviews.
+    """
+    def dataReceived(self, data):
+        self.received.append((type(data), data.tobytes()))
+
+
+
+class ConnectionReadTests(TestCase):
+    """
+    Tests for how L{Connection.doRead} reads from its socket.
+    """
+    def connect(self, data, protocol=None):
+        """
+        Make a reading L{Connection} for a L{ChunkedFakeSocket} holding
+        C{data}.
+        """
+        if protocol is None:
+            protocol = RecordingProtocol()
+        skt = ChunkedFakeSocket(data)
+        conn = Connection(skt, protocol, reactor=_FakeFDSetReactor())
+        conn.connected = True
+        conn.bufferSize = conn._readSize = conn.minimumReadSize
+        conn.startReading()
+        return skt, conn
+
+
+    def test_severalReads(self):
+        """
+        While each read fills the buffer, L{Connection.doRead} reads again,
+        up to C{readsPerEvent} times.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 20)
+        conn.doRead()
+        self.assertEqual(len(skt.sizes), conn.readsPerEvent)
+        self.assertEqual(
+            b"".join(conn.protocol.received),
+            b"x" * sum(skt.sizes))
+
+
+    def test_shortRead(self):
+        """
+        L{Connection.doRead} stops reading once a read does not fill the
+        buffer.
+        """
+        skt, conn = self.connect(b"x" * 10)
+        conn.doRead()
+        self.assertEqual(skt.sizes, [conn.minimumReadSize])
+        self.assertEqual(conn.protocol.received, [b"x" * 10])
+
+
+    def test_stopReading(self):
+        """
+        L{Connection.doRead} stops reading if the protocol stops the
+        connection reading.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 20)
+        conn.protocol.dataReceived = lambda data: conn.stopReading()
+        conn.doRead()
+        self.assertEqual(len(skt.sizes), 1)
+
+
+    def test_loseConnection(self):
+        """
+        L{Connection.doRead} stops reading if the protocol loses the
+        connection.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 20)
+        conn.protocol.dataReceived = lambda data: conn.loseConnection()
+        conn.doRead()
+        self.assertEqual(len(skt.sizes), 1)
+
+
+    def test_growReadSize(self):
+        """
+        The read size is doubled after each read which fills it, up to
+        C{maximumReadSize}.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 24)
+        size = conn.minimumReadSize
+        conn.doRead()
+        self.assertEqual(skt.sizes, [size, size * 2, size * 4, size * 8])
+        conn.maximumReadSize = size * 20
+        conn.doRead()
+        self.assertEqual(skt.sizes[4:], [size * 16] + [size * 20] * 3)
+
+
+    def test_shrinkReadSize(self):
+        """
+        The read size is halved after each read which uses less than a
+        quarter of it, down to C{minimumReadSize}.
+        """
+        skt, conn = self.connect(b"")
+        conn._readSize = conn.minimumReadSize * 4
+        for i in range(3):
+            skt.data = b"x"
+            conn.doRead()
+        size = conn.minimumReadSize
+        self.assertEqual(skt.sizes, [size * 4, size * 2, size])
+        self.assertEqual(conn._readSize, size)
+
+
+    def test_memoryViewReceiver(self):
+        """
+        If the protocol provides L{IMemoryViewReceiver}, it is given a
+        C{memoryview} of a buffer which is reused for each read.
+        """
+        skt, conn = self.connect(b"abc", MemoryViewProtocol())
+        conn.doRead()
+        buf = conn._readBuffer
+        skt.data = b"de"
+        conn.doRead()
+        self.assertIdentical(conn._readBuffer, buf)
+        self.assertEqual(
+            conn.protocol.received,
+            [(memoryview, b"abc"), (memoryview, b"de")])
+
+
+    def test_protocolReplaced(self):
+        """
+        If a protocol which provides L{IMemoryViewReceiver} is replaced by
+        one which does not while L{Connection.doRead} is reading, the new
+        protocol is given C{bytes} by the following reads.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 20, MemoryViewProtocol())
+        replacement = RecordingProtocol()
+        def dataReceived(data):
+            conn.protocol = replacement
+        conn.protocol.dataReceived = dataReceived
+        conn.doRead()
+        self.assertEqual(len(replacement.received), conn.readsPerEvent - 1)
+        for data in replacement.received:
+            self.assertIsInstance(data, bytes)
+
+
+    def test_startTLS(self):
+        """
+        If the protocol starts TLS while L{Connection.doRead} is reading, the
+        following reads pass C{bytes} to the protocol, even if it provides
+        L{IMemoryViewReceiver}.
+        """
+        skt, conn = self.connect(b"x" * 2 ** 20, MemoryViewProtocol())
+        received = []
+        def dataReceived(data):
+            received.append(type(data))
+            conn.TLS = True
+        conn.protocol.dataReceived = dataReceived
+        conn.doRead()
+        self.assertEqual(
+            received, [memoryview] + [bytes] * (conn.readsPerEvent - 1))
+
+
+    def test_connectionDone(self):
+        """
+        L{Connection.doRead} returns L{ConnectionDone} when the socket has
+        been closed by the other side, whether or not the protocol provides
+        L{IMemoryViewReceiver}.
+        """
+        for protocol in [RecordingProtocol(), MemoryViewProtocol()]:
+            skt, conn = self.connect(b"", protocol)
+            skt.recv = lambda size: b""
+            self.assertIsInstance(conn.doRead(), ConnectionDone)
+
+
+
 class TCPCreator(EndpointCreator):
     """
     Create IPv4 TCP endpoints for L{runProtocolsWithReactor}-based tests.
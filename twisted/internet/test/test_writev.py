@@ -0,0 +1,205 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet._writev} and the vectored writes done by
+L{twisted.internet.tcp.Connection}.
+"""
+
+from __future__ import division, absolute_import
+
+import socket
+
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.internet import _writev, main
+from twisted.internet.tcp import Connection
+
+if _writev.writev is None:
+    skip = "writev(2) is not available on this platform"
+elif getattr(socket, 'socketpair', None) is None:
+    skip = "socket.socketpair is not available on this platform"
+
+
+
+class FakeReactor(object):
+    """
+    Just enough of a reactor for a L{Connection} to start and stop writing.
+
+    @ivar writers: The set of writers added with C{addWriter}.
+    """
+    def __init__(self):
+        self.writers = set()
+
+
+    def addWriter(self, writer):
+        self.writers.add(writer)
+
+
+    def removeWriter(self, writer):
+        self.writers.discard(writer)
+
+
+
+class WritevTestsMixin(object):
+    """
+    Helpers for making a connected pair of sockets.
+    """
+
+    def setUp(self):
+        self.server, self.client = socket.socketpair()
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.client.close)
+        self.client.settimeout(5)
+
+
+    def receive(self, count):
+        """
+        Read exactly C{count} bytes from the client socket.
+        """
+        received = []
+        while count:
+            data = self.client.recv(count)
+            received.append(data)
+            count -= len(data)
+        return b"".join(received)
+
+
+
+class WritevTests(WritevTestsMixin, SynchronousTestCase):
+    """
+    Tests for L{_writev.writev}.
+    """
+
+    def test_writev(self):
+        """
+        L{_writev.writev} writes all of the given strings, in order, and
+        returns the number of bytes written.
+        """
+        written = _writev.writev(
+            self.server.fileno(), [b"abc", b"", b"defg", b"h"])
+        self.assertEqual(written, 8)
+        self.assertEqual(self.receive(8), b"abcdefgh")
+
+
+    def test_offset(self):
+        """
+        L{_writev.writev} skips the first C{offset} bytes of the first
+        string.
+        """
+        written = _writev.writev(self.server.fileno(), [b"abc", b"def"], 2)
+        self.assertEqual(written, 4)
+        self.assertEqual(self.receive(4), b"cdef")
+
+
+    def test_error(self):
+        """
+        L{_writev.writev} raises L{OSError} if writev(2) fails.
+        """
+        self.server.close()
+        self.assertRaises(OSError, _writev.writev, -1, [b"abc"])
+
+
+    def test_iovMax(self):
+        """
+        L{_writev.IOV_MAX} is at least the smallest limit POSIX allows.
+        """
+        self.assertTrue(_writev.IOV_MAX >= 16)
+
+
+
+class ConnectionWritevTests(WritevTestsMixin, SynchronousTestCase):
+    """
+    Tests for the vectored writes done by L{Connection.doWrite}.
+    """
+
+    def setUp(self):
+        WritevTestsMixin.setUp(self)
+        self.server.setblocking(False)
+        self.reactor = FakeReactor()
+        self.connection = Connection(self.server, None, self.reactor)
+        self.connection.connected = 1
+
+
+    def test_canWriteVectors(self):
+        """
+        L{Connection._canWriteVectors} returns C{True} unless TLS has been
+        started.
+        """
+        self.assertTrue(self.connection._canWriteVectors())
+        self.connection.TLS = True
+        self.assertFalse(self.connection._canWriteVectors())
+
+
+    def test_strings(self):
+        """
+        Strings given to L{Connection.write} and L{Connection.writeSequence}
+        are sent in order, and are not joined while they are sent.
+        """
+        self.connection.write(b"abc")
+        self.connection.writeSequence([b"def", b"", b"ghi"])
+        self.assertEqual(self.connection._tempDataBuffer,
+                         [b"abc", b"def", b"", b"ghi"])
+        self.connection.doWrite()
+        self.assertEqual(self.receive(9), b"abcdefghi")
+        self.assertEqual(self.connection.dataBuffer, b"")
+        self.assertEqual(self.connection._tempDataBuffer, [])
+        self.assertEqual(self.connection._tempDataLen, 0)
+        self.assertNotIn(self.connection, self.reactor.writers)
+
+
+    def test_partialWrites(self):
+        """
+        When the socket accepts only part of the data, the unsent part of the
+        partly sent string is kept in C{dataBuffer} without being joined to
+        the strings after it, and all of the data is eventually delivered
+        intact.
+        """
+        chunks = [(b"%d" % (i,)) * (i % 7 + 1) for i in range(500)]
+        expected = b"".join(chunks)
+        writes = []
+        def writeSomeVectors(vectors, offset):
+            # Accept a few bytes at a time, splitting strings in the middle.
+            data = b"".join(vectors)[offset:offset + 13]
+            writes.append(data)
+            return len(data)
+        self.connection._writeSomeVectors = writeSomeVectors
+        self.connection.writeSequence(chunks)
+
+        self.connection.doWrite()
+        self.assertEqual(self.connection.dataBuffer, chunks[4])
+        self.assertEqual(self.connection.offset, 3)
+        self.assertIdentical(self.connection._tempDataBuffer[0], chunks[5])
+
+        while self.connection.dataBuffer or self.connection._tempDataLen:
+            self.connection.doWrite()
+        self.assertEqual(b"".join(writes), expected)
+        self.assertEqual(self.connection._tempDataBuffer, [])
+        self.assertEqual(self.connection._tempDataLen, 0)
+
+
+    def test_iovMax(self):
+        """
+        No more than L{_writev.IOV_MAX} strings are passed to a single
+        writev(2) call.
+        """
+        counts = []
+        def writeSomeVectors(vectors, offset):
+            counts.append(len(vectors))
+            return sum(map(len, vectors)) - offset
+        self.connection._writeSomeVectors = writeSomeVectors
+        self.connection.writeSequence([b"x"] * (_writev.IOV_MAX + 5))
+        self.connection.doWrite()
+        self.connection.doWrite()
+        self.assertEqual(counts, [_writev.IOV_MAX, 5])
+        self.assertEqual(self.connection._tempDataLen, 0)
+
+
+    def test_connectionLost(self):
+        """
+        If the socket fails with an error other than C{EWOULDBLOCK},
+        L{Connection.doWrite} returns L{main.CONNECTION_LOST}.
+        """
+        self.connection.write(b"abc")
+        self.client.close()
+        self.server.close()
+        self.assertIdentical(self.connection.doWrite(), main.CONNECTION_LOST)
@@ -30,7 +30,7 @@ if platformType == 'win32':
     from errno import WSAEWOULDBLOCK
     from errno import WSAEINTR, WSAEMSGSIZE, WSAETIMEDOUT
     from errno import WSAECONNREFUSED, WSAECONNRESET, WSAENETRESET
-    from errno import WSAEINPROGRESS
+    from errno import WSAEINPROGRESS, WSAENOPROTOOPT
 
     # Classify read and write errors
     _sockErrReadIgnore = [WSAEINTR, WSAEWOULDBLOCK, WSAEMSGSIZE, WSAEINPROGRESS]
@@ -42,8 +42,10 @@ if platformType == 'win32':
     ECONNREFUSED = WSAECONNREFUSED
     EAGAIN = WSAEWOULDBLOCK
     EINTR = WSAEINTR
+    ENOPROTOOPT = WSAENOPROTOOPT
 else:
     from errno import EWOULDBLOCK, EINTR, EMSGSIZE, ECONNREFUSED, EAGAIN
+    from errno import ENOPROTOOPT
     _sockErrReadIgnore = [EAGAIN, EINTR, EWOULDBLOCK]
     _sockErrReadRefuse = [ECONNREFUSED]
 
@@ -59,17 +61,37 @@ from twisted.internet import abstract, error, interfaces
 class Port(base.BasePort):
     """
     UDP port, listening for packets.
+
+    @ivar maxDatagramsPerRead: The largest number of datagrams read in one
+        call to L{doRead}, so that a busy port cannot starve the other
+        event sources of the reactor.
+
+    @ivar reusePort: If true, the socket is bound with C{SO_REUSEPORT}, so
+        that several sockets, in this or other processes, can listen on the
+        same port and share the datagrams arriving there.
+
+    @ivar receivedDatagrams: The number of datagrams read from the socket.
+
+    @ivar droppedDatagrams: The number of datagrams read from the socket
+        which the protocol raised an exception handling.
+
+    @ivar fullReads: The number of calls to L{doRead} which stopped at
+        C{maxDatagramsPerRead} or C{maxThroughput}, possibly leaving
+        datagrams queued in the socket.  If this grows quickly, the socket's
+        receive buffer is likely to be overflowing.
     """
 
     addressFamily = socket.AF_INET
     socketType = socket.SOCK_DGRAM
     maxThroughput = 256 * 1024 # max bytes we read in one eventloop iteration
+    maxDatagramsPerRead = 256
 
     # Actual port number being listened on, only set to a non-None
     # value when we are actually listening.
     _realPortNumber = None
 
-    def __init__(self, port, proto, interface='', maxPacketSize=8192, reactor=None):
+    def __init__(self, port, proto, interface='', maxPacketSize=8192,
+                 reactor=None, reusePort=False):
         """
         Initialize with a numeric port to listen on.
         """
@@ -78,6 +100,10 @@ class Port(base.BasePort):
         self.protocol = proto
         self.maxPacketSize = maxPacketSize
         self.interface = interface
+        self.reusePort = reusePort
+        self.receivedDatagrams = 0
+        self.droppedDatagrams = 0
+        self.fullReads = 0
         self.setLogStr()
         self._connectedAddr = None
 
@@ -106,6 +132,11 @@ class Port(base.BasePort):
     def _bindSocket(self):
         try:
             skt = self.createInternetSocket()
+            if self.reusePort:
+                if getattr(socket, "SO_REUSEPORT", None) is None:
+                    raise socket.error(
+                        ENOPROTOOPT, "SO_REUSEPORT is not supported")
+                skt.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             skt.bind((self.interface, self.port))
         except socket.error as le:
             raise error.CannotListenError(self.interface, self.port, le)
@@ -129,11 +160,16 @@ class Port(base.BasePort):
     def doRead(self):
         """
         Called when my socket is ready for reading.
+
+        Up to C{maxDatagramsPerRead} datagrams, or C{maxThroughput} bytes,
+        are read before returning to the reactor.
         """
         read = 0
-        while read < self.maxThroughput:
+        count = 0
+        recvfrom = self.socket.recvfrom
+        while read < self.maxThroughput and count < self.maxDatagramsPerRead:
             try:
-                data, addr = self.socket.recvfrom(self.maxPacketSize)
+                data, addr = recvfrom(self.maxPacketSize)
             except socket.error as se:
                 no = se.args[0]
                 if no in _sockErrReadIgnore:
@@ -145,10 +181,14 @@ class Port(base.BasePort):
                 raise
             else:
                 read += len(data)
+                count += 1
+                self.receivedDatagrams += 1
                 try:
                     self.protocol.datagramReceived(data, addr)
                 except:
+                    self.droppedDatagrams += 1
                     log.err()
+        self.fullReads += 1
 
 
     def write(self, datagram, addr=None):
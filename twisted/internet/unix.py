@@ -102,6 +102,16 @@ class _SendmsgMixin(object):
         self.startWriting()
 
 
+    def _canWriteVectors(self):
+        """
+        Determine whether buffered data can be sent with writev(2).  It
+        cannot while there are file descriptors to send, since they are sent
+        along with the bytes given to L{writeSomeData}.
+        """
+        return (not self._sendmsgQueue and
+                self._writeSomeDataBase._canWriteVectors(self))
+
+
     def writeSomeData(self, data):
         """
         Send as much of C{data} as possible.  Also send any pending file
@@ -27,10 +27,12 @@ class GladeReactor(sup):
     """GTK+-2 event loop reactor with GUI.
     """
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
         from _inspectro import LoggingFactory
         factory = LoggingFactory(factory)
-        return sup.listenTCP(self, port, factory, backlog, interface)
+        return sup.listenTCP(self, port, factory, backlog, interface,
+                             reusePort)
     
     def connectTCP(self, host, port, factory, timeout=30, bindAddress=None):
         from _inspectro import LoggingFactory
@@ -61,78 +61,154 @@ def getSerial(filename = '/tmp/twisted-names.serial'):
 
 
 class FileAuthority(common.ResolverBase):
-    """An Authority that is loaded from a file."""
+    """
+    An Authority that is loaded from a file.
+
+    Answers to queries for the names in the zone are kept in an index, so
+    that they are computed only once.  L{compileZone} computes them ahead of
+    time; otherwise they are computed when first asked for.  The index is
+    reset whenever C{records} or C{soa} is replaced.  If C{records} is
+    changed in place instead, L{resetIndex} must be called.
+
+    @cvar compiledTypes: The record types answers are kept for, for every
+        name in the zone, besides the types of the name's own records.
+
+    @ivar _index: A C{dict} mapping tuples of a lower-cased name and a record
+        type to the answer to a query for them, or C{None} if no answers
+        have been computed.
+
+    @ivar _indexedRecords: The C{records} C{_index} was built from.
+
+    @ivar _indexedSOA: The C{soa} C{_index} was built from.
+    """
 
     soa = None
     records = None
+    _index = None
+    _indexedRecords = None
+    _indexedSOA = None
+
+    compiledTypes = (dns.A, dns.AAAA, dns.CNAME, dns.MX, dns.NS, dns.SOA,
+                     dns.TXT, dns.ALL_RECORDS)
 
     def __init__(self, filename):
         common.ResolverBase.__init__(self)
         self.loadFile(filename)
         self._cache = {}
+        self.compileZone()
 
 
     def __setstate__(self, state):
         self.__dict__ = state
 #        print 'setstate ', self.soa
 
+
+    def resetIndex(self):
+        """
+        Forget the answers computed for the zone.
+        """
+        self._index = {}
+        self._indexedRecords = self.records
+        self._indexedSOA = self.soa
+
+
+    def compileZone(self):
+        """
+        Compute the answers to queries for each name in the zone, for the
+        types of its records and those in L{compiledTypes}.
+        """
+        self.resetIndex()
+        index = self._index
+        for name, records in self.records.iteritems():
+            if name != name.lower():
+                # Lookups never find these.
+                continue
+            types = set(self.compiledTypes)
+            types.update([record.TYPE for record in records])
+            for type in types:
+                index[name, type] = self._answer(name, type)
+
+
     def _lookup(self, name, cls, type, timeout = None):
+        if (self._indexedRecords is not self.records or
+            self._indexedSOA is not self.soa):
+            self.resetIndex()
+        # The records of an indexed answer are named in lower case, so it can
+        # only be given for a query which is too.
+        answer = self._index.get((name, type))
+        if answer is None:
+            records = self.records.get(name.lower())
+            if records is None:
+                if name.lower().endswith(self.soa[0].lower()):
+                    # We are the authority and we didn't find it.  Goodbye.
+                    return defer.fail(failure.Failure(dns.AuthoritativeDomainError(name)))
+                return defer.fail(failure.Failure(dns.DomainError(name)))
+            answer = self._answer(name, type)
+            if name == name.lower() and (
+                type in self.compiledTypes or
+                type in [record.TYPE for record in records]):
+                self._index[name, type] = answer
+        results, authority, additional = answer
+        return defer.succeed(
+            (list(results), list(authority), list(additional)))
+
+
+    def _answer(self, name, type):
+        """
+        Compute the answer to a query for the records of C{type} of C{name},
+        which must have records in the zone.
+
+        @return: A three-tuple of lists of L{dns.RRHeader} instances: the
+            answer, authority and additional sections of the answer.
+        """
         cnames = []
         results = []
         authority = []
         additional = []
         default_ttl = max(self.soa[1].minimum, self.soa[1].expire)
 
-        domain_records = self.records.get(name.lower())
+        for record in self.records[name.lower()]:
+            if record.ttl is not None:
+                ttl = record.ttl
+            else:
+                ttl = default_ttl
 
-        if domain_records:
-            for record in domain_records:
-                if record.ttl is not None:
-                    ttl = record.ttl
-                else:
-                    ttl = default_ttl
-
-                if record.TYPE == dns.NS and name.lower() != self.soa[0].lower():
-                    # NS record belong to a child zone: this is a referral.  As
-                    # NS records are authoritative in the child zone, ours here
-                    # are not.  RFC 2181, section 6.1.
-                    authority.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=False)
-                    )
-                elif record.TYPE == type or type == dns.ALL_RECORDS:
-                    results.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
-                    )
-                if record.TYPE == dns.CNAME:
-                    cnames.append(
-                        dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
-                    )
-            if not results:
-                results = cnames
-
-            for record in results + authority:
-                section = {dns.NS: additional, dns.CNAME: results, dns.MX: additional}.get(record.type)
-                if section is not None:
-                    n = str(record.payload.name)
-                    for rec in self.records.get(n.lower(), ()):
-                        if rec.TYPE == dns.A:
-                            section.append(
-                                dns.RRHeader(n, dns.A, dns.IN, rec.ttl or default_ttl, rec, auth=True)
-                            )
-
-            if not results and not authority:
-                # Empty response. Include SOA record to allow clients to cache
-                # this response.  RFC 1034, sections 3.7 and 4.3.4, and RFC 2181
-                # section 7.1.
+            if record.TYPE == dns.NS and name.lower() != self.soa[0].lower():
+                # NS record belong to a child zone: this is a referral.  As
+                # NS records are authoritative in the child zone, ours here
+                # are not.  RFC 2181, section 6.1.
                 authority.append(
-                    dns.RRHeader(self.soa[0], dns.SOA, dns.IN, ttl, self.soa[1], auth=True)
-                    )
-            return defer.succeed((results, authority, additional))
-        else:
-            if name.lower().endswith(self.soa[0].lower()):
-                # We are the authority and we didn't find it.  Goodbye.
-                return defer.fail(failure.Failure(dns.AuthoritativeDomainError(name)))
-            return defer.fail(failure.Failure(dns.DomainError(name)))
+                    dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=False)
+                )
+            elif record.TYPE == type or type == dns.ALL_RECORDS:
+                results.append(
+                    dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
+                )
+            if record.TYPE == dns.CNAME:
+                cnames.append(
+                    dns.RRHeader(name, record.TYPE, dns.IN, ttl, record, auth=True)
+                )
+        if not results:
+            results = cnames
+
+        for record in results + authority:
+            section = {dns.NS: additional, dns.CNAME: results, dns.MX: additional}.get(record.type)
+            if section is not None:
+                n = str(record.payload.name)
+                for rec in self.records.get(n.lower(), ()):
+                    if rec.TYPE == dns.A:
+                        section.append(
+                            dns.RRHeader(n, dns.A, dns.IN, rec.ttl or default_ttl, rec, auth=True)
+                        )
+
+        if not results and not authority:
+            # Empty response. Include SOA record to allow clients to cache
+            # this response.  RFC 1034, sections 3.7 and 4.3.4, and RFC 2181
+            # section 7.1.
+            authority.append(
+                dns.RRHeader(self.soa[0], dns.SOA, dns.IN, ttl, self.soa[1], auth=True)
+                )
+        return results, authority, additional
 
 
     def lookupZone(self, name, timeout = 10):
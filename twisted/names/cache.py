@@ -8,28 +8,102 @@ An in-memory caching resolver.
 
 from __future__ import division, absolute_import
 
+import heapq
+
 from zope.interface import implementer
 
-from twisted.names import dns, common
+from twisted.names import dns, common, error
 from twisted.python import failure, log
+from twisted.python._lru import LRUCache
 from twisted.internet import interfaces, defer
 
 
+
+class _CacheEntry(object):
+    """
+    A cached answer to a query.
+
+    @ivar cachedAt: The time the answer was cached at.
+
+    @ivar expires: The time after which the answer may no longer be given.
+
+    @ivar payload: A 3-tuple of lists of L{dns.RRHeader} records: the
+        answers, authority and additional sections of the answer.
+
+    @ivar negative: C{True} if the answer is that the name does not exist.
+
+    @ivar lastResult: The last records built from C{payload} for a lookup, as
+        a tuple of the number of whole seconds elapsed since C{cachedAt} they
+        were built for and the records, or C{None}.
+    """
+    __slots__ = ('cachedAt', 'expires', 'payload', 'negative', 'lastResult')
+
+    def __init__(self, cachedAt, expires, payload, negative):
+        self.cachedAt = cachedAt
+        self.expires = expires
+        self.payload = payload
+        self.negative = negative
+        self.lastResult = None
+
+
+
 implementer(interfaces.IResolver)
 class CacheResolver(common.ResolverBase):
     """
     A resolver that serves records from a local, memory cache.
 
+    Answers are kept until the smallest TTL of their records runs out.
+    Negative answers, which have no answer records but an I{SOA} record in
+    their authority section, are kept for the smaller of the TTL of that
+    record and its I{minimum} field, as described in RFC 2308.  Answers that
+    a name does not exist are only cached by L{cacheNegativeResult}.
+
+    A single timer removes expired answers, rather than one timer for each.
+
+    @ivar maxEntries: The largest number of answers cached, or C{None} for no
+        limit.  Once there are this many, the least recently used answer is
+        discarded to make room for a new one.
+
+    @ivar maxStale: The number of seconds an expired answer may still be
+        given while L{resolver} is asked for a new one.  Only used if
+        L{resolver} is not C{None}.
+
+    @ivar staleTTL: The TTL of the records of an expired answer.
+
+    @ivar resolver: An L{interfaces.IResolver} provider used to refresh
+        expired answers in the background, or C{None}.
+
     @ivar _reactor: A provider of L{interfaces.IReactorTime}.
+
+    @ivar _expiries: A heap of C{(time, query)} tuples, giving when the cached
+        answer for each query may be removed.  Tuples for answers which have
+        since been replaced or discarded are left in place until their time
+        comes.
+
+    @ivar _sweepCall: The L{interfaces.IDelayedCall} which will next remove
+        expired answers, or C{None}.
+
+    @ivar _refreshing: A C{set} of the queries being refreshed by
+        L{resolver}.
     """
     cache = None
+    staleTTL = 30
 
-    def __init__(self, cache=None, verbose=0, reactor=None):
+    def __init__(self, cache=None, verbose=0, reactor=None, maxEntries=None,
+                 maxStale=0, resolver=None):
         common.ResolverBase.__init__(self)
 
-        self.cache = {}
+        if maxEntries is None:
+            self.cache = {}
+        else:
+            self.cache = LRUCache(maxEntries)
+        self.maxEntries = maxEntries
+        self.maxStale = maxStale
+        self.resolver = resolver
         self.verbose = verbose
-        self.cancel = {}
+        self._expiries = []
+        self._sweepCall = None
+        self._refreshing = set()
         if reactor is None:
             from twisted.internet import reactor
         self._reactor = reactor
@@ -40,56 +114,161 @@ class CacheResolver(common.ResolverBase):
 
 
     def __setstate__(self, state):
+        cache = state.pop('cache')
+        # Pickled before the cache could be bounded, the state may have none
+        # of the new settings, and a dict of the timers expiring each answer.
+        state.pop('cancel', None)
         self.__dict__ = state
-
+        self.__init__(verbose=state.get('verbose', 0),
+                      reactor=state.get('_reactor'),
+                      maxEntries=state.get('maxEntries'),
+                      maxStale=state.get('maxStale', 0),
+                      resolver=state.get('resolver'))
         now = self._reactor.seconds()
-        for (k, (when, (ans, add, ns))) in self.cache.items():
-            diff = now - when
-            for rec in ans + add + ns:
-                if rec.ttl < diff:
-                    del self.cache[k]
-                    break
+        for query, (when, payload) in cache.items():
+            if self._expiryFor(payload, when) > now:
+                self.cacheResult(query, payload, when)
 
 
     def __getstate__(self):
-        for c in self.cancel.values():
-            c.cancel()
-        self.cancel.clear()
-        return self.__dict__
+        state = self.__dict__.copy()
+        for name in ('_expiries', '_sweepCall', '_refreshing'):
+            del state[name]
+        state['cache'] = cache = {}
+        for query in self.cache:
+            entry = self._peek(query)
+            if not entry.negative:
+                cache[query] = (entry.cachedAt, entry.payload)
+        return state
 
 
     def _lookup(self, name, cls, type, timeout):
         now = self._reactor.seconds()
         q = dns.Query(name, type, cls)
-        try:
-            when, (ans, auth, add) = self.cache[q]
-        except KeyError:
+        entry = self.cache.get(q)
+        if (entry is not None and entry.expires <= now and
+            entry.payload != ([], [], [])):
+            # An answer without records is given until it is swept away.
+            if (self.resolver is None or
+                entry.expires + self.maxStale <= now):
+                entry = None
+            else:
+                self._refresh(q)
+                if self.verbose:
+                    log.msg('Stale cache hit for ' + repr(name))
+                return self._result(name, entry, None)
+
+        if entry is None:
             if self.verbose > 1:
                 log.msg('Cache miss for ' + repr(name))
             return defer.fail(failure.Failure(dns.DomainError(name)))
+
+        if self.verbose:
+            log.msg('Cache hit for ' + repr(name))
+        return self._result(name, entry, int(now - entry.cachedAt))
+
+
+    def _result(self, name, entry, elapsed):
+        """
+        Give the cached answer C{entry} for C{name}.
+
+        @param elapsed: The number of whole seconds since C{entry} was cached,
+            which is taken off the TTL of each record, or C{None} to give
+            every record a TTL of L{staleTTL}.
+
+        @return: A L{Deferred} which fires with the records of the answer, or
+            fails with L{dns.AuthoritativeDomainError} if the answer is that
+            C{name} does not exist.
+        """
+        if entry.negative:
+            return defer.fail(failure.Failure(
+                    dns.AuthoritativeDomainError(name)))
+        last = entry.lastResult
+        if last is not None and last[0] == elapsed:
+            return defer.succeed(last[1])
+        ans, auth, add = entry.payload
+        if elapsed is None:
+            ttl = lambda r: self.staleTTL
         else:
-            if self.verbose:
-                log.msg('Cache hit for ' + repr(name))
-            diff = now - when
-
-            try:
-                result = (
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in ans],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in auth],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in add])
-            except ValueError:
-                return defer.fail(failure.Failure(dns.DomainError(name)))
-            else:
-                return defer.succeed(result)
+            ttl = lambda r: max(r.ttl - elapsed, 0)
+        result = (
+            [dns.RRHeader(r.name.name, r.type, r.cls, ttl(r), r.payload)
+             for r in ans],
+            [dns.RRHeader(r.name.name, r.type, r.cls, ttl(r), r.payload)
+             for r in auth],
+            [dns.RRHeader(r.name.name, r.type, r.cls, ttl(r), r.payload)
+             for r in add])
+        entry.lastResult = (elapsed, result)
+        return defer.succeed(result)
+
+
+    def _refresh(self, query):
+        """
+        Ask L{resolver} for a new answer to C{query}, unless it already has
+        been, and cache it.
+        """
+        if query in self._refreshing:
+            return
+        self._refreshing.add(query)
+
+        def refreshed(result):
+            self.cacheResult(query, result)
+
+        def failed(reason):
+            if reason.check(error.DNSNameError):
+                message = reason.value.args[0]
+                if isinstance(message, dns.Message):
+                    self.cacheNegativeResult(query, message.authority)
+            elif self.verbose:
+                log.msg('Failed to refresh %r: %s' % (
+                        query, reason.getErrorMessage()))
+
+        def finished(ignored):
+            self._refreshing.discard(query)
+
+        d = self.resolver.query(query)
+        d.addCallbacks(refreshed, failed)
+        d.addBoth(finished)
 
 
     def lookupAllRecords(self, name, timeout = None):
         return defer.fail(failure.Failure(dns.DomainError(name)))
 
 
+    def _negativeTTL(self, authority):
+        """
+        Find how long a negative answer may be cached for, according to RFC
+        2308.
+
+        @param authority: The authority section of the answer.
+
+        @return: The smaller of the TTL and the I{minimum} field of the
+            I{SOA} record in C{authority}, or C{None} if there is none.
+        """
+        for record in authority:
+            if record.type == dns.SOA:
+                return min(record.ttl, record.payload.minimum)
+        return None
+
+
+    def _expiryFor(self, payload, cacheTime):
+        """
+        Find the time after which an answer cached at C{cacheTime} may no
+        longer be given.
+        """
+        ans, auth, add = payload
+        ttl = None
+        if not ans:
+            ttl = self._negativeTTL(auth)
+        if ttl is None:
+            records = list(ans) + list(auth) + list(add)
+            if records:
+                ttl = min([r.ttl for r in records])
+            else:
+                ttl = 0
+        return cacheTime + ttl
+
+
     def cacheResult(self, query, payload, cacheTime=None):
         """
         Cache a DNS entry.
@@ -106,22 +285,114 @@ class CacheResolver(common.ResolverBase):
         if self.verbose > 1:
             log.msg('Adding %r to cache' % query)
 
-        self.cache[query] = (cacheTime or self._reactor.seconds(), payload)
+        if cacheTime is None:
+            cacheTime = self._reactor.seconds()
+        self._store(query, _CacheEntry(
+                cacheTime, self._expiryFor(payload, cacheTime), payload,
+                False))
 
-        if query in self.cancel:
-            self.cancel[query].cancel()
 
-        s = list(payload[0]) + list(payload[1]) + list(payload[2])
-        if s:
-            m = s[0].ttl
-            for r in s:
-                m = min(m, r.ttl)
-        else:
-            m = 0
+    def cacheNegativeResult(self, query, authority, cacheTime=None):
+        """
+        Cache the answer that the name of a query does not exist.
+
+        Lookups of the query then fail with L{dns.AuthoritativeDomainError}
+        until the answer expires.
+
+        @param query: a L{dns.Query} instance.
+
+        @param authority: The authority section of the answer, a C{list} of
+            L{dns.RRHeader} records.  The answer is cached as described by RFC
+            2308, which requires an I{SOA} record; without one it is not
+            cached.
+
+        @param cacheTime: The time (seconds since epoch) at which the entry is
+            considered to have been added to the cache. If C{None} is given,
+            the current time is used.
+        """
+        ttl = self._negativeTTL(authority)
+        if ttl is None:
+            return
+        if self.verbose > 1:
+            log.msg('Adding negative answer for %r to cache' % query)
+        if cacheTime is None:
+            cacheTime = self._reactor.seconds()
+        self._store(query, _CacheEntry(
+                cacheTime, cacheTime + ttl, ([], list(authority), []), True))
+
 
-        self.cancel[query] = self._reactor.callLater(m, self.clearEntry, query)
+    def _store(self, query, entry):
+        """
+        Add C{entry} to the cache and arrange for it to be removed once it has
+        expired.
+        """
+        self.cache[query] = entry
+        removeAt = entry.expires
+        if self.resolver is not None:
+            removeAt += self.maxStale
+        expiries = self._expiries
+        if len(expiries) > 2 * len(self.cache) + 64:
+            # Drop the tuples of answers no longer cached.
+            expiries[:] = [
+                (when, q) for (when, q) in expiries
+                if q in self.cache and when == self._removeAt(q)]
+            heapq.heapify(expiries)
+        heapq.heappush(expiries, (removeAt, query))
+        self._scheduleSweep()
+
+
+    def _removeAt(self, query):
+        """
+        Find the time the cached answer to C{query} may be removed.
+        """
+        removeAt = self._peek(query).expires
+        if self.resolver is not None:
+            removeAt += self.maxStale
+        return removeAt
+
+
+    def _peek(self, query):
+        """
+        Find the cached answer to C{query} without making it the most recently
+        used one.
+
+        @return: A L{_CacheEntry}, or C{None}.
+        """
+        if self.maxEntries is None:
+            return self.cache.get(query)
+        return self.cache.peek(query)
+
+
+    def _scheduleSweep(self):
+        """
+        Make sure L{_sweep} is called when the first cached answer may be
+        removed.
+        """
+        if not self._expiries:
+            return
+        delay = max(self._expiries[0][0] - self._reactor.seconds(), 0)
+        if self._sweepCall is None:
+            self._sweepCall = self._reactor.callLater(delay, self._sweep)
+        elif self._sweepCall.getTime() > self._expiries[0][0]:
+            self._sweepCall.reset(delay)
+
+
+    def _sweep(self):
+        """
+        Remove every cached answer which may be removed by now.
+        """
+        self._sweepCall = None
+        now = self._reactor.seconds()
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            when, query = heapq.heappop(expiries)
+            if query in self.cache and self._removeAt(query) == when:
+                del self.cache[query]
+        self._scheduleSweep()
 
 
     def clearEntry(self, query):
-        del self.cache[query]
-        del self.cancel[query]
+        """
+        Remove the cached answer to C{query}, if there is one.
+        """
+        self.cache.pop(query, None)
@@ -34,13 +34,13 @@ from twisted.names import dns, common
 implementer(interfaces.IResolver)
 class Resolver(common.ResolverBase):
     """
-    @ivar _waiting: A C{dict} mapping tuple keys of query name/type/class to
-        Deferreds which will be called back with the result of those queries.
-        This is used to avoid issuing the same query more than once in
-        parallel.  This is more efficient on the network and helps avoid a
-        "birthday paradox" attack by keeping the number of outstanding requests
-        for a particular query fixed at one instead of allowing the attacker to
-        raise it to an arbitrary number.
+    @ivar _waiting: A C{dict} mapping tuple keys of lower-cased query
+        name/type/class to Deferreds which will be called back with the
+        result of those queries.  This is used to avoid issuing the same
+        query more than once in parallel.  This is more efficient on the
+        network and helps avoid a "birthday paradox" attack by keeping the
+        number of outstanding requests for a particular query fixed at one
+        instead of allowing the attacker to raise it to an arbitrary number.
 
     @ivar _reactor: A provider of L{IReactorTCP}, L{IReactorUDP}, and
         L{IReactorTime} which will be used to set up network resources and
@@ -376,7 +376,8 @@ class Resolver(common.ResolverBase):
 
         If this query is already outstanding, it will not be re-issued.
         Instead, when the outstanding query receives a response, that response
-        will be re-used for this query as well.
+        will be re-used for this query as well.  Names are compared without
+        regard to case, as DNS does.
 
         @type name: C{str}
         @type type: C{int}
@@ -386,7 +387,7 @@ class Resolver(common.ResolverBase):
             answer, authority, and additional sections of the response or with
             a L{Failure} if the response code is anything other than C{dns.OK}.
         """
-        key = (name, type, cls)
+        key = (name.lower(), type, cls)
         waiting = self._waiting.get(key)
         if waiting is None:
             self._waiting[key] = []
@@ -404,18 +405,57 @@ class Resolver(common.ResolverBase):
 
 
     # This one doesn't ever belong on UDP
-    def lookupZone(self, name, timeout = 10):
+    def lookupZone(self, name, timeout = 10, recordsReceived = None):
         """
         Perform an AXFR request. This is quite different from usual
         DNS requests. See http://cr.yp.to/djbdns/axfr-notes.html for
         more information.
+
+        @param recordsReceived: If not C{None}, a callable which is called
+            with a C{list} of the records of each message of the transfer as
+            it arrives, rather than the records being collected.
+        """
+        d = defer.Deferred()
+        return self._transfer(
+            AXFRController(name, d, recordsReceived), d, timeout)
+
+
+    def lookupZoneChanges(self, name, soa, timeout = 10,
+                          recordsReceived = None):
+        """
+        Perform an IXFR request (RFC 1995) for the changes to a zone since
+        the version a client has.
+
+        The response is made up of the new I{SOA} record, followed either
+        by the records of the whole zone as for AXFR, or by sequences of an
+        old I{SOA} record, the records deleted since it, a newer I{SOA} record
+        and the records added since, ending with the new I{SOA} record again.
+        If the client's version is current, only the new I{SOA} record is
+        given.
+
+        @param soa: The L{dns.Record_SOA} of the version of the zone the
+            client has.
+
+        @param recordsReceived: See L{lookupZone}.
+
+        @return: A L{Deferred} which fires with a three-tuple of the
+            C{list} of the records received (empty if C{recordsReceived} was
+            given), and two empty C{list}s.
+        """
+        d = defer.Deferred()
+        return self._transfer(
+            IXFRController(name, soa, d, recordsReceived), d, timeout)
+
+
+    def _transfer(self, controller, d, timeout):
+        """
+        Connect to a server over TCP and have C{controller} perform a zone
+        transfer from it.
         """
         address = self.pickServer()
         if address is None:
             return defer.fail(IOError('No domain name servers available'))
         host, port = address
-        d = defer.Deferred()
-        controller = AXFRController(name, d)
         factory = DNSClientFactory(controller, timeout)
         factory.noisy = False #stfu
 
@@ -437,19 +477,38 @@ class Resolver(common.ResolverBase):
 
 
 class AXFRController:
+    """
+    Perform an AXFR request on a L{dns.DNSProtocol} connection.
+
+    @ivar recordsReceived: A callable which is called with the C{list} of
+        the records of each message of the transfer, or C{None} if the
+        records are collected in C{records} and the Deferred fired with them.
+
+    @ivar count: The number of records received.
+    """
     timeoutCall = None
 
-    def __init__(self, name, deferred):
+    def __init__(self, name, deferred, recordsReceived=None):
         self.name = name
         self.deferred = deferred
+        self.recordsReceived = recordsReceived
         self.soa = None
         self.records = []
+        self.count = 0
 
-    def connectionMade(self, protocol):
+
+    def _query(self, protocol):
+        """
+        Make the message requesting the transfer.
+        """
         # dig saids recursion-desired to 0, so I will too
         message = dns.Message(protocol.pickID(), recDes=0)
         message.queries = [dns.Query(self.name, dns.AXFR, dns.IN)]
-        protocol.writeMessage(message)
+        return message
+
+
+    def connectionMade(self, protocol):
+        protocol.writeMessage(self._query(protocol))
 
 
     def connectionLost(self, protocol):
@@ -457,6 +516,22 @@ class AXFRController:
         pass
 
 
+    def _isLast(self, record):
+        """
+        Determine whether C{record}, which is not the first record of the
+        transfer, is its last one.
+        """
+        return record.type == dns.SOA
+
+
+    def _messageDone(self):
+        """
+        Determine whether the transfer is complete after a message which did
+        not end with its last record.
+        """
+        return False
+
+
     def messageReceived(self, message, protocol):
         # Caveat: We have to handle two cases: All records are in 1
         # message, or all records are in N messages.
@@ -464,21 +539,83 @@ class AXFRController:
         # According to http://cr.yp.to/djbdns/axfr-notes.html,
         # 'authority' and 'additional' are always empty, and only
         # 'answers' is present.
-        self.records.extend(message.answers)
-        if not self.records:
+        if self.deferred is None:
             return
-        if not self.soa:
-            if self.records[0].type == dns.SOA:
-                #print "first SOA!"
-                self.soa = self.records[0]
-        if len(self.records) > 1 and self.records[-1].type == dns.SOA:
-            #print "It's the second SOA! We're done."
+        records = message.answers
+        done = False
+        for i, record in enumerate(records):
+            self.count += 1
+            if self.count == 1:
+                if record.type == dns.SOA:
+                    self.soa = record
+            elif self.soa is not None and self._isLast(record):
+                records = records[:i + 1]
+                done = True
+                break
+        if self.recordsReceived is not None:
+            if records:
+                self.recordsReceived(records)
+        else:
+            self.records.extend(records)
+        if done or (self.soa is not None and self._messageDone()):
             if self.timeoutCall is not None:
                 self.timeoutCall.cancel()
                 self.timeoutCall = None
-            if self.deferred is not None:
-                self.deferred.callback(self.records)
-                self.deferred = None
+            self.deferred, d = None, self.deferred
+            d.callback(self.records)
+
+
+
+class IXFRController(AXFRController):
+    """
+    Perform an IXFR request on a L{dns.DNSProtocol} connection.
+
+    @ivar serial: The L{dns.Record_SOA} of the version of the zone the
+        client has.
+
+    @ivar incremental: C{None} until the second record is received, then
+        whether the changes are given incrementally rather than as the whole
+        zone.
+
+    @ivar soaCount: The number of I{SOA} records received after the first in
+        an incremental transfer.
+    """
+
+    def __init__(self, name, serial, deferred, recordsReceived=None):
+        AXFRController.__init__(self, name, deferred, recordsReceived)
+        self.serial = serial
+        self.incremental = None
+        self.soaCount = 0
+
+
+    def _query(self, protocol):
+        message = dns.Message(protocol.pickID(), recDes=0)
+        message.queries = [dns.Query(self.name, dns.IXFR, dns.IN)]
+        message.authority = [
+            dns.RRHeader(self.name, dns.SOA, payload=self.serial)]
+        return message
+
+
+    def _isLast(self, record):
+        if self.incremental is None:
+            self.incremental = record.type == dns.SOA
+        elif not self.incremental:
+            return record.type == dns.SOA
+        if record.type == dns.SOA:
+            # The SOA records alternately start the deletions and the
+            # additions of each change; the new SOA record starting the
+            # deletions ends the transfer.
+            self.soaCount += 1
+            return (self.soaCount % 2 == 1 and
+                    record.payload.serial == self.soa.payload.serial)
+        return False
+
+
+    def _messageDone(self):
+        # A single SOA record no newer than the client's says the client's
+        # version is current.
+        return (self.count == 1 and not dns._serialNewer(
+                self.soa.payload.serial, self.serial.serial))
 
 
 
@@ -240,6 +240,20 @@ def str2time(s):
     return s
 
 
+def _serialNewer(serial, than):
+    """
+    Compare zone serial numbers with the sequence space arithmetic of RFC
+    1982.
+
+    @type serial: C{int}
+    @type than: C{int}
+
+    @return: C{True} if C{serial} is newer than C{than}.
+    """
+    return 0 < (serial - than) % 2 ** 32 < 2 ** 31
+
+
+
 def readPrecisely(file, l):
     buff = file.read(l)
     if len(buff) < l:
@@ -247,6 +261,82 @@ def readPrecisely(file, l):
     return buff
 
 
+# Precompiled formats of the fixed size fields of messages.
+_BYTE = struct.Struct('!B')
+_SHORT = struct.Struct('!H')
+_QUERY = struct.Struct('!HH')
+_SOA = struct.Struct('!LlllL')
+_SRV = struct.Struct('!HHH')
+
+
+def _readBuffer(data, offset, length):
+    """
+    Read C{length} bytes at C{offset} in C{data}.
+
+    @raise EOFError: If C{data} is too short.
+    """
+    buff = data[offset:offset + length]
+    if len(buff) < length:
+        raise EOFError
+    return buff
+
+
+def _unpackBuffer(format, data, offset):
+    """
+    Unpack the fields of the L{struct.Struct} C{format} at C{offset} in
+    C{data}.
+
+    @raise EOFError: If C{data} is too short.
+    """
+    if offset + format.size > len(data):
+        raise EOFError
+    return format.unpack_from(data, offset)
+
+
+def _decodeName(data, offset):
+    """
+    Decode the name at C{offset} in the message C{data}, following
+    compression pointers, as L{Name.decode} does.
+
+    @return: A two-tuple of the name, as C{bytes}, and the offset just past
+        its encoding.
+
+    @raise EOFError: If C{data} is too short.
+
+    @raise ValueError: If the name cannot be decoded (for example, because it
+        contains a loop).
+    """
+    labels = []
+    end = None
+    visited = None
+    size = len(data)
+    while True:
+        if offset >= size:
+            raise EOFError
+        l = _BYTE.unpack_from(data, offset)[0]
+        offset += 1
+        if l == 0:
+            break
+        if (l >> 6) == 3:
+            if offset >= size:
+                raise EOFError
+            pointer = (l & 63) << 8 | _BYTE.unpack_from(data, offset)[0]
+            if visited is None:
+                visited = set()
+            if pointer in visited:
+                raise ValueError("Compression loop in encoded name")
+            visited.add(pointer)
+            if end is None:
+                end = offset + 1
+            offset = pointer
+            continue
+        labels.append(_readBuffer(data, offset, l))
+        offset += l
+    if end is None:
+        end = offset
+    return b'.'.join(labels), end
+
+
 class IEncodable(Interface):
     """
     Interface for something which can be encoded to and decoded
@@ -379,8 +469,7 @@ class Name:
         while name:
             if compDict is not None:
                 if name in compDict:
-                    strio.write(
-                        struct.pack("!H", 0xc000 | compDict[name]))
+                    strio.write(_SHORT.pack(0xc000 | compDict[name]))
                     return
                 else:
                     compDict[name] = strio.tell() + Message.headerSize
@@ -492,13 +581,13 @@ class Query:
 
     def encode(self, strio, compDict=None):
         self.name.encode(strio, compDict)
-        strio.write(struct.pack("!HH", self.type, self.cls))
+        strio.write(_QUERY.pack(self.type, self.cls))
 
 
     def decode(self, strio, length = None):
         self.name.decode(strio)
         buff = readPrecisely(strio, 4)
-        self.type, self.cls = struct.unpack("!HH", buff)
+        self.type, self.cls = _QUERY.unpack(buff)
 
 
     def __hash__(self):
@@ -593,7 +682,7 @@ class RRHeader(tputil.FancyEqMixin):
             self.payload.encode(strio, compDict)
             aft = strio.tell()
             strio.seek(prefix - 2, 0)
-            strio.write(struct.pack('!H', aft - prefix))
+            strio.write(_SHORT.pack(aft - prefix))
             strio.seek(aft, 0)
 
 
@@ -863,8 +952,7 @@ class Record_SOA(tputil.FancyEqMixin, tputil.FancyStrMixin):
         self.mname.encode(strio, compDict)
         self.rname.encode(strio, compDict)
         strio.write(
-            struct.pack(
-                '!LlllL',
+            _SOA.pack(
                 self.serial, self.refresh, self.retry, self.expire,
                 self.minimum
             )
@@ -875,7 +963,7 @@ class Record_SOA(tputil.FancyEqMixin, tputil.FancyStrMixin):
         self.mname, self.rname = Name(), Name()
         self.mname.decode(strio)
         self.rname.decode(strio)
-        r = struct.unpack('!LlllL', readPrecisely(strio, 20))
+        r = _SOA.unpack(readPrecisely(strio, _SOA.size))
         self.serial, self.refresh, self.retry, self.expire, self.minimum = r
 
 
@@ -1151,13 +1239,13 @@ class Record_SRV(tputil.FancyEqMixin, tputil.FancyStrMixin):
 
 
     def encode(self, strio, compDict = None):
-        strio.write(struct.pack('!HHH', self.priority, self.weight, self.port))
+        strio.write(_SRV.pack(self.priority, self.weight, self.port))
         # This can't be compressed
         self.target.encode(strio, None)
 
 
     def decode(self, strio, length = None):
-        r = struct.unpack('!HHH', readPrecisely(strio, struct.calcsize('!HHH')))
+        r = _SRV.unpack(readPrecisely(strio, _SRV.size))
         self.priority, self.weight, self.port = r
         self.target = Name()
         self.target.decode(strio)
@@ -1493,12 +1581,12 @@ class Record_MX(tputil.FancyStrMixin, tputil.FancyEqMixin):
         self.ttl = str2time(ttl)
 
     def encode(self, strio, compDict = None):
-        strio.write(struct.pack('!H', self.preference))
+        strio.write(_SHORT.pack(self.preference))
         self.name.encode(strio, compDict)
 
 
     def decode(self, strio, length = None):
-        self.preference = struct.unpack('!H', readPrecisely(strio, 2))[0]
+        self.preference = _SHORT.unpack(readPrecisely(strio, 2))[0]
         self.name = Name()
         self.name.decode(strio)
 
@@ -1687,7 +1775,97 @@ class Record_SSHFP(tputil.FancyEqMixin, tputil.FancyStrMixin):
         return hash((self.algorithm, self.fp_type, self.fingerprint))
 
 
-class Message:
+# Decoders of the data of records in messages held in a buffer, used by
+# Message.fromStr.  Each is called with the record to fill in, the message,
+# and the offset and length of the record's data in it.  Records of types
+# without one here, including subclasses of these, are decoded with their
+# decode method.
+
+def _decodeSimpleRecord(record, data, offset, length):
+    record.name = Name(_decodeName(data, offset)[0])
+
+
+def _decodeA(record, data, offset, length):
+    record.address = _readBuffer(data, offset, 4)
+
+
+def _decodeAAAA(record, data, offset, length):
+    record.address = _readBuffer(data, offset, 16)
+
+
+def _decodeMX(record, data, offset, length):
+    record.preference = _unpackBuffer(_SHORT, data, offset)[0]
+    record.name = Name(_decodeName(data, offset + _SHORT.size)[0])
+
+
+def _decodeSOA(record, data, offset, length):
+    mname, offset = _decodeName(data, offset)
+    rname, offset = _decodeName(data, offset)
+    record.mname, record.rname = Name(mname), Name(rname)
+    (record.serial, record.refresh, record.retry, record.expire,
+     record.minimum) = _unpackBuffer(_SOA, data, offset)
+
+
+def _decodeSRV(record, data, offset, length):
+    record.priority, record.weight, record.port = _unpackBuffer(
+        _SRV, data, offset)
+    record.target = Name(_decodeName(data, offset + _SRV.size)[0])
+
+
+def _decodeTXT(record, data, offset, length):
+    soFar = 0
+    record.data = []
+    while soFar < length:
+        L = _unpackBuffer(_BYTE, data, offset + soFar)[0]
+        record.data.append(_readBuffer(data, offset + soFar + 1, L))
+        soFar += L + 1
+    if soFar != length:
+        log.msg(
+            "Decoded %d bytes in %s record, but rdlength is %d" % (
+                soFar, record.fancybasename, length
+            )
+        )
+
+
+_bufferDecoders = {
+    Record_A: _decodeA,
+    Record_AAAA: _decodeAAAA,
+    Record_MX: _decodeMX,
+    Record_SOA: _decodeSOA,
+    Record_SRV: _decodeSRV,
+    Record_TXT: _decodeTXT,
+    Record_SPF: _decodeTXT,
+    }
+for _recordClass in (Record_NS, Record_MD, Record_MF, Record_CNAME, Record_MB,
+                     Record_MG, Record_MR, Record_PTR, Record_DNAME):
+    _bufferDecoders[_recordClass] = _decodeSimpleRecord
+del _recordClass
+
+
+
+def _sectionProperty(name):
+    """
+    Make a property for one of the record sections of L{Message}, which
+    decodes the sections a lazily decoded message has not yet decoded when
+    it is read.
+
+    @param name: The name of the section.
+    """
+    attr = '_' + name
+
+    def get(self):
+        if self._undecoded is not None and getattr(self, attr) is None:
+            self._decodeSections()
+        return getattr(self, attr)
+
+    def set(self, value):
+        setattr(self, attr, value)
+
+    return property(get, set, doc="The %s section of the message." % (name,))
+
+
+
+class Message(object):
     """
     L{Message} contains all the information represented by a single
     DNS request or response.
@@ -1695,15 +1873,32 @@ class Message:
     @ivar rCode: A response code, used to indicate success or failure in a
         message which is a response from a server to a client request.
     @type rCode: C{0 <= int < 16}
+
+    @ivar lazy: If true, L{fromStr} decodes only the header and the queries,
+        and the answer, authority and additional sections are decoded when
+        one of them is first read.  Errors in those sections are then only
+        raised at that point.
+    @type lazy: C{bool}
+
+    @ivar _undecoded: C{None}, or a tuple of the message L{fromStr} was
+        given, the offset of its answer section and the numbers of records in
+        each section, if these are yet to be decoded.
     """
     headerFmt = "!H2B4H"
     headerSize = struct.calcsize(headerFmt)
 
     # Question, answer, additional, and nameserver lists
-    queries = answers = add = ns = None
+    queries = add = ns = None
+    _answers = _authority = _additional = None
+    answers = _sectionProperty('answers')
+    authority = _sectionProperty('authority')
+    additional = _sectionProperty('additional')
+
+    _undecoded = None
 
     def __init__(self, id=0, answer=0, opCode=0, recDes=0, recAv=0,
-                       auth=0, rCode=OK, trunc=0, maxSize=512):
+                       auth=0, rCode=OK, trunc=0, maxSize=512, lazy=False):
+        self.lazy = lazy
         self.maxSize = maxSize
         self.id = id
         self.answer = answer
@@ -1855,10 +2050,91 @@ class Message:
         Decode a byte string in the format described by RFC 1035 into this
         L{Message}.
 
+        Fields are unpacked straight from C{str}, rather than read from a file
+        as L{decode} does.  See L{lazy}.
+
         @param str: L{bytes}
         """
-        strio = BytesIO(str)
-        self.decode(strio)
+        self.maxSize = 0
+        (self.id, byte3, byte4, nqueries, nans, nns,
+         nadd) = _unpackBuffer(_HEADER, str, 0)
+        self.answer = ( byte3 >> 7 ) & 1
+        self.opCode = ( byte3 >> 3 ) & 0xf
+        self.auth = ( byte3 >> 2 ) & 1
+        self.trunc = ( byte3 >> 1 ) & 1
+        self.recDes = byte3 & 1
+        self.recAv = ( byte4 >> 7 ) & 1
+        self.rCode = byte4 & 0xf
+
+        self.queries = []
+        offset = _HEADER.size
+        for i in range(nqueries):
+            try:
+                name, offset = _decodeName(str, offset)
+                type, cls = _unpackBuffer(_QUERY, str, offset)
+            except EOFError:
+                return
+            offset += _QUERY.size
+            self.queries.append(Query(name, type, cls))
+
+        self._undecoded = (str, offset, (nans, nns, nadd))
+        self._answers = self._authority = self._additional = None
+        if not self.lazy:
+            self._decodeSections()
+
+
+    def _decodeSections(self):
+        """
+        Decode the records in the sections left undecoded by L{fromStr},
+        except for sections which have been set since.
+        """
+        data, offset, counts = self._undecoded
+        self._undecoded = None
+        sections = ([], [], [])
+        strio = None
+        for section, count in zip(sections, counts):
+            for i in range(count):
+                try:
+                    name, offset = _decodeName(data, offset)
+                    type, cls, ttl, rdlength = _unpackBuffer(
+                        _RRHEADER, data, offset)
+                except EOFError:
+                    break
+                offset += _RRHEADER.size
+                t = self.lookupRecordType(type)
+                if not t:
+                    offset += rdlength
+                    continue
+                header = RRHeader(name, type, cls, ttl, auth=self.auth)
+                header.rdlength = rdlength
+                header.payload = t(ttl=ttl)
+                decoder = _bufferDecoders.get(t)
+                try:
+                    if decoder is not None:
+                        decoder(header.payload, data, offset, rdlength)
+                    else:
+                        if strio is None:
+                            strio = BytesIO(data)
+                        strio.seek(offset)
+                        header.payload.decode(strio, rdlength)
+                except EOFError:
+                    break
+                offset += rdlength
+                section.append(header)
+            else:
+                continue
+            # Like decode, give up on the rest of the message if it is
+            # truncated.
+            break
+        for attr, section in zip(
+            ('_answers', '_authority', '_additional'), sections):
+            if getattr(self, attr) is None:
+                setattr(self, attr, section)
+
+
+
+_HEADER = struct.Struct(Message.headerFmt)
+_RRHEADER = struct.Struct(RRHeader.fmt)
 
 
 
@@ -1868,9 +2144,14 @@ class DNSMixin(object):
 
     @ivar _reactor: A L{IReactorTime} and L{IReactorUDP} provider which will
         be used to issue DNS queries and manage request timeouts.
+
+    @ivar lazyMessages: If true, the records of received messages are only
+        decoded when they are first used.  See L{Message.lazy}.
+    @type lazyMessages: C{bool}
     """
     id = None
     liveMessages = None
+    lazyMessages = False
 
     def __init__(self, controller, reactor=None):
         self.controller = controller
@@ -1980,7 +2261,7 @@ class DNSDatagramProtocol(DNSMixin, protocol.DatagramProtocol):
         Read a datagram, extract the message in it and trigger the associated
         Deferred.
         """
-        m = Message()
+        m = Message(lazy=self.lazyMessages)
         try:
             m.fromStr(data)
         except EOFError:
@@ -2089,7 +2370,7 @@ class DNSProtocol(DNSMixin, protocol.Protocol):
 
             if len(self.buffer) >= self.length:
                 myChunk = self.buffer[:self.length]
-                m = Message()
+                m = Message(lazy=self.lazyMessages)
                 m.fromStr(myChunk)
 
                 try:
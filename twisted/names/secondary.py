@@ -76,10 +76,72 @@ class SecondaryAuthorityService(service.Service):
 
 
 
+class _ZoneTransfer(object):
+    """
+    Collect the records of an AXFR or IXFR zone transfer as they are
+    received.
+
+    @ivar soa: The L{dns.RRHeader} of the first I{SOA} record of the transfer,
+        giving the new version of the zone, or C{None}.
+
+    @ivar records: If the transfer gives the whole zone, a C{dict} mapping
+        lower-cased names to C{list}s of their records, otherwise C{None}.
+
+    @ivar changes: If the transfer gives the changes since an earlier
+        version of the zone, a C{list} of tuples of whether the record was
+        deleted rather than added, its lower-cased name and the record,
+        otherwise C{None}.
+
+    @ivar incremental: Whether the transfer was requested with IXFR, so that
+        it may give changes.
+    """
+
+    def __init__(self, incremental):
+        self.incremental = incremental
+        self.soa = None
+        self.records = None
+        self.changes = None
+        self._deleting = False
+
+
+    def recordsReceived(self, records):
+        """
+        Add the records of a message of the transfer.
+        """
+        for record in records:
+            if self.soa is None:
+                self.soa = record
+            elif self.records is None and self.changes is None:
+                if self.incremental and record.type == dns.SOA:
+                    self.changes = []
+                else:
+                    self.records = {}
+            if self.records is not None:
+                self.records.setdefault(
+                    str(record.name).lower(), []).append(record.payload)
+            elif self.changes is not None:
+                if record.type == dns.SOA:
+                    # These start the deletions and the additions of each
+                    # change in turn.
+                    self._deleting = not self._deleting
+                else:
+                    self.changes.append(
+                        (self._deleting, str(record.name).lower(),
+                         record.payload))
+
+
+
 class SecondaryAuthority(common.ResolverBase):
     """
     An Authority that keeps itself updated by performing zone transfers.
 
+    Before transferring the zone again, the I{SOA} record of the primary is
+    looked up, and the transfer is skipped if its serial number is not newer.
+    Otherwise, once the zone has been transferred, only the changes to it are
+    requested with IXFR.  The records of a transfer are added to a new zone
+    as they arrive, which replaces the old one once the transfer is
+    complete.
+
     @ivar primary: The IP address of the server from which zone transfers will
         be attempted.
     @type primary: C{str}
@@ -96,6 +158,8 @@ class SecondaryAuthority(common.ResolverBase):
     soa = records = None
     _port = 53
     _reactor = None
+    _index = _indexedRecords = _indexedSOA = None
+    compiledTypes = FileAuthority.compiledTypes
 
     def __init__(self, primaryIP, domain):
         common.ResolverBase.__init__(self)
@@ -126,21 +190,98 @@ class SecondaryAuthority(common.ResolverBase):
         return secondary
 
 
-    def transfer(self):
-        if self.transferring:
-            return
-        self.transfering = True
-
+    def _resolver(self):
+        """
+        Make a resolver which queries the primary.
+        """
         reactor = self._reactor
         if reactor is None:
             from twisted.internet import reactor
 
-        resolver = client.Resolver(
+        return client.Resolver(
             servers=[(self.primary, self._port)], reactor=reactor)
-        return resolver.lookupZone(self.domain
-            ).addCallback(self._cbZone
-            ).addErrback(self._ebZone
-            )
+
+
+    def transfer(self):
+        if self.transferring:
+            return defer.succeed(None)
+        self.transferring = True
+
+        resolver = self._resolver()
+        if self.soa is None:
+            d = self._transferZone(resolver)
+        else:
+            d = resolver.lookupAuthority(self.domain)
+            d.addCallbacks(self._cbSerial, self._ebSerial,
+                           callbackArgs=(resolver,), errbackArgs=(resolver,))
+        d.addErrback(self._ebZone)
+        def cbTransferred(result):
+            self.transferring = False
+            return result
+        return d.addBoth(cbTransferred)
+
+
+    def _cbSerial(self, (answers, authority, additional), resolver):
+        """
+        Transfer the changes to the zone if the primary's I{SOA} record is
+        newer than ours.
+        """
+        for record in answers:
+            if (record.type == dns.SOA and
+                not dns._serialNewer(record.payload.serial, self.soa[1].serial)):
+                return None
+        return self._transferZone(resolver)
+
+
+    def _ebSerial(self, failure, resolver):
+        log.msg("Looking up the SOA record of %s from %s failed" % (
+                self.domain, self.primary))
+        log.err(failure)
+        return self._transferZone(resolver)
+
+
+    def _transferZone(self, resolver):
+        """
+        Transfer the zone from the primary, with IXFR if we have a version
+        of it.
+        """
+        if self.soa is None:
+            transfer = _ZoneTransfer(False)
+            d = resolver.lookupZone(
+                self.domain, recordsReceived=transfer.recordsReceived)
+        else:
+            transfer = _ZoneTransfer(True)
+            d = resolver.lookupZoneChanges(
+                self.domain, self.soa[1],
+                recordsReceived=transfer.recordsReceived)
+        return d.addCallback(self._cbTransfer, transfer)
+
+
+    def _cbTransfer(self, result, transfer):
+        """
+        Apply a completed zone transfer.
+        """
+        if transfer.soa is None or transfer.soa.type != dns.SOA:
+            return
+        soa = (str(transfer.soa.name).lower(), transfer.soa.payload)
+        if transfer.records is not None:
+            self.records = transfer.records
+            self.soa = soa
+        elif transfer.changes is not None:
+            records = self.records
+            for deleting, name, record in transfer.changes:
+                if deleting:
+                    existing = records.get(name, [])
+                    if record in existing:
+                        existing.remove(record)
+                        if not existing:
+                            del records[name]
+                else:
+                    records.setdefault(name, []).append(record)
+            apex = records.setdefault(soa[0], [])
+            apex[:] = [r for r in apex if r.TYPE != dns.SOA] + [soa[1]]
+            self.soa = soa
+            self.resetIndex()
 
 
     def _lookup(self, name, cls, type, timeout=None):
@@ -153,15 +294,8 @@ class SecondaryAuthority(common.ResolverBase):
     #shouldn't we just subclass? :P
 
     lookupZone = FileAuthority.__dict__['lookupZone']
-
-    def _cbZone(self, zone):
-        ans, _, _ = zone
-        self.records = r = {}
-        for rec in ans:
-            if not self.soa and rec.type == dns.SOA:
-                self.soa = (str(rec.name).lower(), rec.payload)
-            else:
-                r.setdefault(str(rec.name).lower(), []).append(rec.payload)
+    resetIndex = FileAuthority.__dict__['resetIndex']
+    _answer = FileAuthority.__dict__['_answer']
 
     def _ebZone(self, failure):
         log.msg("Updating %s from %s failed during zone transfer" % (self.domain, self.primary))
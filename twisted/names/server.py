@@ -17,11 +17,36 @@ for resolvers to deal with.  Fix it.
 @author: Jp Calderone
 """
 
-import time
+import time, struct
 
-from twisted.internet import protocol
-from twisted.names import dns, resolve
+from twisted.internet import protocol, defer
+from twisted.names import dns, resolve, error
 from twisted.python import log
+from twisted.python._lru import LRUCache
+
+
+
+class _EncodedMessage(object):
+    """
+    A L{dns.Message} which has already been encoded.
+
+    The C{writeMessage} methods of L{dns.DNSProtocol} and
+    L{dns.DNSDatagramProtocol} only call C{toStr}; other attributes are those
+    of the message.
+    """
+
+    def __init__(self, message, encoded):
+        self._message = message
+        self._encoded = encoded
+
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+
+    def toStr(self):
+        return self._encoded
+
 
 
 class DNSServerFactory(protocol.ServerFactory):
@@ -32,12 +57,45 @@ class DNSServerFactory(protocol.ServerFactory):
     @ivar connections: A list of all the connected L{DNSProtocol}
         instances using this object as their controller.
     @type connections: C{list} of L{DNSProtocol}
+
+    @ivar coalesceQueries: If true, a query received while the resolvers are
+        still working on an identical one is answered with the result of
+        that one, rather than being passed on to the resolvers again.  Each
+        waiting query gets its own copies of the answer lists.  Off by
+        default.
+    @type coalesceQueries: C{bool}
+
+    @ivar _pendingQueries: A C{dict} mapping tuples of the lower-cased name,
+        type and class of the queries the resolvers are working on to a
+        C{list} of L{Deferred}s waiting for their results.
+
+    @ivar responseCacheSize: The number of encoded responses to keep for
+        answering repeated queries without asking the resolvers or encoding
+        the answer again, or C{0} to keep none.  Only responses made up
+        entirely of authoritative records are kept, for the smallest of their
+        TTLs and C{responseCacheTimeout}.
+    @type responseCacheSize: C{int}
+
+    @ivar responseCacheTimeout: The longest time, in seconds, an encoded
+        response is kept for.  This bounds how long answers from before a
+        change to a zone are given out.
+
+    @ivar _responseCache: A L{LRUCache} mapping the keys made by
+        L{_responseCacheKey} to tuples of the time the response expires and
+        its encoding, or C{None} until a response is kept.
+
+    @ivar _reactor: The reactor used to expire encoded responses.
     """
 
     protocol = dns.DNSProtocol
     cache = None
+    coalesceQueries = False
+    responseCacheSize = 0
+    responseCacheTimeout = 30
+    _responseCache = None
 
-    def __init__(self, authorities = None, caches = None, clients = None, verbose = 0):
+    def __init__(self, authorities = None, caches = None, clients = None, verbose = 0,
+                 reactor = None):
         resolvers = []
         if authorities is not None:
             resolvers.extend(authorities)
@@ -52,6 +110,10 @@ class DNSServerFactory(protocol.ServerFactory):
         if caches:
             self.cache = caches[-1]
         self.connections = []
+        self._pendingQueries = {}
+        if reactor is None:
+            from twisted.internet import reactor
+        self._reactor = reactor
 
 
     def buildProtocol(self, addr):
@@ -86,16 +148,77 @@ class DNSServerFactory(protocol.ServerFactory):
                 log.msg("Authority is " + auth)
                 log.msg("Additional is " + add)
 
+        self._writeMessage(protocol, message, address)
+
+        if self.verbose > 1:
+            log.msg("Processed query in %0.3f seconds" % (time.time() - message.timeReceived))
+
+
+    def _writeMessage(self, protocol, message, address):
         if address is None:
             protocol.writeMessage(message)
         else:
             protocol.writeMessage(message, address)
 
-        if self.verbose > 1:
-            log.msg("Processed query in %0.3f seconds" % (time.time() - message.timeReceived))
+
+    def _responseCacheKey(self, message):
+        """
+        Make the key under which the response to C{message} is kept: the
+        query, the header fields which are copied into the response, and the
+        size the response is truncated to.
+
+        @return: The key, or C{None} if the response cannot be kept.
+        """
+        if not self.responseCacheSize or len(message.queries) != 1:
+            return None
+        query = message.queries[0]
+        return (query.name.name, query.type, query.cls, message.opCode,
+                message.auth, message.trunc, message.recDes, message.recAv,
+                message.maxSize)
+
+
+    def _cachedResponse(self, key, message):
+        """
+        Look up the encoded response kept under C{key}, and give it the ID of
+        C{message}.
+
+        @return: The encoded response, or C{None} if none is kept.
+        """
+        if self._responseCache is None:
+            return None
+        cached = self._responseCache.get(key)
+        if cached is None:
+            return None
+        expires, encoded = cached
+        if expires <= self._reactor.seconds():
+            del self._responseCache[key]
+            return None
+        return struct.pack('!H', message.id) + encoded[2:]
+
+
+    def _cacheResponse(self, key, message, records):
+        """
+        Encode C{message} and keep the encoding under C{key} if all of
+        C{records} are authoritative.
+
+        @return: The encoded message.
+        """
+        encoded = message.toStr()
+        timeout = self.responseCacheTimeout
+        for record in records:
+            if not record.isAuthoritative():
+                return encoded
+            timeout = min(timeout, record.ttl)
+        if timeout > 0:
+            if self._responseCache is None:
+                self._responseCache = LRUCache(self.responseCacheSize)
+            self._responseCache[key] = (
+                self._reactor.seconds() + timeout, encoded)
+        return encoded
 
 
     def gotResolverResponse(self, (ans, auth, add), protocol, message, address):
+        key = self._responseCacheKey(message)
         message.rCode = dns.OK
         message.answers = ans
         for x in ans:
@@ -104,9 +227,12 @@ class DNSServerFactory(protocol.ServerFactory):
                 break
         message.authority = auth
         message.additional = add
+        l = len(ans) + len(auth) + len(add)
+        if key is not None and l:
+            message = _EncodedMessage(
+                message, self._cacheResponse(key, message, ans + auth + add))
         self.sendReply(protocol, message, address)
 
-        l = len(ans) + len(auth) + len(add)
         if self.verbose:
             log.msg("Lookup found %d record%s" % (l, l != 1 and "s" or ""))
 
@@ -127,13 +253,63 @@ class DNSServerFactory(protocol.ServerFactory):
         if self.verbose:
             log.msg("Lookup failed")
 
+        # Remember names an upstream server said do not exist, if the cache
+        # can.
+        cacheNegativeResult = getattr(self.cache, 'cacheNegativeResult', None)
+        if (cacheNegativeResult is not None and
+            failure.check(error.DNSNameError) and
+            isinstance(failure.value.args[0], dns.Message)):
+            cacheNegativeResult(
+                message.queries[0], failure.value.args[0].authority)
+
+
+    def _resolve(self, query):
+        """
+        Ask the resolvers for the answer to C{query}, unless they are already
+        working on an identical query and C{coalesceQueries} is set, in which
+        case wait for the answer to that one.
+
+        @return: A L{Deferred} which fires with the answer.
+        """
+        if not self.coalesceQueries:
+            return self.resolver.query(query)
+        key = (query.name.name.lower(), query.type, query.cls)
+        waiting = self._pendingQueries.get(key)
+        if waiting is not None:
+            d = defer.Deferred()
+            waiting.append(d)
+            return d
+        d = self.resolver.query(query)
+        if not d.called:
+            self._pendingQueries[key] = []
+            def cbResolved((ans, auth, add)):
+                for waiter in self._pendingQueries.pop(key):
+                    waiter.callback((list(ans), list(auth), list(add)))
+                return ans, auth, add
+            def ebResolved(failure):
+                for waiter in self._pendingQueries.pop(key):
+                    waiter.errback(failure)
+                return failure
+            d.addCallbacks(cbResolved, ebResolved)
+        return d
+
 
     def handleQuery(self, message, protocol, address):
         # Discard all but the first query!  HOO-AAH HOOOOO-AAAAH
         # (no other servers implement multi-query messages, so we won't either)
         query = message.queries[0]
 
-        return self.resolver.query(query).addCallback(
+        key = self._responseCacheKey(message)
+        if key is not None:
+            encoded = self._cachedResponse(key, message)
+            if encoded is not None:
+                self._writeMessage(
+                    protocol, _EncodedMessage(message, encoded), address)
+                if self.verbose:
+                    log.msg("Answered from the response cache")
+                return defer.succeed(None)
+
+        return self._resolve(query).addCallback(
             self.gotResolverResponse, protocol, message, address
         ).addErrback(
             self.gotResolverError, protocol, message, address
@@ -203,3 +379,56 @@ class DNSServerFactory(protocol.ServerFactory):
     def allowQuery(self, message, protocol, address):
         # Allow anything but empty queries
         return len(message.queries)
+
+
+
+def listenUDPSockets(factory, port, count, interface='', maxPacketSize=512,
+                     reactor=None):
+    """
+    Listen for queries for C{factory} on C{count} UDP sockets bound to the
+    same port with C{SO_REUSEPORT}, each with its own
+    L{dns.DNSDatagramProtocol}.
+
+    The kernel spreads the datagrams arriving at the port over the sockets.
+    Other processes, each with its own L{DNSServerFactory}, may listen on the
+    same port in the same way, so that queries are answered on several
+    cores.
+
+    @param factory: The L{DNSServerFactory} to answer queries with.
+
+    @param port: The port number to listen on.  If it is C{0}, the port the
+        first socket is given is used for the others.
+
+    @param count: The number of sockets to listen on.
+
+    @param interface: The address of the interface to listen on.
+
+    @param maxPacketSize: The largest datagram which will be read.
+
+    @param reactor: The L{IReactorUDP} provider to listen with, or C{None}
+        for the global one.
+
+    @raise twisted.internet.error.CannotListenError: If a socket cannot be
+        bound.
+
+    @raise NotImplementedError: If the reactor or platform does not support
+        C{SO_REUSEPORT}.  This is raised by the first C{listenUDP} call,
+        before any socket is bound.
+
+    @return: A C{list} of the L{IListeningPort} providers listening.
+    """
+    if reactor is None:
+        from twisted.internet import reactor
+    ports = []
+    try:
+        for i in range(count):
+            p = reactor.listenUDP(
+                port, dns.DNSDatagramProtocol(factory, reactor), interface,
+                maxPacketSize, reusePort=True)
+            ports.append(p)
+            port = p.getHost().port
+    except:
+        for p in ports:
+            p.stopListening()
+        raise
+    return ports
@@ -11,8 +11,8 @@ import time
 
 from twisted.trial import unittest
 
-from twisted.names import dns, cache
-from twisted.internet import task
+from twisted.names import dns, cache, error
+from twisted.internet import task, defer
 
 
 class Caching(unittest.TestCase):
@@ -133,3 +133,236 @@ class Caching(unittest.TestCase):
 
         return self.assertFailure(
             c.lookupAddress(b"example.com"), dns.DomainError)
+
+
+
+class CacheResolverTests(unittest.TestCase):
+    """
+    Tests for the bounds, expiry, negative caching and stale answers of
+    L{cache.CacheResolver}.
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.query = dns.Query(name=b"example.com", type=dns.A, cls=dns.IN)
+        self.answer = ([dns.RRHeader(b"example.com", dns.A, dns.IN, 60,
+                                     dns.Record_A("127.0.0.1", 60))], [], [])
+        self.soa = dns.RRHeader(
+            b"example.com", dns.SOA, dns.IN, 300,
+            dns.Record_SOA(b"ns.example.com", b"root.example.com",
+                           minimum=120))
+
+
+    def lookup(self, resolver, name=b"example.com"):
+        """
+        Look up the address of C{name}.
+
+        @return: The result or L{failure.Failure} the lookup gave.
+        """
+        result = []
+        resolver.lookupAddress(name).addBoth(result.append)
+        return result[0]
+
+
+    def test_maxEntries(self):
+        """
+        Once C{maxEntries} answers are cached, caching another discards the
+        least recently used one.
+        """
+        c = cache.CacheResolver(reactor=self.clock, maxEntries=2)
+        queries = [dns.Query(name=name, type=dns.A, cls=dns.IN)
+                   for name in [b"a.example.com", b"b.example.com",
+                                b"c.example.com"]]
+        c.cacheResult(queries[0], self.answer)
+        c.cacheResult(queries[1], self.answer)
+        self.lookup(c, b"a.example.com")
+        c.cacheResult(queries[2], self.answer)
+        self.assertEqual(sorted(c.cache.keys()),
+                         sorted([queries[0], queries[2]]))
+
+
+    def test_singleTimer(self):
+        """
+        However many answers are cached, there is a single timer, which
+        removes each answer when it expires.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        for i in range(10):
+            query = dns.Query(name=b"%d.example.com" % (i,), type=dns.A,
+                              cls=dns.IN)
+            ttl = 100 - i
+            c.cacheResult(query, ([dns.RRHeader(
+                            query.name.name, dns.A, dns.IN, ttl,
+                            dns.Record_A("127.0.0.1", ttl))], [], []))
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(91)
+        self.assertEqual(len(c.cache), 9)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(9)
+        self.assertEqual(len(c.cache), 0)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_replacedEntryNotRemovedEarly(self):
+        """
+        An answer which replaces one that expires sooner is kept until it
+        expires itself.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(30)
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(30)
+        self.assertIn(self.query, c.cache)
+        self.assertEqual(self.lookup(c)[0][0].ttl, 30)
+        self.clock.advance(30)
+        self.assertNotIn(self.query, c.cache)
+
+
+    def test_resultReused(self):
+        """
+        Lookups made within the same second are given the same records.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(1.2)
+        first = self.lookup(c)
+        self.clock.advance(0.5)
+        self.assertIdentical(self.lookup(c), first)
+        self.assertEqual(first[0][0].ttl, 59)
+        self.clock.advance(0.5)
+        self.assertEqual(self.lookup(c)[0][0].ttl, 58)
+
+
+    def test_noData(self):
+        """
+        An answer with no answer records and an I{SOA} record in its authority
+        section is cached for the smaller of the TTL of that record and its
+        I{minimum} field.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheResult(self.query, ([], [self.soa], []))
+        self.clock.advance(119)
+        self.assertEqual(self.lookup(c)[1][0].payload, self.soa.payload)
+        self.clock.advance(1)
+        self.lookup(c).trap(dns.DomainError)
+
+
+    def test_negativeResult(self):
+        """
+        After L{cache.CacheResolver.cacheNegativeResult}, lookups of the name
+        fail with L{dns.AuthoritativeDomainError}, which stops a resolver
+        chain from asking other resolvers, until the answer expires.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheNegativeResult(self.query, [self.soa])
+        self.clock.advance(119)
+        self.lookup(c).trap(dns.AuthoritativeDomainError)
+        self.clock.advance(1)
+        self.lookup(c).trap(dns.DomainError)
+        self.assertNotIn(self.query, c.cache)
+
+
+    def test_negativeResultWithoutSOA(self):
+        """
+        A negative answer without an I{SOA} record is not cached.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheNegativeResult(self.query, [])
+        self.assertNotIn(self.query, c.cache)
+
+
+    def test_serveStale(self):
+        """
+        If C{resolver} is given, an expired answer is given with a TTL of
+        C{staleTTL} for up to C{maxStale} seconds, while C{resolver} is
+        asked, once, for a new answer, which is then cached.
+        """
+        queries = []
+        class Upstream(object):
+            def query(self, query):
+                d = defer.Deferred()
+                queries.append((query, d))
+                return d
+        c = cache.CacheResolver(reactor=self.clock, maxStale=600,
+                                resolver=Upstream())
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(61)
+        stale = self.lookup(c)
+        self.assertEqual(stale[0][0].ttl, c.staleTTL)
+        self.assertEqual(stale[0][0].payload, self.answer[0][0].payload)
+        self.lookup(c)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0][0], self.query)
+
+        fresh = dns.RRHeader(b"example.com", dns.A, dns.IN, 60,
+                             dns.Record_A("127.0.0.2", 60))
+        queries[0][1].callback(([fresh], [], []))
+        self.assertEqual(self.lookup(c)[0][0].payload, fresh.payload)
+
+        self.clock.advance(60 + 601)
+        self.lookup(c).trap(dns.DomainError)
+        self.assertNotIn(self.query, c.cache)
+
+
+    def test_noStaleWithoutResolver(self):
+        """
+        Without C{resolver}, expired answers are never given.
+        """
+        c = cache.CacheResolver(reactor=self.clock, maxStale=600)
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(61)
+        self.lookup(c).trap(dns.DomainError)
+
+
+    def test_refreshNameError(self):
+        """
+        If refreshing a stale answer finds the name no longer exists, that
+        negative answer is cached.
+        """
+        class Upstream(object):
+            def query(this, query):
+                message = dns.Message(rCode=dns.ENAME)
+                message.authority = [self.soa]
+                return defer.fail(error.DNSNameError(message))
+        c = cache.CacheResolver(reactor=self.clock, maxStale=600,
+                                resolver=Upstream())
+        c.cacheResult(self.query, self.answer)
+        self.clock.advance(61)
+        self.lookup(c)
+        self.lookup(c).trap(dns.AuthoritativeDomainError)
+
+
+    def test_pickle(self):
+        """
+        A pickled L{cache.CacheResolver} keeps the answers which have not
+        expired.
+        """
+        c = cache.CacheResolver(reactor=self.clock)
+        c.cacheResult(self.query, self.answer)
+        state = c.__getstate__()
+        self.clock.advance(30)
+        restored = cache.CacheResolver(reactor=self.clock)
+        restored.__setstate__(state)
+        self.assertEqual(self.lookup(restored)[0][0].ttl, 30)
+
+
+    def test_unpickleOldState(self):
+        """
+        L{cache.CacheResolver} can be restored from the state pickled by
+        versions without the C{maxEntries}, C{maxStale} and C{resolver}
+        settings, which kept a dict of timers to expire answers.
+        """
+        state = {
+            'cache': {self.query: (self.clock.seconds(), self.answer)},
+            'verbose': 0,
+            'cancel': {},
+            '_reactor': self.clock}
+        self.clock.advance(30)
+        restored = cache.CacheResolver(reactor=self.clock)
+        restored.__setstate__(state)
+        self.assertEqual(restored.maxEntries, None)
+        self.assertEqual(restored.maxStale, 0)
+        self.assertEqual(restored.resolver, None)
+        self.assertFalse(hasattr(restored, 'cancel'))
+        self.assertEqual(self.lookup(restored)[0][0].ttl, 30)
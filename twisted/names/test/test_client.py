@@ -395,6 +395,31 @@ class ResolverTests(unittest.TestCase):
         return d
 
 
+    def test_concurrentRequestsIgnoreCase(self):
+        """
+        L{client.Resolver.query} compares the names of concurrent queries
+        without regard to case, so queries differing only in case share one
+        request.
+        """
+        protocol = StubDNSDatagramProtocol()
+        resolver = client.Resolver(servers=[('example.com', 53)])
+        resolver._connectedProtocol = lambda: protocol
+        queries = protocol.queries
+
+        firstResult = resolver.query(dns.Query(b'foo.example.com', dns.A))
+        secondResult = resolver.query(dns.Query(b'FOO.Example.COM', dns.A))
+        self.assertEqual(len(queries), 1)
+
+        answer = object()
+        response = dns.Message()
+        response.answers.append(answer)
+        queries.pop()[-1].callback(response)
+
+        d = defer.gatherResults([firstResult, secondResult])
+        d.addCallback(self.assertEqual, [([answer], [], [])] * 2)
+        return d
+
+
     def test_multipleConcurrentRequests(self):
         """
         L{client.Resolver.query} issues a request for each different concurrent
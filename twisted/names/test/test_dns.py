@@ -685,6 +685,117 @@ class MessageTestCase(unittest.SynchronousTestCase):
         self.assertTrue(message.answers[0].auth)
 
 
+    def _recordsMessage(self):
+        """
+        Make a message with records of many types in each of its sections.
+        """
+        msg = dns.Message(id=1234, answer=1, maxSize=0)
+        msg.addQuery(b'example.com', dns.ALL_RECORDS)
+        msg.answers = [
+            dns.RRHeader(b'example.com', dns.A, ttl=10,
+                         payload=dns.Record_A('1.2.3.4', ttl=10)),
+            dns.RRHeader(b'example.com', dns.AAAA,
+                         payload=dns.Record_AAAA('::1')),
+            dns.RRHeader(b'example.com', dns.MX,
+                         payload=dns.Record_MX(10, b'mail.example.com')),
+            dns.RRHeader(b'www.example.com', dns.CNAME,
+                         payload=dns.Record_CNAME(b'example.com')),
+            dns.RRHeader(b'example.com', dns.TXT,
+                         payload=dns.Record_TXT(b'foo', b'bar')),
+            dns.RRHeader(b'example.com', dns.SPF,
+                         payload=dns.Record_SPF(b'v=spf1')),
+            dns.RRHeader(b'_http._tcp.example.com', dns.SRV,
+                         payload=dns.Record_SRV(1, 2, 80, b'www.example.com')),
+            dns.RRHeader(b'example.com', dns.HINFO,
+                         payload=dns.Record_HINFO(b'cpu', b'os')),
+            dns.RRHeader(b'example.com', 65280,
+                         payload=dns.UnknownRecord(b'\x00\x01\x02')),
+            ]
+        msg.authority = [
+            dns.RRHeader(b'example.com', dns.SOA,
+                         payload=dns.Record_SOA(
+                    b'ns1.example.com', b'root.example.com', serial=100,
+                    refresh=200, retry=300, expire=400, minimum=500)),
+            dns.RRHeader(b'example.com', dns.NS,
+                         payload=dns.Record_NS(b'ns1.example.com')),
+            ]
+        msg.additional = [
+            dns.RRHeader(b'ns1.example.com', dns.A,
+                         payload=dns.Record_A('5.6.7.8')),
+            dns.RRHeader(b'1.2.3.4.in-addr.arpa', dns.PTR,
+                         payload=dns.Record_PTR(b'example.com')),
+            ]
+        return msg
+
+
+    def test_fromStrMatchesDecode(self):
+        """
+        L{Message.fromStr} decodes the records of every type in every section
+        of a message the same way L{Message.decode} does.
+        """
+        data = self._recordsMessage().toStr()
+        fromStr = dns.Message()
+        fromStr.fromStr(data)
+        decoded = dns.Message()
+        decoded.decode(BytesIO(data))
+
+        self.assertEqual(fromStr.id, 1234)
+        self.assertEqual(fromStr.queries, decoded.queries)
+        self.assertEqual(len(fromStr.answers), 9)
+        for section in ('answers', 'authority', 'additional'):
+            self.assertEqual(
+                getattr(fromStr, section), getattr(decoded, section))
+
+
+    def test_fromStrTruncated(self):
+        """
+        If a message is cut short in a record, L{Message.fromStr} keeps the
+        records before it and none after it.
+        """
+        data = self._recordsMessage().toStr()
+        msg = dns.Message()
+        msg.fromStr(data)
+        truncated = dns.Message()
+        truncated.fromStr(data[:-2])
+        self.assertEqual(truncated.answers, msg.answers)
+        self.assertEqual(truncated.authority, msg.authority)
+        self.assertEqual(truncated.additional, msg.additional[:1])
+
+
+    def test_lazy(self):
+        """
+        If L{Message.lazy} is set, L{Message.fromStr} decodes the header and
+        queries, and the other sections when one of them is read.
+        """
+        data = self._recordsMessage().toStr()
+        msg = dns.Message()
+        msg.fromStr(data)
+        lazy = dns.Message(lazy=True)
+        lazy.fromStr(data)
+        self.assertEqual(lazy.id, 1234)
+        self.assertEqual(lazy.queries, msg.queries)
+        self.assertNotIdentical(lazy._undecoded, None)
+        self.assertEqual(lazy.authority, msg.authority)
+        self.assertIdentical(lazy._undecoded, None)
+        self.assertEqual(lazy.answers, msg.answers)
+        self.assertEqual(lazy.additional, msg.additional)
+
+
+    def test_lazySectionSet(self):
+        """
+        A section of a lazily decoded message set before it is read keeps its
+        new value, and the other sections are decoded.
+        """
+        data = self._recordsMessage().toStr()
+        msg = dns.Message()
+        msg.fromStr(data)
+        lazy = dns.Message(lazy=True)
+        lazy.fromStr(data)
+        lazy.answers = []
+        self.assertEqual(lazy.answers, [])
+        self.assertEqual(lazy.additional, msg.additional)
+
+
 
 class TestController(object):
     """
@@ -736,6 +847,20 @@ class DatagramProtocolTestCase(unittest.TestCase):
         self.assertEqual(self.controller.messages, [])
 
 
+    def test_lazyMessages(self):
+        """
+        If L{dns.DNSDatagramProtocol.lazyMessages} is set, the messages it
+        receives are decoded lazily.
+        """
+        self.proto.lazyMessages = True
+        m = dns.Message()
+        m.addQuery(b'example.com')
+        self.proto.datagramReceived(m.toStr(), ('127.0.0.1', 21345))
+        received = self.controller.messages[0][0]
+        self.assertTrue(received.lazy)
+        self.assertEqual(received.queries, m.queries)
+
+
     def test_simpleQuery(self):
         """
         Test content received after a query.
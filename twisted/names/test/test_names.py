@@ -13,8 +13,10 @@ from twisted.trial import unittest
 
 from twisted.internet import reactor, defer, error
 from twisted.internet.task import Clock
+from twisted.internet.address import IPv4Address
 from twisted.internet.defer import succeed
-from twisted.names import client, server, common, authority, dns
+from twisted.names import client, server, common, authority, dns, cache
+from twisted.names.error import DNSNameError
 from twisted.python import failure
 from twisted.names.dns import Message
 from twisted.names.client import Resolver
@@ -501,6 +503,319 @@ class DNSServerFactoryTests(unittest.TestCase):
         self.assertEqual(factory.connections, [])
 
 
+    def test_cacheNameError(self):
+        """
+        When an upstream server answers that a name does not exist,
+        L{DNSServerFactory.gotResolverError} caches that answer so later
+        queries for the name are answered from the cache.
+        """
+        clock = Clock()
+        cacheResolver = cache.CacheResolver(reactor=clock)
+        factory = server.DNSServerFactory(caches=[cacheResolver])
+        query = dns.Query('missing.example.com', dns.A, dns.IN)
+        soa = dns.RRHeader('example.com', dns.SOA, dns.IN, 60,
+                           dns.Record_SOA(minimum=30))
+        response = dns.Message(rCode=dns.ENAME)
+        response.authority = [soa]
+
+        class FakeProtocol(object):
+            def writeMessage(self, message, address=None):
+                self.message = message
+
+        protocol = FakeProtocol()
+        message = dns.Message()
+        message.queries = [query]
+        factory.gotResolverError(
+            failure.Failure(DNSNameError(response)), protocol,
+            message, None)
+        self.assertEqual(protocol.message.rCode, dns.ENAME)
+
+        d = factory.resolver.query(query)
+        return self.assertFailure(d, dns.AuthoritativeDomainError)
+
+
+
+    def _coalescingFactory(self):
+        """
+        Make a L{server.DNSServerFactory} whose resolver records its queries
+        and answers them only when told to.
+
+        @return: A C{tuple} of the factory and the C{list} of C{(query,
+            Deferred)} tuples its resolver was asked.
+        """
+        asked = []
+        class PendingResolver(common.ResolverBase):
+            def query(self, query, timeout=None):
+                d = defer.Deferred()
+                asked.append((query, d))
+                return d
+        factory = server.DNSServerFactory(clients=[PendingResolver()])
+        factory.coalesceQueries = True
+        return factory, asked
+
+
+    def _handle(self, factory, name):
+        """
+        Pass a query for the address of C{name} to C{factory}.
+
+        @return: The C{list} the reply will be appended to.
+        """
+        replies = []
+        class FakeProtocol(object):
+            def writeMessage(self, message, address=None):
+                replies.append(message)
+        message = dns.Message()
+        message.queries = [dns.Query(name, dns.A, dns.IN)]
+        factory.handleQuery(message, FakeProtocol(), None)
+        return replies
+
+
+    def test_coalesceQueries(self):
+        """
+        Identical queries received while the resolvers are working on the
+        first of them are answered from its result, without asking the
+        resolvers again.  Names are compared without regard to case.
+        """
+        factory, asked = self._coalescingFactory()
+        first = self._handle(factory, 'example.com')
+        second = self._handle(factory, 'EXAMPLE.com')
+        other = self._handle(factory, 'example.org')
+        self.assertEqual(len(asked), 2)
+
+        answer = dns.RRHeader('example.com', payload=dns.Record_A('1.2.3.4'))
+        asked[0][1].callback(([answer], [], []))
+        self.assertEqual(first[0].answers, [answer])
+        self.assertEqual(second[0].answers, [answer])
+        self.assertEqual(other, [])
+
+        # Once answered, the query is passed to the resolvers again.
+        self._handle(factory, 'example.com')
+        self.assertEqual(len(asked), 3)
+
+
+    def test_coalescedCopies(self):
+        """
+        Each coalesced query is answered with its own copies of the answer,
+        authority and additional lists, so changing the lists of one reply
+        does not change the others.
+        """
+        factory, asked = self._coalescingFactory()
+        first = self._handle(factory, 'example.com')
+        second = self._handle(factory, 'example.com')
+        answer = dns.RRHeader('example.com', payload=dns.Record_A('1.2.3.4'))
+        asked[0][1].callback(([answer], [], []))
+        self.assertEqual(first[0].answers, second[0].answers)
+        self.assertNotIdentical(first[0].answers, second[0].answers)
+        self.assertNotIdentical(first[0].authority, second[0].authority)
+        self.assertNotIdentical(first[0].additional, second[0].additional)
+
+
+    def test_coalescedFailure(self):
+        """
+        If the resolvers fail to answer a query, every coalesced query is
+        answered with an error.
+        """
+        factory, asked = self._coalescingFactory()
+        first = self._handle(factory, 'example.com')
+        second = self._handle(factory, 'example.com')
+        asked[0][1].errback(dns.DomainError('example.com'))
+        self.assertEqual([first[0].rCode, second[0].rCode],
+                         [dns.ENAME, dns.ENAME])
+
+
+    def test_coalesceQueriesDisabled(self):
+        """
+        C{coalesceQueries} is false by default, and then every query is
+        passed to the resolvers.
+        """
+        factory, asked = self._coalescingFactory()
+        del factory.coalesceQueries
+        self.assertFalse(factory.coalesceQueries)
+        self._handle(factory, 'example.com')
+        self._handle(factory, 'example.com')
+        self.assertEqual(len(asked), 2)
+
+
+    def _responseCacheFactory(self, auth=True, ttl=60):
+        """
+        Make a L{server.DNSServerFactory} keeping up to ten encoded responses,
+        whose resolver answers every query with one address record.
+
+        @return: A C{tuple} of the factory, its L{Clock} and the C{list} of
+            queries its resolver was asked.
+        """
+        asked = []
+        class AnsweringResolver(common.ResolverBase):
+            def query(self, query, timeout=None):
+                asked.append(query)
+                return defer.succeed((
+                        [dns.RRHeader(query.name.name, ttl=ttl, auth=auth,
+                                      payload=dns.Record_A('1.2.3.4'))],
+                        [], []))
+        clock = Clock()
+        factory = server.DNSServerFactory(
+            authorities=[AnsweringResolver()], reactor=clock)
+        factory.responseCacheSize = 10
+        return factory, clock, asked
+
+
+    def _handleEncoded(self, factory, name, id):
+        """
+        Pass a query with the given ID for the address of C{name} to
+        C{factory}.
+
+        @return: The encoded reply, or C{None} if there was none.
+        """
+        replies = []
+        class FakeProtocol(object):
+            def writeMessage(self, message, address=None):
+                replies.append(message.toStr())
+        message = dns.Message(id)
+        message.queries = [dns.Query(name, dns.A, dns.IN)]
+        factory.handleQuery(message, FakeProtocol(), None)
+        if replies:
+            return replies[0]
+
+
+    def test_responseCache(self):
+        """
+        If C{responseCacheSize} is set, a repeated query is answered with the
+        encoding of the first response given the new message ID, without
+        asking the resolvers, until the smallest TTL of its records or
+        C{responseCacheTimeout} has passed.
+        """
+        factory, clock, asked = self._responseCacheFactory()
+        first = self._handleEncoded(factory, 'example.com', 100)
+        second = self._handleEncoded(factory, 'example.com', 200)
+        self.assertEqual(len(asked), 1)
+        self.assertEqual(second, '\x00\xc8' + first[2:])
+
+        reply = dns.Message()
+        reply.fromStr(second)
+        self.assertEqual(reply.id, 200)
+        self.assertEqual(reply.answers[0].payload.dottedQuad(), '1.2.3.4')
+
+        # A query differing in case is kept separately, as the reply repeats
+        # the name as asked.
+        self._handleEncoded(factory, 'EXAMPLE.com', 300)
+        self.assertEqual(len(asked), 2)
+
+        clock.advance(factory.responseCacheTimeout)
+        self._handleEncoded(factory, 'example.com', 400)
+        self.assertEqual(len(asked), 3)
+
+
+    def test_responseCacheTTL(self):
+        """
+        An encoded response is kept for no longer than the smallest TTL of
+        its records.
+        """
+        factory, clock, asked = self._responseCacheFactory(ttl=5)
+        self._handleEncoded(factory, 'example.com', 1)
+        clock.advance(4)
+        self._handleEncoded(factory, 'example.com', 2)
+        self.assertEqual(len(asked), 1)
+        clock.advance(1)
+        self._handleEncoded(factory, 'example.com', 3)
+        self.assertEqual(len(asked), 2)
+
+
+    def test_responseCacheNonAuthoritative(self):
+        """
+        Responses including records which are not authoritative are not
+        kept.
+        """
+        factory, clock, asked = self._responseCacheFactory(auth=False)
+        first = self._handleEncoded(factory, 'example.com', 1)
+        self._handleEncoded(factory, 'example.com', 1)
+        self.assertEqual(len(asked), 2)
+        self.assertEqual(first[0:2], '\x00\x01')
+
+
+    def test_responseCacheDisabled(self):
+        """
+        By default no encoded responses are kept.
+        """
+        factory, clock, asked = self._responseCacheFactory()
+        del factory.responseCacheSize
+        self._handleEncoded(factory, 'example.com', 1)
+        self._handleEncoded(factory, 'example.com', 1)
+        self.assertEqual(len(asked), 2)
+        self.assertIdentical(factory._responseCache, None)
+
+
+
+class ListenUDPSocketsTests(unittest.TestCase):
+    """
+    Tests for L{server.listenUDPSockets}.
+    """
+
+    def test_listen(self):
+        """
+        L{server.listenUDPSockets} listens on the given number of sockets
+        sharing one port, each with a L{dns.DNSDatagramProtocol} for the
+        factory.
+        """
+        factory = server.DNSServerFactory()
+        ports = server.listenUDPSockets(factory, 0, 3, interface='127.0.0.1')
+        for port in ports:
+            self.addCleanup(port.stopListening)
+        self.assertEqual(len(ports), 3)
+        self.assertEqual(len(set([port.getHost() for port in ports])), 1)
+        for port in ports:
+            self.assertTrue(port.reusePort)
+            self.assertIsInstance(port.protocol, dns.DNSDatagramProtocol)
+            self.assertIdentical(port.protocol.controller, factory)
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        test_listen.skip = "SO_REUSEPORT is not supported"
+
+
+    def test_reactor(self):
+        """
+        L{server.listenUDPSockets} listens with the C{listenUDP} method of
+        the given reactor, asking for C{reusePort}, and listens on the port
+        the first socket was given with the others.
+        """
+        calls = []
+        class Reactor(object):
+            def listenUDP(self, port, protocol, interface, maxPacketSize,
+                          **kwargs):
+                calls.append((port, interface, maxPacketSize, kwargs))
+                return FakePort(IPv4Address('UDP', '127.0.0.1', 5353))
+        class FakePort(object):
+            def __init__(self, address):
+                self.address = address
+            def getHost(self):
+                return self.address
+        factory = server.DNSServerFactory()
+        ports = server.listenUDPSockets(
+            factory, 0, 2, interface='127.0.0.1', reactor=Reactor())
+        self.assertEqual(len(ports), 2)
+        self.assertEqual(
+            calls,
+            [(0, '127.0.0.1', 512, {'reusePort': True}),
+             (5353, '127.0.0.1', 512, {'reusePort': True})])
+
+
+    def test_unsupported(self):
+        """
+        If the reactor does not support C{reusePort},
+        L{server.listenUDPSockets} raises L{NotImplementedError} without
+        listening on any socket.
+        """
+        calls = []
+        class Reactor(object):
+            def listenUDP(self, port, protocol, interface='',
+                          maxPacketSize=8192, reusePort=False):
+                calls.append(port)
+                raise NotImplementedError("reusePort is not supported")
+        self.assertRaises(
+            NotImplementedError, server.listenUDPSockets,
+            server.DNSServerFactory(), 0, 2, reactor=Reactor())
+        self.assertEqual(calls, [0])
+
+
+
 class HelperTestCase(unittest.TestCase):
     def testSerialGenerator(self):
         f = self.mktemp()
@@ -567,6 +882,113 @@ class AXFRTest(unittest.TestCase):
         self.assertEqual(self.results, self.records)
 
 
+    def test_recordsReceived(self):
+        """
+        If L{client.AXFRController} is given a C{recordsReceived} callable,
+        it is called with the records of each message rather than the records
+        being collected, and the L{Deferred} fires with an empty list.
+        """
+        received = []
+        self.controller = client.AXFRController(
+            'fooby.com', self.d, received.append)
+        for records in [self.records[:2], self.records[2:]]:
+            m = self._makeMessage()
+            m.answers = records
+            self.controller.messageReceived(m, None)
+        self.assertEqual(received, [self.records[:2], self.records[2:]])
+        self.assertEqual(self.results, [])
+
+
+
+class IXFRControllerTests(unittest.TestCase):
+    """
+    Tests for L{client.IXFRController}.
+    """
+
+    def setUp(self):
+        self.results = None
+        self.d = defer.Deferred()
+        self.d.addCallback(self._gotResults)
+        self.controller = client.IXFRController(
+            'fooby.com', self._soa(1).payload, self.d)
+        self.address = dns.RRHeader(
+            'fooby.com', dns.A, payload=dns.Record_A('1.2.3.4'))
+
+
+    def _gotResults(self, results):
+        self.results = results
+
+
+    def _soa(self, serial):
+        return dns.RRHeader(
+            'fooby.com', dns.SOA,
+            payload=dns.Record_SOA('fooby.com', 'hooj.fooby.com', serial))
+
+
+    def _receive(self, records):
+        """
+        Give the controller a message for each of C{records}.
+        """
+        for record in records:
+            m = dns.Message(id=999, answer=1)
+            m.answers = [record]
+            self.controller.messageReceived(m, None)
+
+
+    def test_query(self):
+        """
+        L{client.IXFRController} requests the changes to the zone with an
+        IXFR query with the client's I{SOA} record in the authority section.
+        """
+        written = []
+        class FakeProtocol(object):
+            def pickID(self):
+                return 123
+            def writeMessage(self, message):
+                written.append(message)
+        self.controller.connectionMade(FakeProtocol())
+        self.assertEqual(written[0].queries,
+                         [dns.Query('fooby.com', dns.IXFR, dns.IN)])
+        self.assertEqual(written[0].authority[0].payload.serial, 1)
+
+
+    def test_upToDate(self):
+        """
+        A single I{SOA} record no newer than the client's completes the
+        transfer.
+        """
+        self._receive([self._soa(1)])
+        self.assertEqual(self.results, [self._soa(1)])
+
+
+    def test_incremental(self):
+        """
+        An incremental transfer is complete at the new I{SOA} record which
+        starts the deletions of a change, not the one which starts the
+        additions of the last change.
+        """
+        records = [
+            self._soa(3),
+            self._soa(1), self.address, self._soa(2),
+            self._soa(2), self._soa(3), self.address,
+            self._soa(3)]
+        self._receive(records[:-1])
+        self.assertIdentical(self.results, None)
+        self._receive(records[-1:])
+        self.assertEqual(self.results, records)
+
+
+    def test_wholeZone(self):
+        """
+        A transfer of the whole zone is complete at the second I{SOA} record.
+        """
+        records = [self._soa(3), self.address, self._soa(3)]
+        self._receive(records[:-1])
+        self.assertIdentical(self.results, None)
+        self._receive(records[-1:])
+        self.assertEqual(self.results, records)
+
+
 
 class ResolvConfHandling(unittest.TestCase):
     def testMissing(self):
@@ -661,6 +1083,83 @@ class AuthorityTests(unittest.TestCase):
         self._referralTest('lookupAllRecords')
 
 
+    def _compiledAuthority(self):
+        """
+        Make an authority for a zone with an address, a mail exchanger and an
+        alias.
+        """
+        zone = str(soa_record.mname)
+        return NoFileAuthority(
+            soa=(zone, soa_record),
+            records={
+                zone: [soa_record, dns.Record_MX(10, 'mail.' + zone)],
+                'mail.' + zone: [dns.Record_A('1.2.3.4')],
+                'www.' + zone: [dns.Record_CNAME('mail.' + zone)]})
+
+
+    def _lookup(self, authority, name, type):
+        result = []
+        authority._lookup(name, dns.IN, type).addCallback(result.append)
+        return result[0]
+
+
+    def test_compiledAnswers(self):
+        """
+        L{FileAuthority.compileZone} computes the answers to queries for the
+        names in the zone, which are the same as those computed for each
+        query.
+        """
+        authority = self._compiledAuthority()
+        authority.compileZone()
+        zone = str(soa_record.mname)
+        for name in authority.records:
+            for type in authority.compiledTypes:
+                self.assertIn((name, type), authority._index)
+                self.assertEqual(self._lookup(authority, name, type),
+                                 authority._answer(name, type))
+        answer, auth, additional = self._lookup(authority, zone, dns.MX)
+        self.assertEqual(
+            additional,
+            [dns.RRHeader('mail.' + zone, dns.A, ttl=soa_record.expire,
+                          payload=dns.Record_A('1.2.3.4'), auth=True)])
+
+
+    def test_compiledAnswersCopied(self):
+        """
+        Changing the lists of an answer does not change later answers.
+        """
+        authority = self._compiledAuthority()
+        name = 'mail.' + str(soa_record.mname)
+        answer, auth, additional = self._lookup(authority, name, dns.A)
+        del answer[:]
+        answer, auth, additional = self._lookup(authority, name, dns.A)
+        self.assertEqual(len(answer), 1)
+
+
+    def test_compiledAnswersCase(self):
+        """
+        The records in the answer to a query for a name not in lower case
+        have the name as asked.
+        """
+        authority = self._compiledAuthority()
+        name = 'Mail.' + str(soa_record.mname)
+        answer, auth, additional = self._lookup(authority, name, dns.A)
+        self.assertEqual(str(answer[0].name), name)
+
+
+    def test_recompiledOnChange(self):
+        """
+        Replacing C{records} or C{soa} causes the zone to be compiled again.
+        """
+        authority = self._compiledAuthority()
+        name = 'mail.' + str(soa_record.mname)
+        self._lookup(authority, name, dns.A)
+        authority.records = {name: [dns.Record_A('5.6.7.8')]}
+        answer, auth, additional = self._lookup(authority, name, dns.A)
+        self.assertEqual(answer[0].payload.dottedQuad(), '5.6.7.8')
+        self.assertIdentical(authority._indexedRecords, authority.records)
+
+
 
 class NoInitialResponseTestCase(unittest.TestCase):
 
@@ -781,6 +1280,34 @@ class SecondaryAuthorityTests(unittest.TestCase):
         self.assertEqual(secondary.domain, 'inside.com')
 
 
+    def test_lookup(self):
+        """
+        L{SecondaryAuthority} answers queries for the names in its zone from
+        the records of the last transfer.
+        """
+        secondary = SecondaryAuthority('192.168.1.1', 'example.com')
+        soa = dns.Record_SOA(
+            mname='ns1.example.com', rname='admin.example.com', serial=1)
+        secondary.soa = ('example.com', soa)
+        secondary.records = {
+            'example.com': [soa],
+            'www.example.com': [dns.Record_A('1.2.3.4')]}
+        result = []
+        secondary.lookupAddress('www.example.com').addCallback(result.append)
+        answer, authority, additional = result.pop()
+        self.assertEqual(
+            ['1.2.3.4'], [record.payload.dottedQuad() for record in answer])
+
+        # A later transfer replaces the records.
+        secondary.records = {
+            'example.com': [soa],
+            'www.example.com': [dns.Record_A('1.2.3.5')]}
+        secondary.lookupAddress('www.example.com').addCallback(result.append)
+        answer, authority, additional = result.pop()
+        self.assertEqual(
+            ['1.2.3.5'], [record.payload.dottedQuad() for record in answer])
+
+
     def test_transfer(self):
         """
         An attempt is made to transfer the zone for the domain the
@@ -815,3 +1342,127 @@ class SecondaryAuthorityTests(unittest.TestCase):
 
         self.assertEqual(
             [dns.Query('example.com', dns.AXFR, dns.IN)], msg.queries)
+
+
+    def _transferSecondary(self):
+        """
+        Make a L{SecondaryAuthority} for I{example.com} with a fake resolver
+        which records the zone transfers asked of it.
+
+        @return: A C{tuple} of the authority and the C{list} of C{(method,
+            args, kwargs, Deferred)} tuples of the calls to its resolver.
+        """
+        calls = []
+        class FakeResolver(object):
+            def __getattr__(self, name):
+                def call(*args, **kwargs):
+                    d = defer.Deferred()
+                    calls.append((name, args, kwargs, d))
+                    return d
+                return call
+        secondary = SecondaryAuthority('192.168.1.1', 'example.com')
+        secondary._resolver = FakeResolver
+        return secondary, calls
+
+
+    def _soa(self, serial):
+        return dns.RRHeader(
+            'example.com', dns.SOA,
+            payload=dns.Record_SOA('ns.example.com', 'root.example.com',
+                                   serial))
+
+
+    def _address(self, name, address):
+        return dns.RRHeader(
+            name, dns.A, payload=dns.Record_A(address, ttl=0))
+
+
+    def _lookupAddress(self, secondary, name):
+        result = []
+        secondary.lookupAddress(name).addBoth(result.append)
+        return result[0]
+
+
+    def test_streamedTransfer(self):
+        """
+        The first transfer of a L{SecondaryAuthority} is an AXFR whose
+        records are added to the zone as they are received, which replaces
+        the zone once it is complete.
+        """
+        secondary, calls = self._transferSecondary()
+        d = secondary.transfer()
+        name, args, kwargs, transferred = calls.pop()
+        self.assertEqual((name, args), ('lookupZone', ('example.com',)))
+        receive = kwargs['recordsReceived']
+        receive([self._soa(1), self._address('www.example.com', '1.2.3.4')])
+        receive([self._soa(1)])
+        self.assertIdentical(secondary.records, None)
+        transferred.callback(([], [], []))
+        self.assertEqual(secondary.soa[1].serial, 1)
+        answer, authority, additional = self._lookupAddress(
+            secondary, 'www.example.com')
+        self.assertEqual(answer[0].payload.dottedQuad(), '1.2.3.4')
+        self.assertFalse(secondary.transferring)
+
+
+    def _transferred(self):
+        """
+        Make a L{SecondaryAuthority} which has transferred version C{1} of
+        its zone.
+        """
+        secondary, calls = self._transferSecondary()
+        secondary.transfer()
+        name, args, kwargs, transferred = calls.pop()
+        kwargs['recordsReceived']([
+                self._soa(1), self._address('www.example.com', '1.2.3.4'),
+                self._address('ftp.example.com', '1.2.3.5'), self._soa(1)])
+        transferred.callback(([], [], []))
+        return secondary, calls
+
+
+    def test_serialUnchanged(self):
+        """
+        L{SecondaryAuthority.transfer} does not transfer the zone again if
+        the serial number of the primary's I{SOA} record is not newer.
+        """
+        secondary, calls = self._transferred()
+        secondary.transfer()
+        name, args, kwargs, looked = calls.pop()
+        self.assertEqual((name, args), ('lookupAuthority', ('example.com',)))
+        looked.callback(([self._soa(1)], [], []))
+        self.assertEqual(calls, [])
+        self.assertFalse(secondary.transferring)
+
+
+    def test_incrementalTransfer(self):
+        """
+        Once it has the zone, L{SecondaryAuthority} transfers the changes to
+        it with IXFR, and applies them to its records.
+        """
+        secondary, calls = self._transferred()
+        self._lookupAddress(secondary, 'www.example.com')
+        secondary.transfer()
+        calls.pop()[3].callback(([self._soa(2)], [], []))
+        name, args, kwargs, transferred = calls.pop()
+        self.assertEqual(name, 'lookupZoneChanges')
+        self.assertEqual(args[0], 'example.com')
+        self.assertEqual(args[1].serial, 1)
+        kwargs['recordsReceived']([
+                self._soa(2),
+                self._soa(1), self._address('www.example.com', '1.2.3.4'),
+                self._soa(2), self._address('www.example.com', '5.6.7.8'),
+                self._soa(2)])
+        transferred.callback(([], [], []))
+
+        self.assertEqual(secondary.soa[1].serial, 2)
+        answer, authority, additional = self._lookupAddress(
+            secondary, 'www.example.com')
+        self.assertEqual([a.payload.dottedQuad() for a in answer],
+                         ['5.6.7.8'])
+        answer, authority, additional = self._lookupAddress(
+            secondary, 'ftp.example.com')
+        self.assertEqual([a.payload.dottedQuad() for a in answer],
+                         ['1.2.3.5'])
+        answer, authority, additional = self._lookupAddress(
+            secondary, 'example.com')
+        self.assertEqual(authority[0].payload.serial, 2)
@@ -126,7 +126,8 @@ class MemoryReactor(Clock):
         self.udpPorts = {}
 
 
-    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192):
+    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192,
+                  reusePort=False):
         """
         Pretend to bind a UDP port and connect the given protocol to it.
         """
@@ -12,7 +12,6 @@ from __future__ import absolute_import, division
 # System imports
 import re
 from struct import pack, unpack, calcsize
-from io import BytesIO
 import math
 
 from zope.interface import implementer
@@ -116,18 +115,31 @@ class NetstringReceiver(protocol.Protocol):
         (C{PARSING_LENGTH}) or the payload (C{PARSING_PAYLOAD}) of a netstring
     @type _state: C{int}
 
+    @ivar stringsAsViews: If C{True}, L{stringReceived} is given a
+        C{memoryview} of each payload instead of a C{bytes} copy of it.
+    @type stringsAsViews: C{bool}
+
     @ivar _remainingData: Holds the chunk of data that has not yet been consumed
     @type _remainingData: C{string}
 
-    @ivar _payload: Holds the payload portion of a netstring including the
-        trailing comma
-    @type _payload: C{BytesIO}
+    @ivar _remainingOffset: The position in C{_remainingData} of the first byte
+        which has not been consumed.  Consuming a netstring advances it rather
+        than slicing the rest of the data off, which would copy it once per
+        netstring.
+    @type _remainingOffset: C{int}
+
+    @ivar _payloadChunks: Holds the pieces of the payload portion of a
+        netstring received so far, including the trailing comma.  They are
+        joined once the payload is complete.
+    @type _payloadChunks: C{list} of C{bytes}
 
     @ivar _expectedPayloadSize: Holds the payload size plus one for the trailing
         comma.
     @type _expectedPayloadSize: C{int}
     """
     MAX_LENGTH = 99999
+    stringsAsViews = False
+    _remainingOffset = 0
     _LENGTH = re.compile(b'(0|[1-9]\d*)(:)')
 
     _LENGTH_PREFIX = re.compile(b'(0|[1-9]\d*)$')
@@ -152,8 +164,9 @@ class NetstringReceiver(protocol.Protocol):
         """
         protocol.Protocol.makeConnection(self, transport)
         self._remainingData = b""
+        self._remainingOffset = 0
         self._currentPayloadSize = 0
-        self._payload = BytesIO()
+        self._payloadChunks = []
         self._state = self._PARSING_LENGTH
         self._expectedPayloadSize = 0
         self.brokenPeer = 0
@@ -185,7 +198,7 @@ class NetstringReceiver(protocol.Protocol):
         @type data: C{bytes}
         """
         self._remainingData += data
-        while self._remainingData:
+        while self._remainingOffset < len(self._remainingData):
             try:
                 self._consumeData()
             except IncompleteNetstring:
@@ -193,6 +206,10 @@ class NetstringReceiver(protocol.Protocol):
             except NetstringParseError:
                 self._handleParseError()
                 break
+        # Only a partial length specification can be left over; a partial
+        # payload has been moved to the payload chunks.
+        self._remainingData = self._remainingData[self._remainingOffset:]
+        self._remainingOffset = 0
 
 
     def stringReceived(self, string):
@@ -245,7 +262,8 @@ class NetstringReceiver(protocol.Protocol):
         @raise NetstringParseError: if the received data do not form a valid
             netstring.
         """
-        lengthMatch = self._LENGTH.match(self._remainingData)
+        lengthMatch = self._LENGTH.match(
+            self._remainingData, self._remainingOffset)
         if not lengthMatch:
             self._checkPartialLengthSpecification()
             raise IncompleteNetstring()
@@ -262,7 +280,8 @@ class NetstringReceiver(protocol.Protocol):
         @raise NetstringParseError: if C{self._remainingData} is no
             number or is too big (checked by L{extractLength}).
         """
-        partialLengthMatch = self._LENGTH_PREFIX.match(self._remainingData)
+        partialLengthMatch = self._LENGTH_PREFIX.match(
+            self._remainingData, self._remainingOffset)
         if not partialLengthMatch:
             raise NetstringParseError(self._MISSING_LENGTH)
         lengthSpecification = (partialLengthMatch.group(1))
@@ -274,9 +293,8 @@ class NetstringReceiver(protocol.Protocol):
         Processes the length definition of a netstring.
 
         Extracts and stores in C{self._expectedPayloadSize} the number
-        representing the netstring size.  Removes the prefix
-        representing the length specification from
-        C{self._remainingData}.
+        representing the netstring size.  Skips the prefix representing
+        the length specification in C{self._remainingData}.
 
         @raise NetstringParseError: if the received netstring does not
             start with a number or the number is bigger than
@@ -287,10 +305,10 @@ class NetstringReceiver(protocol.Protocol):
         """
         endOfNumber = lengthMatch.end(1)
         startOfData = lengthMatch.end(2)
-        lengthString = self._remainingData[:endOfNumber]
+        lengthString = self._remainingData[self._remainingOffset:endOfNumber]
         # Expect payload plus trailing comma:
         self._expectedPayloadSize = self._extractLength(lengthString) + 1
-        self._remainingData = self._remainingData[startOfData:]
+        self._remainingOffset = startOfData
 
 
     def _extractLength(self, lengthAsString):
@@ -337,8 +355,7 @@ class NetstringReceiver(protocol.Protocol):
         """
         self._state = self._PARSING_PAYLOAD
         self._currentPayloadSize = 0
-        self._payload.seek(0)
-        self._payload.truncate()
+        self._payloadChunks = []
 
 
     def _consumePayload(self):
@@ -366,23 +383,26 @@ class NetstringReceiver(protocol.Protocol):
         """
         Extracts payload information from C{self._remainingData}.
 
-        Splits C{self._remainingData} at the end of the netstring.  The
-        first part becomes C{self._payload}, the second part is stored
-        in C{self._remainingData}.
+        Adds the part of C{self._remainingData} up to the end of the
+        netstring to C{self._payloadChunks}, and skips it.
 
-        If the netstring is not yet complete, the whole content of
-        C{self._remainingData} is moved to C{self._payload}.
+        If the netstring is not yet complete, the whole unconsumed content
+        of C{self._remainingData} is moved to C{self._payloadChunks}.
         """
+        data = self._remainingData
+        offset = self._remainingOffset
         if self._payloadComplete():
-            remainingPayloadSize = (self._expectedPayloadSize -
-                                    self._currentPayloadSize)
-            self._payload.write(self._remainingData[:remainingPayloadSize])
-            self._remainingData = self._remainingData[remainingPayloadSize:]
+            end = offset + (self._expectedPayloadSize -
+                            self._currentPayloadSize)
+            self._payloadChunks.append(data[offset:end])
+            self._remainingOffset = end
             self._currentPayloadSize = self._expectedPayloadSize
         else:
-            self._payload.write(self._remainingData)
-            self._currentPayloadSize += len(self._remainingData)
+            if offset < len(data):
+                self._payloadChunks.append(data[offset:])
+                self._currentPayloadSize += len(data) - offset
             self._remainingData = b""
+            self._remainingOffset = 0
 
 
     def _payloadComplete(self):
@@ -394,18 +414,27 @@ class NetstringReceiver(protocol.Protocol):
             netstring
         @rtype: C{bool}
         """
-        return (len(self._remainingData) + self._currentPayloadSize >=
-                self._expectedPayloadSize)
+        return (len(self._remainingData) - self._remainingOffset +
+                self._currentPayloadSize >= self._expectedPayloadSize)
 
 
     def _processPayload(self):
         """
         Processes the actual payload with L{stringReceived}.
 
-        Strips C{self._payload} of the trailing comma and calls
+        Joins C{self._payloadChunks}, strips the trailing comma and calls
         L{stringReceived} with the result.
         """
-        self.stringReceived(self._payload.getvalue()[:-1])
+        chunks = self._payloadChunks
+        self._payloadChunks = []
+        if len(chunks) == 1:
+            payload = chunks[0]
+        else:
+            payload = b"".join(chunks)
+        if self.stringsAsViews:
+            self.stringReceived(memoryview(payload)[:-1])
+        else:
+            self.stringReceived(payload[:-1])
 
 
     def _checkForTrailingComma(self):
@@ -415,7 +444,7 @@ class NetstringReceiver(protocol.Protocol):
         @raise NetstringParseError: if the last payload character is
             anything but a comma.
         """
-        if self._payload.getvalue()[-1:] != b",":
+        if self._payloadChunks[-1][-1:] != b",":
             raise NetstringParseError(self._MISSING_COMMA)
 
 
@@ -449,6 +478,8 @@ class LineOnlyReceiver(protocol.Protocol):
         """
         Translates bytes into lines, and calls lineReceived.
         """
+        # One split finds every line in a single pass; unlike LineReceiver,
+        # nothing can change how the rest of the data is parsed.
         lines  = (self._buffer+data).split(self.delimiter)
         self._buffer = lines.pop(-1)
         for line in lines:
@@ -531,9 +562,21 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
     @cvar MAX_LENGTH: The maximum length of a line to allow (If a
                       sent line is longer than this, the connection is dropped).
                       Default is 16384.
+
+    @ivar _buffer: The data received but not yet delivered.  While
+        L{dataReceived} is running, only the part of it from C{_bufferOffset}
+        on is undelivered.
+    @type _buffer: C{bytes}
+
+    @ivar _bufferOffset: The position in C{_buffer} of the first undelivered
+        byte.  Lines are found in C{_buffer} from this position on, instead of
+        splitting each one off the front of the buffer, which would copy the
+        rest of it once per line.  It is always 0 outside L{dataReceived}.
+    @type _bufferOffset: C{int}
     """
     line_mode = 1
     _buffer = b''
+    _bufferOffset = 0
     _busyReceiving = False
     delimiter = b'\r\n'
     MAX_LENGTH = 16384
@@ -545,7 +588,9 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
         @return: All of the cleared buffered data.
         @rtype: C{bytes}
         """
-        b, self._buffer = self._buffer, b""
+        b = self._buffer[self._bufferOffset:]
+        self._buffer = b""
+        self._bufferOffset = 0
         return b
 
 
@@ -562,34 +607,44 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
         try:
             self._busyReceiving = True
             self._buffer += data
-            while self._buffer and not self.paused:
+            # lineReceived and rawDataReceived may change the buffer (by
+            # calling clearLineBuffer or setLineMode, for example), so it is
+            # looked up again after each of them.
+            while self._bufferOffset < len(self._buffer) and not self.paused:
+                buffer = self._buffer
+                offset = self._bufferOffset
                 if self.line_mode:
-                    try:
-                        line, self._buffer = self._buffer.split(
-                            self.delimiter, 1)
-                    except ValueError:
-                        if len(self._buffer) > self.MAX_LENGTH:
-                            line, self._buffer = self._buffer, b''
+                    end = buffer.find(self.delimiter, offset)
+                    if end == -1:
+                        if len(buffer) - offset > self.MAX_LENGTH:
+                            line = buffer[offset:]
+                            self._buffer = b''
+                            self._bufferOffset = 0
                             return self.lineLengthExceeded(line)
                         return
-                    else:
-                        lineLength = len(line)
-                        if lineLength > self.MAX_LENGTH:
-                            exceeded = line + self._buffer
-                            self._buffer = b''
-                            return self.lineLengthExceeded(exceeded)
-                        why = self.lineReceived(line)
-                        if (why or self.transport and
-                            self.transport.disconnecting):
-                            return why
+                    rest = end + len(self.delimiter)
+                    if end - offset > self.MAX_LENGTH:
+                        exceeded = buffer[offset:end] + buffer[rest:]
+                        self._buffer = b''
+                        self._bufferOffset = 0
+                        return self.lineLengthExceeded(exceeded)
+                    self._bufferOffset = rest
+                    why = self.lineReceived(buffer[offset:end])
+                    if (why or self.transport and
+                        self.transport.disconnecting):
+                        return why
                 else:
-                    data = self._buffer
+                    data = buffer[offset:]
                     self._buffer = b''
+                    self._bufferOffset = 0
                     why = self.rawDataReceived(data)
                     if why:
                         return why
         finally:
             self._busyReceiving = False
+            if self._bufferOffset:
+                self._buffer = self._buffer[self._bufferOffset:]
+                self._bufferOffset = 0
 
 
     def setLineMode(self, extra=b''):
@@ -684,6 +739,8 @@ class _RecvdCompatHack(object):
     the default __set__ behavior in both new-style and old-style subclasses.
     """
     def __get__(self, oself, type=None):
+        if oself._chunks is not None:
+            return b"".join(oself._chunks)
         return oself._unprocessed[oself._compatibilityOffset:]
 
 
@@ -709,11 +766,35 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
     @ivar _compatibilityOffset: the offset within C{_unprocessed} to the next
         message to be parsed. (used to generate the recvd attribute)
     @type _compatibilityOffset: C{int}
+
+    @ivar stringsAsViews: If C{True}, L{stringReceived} is given a
+        C{memoryview} of each string within the receive buffer instead of a
+        C{bytes} copy of it.  The view keeps the whole buffer alive, so copy
+        it (for example with C{tobytes()}) before keeping it for long.
+    @type stringsAsViews: C{bool}
+
+    @ivar _needed: While the string at the start of C{_unprocessed} is
+        incomplete, the number of bytes, including its prefix, needed to
+        complete it; otherwise 0.
+    @type _needed: C{int}
+
+    @ivar _chunks: The data received since C{_needed} was set, starting with
+        C{_unprocessed} itself, or C{None}.  The chunks are only joined once
+        there are enough of them to complete the string, rather than
+        concatenating the partial string with each chunk received.
+    @type _chunks: C{list} of C{bytes}
+
+    @ivar _chunksLength: The total length of C{_chunks}.
+    @type _chunksLength: C{int}
     """
 
     MAX_LENGTH = 99999
+    stringsAsViews = False
     _unprocessed = b""
     _compatibilityOffset = 0
+    _needed = 0
+    _chunks = None
+    _chunksLength = 0
 
     # Backwards compatibility support for applications which directly touch the
     # "internal" parse buffer.
@@ -746,14 +827,27 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
         """
         Convert int prefixed strings into calls to stringReceived.
         """
-        # Try to minimize string copying (via slices) by keeping one buffer
-        # containing all the data we have so far and a separate offset into that
-        # buffer.
-        alldata = self._unprocessed + data
+        if self._needed:
+            if self._chunks is None:
+                self._chunks = [self._unprocessed]
+                self._chunksLength = len(self._unprocessed)
+            self._chunks.append(data)
+            self._chunksLength += len(data)
+            if self._chunksLength < self._needed:
+                return
+            alldata = b"".join(self._chunks)
+            self._chunks = None
+            self._needed = 0
+        else:
+            # Try to minimize string copying (via slices) by keeping one buffer
+            # containing all the data we have so far and a separate offset into
+            # that buffer.
+            alldata = self._unprocessed + data
         currentOffset = 0
         prefixLength = self.prefixLength
         fmt = self.structFormat
         self._unprocessed = alldata
+        view = None
 
         while len(alldata) >= (currentOffset + prefixLength) and not self.paused:
             messageStart = currentOffset + prefixLength
@@ -765,11 +859,18 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
                 return
             messageEnd = messageStart + length
             if len(alldata) < messageEnd:
+                # Collect the rest of this string in chunks.
+                self._needed = messageEnd - currentOffset
                 break
 
-            # Here we have to slice the working buffer so we can send just the
-            # netstring into the stringReceived callback.
-            packet = alldata[messageStart:messageEnd]
+            if self.stringsAsViews:
+                if view is None:
+                    view = memoryview(alldata)
+                packet = view[messageStart:messageEnd]
+            else:
+                # Here we have to slice the working buffer so we can send just
+                # the netstring into the stringReceived callback.
+                packet = alldata[messageStart:messageEnd]
             currentOffset = messageEnd
             self._compatibilityOffset = currentOffset
             self.stringReceived(packet)
@@ -781,6 +882,7 @@ class IntNStringReceiver(protocol.Protocol, _PauseableMixin):
                 alldata = self.__dict__.pop('recvd')
                 self._unprocessed = alldata
                 self._compatibilityOffset = currentOffset = 0
+                view = None
                 if alldata:
                     continue
                 return
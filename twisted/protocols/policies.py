@@ -449,7 +449,14 @@ class LimitTotalConnectionsFactory(ServerFactory):
 class TimeoutProtocol(ProtocolWrapper):
     """
     Protocol that automatically disconnects when the connection is idle.
+
+    @ivar lazyTimeout: If C{True}, activity on the connection only records
+        the time at which it happened, and the pending timeout is scheduled
+        again for the remaining time when it is reached.  See
+        L{TimeoutMixin.lazyTimeout}.
     """
+    lazyTimeout = False
+    _lastActivity = None
 
     def __init__(self, factory, wrappedProtocol, timeoutPeriod):
         """
@@ -477,7 +484,8 @@ class TimeoutProtocol(ProtocolWrapper):
         self.cancelTimeout()
         if timeoutPeriod is not None:
             self.timeoutPeriod = timeoutPeriod
-        self.timeoutCall = self.factory.callLater(self.timeoutPeriod, self.timeoutFunc)
+        self.timeoutCall = self.factory.callLater(self.timeoutPeriod,
+                                                  self._timedOut)
 
 
     def cancelTimeout(self):
@@ -492,6 +500,7 @@ class TimeoutProtocol(ProtocolWrapper):
             except error.AlreadyCalled:
                 pass
             self.timeoutCall = None
+            self._lastActivity = None
 
 
     def resetTimeout(self):
@@ -499,7 +508,10 @@ class TimeoutProtocol(ProtocolWrapper):
         Reset the timeout, usually because some activity just happened.
         """
         if self.timeoutCall:
-            self.timeoutCall.reset(self.timeoutPeriod)
+            if self.lazyTimeout:
+                self._lastActivity = self.timeoutCall.seconds()
+            else:
+                self.timeoutCall.reset(self.timeoutPeriod)
 
 
     def write(self, data):
@@ -522,6 +534,23 @@ class TimeoutProtocol(ProtocolWrapper):
         ProtocolWrapper.connectionLost(self, reason)
 
 
+    def _timedOut(self):
+        """
+        Call L{timeoutFunc}, unless there was activity during the timeout
+        period in lazy mode, in which case the timeout is scheduled again for
+        the time remaining since that activity.
+        """
+        if self._lastActivity is not None:
+            remaining = (self._lastActivity + self.timeoutPeriod -
+                         self.timeoutCall.seconds())
+            self._lastActivity = None
+            if remaining > 0:
+                self.timeoutCall = self.factory.callLater(remaining,
+                                                          self._timedOut)
+                return
+        self.timeoutFunc()
+
+
     def timeoutFunc(self):
         """
         This method is called when the timeout is triggered.
@@ -536,18 +565,25 @@ class TimeoutProtocol(ProtocolWrapper):
 class TimeoutFactory(WrappingFactory):
     """
     Factory for TimeoutWrapper.
+
+    @ivar lazyTimeout: Whether the protocols built by this factory use lazy
+        timeouts.  See L{TimeoutProtocol.lazyTimeout}.
     """
     protocol = TimeoutProtocol
 
 
-    def __init__(self, wrappedFactory, timeoutPeriod=30*60):
+    def __init__(self, wrappedFactory, timeoutPeriod=30*60, lazyTimeout=False):
         self.timeoutPeriod = timeoutPeriod
+        self.lazyTimeout = lazyTimeout
         WrappingFactory.__init__(self, wrappedFactory)
 
 
     def buildProtocol(self, addr):
-        return self.protocol(self, self.wrappedFactory.buildProtocol(addr),
-                             timeoutPeriod=self.timeoutPeriod)
+        p = self.protocol(self, self.wrappedFactory.buildProtocol(addr),
+                          timeoutPeriod=self.timeoutPeriod)
+        if self.lazyTimeout:
+            p.lazyTimeout = True
+        return p
 
 
     def callLater(self, period, func):
@@ -664,10 +700,18 @@ class TimeoutMixin:
     default, closes the connection.
 
     @cvar timeOut: The number of seconds after which to timeout the connection.
+
+    @cvar lazyTimeout: If C{True}, L{resetTimeout} only records the time of
+        the activity instead of rescheduling the pending timeout.  When that
+        timeout is reached, it is scheduled again for the time remaining
+        since the last activity, if any.  This avoids rescheduling a timed
+        call for every chunk of data on busy connections.
     """
     timeOut = None
+    lazyTimeout = False
 
     __timeoutCall = None
+    __lastActivity = None
 
     def callLater(self, period, func):
         """
@@ -690,7 +734,10 @@ class TimeoutMixin:
         some data, they're still there, reset the timeout".
         """
         if self.__timeoutCall is not None and self.timeOut is not None:
-            self.__timeoutCall.reset(self.timeOut)
+            if self.lazyTimeout:
+                self.__lastActivity = self.__timeoutCall.seconds()
+            else:
+                self.__timeoutCall.reset(self.timeOut)
 
     def setTimeout(self, period):
         """
@@ -707,6 +754,7 @@ class TimeoutMixin:
             if period is None:
                 self.__timeoutCall.cancel()
                 self.__timeoutCall = None
+                self.__lastActivity = None
             else:
                 self.__timeoutCall.reset(period)
         elif period is not None:
@@ -715,7 +763,14 @@ class TimeoutMixin:
         return prev
 
     def __timedOut(self):
+        now = self.__timeoutCall.seconds()
         self.__timeoutCall = None
+        if self.__lastActivity is not None:
+            remaining = self.__lastActivity + self.timeOut - now
+            self.__lastActivity = None
+            if remaining > 0:
+                self.__timeoutCall = self.callLater(remaining, self.__timedOut)
+                return
         self.timeoutConnection()
 
     def timeoutConnection(self):
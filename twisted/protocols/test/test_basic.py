@@ -335,6 +335,78 @@ a'''
         self.assertIsInstance(why, RuntimeError)
 
 
+    def test_manyLines(self):
+        """
+        All of the lines in a single chunk of data are delivered, and only the
+        incomplete line after them is left buffered.
+        """
+        class CollectingReceiver(basic.LineReceiver):
+            def connectionMade(self):
+                self.lines = []
+
+            def lineReceived(self, line):
+                self.lines.append(line)
+
+        proto = CollectingReceiver()
+        proto.makeConnection(proto_helpers.StringTransport())
+        lines = [(b'%d' % (i,)) * (i % 5) for i in range(2000)]
+        proto.dataReceived(b'\r\n'.join(lines) + b'\r\nrest')
+        self.assertEqual(proto.lines, lines)
+        self.assertEqual(proto._buffer, b'rest')
+        self.assertEqual(proto._bufferOffset, 0)
+
+
+    def test_pausingKeepsRest(self):
+        """
+        When L{LineReceiver} is paused in the middle of a chunk of data, the
+        undelivered part of it is kept buffered, and delivered when it is
+        resumed.
+        """
+        class PausingReceiver(basic.LineReceiver):
+            def connectionMade(self):
+                self.lines = []
+
+            def lineReceived(self, line):
+                self.lines.append(line)
+                if line == b'pause':
+                    self.pauseProducing()
+
+        proto = PausingReceiver()
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.dataReceived(b'a\r\npause\r\nb\r\nc')
+        self.assertEqual(proto.lines, [b'a', b'pause'])
+        self.assertEqual(proto.clearLineBuffer(), b'b\r\nc')
+        proto.dataReceived(b'd\r\ne\r\n')
+        proto.resumeProducing()
+        self.assertEqual(proto.lines, [b'a', b'pause', b'd', b'e'])
+
+
+    def test_maximumLineLengthAfterLines(self):
+        """
+        When a line longer than C{MAX_LENGTH} follows shorter lines in the
+        same chunk of data, those lines are delivered, and
+        L{LineReceiver.lineLengthExceeded} is given the long line and the
+        data after it.
+        """
+        class LimitedReceiver(basic.LineReceiver):
+            MAX_LENGTH = 3
+
+            def connectionMade(self):
+                self.lines = []
+
+            def lineReceived(self, line):
+                self.lines.append(line)
+
+            def lineLengthExceeded(self, line):
+                self.exceeded = line
+
+        proto = LimitedReceiver()
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.dataReceived(b'a\r\nbb\r\ncccc\r\ndd\r\n')
+        self.assertEqual(proto.lines, [b'a', b'bb'])
+        self.assertEqual(proto.exceeded, b'ccccdd\r\n')
+
+
 
 class LineOnlyReceiverTestCase(unittest.SynchronousTestCase):
     """
@@ -369,6 +441,39 @@ class LineOnlyReceiverTestCase(unittest.SynchronousTestCase):
         self.assertIsInstance(res, error.ConnectionLost)
 
 
+    def test_manyLines(self):
+        """
+        All of the lines in a single chunk of data are delivered, and only the
+        incomplete line after them is left buffered.
+        """
+        t = proto_helpers.StringTransport()
+        a = LineOnlyTester()
+        a.makeConnection(t)
+        lines = [(b'%d' % (i,)) * (i % 5) for i in range(2000)]
+        a.dataReceived(b'\n'.join(lines) + b'\nre')
+        a.dataReceived(b'st\n')
+        self.assertEqual(a.received, lines + [b'rest'])
+        self.assertEqual(a._buffer, b'')
+
+
+    def test_disconnectingDiscardsLines(self):
+        """
+        Lines following the one which caused the connection to be lost are not
+        delivered.
+        """
+        class DisconnectingTester(LineOnlyTester):
+            def lineReceived(self, line):
+                LineOnlyTester.lineReceived(self, line)
+                if line == b'quit':
+                    self.transport.loseConnection()
+
+        t = proto_helpers.StringTransport()
+        a = DisconnectingTester()
+        a.makeConnection(t)
+        a.dataReceived(b'a\nquit\nb\nc')
+        self.assertEqual(a.received, [b'a', b'quit'])
+
+
 
 class TestMixin:
 
@@ -461,6 +566,51 @@ class NetstringReceiverTestCase(unittest.SynchronousTestCase, LPTestCaseMixin):
             self.assertEqual(a.received, self.strings)
 
 
+    def test_receiveManyNetstrings(self):
+        """
+        All of the netstrings in a single chunk of data are received, and none
+        of it is left over.
+        """
+        strings = [b"x" * (i % 10) for i in range(1000)]
+        self.netstringReceiver.dataReceived(
+            b"".join([basic._formatNetstring(s) for s in strings]))
+        self.assertEqual(self.netstringReceiver.received, strings)
+        self.assertEqual(self.netstringReceiver._remainingData, b"")
+        self.assertEqual(self.netstringReceiver._remainingOffset, 0)
+
+
+    def test_receivePayloadInChunks(self):
+        """
+        A payload arriving in many chunks is kept as a list of them until it is
+        complete.
+        """
+        self.netstringReceiver.MAX_LENGTH = 1000
+        data = basic._formatNetstring(b"x" * 500) + b"3:abc,"
+        for i in range(0, len(data), 7):
+            self.netstringReceiver.dataReceived(data[i:i + 7])
+            if i == 70:
+                self.assertEqual(
+                    len(self.netstringReceiver._payloadChunks), 11)
+        self.assertEqual(self.netstringReceiver.received,
+                         [b"x" * 500, b"abc"])
+
+
+    def test_stringsAsViews(self):
+        """
+        If C{stringsAsViews} is set, C{stringReceived} is given a
+        C{memoryview} of each payload.
+        """
+        received = []
+        self.netstringReceiver.stringReceived = received.append
+        self.netstringReceiver.stringsAsViews = True
+        self.netstringReceiver.dataReceived(b"3:abc,4:de")
+        self.netstringReceiver.dataReceived(b"fg,")
+        self.assertEqual([type(string) for string in received],
+                         [memoryview] * 2)
+        self.assertEqual([string.tobytes() for string in received],
+                         [b"abc", b"defg"])
+
+
     def test_receiveEmptyNetstring(self):
         """
         Empty netstrings (with length '0') can be received.
@@ -761,6 +911,45 @@ class RecvdAttributeMixin(object):
         return struct.pack(protocol.structFormat, len(data)) + data
 
 
+    def test_receiveInChunks(self):
+        """
+        A string arriving in many chunks is collected without being joined
+        until it is complete, and the C{recvd} attribute reflects all of the
+        data received meanwhile.
+        """
+        r = self.getProtocol()
+        r.MAX_LENGTH = 1000
+        data = (struct.pack(r.structFormat, 200) + b"x" * 200 +
+                struct.pack(r.structFormat, 3) + b"abc")
+        r.dataReceived(data[:10])
+        r.dataReceived(data[10:20])
+        self.assertNotIdentical(r._chunks, None)
+        self.assertEqual(r.recvd, data[:20])
+        for i in range(20, len(data), 10):
+            r.dataReceived(data[i:i + 10])
+        self.assertEqual(r.received, [b"x" * 200, b"abc"])
+        self.assertIdentical(r._chunks, None)
+        self.assertEqual(r.recvd, b"")
+
+
+    def test_stringsAsViews(self):
+        """
+        If C{stringsAsViews} is set, C{stringReceived} is given a
+        C{memoryview} of each string.
+        """
+        r = self.getProtocol()
+        r.stringsAsViews = True
+        r.dataReceived(
+            struct.pack(r.structFormat, 3) + b"abc" +
+            struct.pack(r.structFormat, 2) + b"de" +
+            struct.pack(r.structFormat, 4) + b"f")
+        r.dataReceived(b"ghi")
+        self.assertEqual([type(string) for string in r.received],
+                         [memoryview] * 3)
+        self.assertEqual([string.tobytes() for string in r.received],
+                         [b"abc", b"de", b"fghi"])
+
+
     def test_recvdContainsRemainingData(self):
         """
         In stringReceived, recvd contains the remaining data that was passed to
@@ -0,0 +1,166 @@
+# -*- test-case-name: twisted.python.test.test_lru -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A size-bounded mapping which discards its least recently used items.
+"""
+
+from __future__ import division, absolute_import
+
+
+# Indexes into the links of the doubly linked list used by LRUCache.
+_PREV, _NEXT, _KEY, _VALUE = range(4)
+
+
+
+class LRUCache(object):
+    """
+    A mapping holding at most C{maxSize} items.  Adding an item to a full
+    cache first discards the least recently used one.
+
+    Looking an item up with C{[]} or L{get}, or setting it, makes it the most
+    recently used item.  Membership tests, L{peek} and iteration do not
+    change the order of the items.
+
+    Each operation takes constant time: the items are kept in a circular
+    doubly linked list ordered from least to most recently used, and a
+    dictionary maps each key to its link.
+
+    @ivar maxSize: The largest number of items the cache holds.
+    @type maxSize: C{int}
+
+    @ivar evicted: A callable which is called with the key and value of each
+        item discarded to make room for a new one, or C{None}.
+    """
+
+    def __init__(self, maxSize, evicted=None):
+        """
+        @param maxSize: See L{LRUCache.maxSize}.
+        @param evicted: See L{LRUCache.evicted}.
+        """
+        if maxSize < 1:
+            raise ValueError("maxSize must be at least 1, not %r" % (maxSize,))
+        self.maxSize = maxSize
+        self.evicted = evicted
+        self._links = {}
+        self._root = root = [None, None, None, None]
+        root[_PREV] = root[_NEXT] = root
+
+
+    def __len__(self):
+        return len(self._links)
+
+
+    def __contains__(self, key):
+        return key in self._links
+
+
+    def __iter__(self):
+        """
+        Iterate over the keys, from the least to the most recently used.
+        """
+        root = self._root
+        link = root[_NEXT]
+        while link is not root:
+            yield link[_KEY]
+            link = link[_NEXT]
+
+
+    def keys(self):
+        """
+        @return: A C{list} of the keys, from the least to the most recently
+            used.
+        """
+        return list(self)
+
+
+    def _unlink(self, link):
+        link[_PREV][_NEXT] = link[_NEXT]
+        link[_NEXT][_PREV] = link[_PREV]
+
+
+    def _append(self, link):
+        root = self._root
+        last = root[_PREV]
+        link[_PREV] = last
+        link[_NEXT] = root
+        last[_NEXT] = root[_PREV] = link
+
+
+    def __getitem__(self, key):
+        link = self._links[key]
+        self._unlink(link)
+        self._append(link)
+        return link[_VALUE]
+
+
+    def get(self, key, default=None):
+        """
+        Look up C{key}, making it the most recently used item if present.
+
+        @return: The value for C{key}, or C{default} if it is not present.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+    def peek(self, key, default=None):
+        """
+        Look up C{key} without changing the order of the items.
+
+        @return: The value for C{key}, or C{default} if it is not present.
+        """
+        link = self._links.get(key)
+        if link is None:
+            return default
+        return link[_VALUE]
+
+
+    def __setitem__(self, key, value):
+        link = self._links.get(key)
+        if link is not None:
+            self._unlink(link)
+            link[_VALUE] = value
+            self._append(link)
+            return
+        if len(self._links) >= self.maxSize:
+            oldest = self._root[_NEXT]
+            self._unlink(oldest)
+            del self._links[oldest[_KEY]]
+            if self.evicted is not None:
+                self.evicted(oldest[_KEY], oldest[_VALUE])
+        link = [None, None, key, value]
+        self._append(link)
+        self._links[key] = link
+
+
+    def __delitem__(self, key):
+        self._unlink(self._links.pop(key))
+
+
+    def pop(self, key, *default):
+        """
+        Remove C{key} and return its value.
+
+        @param default: If given, returned when C{key} is not present.
+        @raise KeyError: If C{key} is not present and no default is given.
+        """
+        link = self._links.pop(key, None)
+        if link is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._unlink(link)
+        return link[_VALUE]
+
+
+    def clear(self):
+        """
+        Remove all of the items.
+        """
+        self._links.clear()
+        root = self._root
+        root[_PREV] = root[_NEXT] = root
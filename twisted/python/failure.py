@@ -275,7 +275,7 @@ class Failure:
                 globalz = globalz.items()
             else:
                 localz = globalz = ()
-            stack.insert(0, (
+            stack.append((
                 f.f_code.co_name,
                 f.f_code.co_filename,
                 f.f_lineno,
@@ -283,6 +283,8 @@ class Failure:
                 globalz,
                 ))
             f = f.f_back
+        # The frames were found innermost first.
+        stack.reverse()
 
         while tb is not None:
             f = tb.tb_frame
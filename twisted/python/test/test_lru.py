@@ -0,0 +1,99 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.python._lru}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.python._lru import LRUCache
+
+
+
+class LRUCacheTests(SynchronousTestCase):
+    """
+    Tests for L{LRUCache}.
+    """
+
+    def test_invalidMaxSize(self):
+        """
+        L{LRUCache} raises L{ValueError} if C{maxSize} is less than 1.
+        """
+        self.assertRaises(ValueError, LRUCache, 0)
+
+
+    def test_mapping(self):
+        """
+        Items set in an L{LRUCache} can be looked up, tested for and removed.
+        """
+        cache = LRUCache(3)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(1, cache["a"])
+        self.assertEqual(2, cache.get("b"))
+        self.assertEqual(None, cache.get("c"))
+        self.assertIn("a", cache)
+        self.assertEqual(2, len(cache))
+        del cache["a"]
+        self.assertNotIn("a", cache)
+        self.assertRaises(KeyError, cache.__getitem__, "a")
+        self.assertEqual(2, cache.pop("b"))
+        self.assertEqual(None, cache.pop("b", None))
+        self.assertRaises(KeyError, cache.pop, "b")
+        self.assertEqual(0, len(cache))
+
+
+    def test_evictsLeastRecentlyUsed(self):
+        """
+        Setting a new item in a full L{LRUCache} discards the least recently
+        used item and passes it to C{evicted}.
+        """
+        evicted = []
+        cache = LRUCache(2, lambda key, value: evicted.append((key, value)))
+        cache["a"] = 1
+        cache["b"] = 2
+        cache["a"]
+        cache["c"] = 3
+        self.assertEqual(["a", "c"], cache.keys())
+        self.assertEqual([("b", 2)], evicted)
+
+
+    def test_setMovesToEnd(self):
+        """
+        Replacing the value of an item in an L{LRUCache} makes it the most
+        recently used item without discarding anything.
+        """
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache["a"] = 3
+        self.assertEqual(["b", "a"], cache.keys())
+        self.assertEqual(3, cache.peek("a"))
+
+
+    def test_peekDoesNotReorder(self):
+        """
+        L{LRUCache.peek} and membership tests do not change the order of the
+        items.
+        """
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(1, cache.peek("a"))
+        self.assertIn("a", cache)
+        self.assertEqual(None, cache.peek("c"))
+        self.assertEqual(["a", "b"], cache.keys())
+
+
+    def test_clear(self):
+        """
+        L{LRUCache.clear} removes all of the items.
+        """
+        cache = LRUCache(2)
+        cache["a"] = 1
+        cache.clear()
+        self.assertEqual([], cache.keys())
+        cache["b"] = 2
+        self.assertEqual(["b"], cache.keys())
@@ -2,15 +2,21 @@
 # Copyright (c) Twisted Matrix Laboratories.
 # See LICENSE for details.
 
-import os, errno, sys
+import os, errno, sys, socket
 
 from twisted.python import log, syslog, logfile, usage
 from twisted.python.util import switchUID, uidFromString, gidFromString
-from twisted.application import app, service
+from twisted.application import app, service, internet
+from twisted.internet.endpoints import TCP4ServerEndpoint, TCP6ServerEndpoint
 from twisted.internet.interfaces import IReactorDaemonize
 from twisted import copyright
 
 
+# The environment variable through which a twistd started with --workers
+# tells each worker process its index.
+WORKER_ENVIRONMENT_VARIABLE = "TWISTD_WORKER"
+
+
 def _umask(value):
     return int(value, 8)
 
@@ -41,6 +47,12 @@ class ServerOptions(app.ServerOptions):
                      ['gid', 'g', None, "The gid to run as.", gidFromString],
                      ['umask', None, None,
                       "The (octal) file creation mask to apply.", _umask],
+                     ['workers', None, 0,
+                      "Run the application in this many worker processes "
+                      "sharing its listening TCP ports (requires "
+                      "SO_REUSEPORT), restarting them when they exit.  "
+                      "Applications with other kinds of servers are "
+                      "refused.", int],
                     ]
 
     compData = usage.Completions(
@@ -61,10 +73,42 @@ class ServerOptions(app.ServerOptions):
 
 
     def postOptions(self):
+        """
+        Make the pidfile path absolute and check the C{workers} option.
+
+        If this process is one of the workers of a twistd started with
+        C{--workers}, as indicated by L{WORKER_ENVIRONMENT_VARIABLE}, set
+        C{worker} to its index and configure it to run in the foreground,
+        without a pidfile, and (unless syslog is used) to log to stdout, where
+        the supervising twistd will pick the messages up.  Otherwise, set
+        C{worker} to C{None}.
+        """
         app.ServerOptions.postOptions(self)
         if self['pidfile']:
             self['pidfile'] = os.path.abspath(self['pidfile'])
 
+        if self['workers'] < 0:
+            raise usage.UsageError(
+                "The number of workers must not be negative.")
+        if self['workers'] and getattr(socket, 'SO_REUSEPORT', None) is None:
+            raise usage.UsageError(
+                "Worker processes require SO_REUSEPORT, which is not "
+                "supported on this platform.")
+
+        self['worker'] = None
+        worker = os.environ.get(WORKER_ENVIRONMENT_VARIABLE)
+        if worker is not None:
+            try:
+                self['worker'] = int(worker)
+            except ValueError:
+                raise usage.UsageError(
+                    "Invalid %s value: %r" % (
+                        WORKER_ENVIRONMENT_VARIABLE, worker))
+            self['nodaemon'] = True
+            self['pidfile'] = ''
+            if not self['syslog']:
+                self['logfile'] = '-'
+
 
 def checkPID(pidfile):
     if not pidfile:
@@ -203,10 +247,54 @@ def launchWithName(name):
 
 
 
+def shareListeningPorts(application):
+    """
+    Make the TCP servers of C{application} listen with C{SO_REUSEPORT}, so
+    that the worker processes of a twistd started with C{--workers} can all
+    listen on the same addresses.
+
+    The servers which can be shared are L{internet.TCPServer} services and
+    L{internet.StreamServerEndpointService} services with a
+    L{TCP4ServerEndpoint} or L{TCP6ServerEndpoint}.  Ports which services
+    open in other ways do not use C{SO_REUSEPORT}, so only the first worker
+    can listen on them.
+
+    @param application: The application the workers will run.
+
+    @return: A C{list} of the services of C{application} which are servers
+        of some other kind, such as UDP or UNIX servers, and so cannot be
+        shared by the workers.
+    """
+    unshared = []
+    services = [application]
+    while services:
+        s = services.pop()
+        collection = service.IServiceCollection(s, None)
+        if collection is not None:
+            services.extend(collection)
+        if isinstance(s, internet._AbstractServer):
+            if s.method == 'TCP':
+                s.kwargs['reusePort'] = True
+            else:
+                unshared.append(s)
+        elif isinstance(s, internet.StreamServerEndpointService):
+            if isinstance(s.endpoint,
+                          (TCP4ServerEndpoint, TCP6ServerEndpoint)):
+                s.endpoint._reusePort = True
+            else:
+                unshared.append(s)
+    return unshared
+
+
+
 class UnixApplicationRunner(app.ApplicationRunner):
     """
     An ApplicationRunner which does Unix-specific things, like fork,
     shed privileges, and maintain a PID file.
+
+    When the C{workers} option is set, the process does not run the
+    application itself but supervises that many worker processes which do,
+    see L{superviseWorkers}.
     """
     loggerFactory = UnixAppLogger
 
@@ -227,11 +315,81 @@ class UnixApplicationRunner(app.ApplicationRunner):
         application and run the reactor. After the reactor stops,
         clean up PID files and such.
         """
+        if self.config.get('workers'):
+            unshared = shareListeningPorts(self.application)
+            if self.config.get('worker') is None:
+                if unshared:
+                    sys.exit(
+                        "The worker processes cannot share the ports of "
+                        "these servers, which are not TCP servers: %s" % (
+                            ", ".join(map(repr, unshared)),))
+                self.superviseWorkers()
+                return
         self.startApplication(self.application)
         self.startReactor(None, self.oldstdout, self.oldstderr)
         self.removePID(self.config['pidfile'])
 
 
+    def createWorkerMonitor(self, reactor, count):
+        """
+        Create a L{twisted.scripts._twistd_workers.WorkerMonitor} which runs
+        this twistd command line again C{count} times, with
+        L{WORKER_ENVIRONMENT_VARIABLE} set to the index of each worker.
+
+        @param reactor: The reactor the monitor will use.
+
+        @param count: The number of workers.
+        @type count: C{int}
+
+        @rtype: L{twisted.scripts._twistd_workers.WorkerMonitor}
+        """
+        # Importing procmon installs the default reactor, so wait until the
+        # application has been set up.
+        from twisted.scripts._twistd_workers import WorkerMonitor
+        monitor = WorkerMonitor(reactor)
+        args = [sys.executable] + sys.argv
+        for index in range(count):
+            env = os.environ.copy()
+            env[WORKER_ENVIRONMENT_VARIABLE] = str(index)
+            monitor.addProcess("worker-%d" % (index,), args, env=env)
+        return monitor
+
+
+    def superviseWorkers(self):
+        """
+        Daemonize and write the PID file as usual, then run the reactor with a
+        L{twisted.scripts._twistd_workers.WorkerMonitor} which keeps
+        C{workers} worker processes running.
+
+        Each worker loads the application again and runs it, listening on
+        its TCP ports with C{SO_REUSEPORT} so that the kernel spreads
+        incoming connections across the workers; see L{shareListeningPorts}.
+        The workers change their root and working directory and shed
+        privileges themselves, so this process keeps its own.  When it is
+        told to shut down, it stops the workers and waits for them to exit;
+        C{SIGHUP} is forwarded to them.
+        """
+        from twisted.internet import reactor
+        self.setupEnvironment(
+            None, '.', self.config['nodaemon'], self.config['umask'],
+            self.config['pidfile'])
+
+        monitor = self.createWorkerMonitor(reactor, self.config['workers'])
+        reactor.callWhenRunning(monitor.startService)
+        reactor.addSystemEventTrigger('before', 'shutdown', monitor.stopService)
+        try:
+            import signal
+        except ImportError:
+            pass
+        else:
+            def forwardHangup(signum, frame):
+                reactor.callFromThread(monitor.signalAll, 'HUP')
+            signal.signal(signal.SIGHUP, forwardHangup)
+
+        self.startReactor(None, self.oldstdout, self.oldstderr)
+        self.removePID(self.config['pidfile'])
+
+
     def removePID(self, pidfile):
         """
         Remove the specified PID file, if possible.  Errors are logged, not
@@ -0,0 +1,63 @@
+# -*- test-case-name: twisted.test.test_twistd -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Supervision of the worker processes of a twistd started with C{--workers}.
+"""
+
+from twisted.internet import defer, error
+from twisted.runner.procmon import ProcessMonitor
+
+
+
+class WorkerMonitor(ProcessMonitor):
+    """
+    A L{ProcessMonitor} for the worker processes of a twistd started with
+    C{--workers}.
+
+    Unlike L{ProcessMonitor}, stopping it waits for all of the workers to
+    exit, and signals can be forwarded to all of them.
+
+    @ivar _stopping: A L{defer.Deferred} which fires when the last worker
+        exits after the service is stopped, or C{None}.
+    """
+    _stopping = None
+
+    def signalAll(self, signalID):
+        """
+        Send a signal to all running workers.
+
+        @param signalID: A signal name as accepted by
+            L{IProcessTransport.signalProcess}, for example C{"HUP"}.
+        """
+        for proto in self.protocols.values():
+            try:
+                proto.transport.signalProcess(signalID)
+            except error.ProcessExitedAlready:
+                pass
+
+
+    def stopService(self):
+        """
+        Stop all workers.
+
+        @return: A L{defer.Deferred} which fires when they have all exited.
+        """
+        ProcessMonitor.stopService(self)
+        if not self.protocols:
+            return defer.succeed(None)
+        self._stopping = defer.Deferred()
+        return self._stopping
+
+
+    def connectionLost(self, name):
+        """
+        Restart the worker which exited or, if the service is stopping and it
+        was the last one, fire the L{defer.Deferred} returned by
+        L{stopService}.
+        """
+        ProcessMonitor.connectionLost(self, name)
+        if self._stopping is not None and not self.protocols:
+            stopping, self._stopping = self._stopping, None
+            stopping.callback(None)
@@ -0,0 +1,221 @@
+/*
+ * Copyright (c) Twisted Matrix Laboratories.
+ * See LICENSE for details.
+ */
+
+#define PY_SSIZE_T_CLEAN 1
+#include <Python.h>
+
+#if PY_VERSION_HEX < 0x02050000 && !defined(PY_SSIZE_T_MIN)
+/* This may cause some warnings, but if you want to get rid of them, upgrade
+ * your Python version.  */
+typedef int Py_ssize_t;
+#endif
+
+/*
+ * The number of base 128 digits which always fit in an unsigned long long.
+ */
+#define MAX_SHORT_DIGITS 9
+
+static char cbanana_doc[] = "\
+Compiled versions of the integer encoding functions used by\n\
+L{twisted.spread.banana}.\n\
+";
+
+static char cbanana_int2b128_doc[] = "\
+Encode a non-negative integer as a base 128 string, least significant digit\n\
+first, and pass it to C{stream}.\n\
+\n\
+@param integer: The integer to encode.\n\
+@type integer: C{int} or C{long}\n\
+\n\
+@param stream: A callable which is called with the encoded string.\n\
+";
+
+static char cbanana_b1282int_doc[] = "\
+Convert an integer represented as a base 128 string into an C{int} or\n\
+C{long}.\n\
+\n\
+@param st: The integer encoded in a string.\n\
+@type st: C{str}\n\
+\n\
+@return: The integer value extracted from the string.\n\
+@rtype: C{int} or C{long}\n\
+";
+
+
+/*
+ * Encode an integer too large for an unsigned long long, one digit at a time.
+ */
+static PyObject *cbanana_encodeLong(PyObject *integer) {
+    PyObject *digits = NULL, *mask = NULL, *seven = NULL, *digit, *next;
+    PyObject *result = NULL;
+    char c;
+    int nonzero;
+
+    Py_INCREF(integer);
+    if (!(digits = PyList_New(0)) ||
+        !(mask = PyInt_FromLong(0x7f)) ||
+        !(seven = PyInt_FromLong(7))) {
+        goto finished;
+    }
+
+    while ((nonzero = PyObject_IsTrue(integer)) == 1) {
+        if (!(digit = PyNumber_And(integer, mask))) {
+            goto finished;
+        }
+        c = (char)PyInt_AsLong(digit);
+        Py_DECREF(digit);
+        if (!(digit = PyString_FromStringAndSize(&c, 1))) {
+            goto finished;
+        }
+        if (PyList_Append(digits, digit) == -1) {
+            Py_DECREF(digit);
+            goto finished;
+        }
+        Py_DECREF(digit);
+        if (!(next = PyNumber_Rshift(integer, seven))) {
+            goto finished;
+        }
+        Py_DECREF(integer);
+        integer = next;
+    }
+    if (nonzero == -1) {
+        goto finished;
+    }
+
+    if ((digit = PyString_FromString(""))) {
+        result = _PyString_Join(digit, digits);
+        Py_DECREF(digit);
+    }
+
+  finished:
+    Py_DECREF(integer);
+    Py_XDECREF(digits);
+    Py_XDECREF(mask);
+    Py_XDECREF(seven);
+    return result;
+}
+
+
+static PyObject *cbanana_int2b128(PyObject *self, PyObject *args) {
+    PyObject *integer, *stream, *encoded, *result;
+    unsigned PY_LONG_LONG value;
+    char buffer[MAX_SHORT_DIGITS + 1];
+    Py_ssize_t length = 0;
+    int negative;
+
+    if (!PyArg_ParseTuple(args, "OO:int2b128", &integer, &stream)) {
+        return NULL;
+    }
+
+    if (PyInt_Check(integer)) {
+        long small = PyInt_AS_LONG(integer);
+        negative = small < 0;
+        value = (unsigned PY_LONG_LONG)small;
+    } else if (PyLong_Check(integer)) {
+        negative = _PyLong_Sign(integer) < 0;
+        if (!negative) {
+            value = PyLong_AsUnsignedLongLong(integer);
+            if (value == (unsigned PY_LONG_LONG)-1 && PyErr_Occurred()) {
+                if (!PyErr_ExceptionMatches(PyExc_OverflowError)) {
+                    return NULL;
+                }
+                PyErr_Clear();
+                if (!(encoded = cbanana_encodeLong(integer))) {
+                    return NULL;
+                }
+                result = PyObject_CallFunctionObjArgs(stream, encoded, NULL);
+                Py_DECREF(encoded);
+                return result;
+            }
+        }
+    } else {
+        PyErr_Format(PyExc_TypeError, "int2b128() argument must be int or "
+                     "long, not %.200s", Py_TYPE(integer)->tp_name);
+        return NULL;
+    }
+
+    if (negative) {
+        PyErr_SetString(PyExc_AssertionError,
+                        "can only encode positive integers");
+        return NULL;
+    }
+
+    do {
+        buffer[length++] = (char)(value & 0x7f);
+        value >>= 7;
+    } while (value);
+
+    return PyObject_CallFunction(stream, "s#", buffer, length);
+}
+
+
+static PyObject *cbanana_b1282int(PyObject *self, PyObject *args) {
+    const unsigned char *digits;
+    Py_ssize_t length, i;
+    unsigned PY_LONG_LONG value = 0;
+    PyObject *result, *seven, *digit, *next;
+
+    if (!PyArg_ParseTuple(args, "s#:b1282int", &digits, &length)) {
+        return NULL;
+    }
+
+    if (length <= MAX_SHORT_DIGITS) {
+        for (i = length - 1; i >= 0; i--) {
+            value = (value << 7) | (digits[i] & 0x7f);
+        }
+        if (value <= LONG_MAX) {
+            return PyInt_FromLong((long)value);
+        }
+        return PyLong_FromUnsignedLongLong(value);
+    }
+
+    if (!(seven = PyInt_FromLong(7))) {
+        return NULL;
+    }
+    if (!(result = PyLong_FromLong(0))) {
+        Py_DECREF(seven);
+        return NULL;
+    }
+    for (i = length - 1; i >= 0; i--) {
+        next = PyNumber_Lshift(result, seven);
+        Py_DECREF(result);
+        if (!next) {
+            Py_DECREF(seven);
+            return NULL;
+        }
+        if (!(digit = PyInt_FromLong(digits[i] & 0x7f))) {
+            Py_DECREF(next);
+            Py_DECREF(seven);
+            return NULL;
+        }
+        result = PyNumber_Or(next, digit);
+        Py_DECREF(next);
+        Py_DECREF(digit);
+        if (!result) {
+            Py_DECREF(seven);
+            return NULL;
+        }
+    }
+    Py_DECREF(seven);
+
+    /* Give back an int if the value fits in one. */
+    next = PyNumber_Int(result);
+    Py_DECREF(result);
+    return next;
+}
+
+
+static PyMethodDef cbanana_methods[] = {
+    {"int2b128", (PyCFunction) cbanana_int2b128,
+     METH_VARARGS, cbanana_int2b128_doc},
+    {"b1282int", (PyCFunction) cbanana_b1282int,
+     METH_VARARGS, cbanana_b1282int_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+
+PyMODINIT_FUNC init_cbanana(void) {
+    Py_InitModule3("_cbanana", cbanana_methods, cbanana_doc);
+}
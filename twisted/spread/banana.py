@@ -12,7 +12,7 @@ for more details.
 @author: Glyph Lefkowitz
 """
 
-import copy, cStringIO, struct
+import copy, cStringIO, struct, re
 
 from twisted.internet import protocol
 from twisted.persisted import styles
@@ -22,13 +22,24 @@ class BananaError(Exception):
     pass
 
 def int2b128(integer, stream):
-    if integer == 0:
-        stream(chr(0))
+    """
+    Encode a non-negative integer as a base 128 string, least significant
+    digit first, and pass it to C{stream}.
+
+    @param integer: The integer to encode.
+    @type integer: C{int} or C{long}
+
+    @param stream: A callable which is called with the encoded string.
+    """
+    if integer < 0x80:
+        assert integer >= 0, "can only encode positive integers"
+        stream(_digits[integer])
         return
-    assert integer > 0, "can only encode positive integers"
+    digits = []
     while integer:
-        stream(chr(integer & 0x7f))
+        digits.append(_digits[integer & 0x7f])
         integer = integer >> 7
+    stream(''.join(digits))
 
 
 def b1282int(st):
@@ -42,15 +53,25 @@ def b1282int(st):
     @return: The integer value extracted from the string.
     @rtype: C{int} or C{long}
     """
-    e = 1
     i = 0
-    for char in st:
-        n = ord(char)
-        i += (n * e)
-        e <<= 7
+    for char in reversed(st):
+        i = (i << 7) | ord(char)
     return i
 
 
+_digits = [chr(i) for i in range(0x80)]
+
+# The pure Python implementations, used if the compiled ones are not
+# available.
+_pyInt2b128 = int2b128
+_pyB1282int = b1282int
+
+try:
+    from twisted.spread._cbanana import int2b128, b1282int
+except ImportError:
+    pass
+
+
 # delimiter characters.
 LIST     = chr(0x80)
 INT      = chr(0x81)
@@ -65,6 +86,9 @@ VOCAB    = chr(0x87)
 
 HIGH_BIT_SET = chr(0x80)
 
+# Matches a type byte, which ends the prefix of every token.
+_typeByte = re.compile('[\x80-\xff]')
+
 def setPrefixLimit(limit):
     """
     Set the limit on the prefix length for all Banana connections
@@ -83,6 +107,8 @@ setPrefixLimit(64)
 
 SIZE_LIMIT = 640 * 1024   # 640k is all you'll ever need :-)
 
+_float = struct.Struct("!d")
+
 class Banana(protocol.Protocol, styles.Ephemeral):
     knownDialects = ["pb", "none"]
 
@@ -154,74 +180,117 @@ class Banana(protocol.Protocol, styles.Ephemeral):
 
     buffer = ''
 
+    # While the token at the start of buffer is incomplete, the number of
+    # bytes needed to complete it, if known, and the chunks received since
+    # (starting with buffer itself), which are only joined once there are
+    # enough of them.
+    _needed = 0
+    _chunks = None
+    _chunksLength = 0
+
+    # The offset in the buffer being decoded of the token being handled, so
+    # that if handling it raises an exception, the buffer is kept from there.
+    _pos = 0
+
     def dataReceived(self, chunk):
-        buffer = self.buffer + chunk
+        if self._needed:
+            if self._chunks is None:
+                self._chunks = [self.buffer]
+                self._chunksLength = len(self.buffer)
+            self._chunks.append(chunk)
+            self._chunksLength += len(chunk)
+            if self._chunksLength < self._needed:
+                return
+            buffer = ''.join(self._chunks)
+            self._chunks = None
+            self._needed = 0
+        else:
+            buffer = self.buffer + chunk
+        self._pos = 0
+        try:
+            self._pos = self._decode(buffer)
+        finally:
+            self.buffer = buffer[self._pos:]
+
+
+    def _decode(self, buffer):
+        """
+        Decode the tokens in C{buffer}, passing each complete item to
+        L{gotItem}.
+
+        The tokens are found by moving an offset through C{buffer}, rather
+        than by slicing off each token.  The offset of each token is stored
+        in C{_pos} before it is handled.
+
+        @return: The offset of the first incomplete token, or the length of
+            C{buffer}.
+        """
         listStack = self.listStack
         gotItem = self.gotItem
-        while buffer:
-            assert self.buffer != buffer, "This ain't right: %s %s" % (repr(self.buffer), repr(buffer))
-            self.buffer = buffer
-            pos = 0
-            for ch in buffer:
-                if ch >= HIGH_BIT_SET:
-                    break
-                pos = pos + 1
-            else:
-                if pos > self.prefixLimit:
-                    raise BananaError("Security precaution: more than %d bytes of prefix" % (self.prefixLimit,))
-                return
-            num = buffer[:pos]
-            typebyte = buffer[pos]
-            rest = buffer[pos+1:]
-            if len(num) > self.prefixLimit:
-                raise BananaError("Security precaution: longer than %d bytes worth of prefix" % (self.prefixLimit,))
+        prefixLimit = self.prefixLimit
+        search = _typeByte.search
+        end = len(buffer)
+        pos = 0
+        while pos < end:
+            self._pos = pos
+            match = search(buffer, pos, pos + prefixLimit + 1)
+            if match is None:
+                if end - pos > prefixLimit:
+                    raise BananaError("Security precaution: more than %d bytes of prefix" % (prefixLimit,))
+                return pos
+            typePos = match.start()
+            num = buffer[pos:typePos]
+            typebyte = buffer[typePos]
+            rest = typePos + 1
             if typebyte == LIST:
                 num = b1282int(num)
                 if num > SIZE_LIMIT:
                     raise BananaError("Security precaution: List too long.")
                 listStack.append((num, []))
-                buffer = rest
+                pos = rest
             elif typebyte == STRING:
                 num = b1282int(num)
                 if num > SIZE_LIMIT:
                     raise BananaError("Security precaution: String too long.")
-                if len(rest) >= num:
-                    buffer = rest[num:]
-                    gotItem(rest[:num])
+                if end - rest >= num:
+                    pos = rest + num
+                    gotItem(buffer[rest:pos])
                 else:
-                    return
+                    self._needed = rest + num - pos
+                    return pos
             elif typebyte == INT:
-                buffer = rest
+                pos = rest
                 num = b1282int(num)
                 gotItem(num)
             elif typebyte == LONGINT:
-                buffer = rest
+                pos = rest
                 num = b1282int(num)
                 gotItem(num)
             elif typebyte == LONGNEG:
-                buffer = rest
+                pos = rest
                 num = b1282int(num)
                 gotItem(-num)
             elif typebyte == NEG:
-                buffer = rest
+                pos = rest
                 num = -b1282int(num)
                 gotItem(num)
             elif typebyte == VOCAB:
-                buffer = rest
+                pos = rest
                 num = b1282int(num)
                 gotItem(self.incomingVocabulary[num])
             elif typebyte == FLOAT:
-                if len(rest) >= 8:
-                    buffer = rest[8:]
-                    gotItem(struct.unpack("!d", rest[:8])[0])
+                if end - rest >= 8:
+                    pos = rest + 8
+                    gotItem(_float.unpack_from(buffer, rest)[0])
                 else:
-                    return
+                    self._needed = rest + 8 - pos
+                    return pos
             else:
                 raise NotImplementedError(("Invalid Type Byte %r" % (typebyte,)))
             while listStack and (len(listStack[-1][1]) == listStack[-1][0]):
                 item = listStack.pop()[1]
                 gotItem(item)
-        self.buffer = ''
+        return pos
 
 
     def expressionReceived(self, lst):
@@ -354,5 +423,7 @@ def decode(st):
         _i.dataReceived(st)
     finally:
         _i.buffer = ''
+        _i._needed = 0
+        _i._chunks = None
         del _i.expressionReceived
     return l[0]
@@ -472,93 +472,41 @@ class _Jellier:
                 return preRef
             return obj.jellyFor(self)
         objType = type(obj)
-        if self.taster.isTypeAllowed(qual(objType)):
-            # "Immutable" Types
-            if ((objType is StringType) or
-                (objType is IntType) or
-                (objType is LongType) or
-                (objType is FloatType)):
-                return obj
-            elif objType is MethodType:
-                return ["method",
-                        obj.im_func.__name__,
-                        self.jelly(obj.im_self),
-                        self.jelly(obj.im_class)]
-
-            elif UnicodeType and objType is UnicodeType:
-                return ['unicode', obj.encode('UTF-8')]
-            elif objType is NoneType:
-                return ['None']
-            elif objType is FunctionType:
-                name = obj.__name__
-                return ['function', str(pickle.whichmodule(obj, obj.__name__))
-                        + '.' +
-                        name]
-            elif objType is ModuleType:
-                return ['module', obj.__name__]
-            elif objType is BooleanType:
-                return ['boolean', obj and 'true' or 'false']
-            elif objType is datetime.datetime:
-                if obj.tzinfo:
-                    raise NotImplementedError(
-                        "Currently can't jelly datetime objects with tzinfo")
-                return ['datetime', '%s %s %s %s %s %s %s' % (
-                    obj.year, obj.month, obj.day, obj.hour,
-                    obj.minute, obj.second, obj.microsecond)]
-            elif objType is datetime.time:
-                if obj.tzinfo:
-                    raise NotImplementedError(
-                        "Currently can't jelly datetime objects with tzinfo")
-                return ['time', '%s %s %s %s' % (obj.hour, obj.minute,
-                                                 obj.second, obj.microsecond)]
-            elif objType is datetime.date:
-                return ['date', '%s %s %s' % (obj.year, obj.month, obj.day)]
-            elif objType is datetime.timedelta:
-                return ['timedelta', '%s %s %s' % (obj.days, obj.seconds,
-                                                   obj.microseconds)]
+        entry = _jellyDispatch.get(objType)
+        if entry is None:
+            typeName = qual(objType)
+            method = None
+        else:
+            typeName, method = entry
+        if self.taster.isTypeAllowed(typeName):
+            if method is not None:
+                return method(self, obj)
             elif objType is ClassType or issubclass(objType, type):
                 return ['class', qual(obj)]
-            elif decimal is not None and objType is decimal.Decimal:
-                return self.jelly_decimal(obj)
             else:
+                # Instances
                 preRef = self._checkMutable(obj)
                 if preRef:
                     return preRef
-                # "Mutable" Types
                 sxp = self.prepare(obj)
-                if objType is ListType:
-                    sxp.extend(self._jellyIterable(list_atom, obj))
-                elif objType is TupleType:
-                    sxp.extend(self._jellyIterable(tuple_atom, obj))
-                elif objType in DictTypes:
-                    sxp.append(dictionary_atom)
-                    for key, val in obj.items():
-                        sxp.append([self.jelly(key), self.jelly(val)])
-                elif (_set is not None and objType is set or
-                      objType is _sets.Set):
-                    sxp.extend(self._jellyIterable(set_atom, obj))
-                elif (_set is not None and objType is frozenset or
-                      objType is _sets.ImmutableSet):
-                    sxp.extend(self._jellyIterable(frozenset_atom, obj))
-                else:
-                    className = qual(obj.__class__)
-                    persistent = None
-                    if self.persistentStore:
-                        persistent = self.persistentStore(obj, self)
-                    if persistent is not None:
-                        sxp.append(persistent_atom)
-                        sxp.append(persistent)
-                    elif self.taster.isClassAllowed(obj.__class__):
-                        sxp.append(className)
-                        if hasattr(obj, "__getstate__"):
-                            state = obj.__getstate__()
-                        else:
-                            state = obj.__dict__
-                        sxp.append(self.jelly(state))
+                className = qual(obj.__class__)
+                persistent = None
+                if self.persistentStore:
+                    persistent = self.persistentStore(obj, self)
+                if persistent is not None:
+                    sxp.append(persistent_atom)
+                    sxp.append(persistent)
+                elif self.taster.isClassAllowed(obj.__class__):
+                    sxp.append(className)
+                    if hasattr(obj, "__getstate__"):
+                        state = obj.__getstate__()
                     else:
-                        self.unpersistable(
-                            "instance of class %s deemed insecure" %
-                            qual(obj.__class__), sxp)
+                        state = obj.__dict__
+                    sxp.append(self.jelly(state))
+                else:
+                    self.unpersistable(
+                        "instance of class %s deemed insecure" %
+                        qual(obj.__class__), sxp)
                 return self.preserve(obj, sxp)
         else:
             if objType is InstanceType:
@@ -568,6 +516,119 @@ class _Jellier:
                                 (objType, obj))
 
 
+    # "Immutable" types, jellied without tracking references to them.
+
+    def _jellyAtom(self, obj):
+        return obj
+
+
+    def _jellyMethod(self, obj):
+        return ["method",
+                obj.im_func.__name__,
+                self.jelly(obj.im_self),
+                self.jelly(obj.im_class)]
+
+
+    def _jellyUnicode(self, obj):
+        return ['unicode', obj.encode('UTF-8')]
+
+
+    def _jellyNone(self, obj):
+        return ['None']
+
+
+    def _jellyFunction(self, obj):
+        name = obj.__name__
+        return ['function', str(pickle.whichmodule(obj, obj.__name__))
+                + '.' +
+                name]
+
+
+    def _jellyModule(self, obj):
+        return ['module', obj.__name__]
+
+
+    def _jellyBoolean(self, obj):
+        return ['boolean', obj and 'true' or 'false']
+
+
+    def _jellyDatetime(self, obj):
+        if obj.tzinfo:
+            raise NotImplementedError(
+                "Currently can't jelly datetime objects with tzinfo")
+        return ['datetime', '%s %s %s %s %s %s %s' % (
+            obj.year, obj.month, obj.day, obj.hour,
+            obj.minute, obj.second, obj.microsecond)]
+
+
+    def _jellyTime(self, obj):
+        if obj.tzinfo:
+            raise NotImplementedError(
+                "Currently can't jelly datetime objects with tzinfo")
+        return ['time', '%s %s %s %s' % (obj.hour, obj.minute,
+                                         obj.second, obj.microsecond)]
+
+
+    def _jellyDate(self, obj):
+        return ['date', '%s %s %s' % (obj.year, obj.month, obj.day)]
+
+
+    def _jellyTimedelta(self, obj):
+        return ['timedelta', '%s %s %s' % (obj.days, obj.seconds,
+                                           obj.microseconds)]
+
+
+    # "Mutable" types, which may be referred to more than once.
+
+    def _jellyMutable(self, obj, atom, items):
+        """
+        Jelly a container, or refer to it if it has already been jellied.
+
+        @param atom: The atom identifying the container's type.
+        @type atom: C{str}
+
+        @param items: A callable which returns the container's items, given
+            the container.
+        """
+        preRef = self._checkMutable(obj)
+        if preRef:
+            return preRef
+        sxp = self.prepare(obj)
+        sxp.append(atom)
+        jelly = self.jelly
+        for item in items(obj):
+            sxp.append(jelly(item))
+        return self.preserve(obj, sxp)
+
+
+    def _jellyList(self, obj):
+        return self._jellyMutable(obj, list_atom, iter)
+
+
+    def _jellyTuple(self, obj):
+        return self._jellyMutable(obj, tuple_atom, iter)
+
+
+    def _jellySet(self, obj):
+        return self._jellyMutable(obj, set_atom, iter)
+
+
+    def _jellyFrozenset(self, obj):
+        return self._jellyMutable(obj, frozenset_atom, iter)
+
+
+    def _jellyDictionary(self, obj):
+        preRef = self._checkMutable(obj)
+        if preRef:
+            return preRef
+        sxp = self.prepare(obj)
+        sxp.append(dictionary_atom)
+        jelly = self.jelly
+        for key, val in obj.items():
+            sxp.append([jelly(key), jelly(val)])
+        return self.preserve(obj, sxp)
+
+
     def _jellyIterable(self, atom, obj):
         """
         Jelly an iterable object.
@@ -616,6 +677,38 @@ class _Jellier:
 
 
 
+# Map the types _Jellier handles itself to their qualified names, which are
+# checked with the security taster, and the methods which jelly them.
+_jellyDispatch = {}
+for _types, _method in [
+    ((StringType, IntType, LongType, FloatType), _Jellier._jellyAtom),
+    ((MethodType,), _Jellier._jellyMethod),
+    ((UnicodeType,), _Jellier._jellyUnicode),
+    ((NoneType,), _Jellier._jellyNone),
+    ((FunctionType,), _Jellier._jellyFunction),
+    ((ModuleType,), _Jellier._jellyModule),
+    ((BooleanType,), _Jellier._jellyBoolean),
+    ((datetime.datetime,), _Jellier._jellyDatetime),
+    ((datetime.time,), _Jellier._jellyTime),
+    ((datetime.date,), _Jellier._jellyDate),
+    ((datetime.timedelta,), _Jellier._jellyTimedelta),
+    ((ListType,), _Jellier._jellyList),
+    ((TupleType,), _Jellier._jellyTuple),
+    (DictTypes, _Jellier._jellyDictionary),
+    ((_sets.Set,), _Jellier._jellySet),
+    ((_sets.ImmutableSet,), _Jellier._jellyFrozenset)]:
+    for _type in _types:
+        _jellyDispatch[_type] = (qual(_type), _method)
+if decimal is not None:
+    _jellyDispatch[decimal.Decimal] = (qual(decimal.Decimal),
+                                       _Jellier.jelly_decimal)
+if _set is not None:
+    _jellyDispatch[set] = (qual(set), _Jellier._jellySet)
+    _jellyDispatch[frozenset] = (qual(frozenset), _Jellier._jellyFrozenset)
+del _types, _method, _type
+
+
+
 class _Unjellier:
 
     def __init__(self, taster, persistentLoad, invoker):
@@ -662,9 +755,9 @@ class _Unjellier:
             if hasattr(inst, 'postUnjelly'):
                 self.postCallbacks.append(inst.postUnjelly)
             return inst
-        thunk = getattr(self, '_unjelly_%s'%jelType, None)
+        thunk = _unjellyDispatch.get(jelType)
         if thunk is not None:
-            ret = thunk(obj[1:])
+            ret = thunk(self, obj[1:])
         else:
             nameSplit = jelType.split('.')
             modName = '.'.join(nameSplit[:-1])
@@ -775,11 +868,13 @@ class _Unjellier:
 
 
     def _unjelly_tuple(self, lst):
-        l = range(len(lst))
+        l = list(lst)
         finished = 1
-        for elem in l:
-            if isinstance(self.unjellyInto(l, elem, lst[elem]), NotKnown):
-                finished = 0
+        for elem, item in enumerate(lst):
+            # Anything but a list is already unjellied.
+            if type(item) is ListType:
+                if isinstance(self.unjellyInto(l, elem, item), NotKnown):
+                    finished = 0
         if finished:
             return tuple(l)
         else:
@@ -787,9 +882,10 @@ class _Unjellier:
 
 
     def _unjelly_list(self, lst):
-        l = range(len(lst))
-        for elem in l:
-            self.unjellyInto(l, elem, lst[elem])
+        l = list(lst)
+        for elem, item in enumerate(lst):
+            if type(item) is ListType:
+                self.unjellyInto(l, elem, item)
         return l
 
 
@@ -802,12 +898,13 @@ class _Unjellier:
 
         @param containerType: the type of C{set} to use.
         """
-        l = range(len(lst))
+        l = list(lst)
         finished = True
-        for elem in l:
-            data = self.unjellyInto(l, elem, lst[elem])
-            if isinstance(data, NotKnown):
-                finished = False
+        for elem, item in enumerate(lst):
+            if type(item) is ListType:
+                data = self.unjellyInto(l, elem, item)
+                if isinstance(data, NotKnown):
+                    finished = False
         if not finished:
             return _Container(l, containerType)
         else:
@@ -841,6 +938,9 @@ class _Unjellier:
     def _unjelly_dictionary(self, lst):
         d = {}
         for k, v in lst:
+            if type(k) is not ListType and type(v) is not ListType:
+                d[k] = v
+                continue
             kvd = _DictKeyAndValue(d)
             self.unjellyInto(kvd, 0, k)
             self.unjellyInto(kvd, 1, v)
@@ -935,6 +1035,82 @@ class _Unjellier:
 
 
 
+# Map the type atoms _Unjellier handles itself to the methods which unjelly
+# them.
+_unjellyDispatch = {}
+for _name in dir(_Unjellier):
+    if _name.startswith('_unjelly_'):
+        _unjellyDispatch[_name[len('_unjelly_'):]] = getattr(_Unjellier, _name)
+del _name
+
+
+
+class _NotPlain(Exception):
+    """
+    (Internal) Raised by L{_jellyPlain} for an object which is not part of a
+    plain tree.
+    """
+
+
+
+_plainAtomTypes = {StringType: None, IntType: None, LongType: None,
+                   FloatType: None}
+
+def _jellyPlain(obj, seen):
+    """
+    (Internal) Jelly a tree of lists, tuples and dictionaries of strings,
+    numbers, C{unicode}, C{None} and booleans, in which no container appears
+    more than once, without the reference tracking and security checks of
+    L{_Jellier}.  The result is the same as L{_Jellier.jelly}'s.
+
+    @param seen: A C{dict} whose keys are the C{id}s of the containers
+        already jellied.
+
+    @raise _NotPlain: If C{obj} is not such a tree.
+    """
+    objType = type(obj)
+    if objType in _plainAtomTypes:
+        return obj
+    elif objType is ListType or objType is TupleType:
+        objId = id(obj)
+        if objId in seen:
+            raise _NotPlain()
+        seen[objId] = None
+        if objType is ListType:
+            sxp = [list_atom]
+        else:
+            sxp = [tuple_atom]
+        append = sxp.append
+        for item in obj:
+            if type(item) in _plainAtomTypes:
+                append(item)
+            else:
+                append(_jellyPlain(item, seen))
+        return sxp
+    elif objType is DictionaryType:
+        objId = id(obj)
+        if objId in seen:
+            raise _NotPlain()
+        seen[objId] = None
+        sxp = [dictionary_atom]
+        append = sxp.append
+        for key, val in obj.items():
+            if type(key) not in _plainAtomTypes:
+                key = _jellyPlain(key, seen)
+            if type(val) not in _plainAtomTypes:
+                val = _jellyPlain(val, seen)
+            append([key, val])
+        return sxp
+    elif objType is UnicodeType:
+        return ['unicode', obj.encode('UTF-8')]
+    elif objType is NoneType:
+        return ['None']
+    elif objType is BooleanType:
+        return ['boolean', obj and 'true' or 'false']
+    raise _NotPlain()
+
+
+
 class _Dummy:
     """
     (Internal) Dummy class, used for unserializing instances.
@@ -1123,6 +1299,10 @@ class SecurityOptions:
 globalSecurity = SecurityOptions()
 globalSecurity.allowBasicTypes()
 
+# The isTypeAllowed implementations which allow every builtin type.
+_plainTypesAllowed = (DummySecurityOptions.isTypeAllowed.im_func,
+                      SecurityOptions.isTypeAllowed.im_func)
+
 
 
 def jelly(object, taster=DummySecurityOptions(), persistentStore=None,
@@ -1134,6 +1314,14 @@ def jelly(object, taster=DummySecurityOptions(), persistentStore=None,
     optional 'taster' argument takes a SecurityOptions and will mark any
     insecure objects as unpersistable rather than serializing them.
     """
+    # Every builtin type is allowed by the stock security options, so a
+    # plain tree of them can skip the checks and reference tracking.
+    isTypeAllowed = getattr(taster.__class__, 'isTypeAllowed', None)
+    if getattr(isTypeAllowed, 'im_func', None) in _plainTypesAllowed:
+        try:
+            return _jellyPlain(object, {})
+        except _NotPlain:
+            pass
     return _Jellier(taster, persistentStore, invoker).jelly(object)
 
 
@@ -29,6 +29,7 @@ To get started, begin with L{PBClientFactory} and L{PBServerFactory}.
 
 import random
 import types
+import cStringIO
 
 from zope.interface import implements, Interface
 
@@ -36,6 +37,7 @@ from zope.interface import implements, Interface
 from twisted.python import log, failure, reflect
 from twisted.python.hashlib import md5
 from twisted.internet import defer, protocol
+from twisted.internet.interfaces import IConsumer, IPushProducer
 from twisted.cred.portal import Portal
 from twisted.cred.credentials import IAnonymous, ICredentials
 from twisted.cred.credentials import IUsernameHashedPassword, Anonymous
@@ -483,16 +485,387 @@ def failure2Copyable(fail, unsafeTracebacks=0):
 
 
 
+##
+# Streaming results
+##
+
+class StreamingResult(object):
+    """
+    A result which a remote method sends to its caller a page at a time,
+    rather than as a single answer.
+
+    Return one from a remote method, or fire the L{Deferred} it returns with
+    one, to send a result too large to serialize at once.  The caller's
+    L{Deferred} fires with a L{RemoteStream}, which delivers the items to a
+    consumer.  Both ends of the connection must support streaming.
+
+    The items come either from the iterable given to the initializer, which
+    is only advanced as pages are sent, or from calls to L{write}.  I am an
+    L{IConsumer}, so a producer can write the items: it is paused while a
+    page of items is waiting to be sent.  Call L{finish} or L{fail} to end a
+    stream of written items.
+
+    Pages are sent as the broker's transport has room for them, using
+    L{Broker.registerPageProducer}.
+
+    @ivar pageSize: The largest number of items sent in one page.
+    @type pageSize: C{int}
+
+    @ivar producer: The producer registered with me, or C{None}.
+    """
+    implements(IConsumer)
+
+    producer = None
+    _streamingProducer = False
+    _producerPaused = False
+
+    _broker = None
+    _requestID = None
+    _context = {}
+
+    def __init__(self, iterable=None, pageSize=100):
+        """
+        @param iterable: An iterable of the items to send, or C{None} if they
+            will be passed to L{write}.
+
+        @param pageSize: See L{StreamingResult.pageSize}.
+        """
+        if iterable is not None:
+            self._iterator = iter(iterable)
+        else:
+            self._iterator = None
+        self.pageSize = pageSize
+        self._items = []
+        self._done = False
+        self._failure = None
+        self._stillPaging = True
+        self._waiting = False
+
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+        self._streamingProducer = streaming
+        if not streaming:
+            producer.resumeProducing()
+
+
+    def unregisterProducer(self):
+        self.producer = None
+
+
+    def write(self, item):
+        """
+        Add an item to the stream.
+        """
+        if self._done:
+            return
+        self._items.append(item)
+        if (self._streamingProducer and not self._producerPaused and
+            len(self._items) >= self.pageSize):
+            self._producerPaused = True
+            self.producer.pauseProducing()
+        if self._waiting:
+            self.sendNextPage()
+
+
+    def finish(self):
+        """
+        End the stream once the items written so far have been sent.
+        """
+        if self._done:
+            return
+        self._done = True
+        if self._waiting:
+            self.sendNextPage()
+
+
+    def fail(self, reason=None):
+        """
+        End the stream with an error once the items written so far have been
+        sent.
+
+        @param reason: The L{failure.Failure} sent to the caller, or C{None}
+            to use the current exception.
+        """
+        if self._done:
+            return
+        if reason is None:
+            reason = failure.Failure()
+        self._failure = reason
+        self._done = True
+        if self._waiting:
+            self.sendNextPage()
+
+
+    def _readIterator(self):
+        """
+        Take items from the iterator until a page is full or it is exhausted.
+        """
+        while len(self._items) < self.pageSize:
+            try:
+                item = self._iterator.next()
+            except StopIteration:
+                self._iterator = None
+                self.finish()
+                return
+            except:
+                self._iterator = None
+                self.fail()
+                return
+            self._items.append(item)
+
+
+    def _begin(self, broker, requestID):
+        """
+        Start sending to the caller of a remote method.
+
+        @param broker: The L{Broker} connected to the caller.
+
+        @param requestID: The ID of the call being answered.
+        """
+        self._broker = broker
+        self._requestID = requestID
+
+
+    def stillPaging(self):
+        """
+        (internal) Method called by Broker.
+        """
+        return self._stillPaging
+
+
+    def sendNextPage(self):
+        """
+        (internal) Method called by Broker.
+        """
+        if not self._stillPaging:
+            return
+        self._waiting = False
+        if self._iterator is not None:
+            self._readIterator()
+        items = self._items
+        sent = bool(items)
+        if sent:
+            page = items[:self.pageSize]
+            del items[:self.pageSize]
+            self._broker._sendStreamPage(self._requestID, page, self._context)
+        if self.producer is not None and len(items) < self.pageSize:
+            if not self._streamingProducer:
+                if not self._done:
+                    self.producer.resumeProducing()
+            elif self._producerPaused:
+                self._producerPaused = False
+                self.producer.resumeProducing()
+        if not items:
+            if self._done:
+                self._stillPaging = False
+                self._broker._endStream(self._requestID, self._failure)
+            elif not sent:
+                self._waiting = True
+
+
+    def _stop(self):
+        """
+        Stop sending, because the caller asked for no more items or the
+        connection was lost.
+        """
+        self._stillPaging = False
+        self._done = True
+        self._items = []
+        if self.producer is not None:
+            self.producer.stopProducing()
+        if self._iterator is not None:
+            close = getattr(self._iterator, 'close', None)
+            self._iterator = None
+            if close is not None:
+                close()
+
+
+
+class RemoteStream(object):
+    """
+    The caller's end of a L{StreamingResult}: a remote method call's
+    L{Deferred} fires with one of these if the method streams its result.
+
+    Call L{consume} to have the items delivered to a consumer.  Items which
+    arrive before then, or while I am paused, are kept until they can be
+    delivered.  If more than L{maxBuffered} items are kept, reading from
+    the connection is paused, so the remote end stops sending as its
+    transport fills up.
+
+    @ivar broker: The L{Broker} the items arrive on.
+
+    @ivar requestID: The ID of the call this is the result of.
+
+    @ivar consumer: The consumer given to L{consume}, or C{None}.
+
+    @ivar paused: Whether the consumer has paused delivery.
+
+    @ivar maxBuffered: The number of kept items above which reading from the
+        connection is paused.
+    """
+    implements(IPushProducer)
+
+    maxBuffered = 1000
+    consumer = None
+    paused = False
+
+    def __init__(self, broker, requestID):
+        self.broker = broker
+        self.requestID = requestID
+        self._items = []
+        self._ended = False
+        self._reason = None
+        self._stopped = False
+        self._pausedTransport = False
+        self._deferred = defer.Deferred()
+
+
+    def consume(self, consumer):
+        """
+        Deliver the items to C{consumer}, by calling its C{write} method
+        with each one.  I am registered with it as a streaming producer, and
+        unregistered once every item has been delivered.
+
+        @param consumer: An L{IConsumer}.
+
+        @return: A L{Deferred} which fires with C{consumer} when every item
+            has been delivered or the consumer stops me, or fails if the
+            remote method fails while sending items or the connection is
+            lost.
+        """
+        if self.consumer is not None:
+            raise RuntimeError("%r is already being consumed" % (self,))
+        self.consumer = consumer
+        consumer.registerProducer(self, True)
+        self._deliver()
+        return self._deferred
+
+
+    def _deliver(self):
+        """
+        Deliver the kept items, until the consumer pauses me, and report the
+        end of the stream once they are all delivered.
+        """
+        if self.consumer is None or self._stopped:
+            return
+        items = self._items
+        delivered = 0
+        while delivered < len(items) and not self.paused:
+            item = items[delivered]
+            delivered += 1
+            self.consumer.write(item)
+            if self._stopped:
+                return
+        del items[:delivered]
+        if len(items) <= self.maxBuffered:
+            self._resumeTransport()
+        if self._ended and not items:
+            self._stopped = True
+            self.consumer.unregisterProducer()
+            if self._reason is None:
+                self._deferred.callback(self.consumer)
+            else:
+                self._deferred.errback(self._reason)
+
+
+    def _resumeTransport(self):
+        if self._pausedTransport:
+            self._pausedTransport = False
+            if not self.broker.disconnected:
+                self.broker.transport.resumeProducing()
+
+
+    def _gotItems(self, items):
+        """
+        (internal) Called by the broker when a page of items arrives.
+        """
+        if self._stopped:
+            return
+        self._items.extend(items)
+        self._deliver()
+        if len(self._items) > self.maxBuffered and not self._pausedTransport:
+            self._pausedTransport = True
+            self.broker.transport.pauseProducing()
+
+
+    def _finished(self, reason):
+        """
+        (internal) Called by the broker when the stream ends.
+
+        @param reason: C{None} if every item was sent, or the error the
+            remote method failed with, as passed to L{Deferred.errback}.
+        """
+        self._ended = True
+        self._reason = reason
+        if self.consumer is None and reason is not None:
+            # Nothing will deliver the items, so report the error now.
+            self._items = []
+        self._deliver()
+        if self.consumer is None and reason is not None:
+            self._stopped = True
+            self._resumeTransport()
+            self._deferred.errback(reason)
+
+
+    def pauseProducing(self):
+        """
+        Stop delivering items until L{resumeProducing} is called.
+        """
+        self.paused = True
+
+
+    def resumeProducing(self):
+        """
+        Deliver the items which arrived while I was paused, and those which
+        arrive from now on.
+        """
+        self.paused = False
+        self._deliver()
+
+
+    def stopProducing(self):
+        """
+        Discard the remaining items, and ask the remote end to stop sending
+        them.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self._items = []
+        self._resumeTransport()
+        if not self._ended:
+            self.broker._stopStream(self.requestID)
+        self._deferred.callback(self.consumer)
+
+
+
 class Broker(banana.Banana):
     """I am a broker for objects.
+
+    @ivar batchSize: If non-zero, outgoing messages are not written to the
+        transport one at a time, but collected and written together at the
+        end of the current reactor iteration, or as soon as this many bytes
+        are waiting.  Call L{flushBatch} to write them before closing the
+        transport directly.
+    @type batchSize: C{int}
     """
 
     version = 6
     username = None
     factory = None
+    batchSize = 0
 
-    def __init__(self, isClient=1, security=globalSecurity):
+    _batch = None
+    _batchCall = None
+
+    def __init__(self, isClient=1, security=globalSecurity, reactor=None):
+        """
+        @param reactor: The reactor used to schedule writing a batch of
+            messages, or C{None} for the global reactor.
+        """
         banana.Banana.__init__(self, isClient)
+        self._reactor = reactor
         self.disconnected = 0
         self.disconnects = []
         self.failures = []
@@ -500,6 +873,10 @@ class Broker(banana.Banana):
         self.localObjects = {}
         self.security = security
         self.pageProducers = []
+        # StreamingResults being sent, and RemoteStreams being received, by
+        # request ID.
+        self._outgoingStreams = {}
+        self._incomingStreams = {}
         self.currentRequestID = 0
         self.currentLocalID = 0
         self.unserializingPerspective = None
@@ -585,6 +962,49 @@ class Broker(banana.Banana):
         """
         self.sendEncoded(exp)
 
+
+    def sendEncoded(self, obj):
+        """
+        Encode an expression and write it to the transport, or add it to the
+        current batch if L{batchSize} is set.
+        """
+        if not self.batchSize:
+            banana.Banana.sendEncoded(self, obj)
+            return
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = cStringIO.StringIO()
+        start = batch.tell()
+        try:
+            self._encode(obj, batch.write)
+        except:
+            # Leave no partly encoded expression behind.
+            batch.seek(start)
+            batch.truncate()
+            raise
+        if batch.tell() >= self.batchSize:
+            self.flushBatch()
+        elif self._batchCall is None:
+            reactor = self._reactor
+            if reactor is None:
+                from twisted.internet import reactor
+            self._batchCall = reactor.callLater(0, self.flushBatch)
+
+
+    def flushBatch(self):
+        """
+        Write the current batch of messages to the transport now.
+        """
+        if self._batchCall is not None:
+            if self._batchCall.active():
+                self._batchCall.cancel()
+            self._batchCall = None
+        batch = self._batch
+        self._batch = None
+        if batch is not None and batch.tell():
+            self.transport.write(batch.getvalue())
+
+
     def proto_didNotUnderstand(self, command):
         """Respond to stock 'C{didNotUnderstand}' message.
 
@@ -622,6 +1042,10 @@ class Broker(banana.Banana):
         """The connection was lost.
         """
         self.disconnected = 1
+        if self._batchCall is not None:
+            self._batchCall.cancel()
+            self._batchCall = None
+        self._batch = None
         # nuke potential circular references.
         self.luids = None
         if self.waitingForAnswers:
@@ -646,6 +1070,18 @@ class Broker(banana.Banana):
             except:
                 log.deferr()
         self.disconnects = None
+        for result in self._outgoingStreams.values():
+            try:
+                result._stop()
+            except:
+                log.deferr()
+        self._outgoingStreams = {}
+        for stream in self._incomingStreams.values():
+            try:
+                stream._finished(failure.Failure(PBConnectionLost(reason)))
+            except:
+                log.deferr()
+        self._incomingStreams = {}
         self.waitingForAnswers = None
         self.localSecurity = None
         self.remoteSecurity = None
@@ -787,6 +1223,9 @@ class Broker(banana.Banana):
 
     def serialize(self, object, perspective=None, method=None, args=None, kw=None):
         """Jelly an object according to the remote security rules for this broker.
+
+        A L{StreamingResult} is not jellied; each page of its items is, using
+        the same arguments.
         """
 
         if isinstance(object, defer.Deferred):
@@ -799,6 +1238,14 @@ class Broker(banana.Banana):
                 })
             return object
 
+        if isinstance(object, StreamingResult):
+            object._context = {
+                'perspective': perspective,
+                'method': method,
+                'args': args,
+                'kw': kw}
+            return object
+
         # XXX This call is NOT REENTRANT and testing for reentrancy is just
         # crazy, so it likely won't be.  Don't ever write methods that call the
         # broker's serialize() method recursively (e.g. sending a method call
@@ -923,7 +1370,10 @@ class Broker(banana.Banana):
     def _sendAnswer(self, netResult, requestID):
         """(internal) Send an answer to a previously sent message.
         """
-        self.sendCall("answer", requestID, netResult)
+        if isinstance(netResult, StreamingResult):
+            self._sendStream(netResult, requestID)
+        else:
+            self.sendCall("answer", requestID, netResult)
 
     def proto_answer(self, requestID, netResult):
         """(internal) Got an answer to a previously sent message.
@@ -957,6 +1407,12 @@ class Broker(banana.Banana):
     def _sendError(self, fail, requestID):
         """(internal) Send an error for a previously sent message.
         """
+        self.sendCall("error", requestID, self._serializeError(fail))
+
+
+    def _serializeError(self, fail):
+        """(internal) Serialize an error to be sent to the peer.
+        """
         if isinstance(fail, failure.Failure):
             # If the failures value is jellyable or allowed through security,
             # send the value
@@ -967,7 +1423,7 @@ class Broker(banana.Banana):
                 fail = failure2Copyable(fail, self.factory.unsafeTracebacks)
         if isinstance(fail, CopyableFailure):
             fail.unsafeTracebacks = self.factory.unsafeTracebacks
-        self.sendCall("error", requestID, self.serialize(fail))
+        return self.serialize(fail)
 
     def proto_error(self, requestID, fail):
         """(internal) Deal with an error.
@@ -976,6 +1432,95 @@ class Broker(banana.Banana):
         del self.waitingForAnswers[requestID]
         d.errback(self.unserialize(fail))
 
+    ##
+    # streaming
+    ##
+
+    def _sendStream(self, result, requestID):
+        """(internal) Start sending a L{StreamingResult} as the answer to a
+        previously sent message.
+        """
+        result._begin(self, requestID)
+        self._outgoingStreams[requestID] = result
+        self.sendCall("stream", requestID)
+        self.registerPageProducer(result)
+
+
+    def _sendStreamPage(self, requestID, items, context):
+        """(internal) Send a page of items of a L{StreamingResult}.
+        """
+        self.sendCall(
+            "streampage", requestID, self.serialize(items, **context))
+
+
+    def _endStream(self, requestID, fail):
+        """(internal) Tell the peer a L{StreamingResult} has been sent, or has
+        failed with C{fail}.
+        """
+        self._outgoingStreams.pop(requestID, None)
+        if fail is None:
+            self.sendCall("streamend", requestID)
+        else:
+            if fail.check(Error) is None:
+                log.msg("Peer will receive following PB traceback:")
+                log.err(fail)
+            self.sendCall("streamerror", requestID, self._serializeError(fail))
+
+
+    def _stopStream(self, requestID):
+        """(internal) Ask the peer to stop sending a stream.
+        """
+        if self._incomingStreams.pop(requestID, None) is not None:
+            self.sendCall("streamstop", requestID)
+
+
+    def proto_stream(self, requestID):
+        """(internal) The answer to a previously sent message is a stream.
+        """
+        d = self.waitingForAnswers.pop(requestID)
+        stream = RemoteStream(self, requestID)
+        self._incomingStreams[requestID] = stream
+        d.callback(stream)
+
+
+    def proto_streampage(self, requestID, netItems):
+        """(internal) Got a page of a stream's items.
+        """
+        items = self.unserialize(netItems)
+        stream = self._incomingStreams.get(requestID)
+        if stream is not None:
+            stream._gotItems(items)
+
+
+    def proto_streamend(self, requestID):
+        """(internal) Got every item of a stream.
+        """
+        stream = self._incomingStreams.pop(requestID, None)
+        if stream is not None:
+            stream._finished(None)
+
+
+    def proto_streamerror(self, requestID, fail):
+        """(internal) A stream failed.
+        """
+        fail = self.unserialize(fail)
+        stream = self._incomingStreams.pop(requestID, None)
+        if stream is not None:
+            stream._finished(fail)
+
+
+    def proto_streamstop(self, requestID):
+        """(internal) The peer wants no more of a stream's items.
+        """
+        result = self._outgoingStreams.pop(requestID, None)
+        if result is None:
+            return
+        result._stop()
+        if result in self.pageProducers:
+            self.pageProducers.remove(result)
+            if not self.pageProducers:
+                self.transport.unregisterProducer()
+
     ##
     # refcounts
     ##
@@ -1078,6 +1623,9 @@ class PBClientFactory(protocol.ClientFactory):
     protocol = Broker
     unsafeTracebacks = False
 
+    # If non-zero, the batchSize given to the brokers built.
+    batchSize = 0
+
     def __init__(self, unsafeTracebacks=False, security=globalSecurity):
         """
         @param unsafeTracebacks: if set, tracebacks for exceptions will be sent
@@ -1099,6 +1647,8 @@ class PBClientFactory(protocol.ClientFactory):
         """
         p = self.protocol(isClient=True, security=self.security)
         p.factory = self
+        if self.batchSize:
+            p.batchSize = self.batchSize
         return p
 
 
@@ -1153,6 +1703,7 @@ class PBClientFactory(protocol.ClientFactory):
         is called.
         """
         if self._broker:
+            self._broker.flushBatch()
             self._broker.transport.loseConnection()
 
     def _cbSendUsername(self, root, username, password, client):
@@ -1225,6 +1776,9 @@ class PBServerFactory(protocol.ServerFactory):
     # object broker factory
     protocol = Broker
 
+    # If non-zero, the batchSize given to the brokers built.
+    batchSize = 0
+
     def __init__(self, root, unsafeTracebacks=False, security=globalSecurity):
         """
         @param root: factory providing the root Referenceable used by the broker.
@@ -1249,6 +1803,8 @@ class PBServerFactory(protocol.ServerFactory):
         """
         proto = self.protocol(isClient=False, security=self.security)
         proto.factory = self
+        if self.batchSize:
+            proto.batchSize = self.batchSize
         proto.setNameForLocal("root", self.root.rootObject(proto))
         return proto
 
@@ -1429,6 +1985,7 @@ __all__ = [
     'ProtocolError', 'DeadReferenceError', 'Error', 'PBConnectionLost',
     'RemoteMethod', 'IPerspective', 'Avatar', 'AsReferenceable',
     'RemoteReference', 'CopyableFailure', 'CopiedFailure', 'failure2Copyable',
-    'Broker', 'respond', 'challenge', 'PBClientFactory', 'PBServerFactory',
+    'StreamingResult', 'RemoteStream', 'Broker', 'respond', 'challenge',
+    'PBClientFactory', 'PBServerFactory',
     'IUsernameMD5Password',
     ]
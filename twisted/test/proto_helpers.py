@@ -425,10 +425,11 @@ class MemoryReactor(object):
         return _FakePort(addr)
 
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
         """
         Fake L{reactor.listenTCP}, that logs the call and returns an
-        L{IListeningPort}.
+        L{IListeningPort}.  C{reusePort} is ignored.
         """
         self.tcpServers.append((port, factory, backlog, interface))
         if isIPv6Address(interface):
@@ -528,7 +529,8 @@ class RaisingMemoryReactor(object):
         raise self._listenException
 
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
         """
         Fake L{reactor.listenTCP}, that raises L{self._listenException}.
         """
@@ -11,16 +11,116 @@ from twisted.python import failure
 from twisted.internet import protocol, main
 
 
+try:
+    from twisted.spread import _cbanana
+except ImportError:
+    _cbanana = None
+
+
+
 class MathTestCase(unittest.TestCase):
+    int2b128 = staticmethod(banana.int2b128)
+    b1282int = staticmethod(banana.b1282int)
+
     def testInt2b128(self):
         funkylist = range(0,100) + range(1000,1100) + range(1000000,1000100) + [1024 **10l]
         for i in funkylist:
             x = StringIO.StringIO()
-            banana.int2b128(i, x.write)
+            self.int2b128(i, x.write)
             v = x.getvalue()
-            y = banana.b1282int(v)
+            y = self.b1282int(v)
             assert y == i, "y = %s; i = %s" % (y,i)
 
+
+    def test_encoding(self):
+        """
+        C{int2b128} writes the base 128 digits of an integer, least
+        significant first, in a single call.
+        """
+        for value, digits in [(0, '\x00'), (0x7f, '\x7f'), (0x80, '\x00\x01'),
+                              (2 ** 64, '\x00' * 9 + '\x02'),
+                              (2 ** 64 - 1, '\x7f' * 9 + '\x01')]:
+            written = []
+            self.int2b128(value, written.append)
+            self.assertEqual(written, [digits])
+
+
+    def test_encodeNegative(self):
+        """
+        C{int2b128} refuses to encode a negative integer.
+        """
+        self.assertRaises(AssertionError, self.int2b128, -1, lambda s: None)
+        self.assertRaises(
+            AssertionError, self.int2b128, -2 ** 70, lambda s: None)
+
+
+    def test_decodeType(self):
+        """
+        C{b1282int} returns an C{int} for values which fit in one, however many
+        digits encode them, and a C{long} otherwise.
+        """
+        self.assertIdentical(type(self.b1282int('\x01' + '\x00' * 12)), int)
+        self.assertEqual(self.b1282int('\x01' + '\x00' * 12), 1)
+        self.assertEqual(self.b1282int('\x00' * 9 + '\x02'), 2 ** 64)
+        self.assertEqual(self.b1282int('\x00' * 20 + '\x01'), 2 ** 140)
+        self.assertEqual(self.b1282int(''), 0)
+
+
+
+class PythonMathTests(MathTestCase):
+    """
+    Tests for the pure Python integer encoding functions, which are used when
+    the compiled ones are not available.
+    """
+    int2b128 = staticmethod(banana._pyInt2b128)
+    b1282int = staticmethod(banana._pyB1282int)
+
+    def test_decodeType(self):
+        """
+        C{b1282int} returns an C{int} for values which fit in one, and a
+        C{long} otherwise.
+        """
+        self.assertIdentical(type(self.b1282int('\x01\x00')), int)
+        self.assertEqual(self.b1282int('\x00' * 9 + '\x02'), 2 ** 64)
+        self.assertEqual(self.b1282int('\x00' * 20 + '\x01'), 2 ** 140)
+        self.assertEqual(self.b1282int(''), 0)
+
+
+
+class CompiledMathTests(MathTestCase):
+    """
+    Tests for the compiled integer encoding functions.
+    """
+    if _cbanana is None:
+        skip = "twisted.spread._cbanana is not available"
+    else:
+        int2b128 = staticmethod(_cbanana.int2b128)
+        b1282int = staticmethod(_cbanana.b1282int)
+
+
+    def test_matchesPython(self):
+        """
+        The compiled functions encode and decode the same way as the pure
+        Python ones.
+        """
+        values = [0, 1, 127, 128, 2 ** 31, 2 ** 63 - 1, 2 ** 63, 2 ** 64,
+                  3 ** 100]
+        for value in values:
+            compiled, python = [], []
+            self.int2b128(value, compiled.append)
+            banana._pyInt2b128(value, python.append)
+            self.assertEqual(compiled, python)
+            self.assertEqual(self.b1282int(python[0]),
+                             banana._pyB1282int(python[0]))
+
+
+    def test_badType(self):
+        """
+        The compiled C{int2b128} raises L{TypeError} for a non-integer.
+        """
+        self.assertRaises(TypeError, self.int2b128, 1.0, lambda s: None)
+        self.assertRaises(TypeError, self.int2b128, "1", lambda s: None)
+
 class BananaTestCase(unittest.TestCase):
 
     encClass = banana.Banana
@@ -183,6 +283,57 @@ class BananaTestCase(unittest.TestCase):
     def feed(self, data):
         for byte in data:
             self.enc.dataReceived(byte)
+    def test_partialLargeString(self):
+        """
+        A large string delivered in many chunks is decoded once the last
+        chunk arrives, and data following it in the same chunk is decoded
+        too.
+        """
+        value = 'x' * 100000
+        self.enc.sendEncoded(value)
+        self.enc.sendEncoded(1)
+        data = self.io.getvalue()
+        results = []
+        self.enc.expressionReceived = results.append
+        for i in range(0, len(data), 1000):
+            self.enc.dataReceived(data[i:i + 1000])
+        self.assertEqual(results, [value, 1])
+        self.assertEqual(self.enc.buffer, '')
+
+
+    def test_manyItems(self):
+        """
+        Many items delivered in one chunk are all decoded, in order.
+        """
+        values = [1, -2, 'three', 4.0, [5, ['six']], 2 ** 70, -2 ** 70]
+        for value in values:
+            self.enc.sendEncoded(value)
+        results = []
+        self.enc.expressionReceived = results.append
+        self.enc.dataReceived(self.io.getvalue())
+        self.assertEqual(results, values)
+
+
+    def test_expressionReceivedRaises(self):
+        """
+        If C{expressionReceived} raises an exception for an item, the
+        exception propagates from C{dataReceived}, and the buffer is kept
+        from the token of that item, after the items handled before it.
+        """
+        for value in ['one', 2, 'three']:
+            self.enc.sendEncoded(value)
+        data = self.io.getvalue()
+        results = []
+        def expressionReceived(item):
+            if item == 2:
+                raise ZeroDivisionError()
+            results.append(item)
+        self.enc.expressionReceived = expressionReceived
+        self.assertRaises(ZeroDivisionError, self.enc.dataReceived, data)
+        self.assertEqual(results, ['one'])
+        self.assertEqual(self.enc.buffer, data[len('\x03\x82one'):])
+
+
     def testOversizedList(self):
         data = '\x02\x01\x01\x01\x01\x80'
         # list(size=0x0101010102, about 4.3e9)
@@ -856,6 +856,58 @@ class DeferredTestCase(unittest.SynchronousTestCase, ImmediateFailureMixin):
         self.assertIdentical(a._chainedTo, b)
 
 
+    def test_noInstanceDictionary(self):
+        """
+        L{Deferred} instances have no C{__dict__}, so arbitrary attributes
+        cannot be set on them, but instances of subclasses can still have
+        them.
+        """
+        d = defer.Deferred()
+        self.assertRaises(AttributeError, setattr, d, 'foo', 1)
+
+        class SubclassedDeferred(defer.Deferred):
+            pass
+        d = SubclassedDeferred()
+        d.foo = 1
+        self.assertEqual(d.foo, 1)
+
+
+    def test_callbacksRemovedWhenRun(self):
+        """
+        Each callback is removed from C{callbacks} once it has run, including
+        callbacks added by other callbacks, which run after those already
+        added.
+        """
+        d = defer.Deferred()
+        results = []
+        def first(result):
+            d.addCallback(lambda result: results.append(('third', result)))
+            results.append(('first', result))
+            return result + 1
+        d.addCallback(first)
+        d.addCallback(lambda result: results.append(('second', result)))
+        d.callback(1)
+        self.assertEqual(
+            results, [('first', 1), ('second', 2), ('third', None)])
+        self.assertEqual(d.callbacks, [])
+
+
+    def test_passthruSteps(self):
+        """
+        Errbacks added by L{Deferred.addCallback} and callbacks added by
+        L{Deferred.addErrback} pass the result on unchanged.
+        """
+        d = defer.Deferred()
+        d.addErrback(self.fail)
+        d.addCallback(lambda result: 1 // 0)
+        d.addCallback(self.fail)
+        failures = []
+        d.addErrback(failures.append)
+        d.callback(None)
+        self.assertEqual(len(failures), 1)
+        failures[0].trap(ZeroDivisionError)
+
+
     def test_explicitChainClearedWhenResolved(self):
         """
         Any recorded chaining is cleared once the chaining is resolved, since
@@ -1606,9 +1658,9 @@ class LogTestCase(unittest.SynchronousTestCase):
         Same as L{test_errorLogWithInnerFrameRef}, plus create a cycle.
         """
         def _subErrorLogWithInnerFrameCycle():
-            d = defer.Deferred()
+            # The canceller refers to the Deferred, making a cycle.
+            d = defer.Deferred(lambda ignored: d)
             d.addCallback(lambda x, d=d: 1 // 0)
-            d._d = d
             d.callback(1)
 
         _subErrorLogWithInnerFrameCycle()
@@ -420,6 +420,44 @@ class JellyTestCase(unittest.TestCase):
         self.assertIdentical(z[0][0], z)
 
 
+    def test_plainTree(self):
+        """
+        A tree of builtin containers and atoms is jellied the same way
+        whether or not it takes the fast path for such trees.
+        """
+        tree = [1, 2L ** 70, 1.5, 'x', u'\N{SNOWMAN}', None, True, False,
+                (), [], {}, ('a', ['b', {'c': (1, 2), 3: [None]}]),
+                {(1, 2): u'x', None: [True]}]
+        for taster in [jelly.DummySecurityOptions(), jelly.globalSecurity]:
+            full = jelly._Jellier(taster, None, None).jelly(tree)
+            self.assertEqual(jelly.jelly(tree, taster), full)
+            self.assertEqual(jelly.unjelly(full, taster), tree)
+
+
+    def test_plainTreeSharedContainer(self):
+        """
+        A container which appears more than once in an otherwise plain tree
+        is jellied as a reference.
+        """
+        shared = ['shared']
+        tree = [shared, (shared,), {'key': shared}]
+        result = jelly.unjelly(jelly.jelly(tree))
+        self.assertIdentical(result[0], result[1][0])
+        self.assertIdentical(result[0], result[2]['key'])
+
+
+    def test_plainTreeCustomTaster(self):
+        """
+        A plain tree is checked by a taster which overrides
+        C{isTypeAllowed}.
+        """
+        class NoTuples(jelly.SecurityOptions):
+            def isTypeAllowed(self, typeName):
+                return typeName != '__builtin__.tuple'
+        self.assertRaises(jelly.InsecureJelly, jelly.jelly, [1, (2,)],
+                          NoTuples())
+
+
     def test_unicode(self):
         x = unicode('blah')
         y = jelly.unjelly(jelly.jelly(x))
@@ -18,13 +18,15 @@ from zope.interface import implements, Interface
 
 from twisted.trial import unittest
 from twisted.spread import pb, util, publish, jelly
-from twisted.internet import protocol, main, reactor
+from twisted.internet import protocol, main, reactor, task
 from twisted.internet.error import ConnectionRefusedError
 from twisted.internet.defer import Deferred, gatherResults, succeed
 from twisted.protocols.policies import WrappingFactory
 from twisted.python import failure, log
 from twisted.cred.error import UnauthorizedLogin, UnhandledCredentials
 from twisted.cred import portal, checkers, credentials
+from twisted.spread import banana
+from twisted.test.proto_helpers import StringTransport
 
 
 class Dummy(pb.Viewable):
@@ -946,6 +948,437 @@ class PagingTestCase(unittest.TestCase):
 
 
 
+class Streamer(pb.Referenceable):
+    """
+    A remote object whose methods stream their results.
+
+    @ivar produced: The items taken from the iterator so far.
+    @ivar closed: Whether the iterator was closed before it was exhausted.
+    @ivar result: The last L{pb.StreamingResult} made by L{remote_written}.
+    """
+    def __init__(self):
+        self.produced = []
+        self.closed = False
+        self.result = None
+
+
+    def _items(self, count, failAfter):
+        try:
+            for i in range(count):
+                if i == failAfter:
+                    raise RuntimeError("failed at %d" % (i,))
+                self.produced.append(i)
+                yield i
+        except GeneratorExit:
+            self.closed = True
+            raise
+
+
+    def remote_iterate(self, count, pageSize, failAfter=None):
+        return pb.StreamingResult(self._items(count, failAfter), pageSize)
+
+
+    def remote_written(self, pageSize):
+        self.result = pb.StreamingResult(pageSize=pageSize)
+        return succeed(self.result)
+
+
+
+class ListConsumer(object):
+    """
+    A consumer which keeps the items written to it.
+
+    @ivar items: The items written.
+    @ivar producer: The registered producer, or C{None}.
+    @ivar stopAfter: The number of items after which to stop the producer,
+        or C{None}.
+    """
+    producer = None
+    stopAfter = None
+
+    def __init__(self):
+        self.items = []
+
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+
+
+    def unregisterProducer(self):
+        self.producer = None
+
+
+    def write(self, item):
+        self.items.append(item)
+        if len(self.items) == self.stopAfter:
+            self.producer.stopProducing()
+
+
+
+class PushProducer(object):
+    """
+    A streaming producer which records whether it is paused or stopped.
+    """
+    paused = False
+    stopped = False
+
+    def pauseProducing(self):
+        self.paused = True
+
+
+    def resumeProducing(self):
+        self.paused = False
+
+
+    def stopProducing(self):
+        self.stopped = True
+
+
+
+class StreamingTestCase(unittest.TestCase):
+    """
+    Tests for results streamed with L{pb.StreamingResult} and received as a
+    L{pb.RemoteStream}.
+    """
+
+    def setUp(self):
+        self.client, self.server, self.pump = connectedServerAndClient()
+        self.streamer = Streamer()
+        self.server.setNameForLocal("streamer", self.streamer)
+        self.remote = self.client.remoteForName("streamer")
+
+
+    def _stream(self, *args):
+        """
+        Call a method of L{Streamer} and return the L{pb.RemoteStream} it
+        answers with.
+        """
+        streams = []
+        self.remote.callRemote(*args).addCallback(streams.append)
+        while not streams:
+            self.pump.pump()
+        self.assertIsInstance(streams[0], pb.RemoteStream)
+        return streams[0]
+
+
+    def test_iterable(self):
+        """
+        The items of an iterable returned in a L{pb.StreamingResult} are
+        delivered to the consumer of the L{pb.RemoteStream}, which is
+        unregistered and passed to the L{Deferred} returned by
+        L{pb.RemoteStream.consume} at the end of the stream.
+        """
+        stream = self._stream("iterate", 25, 10)
+        consumer = ListConsumer()
+        results = []
+        stream.consume(consumer).addCallback(results.append)
+        self.assertIdentical(consumer.producer, stream)
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(25))
+        self.assertEqual(results, [consumer])
+        self.assertIdentical(consumer.producer, None)
+        self.assertEqual(self.server._outgoingStreams, {})
+        self.assertEqual(self.client._incomingStreams, {})
+
+
+    def test_paged(self):
+        """
+        The iterator is only advanced a page at a time, as the transport has
+        room for more data.
+        """
+        stream = self._stream("iterate", 100, 10)
+        self.assertTrue(len(self.streamer.produced) <= 20)
+        consumer = ListConsumer()
+        stream.consume(consumer)
+        self.pump.pump()
+        self.assertTrue(len(self.streamer.produced) <= 30)
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(100))
+
+
+    def test_itemsBeforeConsume(self):
+        """
+        Items which arrive before L{pb.RemoteStream.consume} is called are
+        delivered when it is.
+        """
+        stream = self._stream("iterate", 5, 2)
+        self.pump.flush()
+        consumer = ListConsumer()
+        results = []
+        stream.consume(consumer).addCallback(results.append)
+        self.assertEqual(consumer.items, range(5))
+        self.assertEqual(results, [consumer])
+
+
+    def test_consumeTwice(self):
+        """
+        L{pb.RemoteStream.consume} raises L{RuntimeError} if the stream
+        already has a consumer.
+        """
+        stream = self._stream("iterate", 5, 2)
+        stream.consume(ListConsumer())
+        self.assertRaises(RuntimeError, stream.consume, ListConsumer())
+
+
+    def test_written(self):
+        """
+        Items written to a L{pb.StreamingResult}, which may be returned in a
+        L{Deferred}, are streamed until it is finished, and a streaming
+        producer writing them is paused while a page is waiting to be sent.
+        """
+        stream = self._stream("written", 3)
+        result = self.streamer.result
+        producer = PushProducer()
+        result.registerProducer(producer, True)
+        consumer = ListConsumer()
+        results = []
+        stream.consume(consumer).addCallback(results.append)
+        for i in range(4):
+            result.write(i)
+        self.assertTrue(producer.paused)
+        self.pump.flush()
+        self.assertFalse(producer.paused)
+        result.write(4)
+        result.unregisterProducer()
+        result.finish()
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(5))
+        self.assertEqual(results, [consumer])
+
+
+    def test_error(self):
+        """
+        If the iterator raises an exception, the items before it are
+        delivered, and then the L{Deferred} returned by
+        L{pb.RemoteStream.consume} fails with the error.
+        """
+        stream = self._stream("iterate", 10, 2, 3)
+        consumer = ListConsumer()
+        errors = []
+        stream.consume(consumer).addErrback(errors.append)
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(3))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].type, "exceptions.RuntimeError")
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+
+
+    def test_errorBeforeConsume(self):
+        """
+        If the stream fails before L{pb.RemoteStream.consume} is called, the
+        L{Deferred} it returns has already failed.
+        """
+        stream = self._stream("iterate", 10, 2, 0)
+        self.pump.flush()
+        self.flushLoggedErrors(RuntimeError)
+        errors = []
+        stream.consume(ListConsumer()).addErrback(errors.append)
+        self.assertEqual(len(errors), 1)
+
+
+    def test_stopProducing(self):
+        """
+        Stopping a L{pb.RemoteStream} discards the remaining items and stops
+        the remote iterator.
+        """
+        stream = self._stream("iterate", 1000, 10)
+        consumer = ListConsumer()
+        consumer.stopAfter = 5
+        results = []
+        stream.consume(consumer).addCallback(results.append)
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(5))
+        self.assertEqual(results, [consumer])
+        self.assertTrue(self.streamer.closed)
+        self.assertTrue(len(self.streamer.produced) < 1000)
+        self.assertEqual(self.server._outgoingStreams, {})
+        self.assertEqual(self.server.pageProducers, [])
+
+
+    def test_pauseBuffers(self):
+        """
+        Items arriving while a L{pb.RemoteStream} is paused are kept, and
+        reading from the connection is paused while more than
+        C{maxBuffered} are kept.
+        """
+        transportCalls = []
+        self.client.transport.pauseProducing = (
+            lambda: transportCalls.append("pause"))
+        self.client.transport.resumeProducing = (
+            lambda: transportCalls.append("resume"))
+        stream = self._stream("iterate", 20, 5)
+        stream.maxBuffered = 8
+        consumer = ListConsumer()
+        stream.pauseProducing()
+        stream.consume(consumer)
+        self.pump.flush()
+        self.assertEqual(consumer.items, [])
+        self.assertEqual(transportCalls, ["pause"])
+        stream.resumeProducing()
+        self.assertEqual(transportCalls, ["pause", "resume"])
+        self.pump.flush()
+        self.assertEqual(consumer.items, range(20))
+
+
+    def test_connectionLost(self):
+        """
+        Losing the connection fails a stream being received with
+        L{pb.PBConnectionLost}, and stops one being sent.
+        """
+        stream = self._stream("iterate", 1000, 10)
+        errors = []
+        stream.consume(ListConsumer()).addErrback(errors.append)
+        reason = failure.Failure(main.CONNECTION_DONE)
+        self.client.connectionLost(reason)
+        self.server.connectionLost(reason)
+        self.assertEqual(len(errors), 1)
+        errors[0].trap(pb.PBConnectionLost)
+        self.assertTrue(self.streamer.closed)
+
+
+
+class WriteCountingTransport(StringTransport):
+    """
+    A L{StringTransport} which counts the calls to its C{write} method.
+    """
+    writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        StringTransport.write(self, data)
+
+
+
+class BatchingTestCase(unittest.TestCase):
+    """
+    Tests for batching the messages a L{pb.Broker} sends.
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.broker = pb.Broker(reactor=self.clock)
+        self.broker.batchSize = 1000
+        self.transport = WriteCountingTransport()
+        self.broker.makeConnection(self.transport)
+
+
+    def _encoded(self, *calls):
+        """
+        Return the bytes an unbatched L{pb.Broker} writes for C{calls}.
+        """
+        broker = pb.Broker()
+        transport = StringTransport()
+        broker.makeConnection(transport)
+        transport.clear()
+        for call in calls:
+            broker.sendCall(*call)
+        return transport.value()
+
+
+    def test_batchedUntilIteration(self):
+        """
+        Messages are written together, once the reactor iteration ends.
+        """
+        self.clock.advance(0)
+        self.transport.clear()
+        self.transport.writes = 0
+        self.broker.sendCall("first", 1)
+        self.broker.sendCall("second", "two")
+        self.assertEqual(self.transport.value(), "")
+        self.clock.advance(0)
+        self.assertEqual(self.transport.writes, 1)
+        self.assertEqual(self.transport.value(),
+                         self._encoded(("first", 1), ("second", "two")))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_batchSize(self):
+        """
+        The batch is written as soon as it reaches C{batchSize} bytes.
+        """
+        self.clock.advance(0)
+        self.transport.clear()
+        self.broker.batchSize = 100
+        self.broker.sendCall("small")
+        self.assertEqual(self.transport.value(), "")
+        self.broker.sendCall("x" * 100)
+        self.assertEqual(self.transport.value(),
+                         self._encoded(("small",), ("x" * 100,)))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_flushBatch(self):
+        """
+        L{pb.Broker.flushBatch} writes the batch immediately.
+        """
+        self.broker.sendCall("message")
+        self.broker.flushBatch()
+        self.assertNotEqual(self.transport.value(), "")
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_encodingError(self):
+        """
+        A message which cannot be encoded leaves nothing in the batch.
+        """
+        self.clock.advance(0)
+        self.transport.clear()
+        self.broker.sendCall("first")
+        self.assertRaises(banana.BananaError, self.broker.sendCall,
+                          "second", [None] * (banana.SIZE_LIMIT + 1))
+        self.clock.advance(0)
+        self.assertEqual(self.transport.value(), self._encoded(("first",)))
+
+
+    def test_connectionLost(self):
+        """
+        Losing the connection discards the batch.
+        """
+        self.broker.sendCall("message")
+        self.broker.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_factories(self):
+        """
+        The C{batchSize} of L{pb.PBClientFactory} and L{pb.PBServerFactory}
+        is given to the brokers they build.
+        """
+        clientFactory = pb.PBClientFactory()
+        clientFactory.batchSize = 123
+        self.assertEqual(clientFactory.buildProtocol(None).batchSize, 123)
+        serverFactory = pb.PBServerFactory(pb.Root())
+        serverFactory.batchSize = 456
+        self.assertEqual(serverFactory.buildProtocol(None).batchSize, 456)
+
+
+    def test_calls(self):
+        """
+        Calls made through a batching broker are answered.
+        """
+        server = pb.PBServerFactory(pb.Root()).buildProtocol(None)
+        server.setNameForLocal("echo", SimpleRemote())
+        client = pb.Broker(reactor=self.clock)
+        client.batchSize = 1000
+        clientIO = StringIO()
+        serverIO = StringIO()
+        client.makeConnection(protocol.FileWrapper(clientIO))
+        server.makeConnection(protocol.FileWrapper(serverIO))
+        pump = IOPump(client, server, clientIO, serverIO)
+        while client.currentDialect is None or server.currentDialect is None:
+            self.clock.advance(0)
+            pump.pump()
+        remote = client.remoteForName("echo")
+        results = []
+        for i in range(3):
+            remote.callRemote("thunk", i).addCallback(results.append)
+        while len(results) < 3:
+            self.clock.advance(0)
+            pump.pump()
+        self.assertEqual(results, [1, 2, 3])
+
+
+
 class DumbPublishable(publish.Publishable):
     def getStateToPublish(self):
         return {"yayIGotPublished": 1}
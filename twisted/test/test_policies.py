@@ -567,6 +567,51 @@ class TimeoutTestCase(unittest.TestCase):
 
 
 
+class LazyTimeoutTestCase(TimeoutTestCase):
+    """
+    Tests for L{policies.TimeoutFactory} with lazy timeouts.
+    """
+
+    def setUp(self):
+        """
+        Create a testable, deterministic clock, and a set of
+        server factory/protocol/transport using lazy timeouts.
+        """
+        self.clock = task.Clock()
+        wrappedFactory = protocol.ServerFactory()
+        wrappedFactory.protocol = SimpleProtocol
+        self.factory = TestableTimeoutFactory(
+            self.clock, wrappedFactory, 3, lazyTimeout=True)
+        self.proto = self.factory.buildProtocol(
+            address.IPv4Address('TCP', '127.0.0.1', 12345))
+        self.transport = StringTransportWithDisconnection()
+        self.transport.protocol = self.proto
+        self.proto.makeConnection(self.transport)
+
+
+    def test_activityDoesNotReschedule(self):
+        """
+        Activity on a connection with a lazy timeout does not change the time
+        of the pending timeout; when it is reached, a new timeout is scheduled
+        for the time remaining since the activity.
+        """
+        self.assertTrue(self.proto.lazyTimeout)
+        self.clock.advance(1)
+        self.proto.dataReceived(b'bytes')
+        self.proto.write(b'bytes')
+        self.assertEqual(len(self.clock.calls), 1)
+        self.assertEqual(self.clock.calls[0].getTime(), 3)
+
+        self.clock.advance(2)
+        self.failIf(self.proto.wrappedProtocol.disconnected)
+        self.assertEqual(len(self.clock.calls), 1)
+        self.assertEqual(self.clock.calls[0].getTime(), 4)
+
+        self.clock.advance(1)
+        self.failUnless(self.proto.wrappedProtocol.disconnected)
+
+
+
 class TimeoutTester(protocol.Protocol, policies.TimeoutMixin):
     """
     A testable protocol with timeout facility.
@@ -719,6 +764,57 @@ class TestTimeout(unittest.TestCase):
 
 
 
+class LazyTestTimeout(TestTimeout):
+    """
+    Tests for L{policies.TimeoutMixin} with C{lazyTimeout} set.
+    """
+
+    def setUp(self):
+        """
+        Create a testable, deterministic clock and a C{TimeoutTester} instance
+        using lazy timeouts.
+        """
+        TestTimeout.setUp(self)
+        self.proto.lazyTimeout = True
+
+
+    def test_activityDoesNotReschedule(self):
+        """
+        L{policies.TimeoutMixin.resetTimeout} does not change the time of the
+        pending timeout; when it is reached, a new timeout is scheduled for
+        the time remaining since the last activity.
+        """
+        self.proto.makeConnection(StringTransport())
+        self.clock.advance(1)
+        self.proto.dataReceived(b'hello')
+        self.clock.advance(1)
+        self.proto.dataReceived(b'there')
+        self.assertEqual(len(self.clock.calls), 1)
+        self.assertEqual(self.clock.calls[0].getTime(), 3)
+
+        self.clock.advance(1)
+        self.failIf(self.proto.timedOut)
+        self.assertEqual(len(self.clock.calls), 1)
+        self.assertEqual(self.clock.calls[0].getTime(), 5)
+
+        self.clock.advance(2)
+        self.failUnless(self.proto.timedOut)
+
+
+    def test_setTimeoutAfterActivity(self):
+        """
+        A timeout set with L{policies.TimeoutMixin.setTimeout} after some
+        activity is not extended by that activity.
+        """
+        self.proto.makeConnection(StringTransport())
+        self.clock.advance(1)
+        self.proto.dataReceived(b'hello')
+        self.proto.setTimeout(0.5)
+        self.clock.advance(0.5)
+        self.failUnless(self.proto.timedOut)
+
+
+
 class LimitTotalConnectionsFactoryTestCase(unittest.TestCase):
     """Tests for policies.LimitTotalConnectionsFactory"""
     def testConnectionCounting(self):
@@ -16,7 +16,7 @@ from twisted.trial import unittest
 
 from twisted.python.log import msg
 from twisted.internet import protocol, reactor, defer, interfaces
-from twisted.internet import error
+from twisted.internet import error, posixbase
 from twisted.internet.address import IPv4Address
 from twisted.internet.interfaces import IHalfCloseableProtocol, IPullProducer
 from twisted.protocols import policies
@@ -183,6 +183,40 @@ class ListeningTestCase(unittest.TestCase):
         self.failUnless(interfaces.IListeningPort.providedBy(p1))
 
 
+    def test_reusePort(self):
+        """
+        Several ports created by C{listenTCP} with C{reusePort} set can listen
+        on the same address, but a port created without it cannot join them.
+        """
+        f = MyServerFactory()
+        first = reactor.listenTCP(
+            0, f, interface="127.0.0.1", reusePort=True)
+        self.addCleanup(first.stopListening)
+        n = first.getHost().port
+        second = reactor.listenTCP(
+            n, f, interface="127.0.0.1", reusePort=True)
+        self.addCleanup(second.stopListening)
+        self.assertEqual(first.getHost(), second.getHost())
+        self.assertRaises(
+            error.CannotListenError,
+            reactor.listenTCP, n, f, interface="127.0.0.1")
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        test_reusePort.skip = "SO_REUSEPORT is not supported"
+    elif not isinstance(reactor, posixbase.PosixReactorBase):
+        test_reusePort.skip = "reusePort is only supported by POSIX reactors"
+
+
+    def test_reusePortUnsupported(self):
+        """
+        C{listenTCP} raises L{NotImplementedError} if C{reusePort} is set on a
+        platform without C{SO_REUSEPORT}.
+        """
+        self.patch(socket, "SO_REUSEPORT", None)
+        self.assertRaises(
+            NotImplementedError, reactor.listenTCP, 0, MyServerFactory(),
+            interface="127.0.0.1", reusePort=True)
+
+
     def testStopListening(self):
         """
         The L{IListeningPort} returned by L{IReactorTCP.listenTCP} can be
@@ -773,6 +773,236 @@ class UnixApplicationRunnerStartApplicationTests(unittest.TestCase):
 
 
 
+class WorkersTests(unittest.TestCase):
+    """
+    Tests for running twistd with C{--workers}.
+    """
+    if _twistd_unix is None:
+        skip = "twistd unix not available"
+
+    def setUp(self):
+        self.environ = {}
+        self.patch(os, 'environ', self.environ)
+
+
+    def test_defaultWorkers(self):
+        """
+        By default, twistd does not use worker processes and is not a worker
+        itself.
+        """
+        config = twistd.ServerOptions()
+        config.parseOptions([])
+        self.assertEqual(config['workers'], 0)
+        self.assertIdentical(config['worker'], None)
+
+
+    def test_negativeWorkers(self):
+        """
+        A negative value for C{workers} is rejected with a L{UsageError}.
+        """
+        config = twistd.ServerOptions()
+        self.assertRaises(UsageError, config.parseOptions, ['--workers', '-1'])
+
+
+    def test_workerOptions(self):
+        """
+        If L{_twistd_unix.WORKER_ENVIRONMENT_VARIABLE} is set, C{worker} is
+        set to its value and the process is configured to run in the
+        foreground, log to stdout, and not write a pidfile.
+        """
+        self.environ[_twistd_unix.WORKER_ENVIRONMENT_VARIABLE] = '3'
+        config = twistd.ServerOptions()
+        config.parseOptions(
+            ['--workers', '4', '--logfile', 'foo.log', '--pidfile', 'foo.pid'])
+        self.assertEqual(config['worker'], 3)
+        self.assertTrue(config['nodaemon'])
+        self.assertEqual(config['logfile'], '-')
+        self.assertEqual(config['pidfile'], '')
+
+
+    def test_shareListeningPorts(self):
+        """
+        L{_twistd_unix.shareListeningPorts} makes the TCP servers of an
+        application, including those in nested services and those listening
+        on a TCP endpoint, listen with C{SO_REUSEPORT}, and returns the other
+        servers.
+        """
+        from twisted.application import internet
+        from twisted.internet.endpoints import TCP4ServerEndpoint
+        application = service.Application("workers")
+        tcpServer = internet.TCPServer(8080, None)
+        tcpServer.setServiceParent(application)
+        nested = service.MultiService()
+        nested.setServiceParent(application)
+        endpoint = TCP4ServerEndpoint(None, 8081)
+        endpointService = internet.StreamServerEndpointService(endpoint, None)
+        endpointService.setServiceParent(nested)
+        udpServer = internet.UDPServer(8082, None)
+        udpServer.setServiceParent(nested)
+        unixServer = internet.UNIXServer('foo.sock', None)
+        unixServer.setServiceParent(application)
+
+        unshared = _twistd_unix.shareListeningPorts(application)
+        self.assertEqual(
+            set([udpServer, unixServer]), set(unshared))
+        self.assertEqual({'reusePort': True}, tcpServer.kwargs)
+        self.assertTrue(endpoint._reusePort)
+        self.assertEqual({}, udpServer.kwargs)
+
+
+    def _postApplication(self, worker, application):
+        """
+        Call L{UnixApplicationRunner.postApplication} for a twistd started
+        with C{--workers}, without running the application or the workers.
+
+        @param worker: Whether to run it as a worker.
+
+        @return: A C{list} of the names of the runner methods which would
+            have been called to run the application or the workers.
+        """
+        if worker:
+            self.environ[_twistd_unix.WORKER_ENVIRONMENT_VARIABLE] = '0'
+        config = twistd.ServerOptions()
+        config.parseOptions(['--workers', '2'])
+        runner = UnixApplicationRunner(config)
+        runner.application = application
+        runner.oldstdout = runner.oldstderr = None
+        calls = []
+        def record(name):
+            return lambda *args, **kwargs: calls.append(name)
+        for name in ['startApplication', 'startReactor', 'removePID',
+                     'superviseWorkers']:
+            setattr(runner, name, record(name))
+        runner.postApplication()
+        return calls
+
+
+    def test_workerSharesPorts(self):
+        """
+        L{UnixApplicationRunner.postApplication} makes the TCP servers of a
+        worker's application listen with C{SO_REUSEPORT} before starting it.
+        """
+        from twisted.application import internet
+        application = service.Application("workers")
+        tcpServer = internet.TCPServer(8080, None)
+        tcpServer.setServiceParent(application)
+        calls = self._postApplication(True, application)
+        self.assertEqual({'reusePort': True}, tcpServer.kwargs)
+        self.assertEqual(
+            ['startApplication', 'startReactor', 'removePID'], calls)
+
+
+    def test_supervisorRefusesUnsharedPorts(self):
+        """
+        L{UnixApplicationRunner.postApplication} exits instead of starting
+        the workers if the application has servers which are not TCP
+        servers, since only the first worker could listen on them.
+        """
+        from twisted.application import internet
+        application = service.Application("workers")
+        internet.UDPServer(8082, None).setServiceParent(application)
+        calls = []
+        exc = self.assertRaises(
+            SystemExit, lambda: calls.extend(
+                self._postApplication(False, application)))
+        self.assertIn("UDPServer", str(exc))
+        self.assertEqual([], calls)
+
+
+    def test_supervisorStartsWorkers(self):
+        """
+        L{UnixApplicationRunner.postApplication} supervises the workers
+        instead of running the application itself if the application's
+        servers can all be shared.
+        """
+        from twisted.application import internet
+        application = service.Application("workers")
+        internet.TCPServer(8080, None).setServiceParent(application)
+        calls = self._postApplication(False, application)
+        self.assertEqual(['superviseWorkers'], calls)
+
+
+    def test_createWorkerMonitor(self):
+        """
+        L{UnixApplicationRunner.createWorkerMonitor} returns a
+        L{WorkerMonitor} which runs the twistd command line once per worker,
+        telling each its index in the environment.
+        """
+        from twisted.runner.test.test_procmon import DummyProcessReactor
+        self.patch(sys, 'argv', ['twistd', '--workers', '2', '-y', 'foo.tac'])
+        self.environ['HOME'] = '/home/foo'
+        runner = UnixApplicationRunner({})
+        reactor = DummyProcessReactor()
+        monitor = runner.createWorkerMonitor(reactor, 2)
+        monitor.startService()
+        args = [sys.executable, 'twistd', '--workers', '2', '-y', 'foo.tac']
+        spawned = sorted(
+            [(p._args, p._environment) for p in reactor.spawnedProcesses])
+        self.assertEqual(
+            spawned,
+            [(args, {'HOME': '/home/foo',
+                     _twistd_unix.WORKER_ENVIRONMENT_VARIABLE: '0'}),
+             (args, {'HOME': '/home/foo',
+                     _twistd_unix.WORKER_ENVIRONMENT_VARIABLE: '1'})])
+
+
+    def test_stopWaitsForWorkers(self):
+        """
+        The L{Deferred} returned by L{WorkerMonitor.stopService} fires once
+        all of the workers have exited.
+        """
+        from twisted.runner.test.test_procmon import DummyProcessReactor
+        from twisted.scripts._twistd_workers import WorkerMonitor
+        reactor = DummyProcessReactor()
+        monitor = WorkerMonitor(reactor)
+        monitor.addProcess('worker-0', ['twistd'])
+        monitor.addProcess('worker-1', ['twistd'])
+        monitor.startService()
+        reactor.spawnedProcesses[0]._terminationDelay = 2
+
+        stopped = []
+        monitor.stopService().addCallback(stopped.append)
+        reactor.advance(1)
+        self.assertEqual(stopped, [])
+        reactor.advance(1)
+        self.assertEqual(stopped, [None])
+        self.assertEqual(reactor.spawnedProcesses[2:], [])
+
+
+    def test_stopWithoutWorkers(self):
+        """
+        L{WorkerMonitor.stopService} returns an already fired L{Deferred} if
+        no workers are running.
+        """
+        from twisted.runner.test.test_procmon import DummyProcessReactor
+        from twisted.scripts._twistd_workers import WorkerMonitor
+        monitor = WorkerMonitor(DummyProcessReactor())
+        monitor.startService()
+        stopped = []
+        monitor.stopService().addCallback(stopped.append)
+        self.assertEqual(stopped, [None])
+
+
+    def test_signalAll(self):
+        """
+        L{WorkerMonitor.signalAll} sends the given signal to every running
+        worker.
+        """
+        from twisted.runner.test.test_procmon import DummyProcessReactor
+        from twisted.scripts._twistd_workers import WorkerMonitor
+        reactor = DummyProcessReactor()
+        monitor = WorkerMonitor(reactor)
+        monitor.addProcess('worker-0', ['twistd'])
+        monitor.addProcess('worker-1', ['twistd'])
+        monitor.startService()
+        signals = []
+        for proc in reactor.spawnedProcesses:
+            proc.signalProcess = signals.append
+        monitor.signalAll('HUP')
+        self.assertEqual(signals, ['HUP', 'HUP'])
+
+
+
 class UnixApplicationRunnerRemovePID(unittest.TestCase):
     """
     Tests for L{UnixApplicationRunner.removePID}.
@@ -8,11 +8,14 @@ Tests for implementations of L{IReactorUDP} and L{IReactorMulticast}.
 
 from __future__ import division, absolute_import
 
+import socket
+
 from twisted.trial import unittest
 
 from twisted.python.compat import intToBytes
 from twisted.internet.defer import Deferred, gatherResults, maybeDeferred
 from twisted.internet import protocol, reactor, error, defer, interfaces, udp
+from twisted.internet import posixbase
 from twisted.python import runtime
 
 
@@ -449,6 +452,114 @@ class UDPTestCase(unittest.TestCase):
 
 
 
+class PortReadTests(unittest.TestCase):
+    """
+    Tests for the reading of datagrams by L{udp.Port.doRead}.
+    """
+
+    def setUp(self):
+        """
+        Bind a L{udp.Port} which is not read from by the reactor, and a
+        socket to send datagrams to it with.
+        """
+        self.server = Server()
+        self.port = udp.Port(0, self.server, interface="127.0.0.1")
+        self.port._bindSocket()
+        self.addCleanup(self.port.socket.close)
+        self.server.makeConnection(self.port)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sender.close)
+
+
+    def _send(self, *datagrams):
+        address = ("127.0.0.1", self.port.getHost().port)
+        for datagram in datagrams:
+            self.sender.sendto(datagram, address)
+
+
+    def test_maxDatagramsPerRead(self):
+        """
+        L{udp.Port.doRead} reads at most C{maxDatagramsPerRead} datagrams,
+        leaving the others for the next call, and counts the calls which
+        stop at the limit.
+        """
+        self.port.maxDatagramsPerRead = 2
+        self._send(b"a", b"b", b"c")
+        self.port.doRead()
+        self.assertEqual([data for (data, addr) in self.server.packets],
+                         [b"a", b"b"])
+        self.assertEqual(self.port.fullReads, 1)
+        self.port.doRead()
+        self.assertEqual([data for (data, addr) in self.server.packets],
+                         [b"a", b"b", b"c"])
+        self.assertEqual(self.port.fullReads, 1)
+        self.assertEqual(self.port.receivedDatagrams, 3)
+
+
+    def test_droppedDatagrams(self):
+        """
+        Datagrams the protocol raises an exception handling are counted as
+        dropped, and the error is logged.
+        """
+        def datagramReceived(data, addr):
+            raise BadClientError("Application code is very buggy!")
+        self.server.datagramReceived = datagramReceived
+        self._send(b"a", b"b")
+        self.port.doRead()
+        self.assertEqual(self.port.receivedDatagrams, 2)
+        self.assertEqual(self.port.droppedDatagrams, 2)
+        self.assertEqual(len(self.flushLoggedErrors(BadClientError)), 2)
+
+
+    def test_reusePort(self):
+        """
+        Several L{udp.Port}s created with C{reusePort} set can listen on the
+        same port.
+        """
+        first = udp.Port(0, Server(), interface="127.0.0.1", reusePort=True)
+        first._bindSocket()
+        self.addCleanup(first.socket.close)
+        second = udp.Port(first.getHost().port, Server(),
+                          interface="127.0.0.1", reusePort=True)
+        second._bindSocket()
+        self.addCleanup(second.socket.close)
+        self.assertEqual(first.getHost(), second.getHost())
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        test_reusePort.skip = "SO_REUSEPORT is not supported"
+
+
+    def test_listenUDPReusePort(self):
+        """
+        C{listenUDP} passes C{reusePort} on to the L{udp.Port} it creates.
+        """
+        first = reactor.listenUDP(
+            0, Server(), interface="127.0.0.1", reusePort=True)
+        self.addCleanup(first.stopListening)
+        second = reactor.listenUDP(
+            first.getHost().port, Server(), interface="127.0.0.1",
+            reusePort=True)
+        self.addCleanup(second.stopListening)
+        self.assertTrue(second.reusePort)
+        self.assertEqual(first.getHost(), second.getHost())
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        test_listenUDPReusePort.skip = "SO_REUSEPORT is not supported"
+    elif not isinstance(reactor, posixbase.PosixReactorBase):
+        test_listenUDPReusePort.skip = (
+            "reusePort is only supported by POSIX reactors")
+
+
+    def test_listenUDPReusePortUnsupported(self):
+        """
+        C{listenUDP} raises L{NotImplementedError} if C{reusePort} is set on a
+        platform without C{SO_REUSEPORT}.
+        """
+        self.patch(socket, "SO_REUSEPORT", None)
+        self.assertRaises(
+            NotImplementedError, reactor.listenUDP, 0, Server(),
+            interface="127.0.0.1", reusePort=True)
+
+
+
 class ReactorShutdownInteraction(unittest.TestCase):
     """Test reactor shutdown interaction"""
 
@@ -692,6 +803,7 @@ class MulticastTestCase(unittest.TestCase):
 
 if not interfaces.IReactorUDP(reactor, None):
     UDPTestCase.skip = "This reactor does not support UDP"
+    PortReadTests.skip = "This reactor does not support UDP"
     ReactorShutdownInteraction.skip = "This reactor does not support UDP"
 if not interfaces.IReactorMulticast(reactor, None):
     MulticastTestCase.skip = "This reactor does not support multicast"
@@ -40,6 +40,10 @@ extensions = [
     Extension("twisted.python.sendmsg",
               sources=["twisted/python/sendmsg.c"],
               condition=lambda _: sys.platform != "win32"),
+
+    Extension("twisted.spread._cbanana",
+              ["twisted/spread/_cbanana.c"],
+              condition=lambda _: _isCPython),
 ]
 
 if sys.version_info[:2] <= (2, 6):
@@ -30,6 +30,7 @@ from twisted.web import http
 from twisted.internet import defer, protocol, task, reactor
 from twisted.internet.interfaces import IProtocol
 from twisted.internet.endpoints import TCP4ClientEndpoint, SSL4ClientEndpoint
+from twisted.internet.endpoints import HostnameEndpoint, _SSLHostnameEndpoint
 from twisted.python import failure
 from twisted.python.util import InsensitiveDict
 from twisted.python.components import proxyForInterface
@@ -834,14 +835,42 @@ class _HTTP11ClientFactory(protocol.Factory):
     @ivar _quiescentCallback: The quiescent callback to be passed to protocol
         instances, used to return them to the connection pool.
 
+    @ivar _connectionLostCallback: A callable called with each protocol
+        instance when its connection is lost, or C{None}.
+
     @since: 11.1
     """
-    def __init__(self, quiescentCallback):
+    def __init__(self, quiescentCallback, connectionLostCallback=None):
         self._quiescentCallback = quiescentCallback
+        self._connectionLostCallback = connectionLostCallback
 
 
     def buildProtocol(self, addr):
-        return HTTP11ClientProtocol(self._quiescentCallback)
+        if self._connectionLostCallback is None:
+            return HTTP11ClientProtocol(self._quiescentCallback)
+        return _PooledHTTP11ClientProtocol(
+            self._quiescentCallback, self._connectionLostCallback)
+
+
+
+class _PooledHTTP11ClientProtocol(HTTP11ClientProtocol):
+    """
+    An L{HTTP11ClientProtocol} which tells the L{HTTPConnectionPool} that
+    created it when its connection is lost, so the pool can stop counting it
+    against its connection limits.
+
+    @ivar _connectionLostCallback: A callable called with this protocol when
+        its connection is lost.
+    """
+
+    def __init__(self, quiescentCallback, connectionLostCallback):
+        HTTP11ClientProtocol.__init__(self, quiescentCallback)
+        self._connectionLostCallback = connectionLostCallback
+
+
+    def connectionLost(self, reason):
+        HTTP11ClientProtocol.connectionLost(self, reason)
+        self._connectionLostCallback(self)
 
 
 
@@ -907,6 +936,8 @@ class HTTPConnectionPool(object):
     Features:
      - Cached connections will eventually time out.
      - Limits on maximum number of persistent connections.
+     - Optional limits on the number of open connections, per destination
+       and in total, with requests over the limit waiting their turn.
 
     Connections are stored using keys, which should be chosen such that any
     connections stored under a given key can be used interchangeably.
@@ -915,6 +946,18 @@ class HTTPConnectionPool(object):
     once if they use an idempotent method (e.g. GET), in case the HTTP server
     timed them out.
 
+    Cached connections are reused most recently used first, so that a busy
+    pool keeps reusing the same few warm connections and lets the rest time
+    out.
+
+    When C{maxConnectionsPerHost} or C{maxConnections} would be exceeded by
+    opening a new connection, L{getConnection} returns a C{Deferred} which
+    fires once a connection becomes available.  Waiting requests are served
+    in the order they were made.  If only the total limit is in the way, the
+    least recently used cached connection for another destination is closed
+    to make room.  Connections opened to retry a failed request are not
+    subject to the limits.
+
     @ivar persistent: Boolean indicating whether connections should be
         persistent. Connections are persistent by default.
 
@@ -922,25 +965,63 @@ class HTTPConnectionPool(object):
         connections for a C{host:port} destination.
     @type maxPersistentPerHost: C{int}
 
+    @ivar maxConnectionsPerHost: The maximum number of open connections,
+        whether cached, in use or being established, for a C{host:port}
+        destination, or C{None} for no limit.
+    @type maxConnectionsPerHost: C{int} or C{NoneType}
+
+    @ivar maxConnections: The maximum number of open connections for all
+        destinations together, or C{None} for no limit.
+    @type maxConnections: C{int} or C{NoneType}
+
     @ivar cachedConnectionTimeout: Number of seconds a cached persistent
         connection will stay open before disconnecting.
 
     @ivar retryAutomatically: C{boolean} indicating whether idempotent
         requests should be retried once if no response was received.
 
+    @ivar hits: The number of requests which were given a cached connection.
+
+    @ivar misses: The number of requests for which a new connection was
+        opened.
+
+    @ivar waits: The number of requests which had to wait for a connection
+        because of C{maxConnectionsPerHost} or C{maxConnections}.
+
+    @ivar evictions: The number of cached connections which were closed
+        because they timed out or to make room for other connections.
+
     @ivar _factory: The factory used to connect to the proxy.
 
     @ivar _connections: Map (scheme, host, port) to lists of
-        L{HTTP11ClientProtocol} instances.
+        L{HTTP11ClientProtocol} instances, from the least to the most
+        recently cached.
 
     @ivar _timeouts: Map L{HTTP11ClientProtocol} instances to a
         C{IDelayedCall} instance of their timeout.
 
+    @ivar _openConnections: Map keys to the number of connections open or
+        being opened for them.
+
+    @ivar _openConnectionCount: The number of connections open or being opened
+        for all keys.
+
+    @ivar _liveConnections: Map each open connection made by this pool to its
+        key.
+
+    @ivar _waiting: A C{list} of C{(key, endpoint, Deferred)} tuples for the
+        requests waiting for a connection, oldest first.
+
+    @ivar _processWaitingCall: The C{IDelayedCall} which will next try to
+        serve waiting requests, or C{None}.
+
     @since: 12.1
     """
 
     _factory = _HTTP11ClientFactory
     maxPersistentPerHost = 2
+    maxConnectionsPerHost = None
+    maxConnections = None
     cachedConnectionTimeout = 240
     retryAutomatically = True
 
@@ -949,6 +1030,15 @@ class HTTPConnectionPool(object):
         self.persistent = persistent
         self._connections = {}
         self._timeouts = {}
+        self._openConnections = {}
+        self._openConnectionCount = 0
+        self._liveConnections = {}
+        self._waiting = []
+        self._processWaitingCall = None
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
 
 
     def getConnection(self, key, endpoint):
@@ -974,21 +1064,82 @@ class HTTPConnectionPool(object):
         @return: A C{Deferred} that will fire with a L{HTTP11ClientProtocol}
            (or a wrapper) that can be used to send a single HTTP request.
         """
-        # Try to get cached version:
+        connection = self._getCachedConnection(key)
+        if connection is not None:
+            self.hits += 1
+            return defer.succeed(
+                self._wrapConnection(key, endpoint, connection))
+
+        if self._makeRoom(key):
+            self.misses += 1
+            return self._newConnection(key, endpoint)
+
+        self.waits += 1
+        d = defer.Deferred(lambda d: self._cancelWaiting(waiter))
+        waiter = (key, endpoint, d)
+        self._waiting.append(waiter)
+        return d
+
+
+    def _getCachedConnection(self, key):
+        """
+        Remove the most recently cached connection for C{key} from the cache,
+        discarding any which are no longer usable.
+
+        @return: A quiescent L{HTTP11ClientProtocol}, or C{None} if there is
+            none for C{key}.
+        """
         connections = self._connections.get(key)
         while connections:
-            connection = connections.pop(0)
+            connection = connections.pop()
             # Cancel timeout:
             self._timeouts[connection].cancel()
             del self._timeouts[connection]
             if connection.state == "QUIESCENT":
-                if self.retryAutomatically:
-                    newConnection = lambda: self._newConnection(key, endpoint)
-                    connection = _RetryingHTTP11ClientProtocol(
-                        connection, newConnection)
-                return defer.succeed(connection)
+                return connection
+        return None
 
-        return self._newConnection(key, endpoint)
+
+    def _wrapConnection(self, key, endpoint, connection):
+        """
+        Wrap a cached connection so that idempotent requests which fail on it
+        are retried on a new connection, if C{retryAutomatically} is set.
+        """
+        if self.retryAutomatically:
+            newConnection = lambda: self._newConnection(key, endpoint)
+            connection = _RetryingHTTP11ClientProtocol(
+                connection, newConnection)
+        return connection
+
+
+    def _makeRoom(self, key):
+        """
+        Determine whether a new connection for C{key} may be opened without
+        exceeding C{maxConnectionsPerHost} or C{maxConnections}, closing the
+        least recently used cached connection if that is all that stands in
+        the way.
+
+        @return: C{True} if a new connection may be opened, C{False}
+            otherwise.
+        """
+        if (self.maxConnectionsPerHost is not None and
+            self._openConnections.get(key, 0) >= self.maxConnectionsPerHost):
+            return False
+        if (self.maxConnections is not None and
+            self._openConnectionCount >= self.maxConnections):
+            oldest = None
+            for cachedKey, connections in self._connections.iteritems():
+                if connections:
+                    candidate = connections[0]
+                    if (oldest is None or
+                        self._timeouts[candidate].getTime() <
+                        self._timeouts[oldest[1]].getTime()):
+                        oldest = (cachedKey, candidate)
+            if oldest is None:
+                return False
+            self._removeConnection(*oldest)
+            return self._openConnectionCount < self.maxConnections
+        return True
 
 
     def _newConnection(self, key, endpoint):
@@ -999,8 +1150,94 @@ class HTTPConnectionPool(object):
         """
         def quiescentCallback(protocol):
             self._putConnection(key, protocol)
-        factory = self._factory(quiescentCallback)
-        return endpoint.connect(factory)
+        def connected(protocol):
+            self._liveConnections[protocol] = key
+            return protocol
+        def failed(reason):
+            self._releaseSlot(key)
+            return reason
+        factory = self._factory(quiescentCallback, self._connectionLost)
+        self._openConnections[key] = self._openConnections.get(key, 0) + 1
+        self._openConnectionCount += 1
+        return endpoint.connect(factory).addCallbacks(connected, failed)
+
+
+    def _releaseSlot(self, key):
+        """
+        Stop counting a connection for C{key} against the connection limits,
+        and arrange for waiting requests to be served.
+        """
+        count = self._openConnections[key] - 1
+        if count:
+            self._openConnections[key] = count
+        else:
+            del self._openConnections[key]
+        self._openConnectionCount -= 1
+        self._scheduleWaiting()
+
+
+    def _forgetConnection(self, connection):
+        """
+        Stop counting C{connection} against the connection limits, if it is
+        counted.
+        """
+        key = self._liveConnections.pop(connection, None)
+        if key is not None:
+            self._releaseSlot(key)
+
+
+    def _connectionLost(self, connection):
+        """
+        Called by connections made by this pool when their connection is lost.
+        """
+        key = self._liveConnections.get(connection)
+        if connection in self._timeouts:
+            self._timeouts.pop(connection).cancel()
+            self._connections[key].remove(connection)
+        self._forgetConnection(connection)
+
+
+    def _scheduleWaiting(self):
+        """
+        Arrange for L{_processWaiting} to be called soon if any requests are
+        waiting for a connection.
+
+        This is never done synchronously, since connections are returned to
+        the pool before they are ready to send another request.
+        """
+        if self._waiting and self._processWaitingCall is None:
+            self._processWaitingCall = self._reactor.callLater(
+                0, self._processWaiting)
+
+
+    def _processWaiting(self):
+        """
+        Give connections to as many waiting requests as the limits allow, in
+        the order the requests were made.
+        """
+        self._processWaitingCall = None
+        for waiter in self._waiting[:]:
+            if waiter not in self._waiting:
+                # Cancelled by the callbacks of an earlier waiter.
+                continue
+            key, endpoint, d = waiter
+            connection = self._getCachedConnection(key)
+            if connection is not None:
+                self._waiting.remove(waiter)
+                self.hits += 1
+                d.callback(self._wrapConnection(key, endpoint, connection))
+            elif self._makeRoom(key):
+                self._waiting.remove(waiter)
+                self.misses += 1
+                self._newConnection(key, endpoint).chainDeferred(d)
+
+
+    def _cancelWaiting(self, waiter):
+        """
+        Stop a request from waiting for a connection.
+        """
+        if waiter in self._waiting:
+            self._waiting.remove(waiter)
 
 
     def _removeConnection(self, key, connection):
@@ -1009,7 +1246,11 @@ class HTTPConnectionPool(object):
         """
         connection.transport.loseConnection()
         self._connections[key].remove(connection)
-        del self._timeouts[connection]
+        timeout = self._timeouts.pop(connection)
+        if timeout.active():
+            timeout.cancel()
+        self.evictions += 1
+        self._forgetConnection(connection)
 
 
     def _putConnection(self, key, connection):
@@ -1027,15 +1268,13 @@ class HTTPConnectionPool(object):
             return
         connections = self._connections.setdefault(key, [])
         if len(connections) == self.maxPersistentPerHost:
-            dropped = connections.pop(0)
-            dropped.transport.loseConnection()
-            self._timeouts[dropped].cancel()
-            del self._timeouts[dropped]
+            self._removeConnection(key, connections[0])
         connections.append(connection)
         cid = self._reactor.callLater(self.cachedConnectionTimeout,
                                       self._removeConnection,
                                       key, connection)
         self._timeouts[connection] = cid
+        self._scheduleWaiting()
 
 
     def closeCachedConnections(self):
@@ -1046,13 +1285,15 @@ class HTTPConnectionPool(object):
             closed.
         """
         results = []
-        for protocols in self._connections.itervalues():
-            for p in protocols:
-                results.append(p.abort())
+        connections = self._connections
         self._connections = {}
         for dc in self._timeouts.values():
             dc.cancel()
         self._timeouts = {}
+        for protocols in connections.itervalues():
+            for p in protocols:
+                results.append(p.abort())
+                self._forgetConnection(p)
         return defer.gatherResults(results).addCallback(lambda ign: None)
 
 
@@ -1126,16 +1367,24 @@ class Agent(_AgentBase):
     @ivar _bindAddress: If not C{None}, the address passed to C{connectTCP} or
         C{connectSSL} for specifying the local address to bind to.
 
+    @ivar _hostResolver: If not C{None}, a
+        L{twisted.internet.endpoints.CachingHostResolver} used to resolve host
+        names, in which case connections are made with L{HostnameEndpoint},
+        trying the IPv4 and IPv6 addresses of the host in parallel.
+        Otherwise the reactor resolves the host name every time a connection
+        is made.
+
     @since: 9.0
     """
 
     def __init__(self, reactor, contextFactory=WebClientContextFactory(),
                  connectTimeout=None, bindAddress=None,
-                 pool=None):
+                 pool=None, hostResolver=None):
         _AgentBase.__init__(self, reactor, pool)
         self._contextFactory = contextFactory
         self._connectTimeout = connectTimeout
         self._bindAddress = bindAddress
+        self._hostResolver = hostResolver
 
 
     def _wrapContextFactory(self, host, port):
@@ -1177,6 +1426,14 @@ class Agent(_AgentBase):
         if self._connectTimeout is not None:
             kwargs['timeout'] = self._connectTimeout
         kwargs['bindAddress'] = self._bindAddress
+        if self._hostResolver is not None:
+            kwargs['resolver'] = self._hostResolver
+            if scheme == 'http':
+                return HostnameEndpoint(self._reactor, host, port, **kwargs)
+            elif scheme == 'https':
+                return _SSLHostnameEndpoint(
+                    self._reactor, host, port,
+                    self._wrapContextFactory(host, port), **kwargs)
         if scheme == 'http':
             return TCP4ClientEndpoint(self._reactor, host, port, **kwargs)
         elif scheme == 'https':
@@ -51,7 +51,8 @@ __all__ = [
     'stringToDatetime', 'toChunk', 'fromChunk', 'parseContentRange',
 
     'StringTransport', 'HTTPClient', 'NO_BODY_CODES', 'Request',
-    'PotentialDataLoss', 'HTTPChannel', 'HTTPFactory',
+    'PotentialDataLoss', 'HTTPChannel', 'HeaderBlockHTTPChannel',
+    'HTTPFactory',
     ]
 
 
@@ -526,6 +527,12 @@ class HTTPClient(basic.LineReceiver):
 NO_BODY_CODES = (204, 304)
 
 
+# The attributes of Request which Request.__setattr__ treats specially.
+_headerAttributes = frozenset([
+    'received_headers', 'requestHeaders', 'headers', 'responseHeaders'])
+
+
+
 @implementer(interfaces.IConsumer)
 class Request:
     """
@@ -611,7 +618,11 @@ class Request:
         Support assignment of C{dict} instances to C{received_headers} for
         backwards-compatibility.
         """
-        if name == 'received_headers':
+        if name not in _headerAttributes:
+            # The common case, checked first since it is on every attribute
+            # assignment.
+            self.__dict__[name] = value
+        elif name == 'received_headers':
             # A property would be nice, but Request is classic.
             self.requestHeaders = headers = Headers()
             for k, v in value.items():
@@ -623,11 +634,9 @@ class Request:
             self.responseHeaders = headers = Headers()
             for k, v in value.items():
                 headers.setRawHeaders(k, [v])
-        elif name == 'responseHeaders':
-            self.__dict__[name] = value
-            self.__dict__['headers'] = _DictHeaders(value)
         else:
             self.__dict__[name] = value
+            self.__dict__['headers'] = _DictHeaders(value)
 
 
     def _cleanup(self):
@@ -1544,12 +1553,26 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     """
     A receiver for HTTP requests.
 
+    Pipelined requests are processed as soon as they have been received,
+    without waiting for the responses to earlier requests.  The responses to
+    later requests are buffered until all earlier responses have been
+    written, so that they are sent in order.
+
+    @cvar maxPipelinedRequests: The largest number of requests which may be
+        outstanding (received, but not completely responded to) at once, or
+        C{None} for no limit.  When the limit is reached, the channel stops
+        reading from its transport until the oldest response is finished.
+
     @ivar _transferDecoder: C{None} or an instance of
         L{_ChunkedTransferDecoder} if the request body uses the I{chunked}
         Transfer-Encoding.
+
+    @ivar _pipelinePaused: C{True} if the channel has paused its transport
+        because C{maxPipelinedRequests} requests are outstanding.
     """
 
     maxHeaders = 500 # max number of headers allowed per request
+    maxPipelinedRequests = None
 
     length = 0
     persistent = 1
@@ -1562,6 +1585,7 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
 
     _savedTimeOut = None
     _receivedHeaderCount = 0
+    _pipelinePaused = False
 
     def __init__(self):
         # the request queue
@@ -1685,6 +1709,13 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         req = self.requests[-1]
         req.requestReceived(command, path, version)
 
+        if (self.maxPipelinedRequests is not None and
+            len(self.requests) >= self.maxPipelinedRequests and
+            not self._pipelinePaused and self.persistent):
+            # Don't read any more requests until a response is finished.
+            self._pipelinePaused = True
+            self.pauseProducing()
+
 
     def rawDataReceived(self, data):
         self.resetTimeout()
@@ -1766,6 +1797,10 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
             else:
                 if self._savedTimeOut:
                     self.setTimeout(self._savedTimeOut)
+            if (self._pipelinePaused and
+                len(self.requests) < self.maxPipelinedRequests):
+                self._pipelinePaused = False
+                self.resumeProducing()
         else:
             self.transport.loseConnection()
 
@@ -1779,10 +1814,176 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
             request.connectionLost(reason)
 
 
+class HeaderBlockHTTPChannel(HTTPChannel):
+    """
+    An L{HTTPChannel} which parses the request line and headers of each
+    request in one pass over the complete header block, instead of one line
+    at a time.
+
+    Received data is scanned in place, using offsets into the buffer, for
+    the blank line ending the headers.  The headers are then split up
+    together and stored in the request's C{requestHeaders} in bulk.
+    Apart from this, and from limiting the size of the whole header block
+    rather than of each line, it behaves exactly like L{HTTPChannel}.  To use
+    it, set the C{protocol} attribute of an L{HTTPFactory} (or a
+    L{twisted.web.server.Site}) to it.
+
+    @cvar maxHeaderBlockLength: The largest number of bytes allowed in the
+        request line and headers of a request.  The connection is dropped
+        (see L{lineLengthExceeded}) if a request has more.
+    """
+
+    maxHeaderBlockLength = 65536
+
+    def dataReceived(self, data):
+        """
+        Find complete header blocks in C{data} and pass them to
+        L{_headerBlockReceived}, and pass request bodies to
+        L{rawDataReceived}.
+        """
+        if self._busyReceiving:
+            self._buffer += data
+            return
+        self._busyReceiving = True
+        try:
+            self.resetTimeout()
+            buffer = self._buffer + data
+            self._buffer = b''
+            offset = 0
+            while offset < len(buffer) and not self.paused:
+                if not self.line_mode:
+                    self.rawDataReceived(buffer[offset:])
+                    offset = len(buffer)
+                elif not self.persistent:
+                    # Drop any data which the client (illegally) sent after
+                    # the last request.
+                    return
+                else:
+                    if buffer.startswith(b'\r\n', offset):
+                        # IE sends an extraneous empty line (\r\n) after a
+                        # POST request; eat it up.
+                        offset += 2
+                    end = buffer.find(b'\r\n\r\n', offset)
+                    if end == -1:
+                        if len(buffer) - offset > self.maxHeaderBlockLength:
+                            return self.lineLengthExceeded(buffer[offset:])
+                        lineEnd = buffer.find(b'\r\n', offset)
+                        if (lineEnd != -1 and
+                            len(buffer[offset:lineEnd].split()) != 3):
+                            # Reject a bad request line (for example, an
+                            # HTTP/0.9 request) without waiting for headers.
+                            self._badRequest()
+                            return
+                        break
+                    if end - offset > self.maxHeaderBlockLength:
+                        return self.lineLengthExceeded(buffer[offset:])
+                    block = buffer[offset:end]
+                    offset = end + 4
+                    if not self._headerBlockReceived(block):
+                        return
+                if self.transport.disconnecting:
+                    return
+                if self._buffer:
+                    # Data passed to setLineMode by rawDataReceived.
+                    buffer = buffer[offset:] + self._buffer
+                    offset = 0
+                    self._buffer = b''
+            self._buffer = buffer[offset:]
+        finally:
+            self._busyReceiving = False
+
+
+    def _badRequest(self):
+        """
+        Respond with I{400 Bad Request} and drop the connection.
+        """
+        self.transport.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+        self.transport.loseConnection()
+
+
+    def _headerBlockReceived(self, block):
+        """
+        Start a request from its request line and headers.
+
+        @param block: The request line and headers, without the blank line
+            ending them.
+        @type block: C{bytes}
+
+        @return: C{True} if the request was started, C{False} if it was
+            invalid and the connection is being dropped.
+        """
+        lines = block.split(b'\r\n')
+        request = self.requestFactory(self, len(self.requests))
+        self.requests.append(request)
+
+        parts = lines[0].split()
+        if len(parts) != 3:
+            self._badRequest()
+            return False
+        self._command, self._path, self._version = parts
+        if len(lines) - 1 > self.maxHeaders:
+            self._badRequest()
+            return False
+
+        headers = {}
+        values = None
+        for i in range(1, len(lines)):
+            line = lines[i]
+            if line.startswith((b' ', b'\t')):
+                if values is None:
+                    self._badRequest()
+                    return False
+                values[-1] = (values[-1] + b'\n' + line).strip()
+                continue
+            name, colon, value = line.partition(b':')
+            if not colon:
+                self._badRequest()
+                return False
+            name = name.lower()
+            values = headers.get(name)
+            if values is None:
+                values = headers[name] = []
+            values.append(value.strip())
+
+        self.length = 0
+        contentLength = headers.get(b'content-length')
+        transferEncoding = headers.get(b'transfer-encoding')
+        if transferEncoding and transferEncoding[-1].lower() == b'chunked':
+            self.length = None
+            self._transferDecoder = _ChunkedTransferDecoder(
+                request.handleContentChunk, self._finishRequestBody)
+        elif contentLength:
+            try:
+                self.length = int(contentLength[-1])
+            except ValueError:
+                self.length = None
+                self._badRequest()
+                return False
+            self._transferDecoder = _IdentityTransferDecoder(
+                self.length, request.handleContentChunk,
+                self._finishRequestBody)
+
+        # The request's headers are still empty, so fill them in one go.
+        request.requestHeaders._rawHeaders.update(headers)
+        self.allHeadersReceived()
+        if self.length == 0:
+            self.allContentReceived()
+        else:
+            self.setRawMode()
+        return True
+
+
+
 class HTTPFactory(protocol.ServerFactory):
     """
     Factory for HTTP server.
 
+    @ivar protocol: The L{HTTPChannel} subclass to use for connections;
+        L{HeaderBlockHTTPChannel} may be used for a faster header parser.
+
+    @ivar maxPipelinedRequests: If not C{None}, the
+        C{maxPipelinedRequests} of the channels built by this factory.
+
     @ivar _logDateTime: A cached datetime string for log messages, updated by
         C{_logDateTimeCall}.
     @type _logDateTime: C{str}
@@ -1798,6 +1999,8 @@ class HTTPFactory(protocol.ServerFactory):
 
     timeOut = 60 * 60 * 12
 
+    maxPipelinedRequests = None
+
     def __init__(self, logPath=None, timeout=60*60*12):
         if logPath is not None:
             logPath = os.path.abspath(logPath)
@@ -1822,6 +2025,8 @@ class HTTPFactory(protocol.ServerFactory):
         # timeOut needs to be on the Protocol instance cause
         # TimeoutMixin expects it there
         p.timeOut = self.timeOut
+        if self.maxPipelinedRequests is not None:
+            p.maxPipelinedRequests = self.maxPipelinedRequests
         return p
 
 
@@ -38,6 +38,7 @@ from twisted.internet import address, task
 from twisted.web import iweb, http, html
 from twisted.web.http import unquote
 from twisted.python import log, _reflectpy3 as reflect, failure, components
+from twisted.python._lru import LRUCache
 from twisted import copyright
 # Re-enable as part of #6178 when twisted.web.util is ported to Python 3:
 if not _PY3:
@@ -449,11 +450,39 @@ class GzipEncoderFactory(object):
     @cvar compressLevel: The compression level used by the compressor, default
         to 9 (highest).
 
+    @ivar cache: An L{LRUCache} of compressed response bodies, or C{None} if
+        they are not cached.  A body is cached when a successful I{GET}
+        response carries an I{ETag} or I{Last-Modified} header.  It is keyed
+        on the I{Host} and URI of the request, the validators and the
+        I{Content-Type}, so a new version of a resource gets a new entry.
+        Responses to requests with credentials, and responses which are
+        private, set cookies or vary on other request headers, are never
+        cached.
+        When an entry is found, the compressed body is sent, with a
+        I{Content-Length}, and whatever the resource writes is discarded
+        rather than compressed again.
+
+    @ivar maxCachedBodySize: The size, in bytes, of the largest compressed
+        body which will be cached.
+
     @since: 12.3
     """
 
     compressLevel = 9
 
+    def __init__(self, cacheSize=0, maxCachedBodySize=1024 * 1024):
+        """
+        @param cacheSize: The number of compressed bodies to cache, C{0} to
+            disable caching.
+        @param maxCachedBodySize: See L{GzipEncoderFactory.maxCachedBodySize}.
+        """
+        if cacheSize:
+            self.cache = LRUCache(cacheSize)
+        else:
+            self.cache = None
+        self.maxCachedBodySize = maxCachedBodySize
+
+
     def encoderForRequest(self, request):
         """
         Check the headers if the client accepts gzip encoding, and encodes the
@@ -472,7 +501,47 @@ class GzipEncoderFactory(object):
 
             request.responseHeaders.setRawHeaders('content-encoding',
                                                   [encoding])
-            return _GzipEncoder(self.compressLevel, request)
+            return _GzipEncoder(self.compressLevel, request, self)
+
+
+
+def _gzipCacheKey(request):
+    """
+    Compute the key under which the compressed body of the response to
+    C{request} is cached by L{GzipEncoderFactory}.
+
+    A response is not cached if the request carries credentials
+    (I{Authorization} or I{Cookie}), if the response sets a cookie, is
+    marked I{private} or I{no-store} by I{Cache-Control}, or varies on
+    anything other than I{Accept-Encoding}.
+
+    @return: A C{tuple}, or C{None} if the response must not be cached.
+    """
+    if request.method != b"GET" or request.code != http.OK:
+        return None
+    if (request.requestHeaders.hasHeader(b"authorization") or
+        request.requestHeaders.hasHeader(b"cookie")):
+        return None
+    headers = request.responseHeaders
+    if request.cookies or headers.hasHeader(b"set-cookie"):
+        return None
+    for value in headers.getRawHeaders(b"vary", ()):
+        for name in value.split(b","):
+            if name.strip().lower() != b"accept-encoding":
+                return None
+    for value in headers.getRawHeaders(b"cache-control", ()):
+        for directive in value.split(b","):
+            directive = directive.split(b"=", 1)[0].strip().lower()
+            if directive in (b"private", b"no-store"):
+                return None
+    etag = request.etag or headers.getRawHeaders(b"etag", [None])[0]
+    lastModified = (request.lastModified or
+                    headers.getRawHeaders(b"last-modified", [None])[0])
+    if etag is None and lastModified is None:
+        return None
+    return (request.getHeader(b"host"), request.uri, etag, lastModified,
+            tuple(headers.getRawHeaders(b"content-type", ())),
+            tuple(headers.getRawHeaders(b"content-encoding", ())))
 
 
 
@@ -486,15 +555,61 @@ class _GzipEncoder(object):
 
     @ivar _request: A reference to the originating request.
 
+    @ivar _factory: The L{GzipEncoderFactory} which created this encoder, or
+        C{None}.
+
+    @ivar _cacheKey: The key under which the compressed body is looked up in,
+        or stored in, the cache of C{_factory}, or C{None}.
+
+    @ivar _cached: The compressed body found in the cache, or C{None}.
+
+    @ivar _chunks: A C{list} of the compressed data produced so far, if it is
+        to be stored in the cache, otherwise C{None}.
+
     @since: 12.3
     """
 
     _zlibCompressor = None
+    _cacheKey = None
+    _cached = None
+    _chunks = None
+    _chunksSize = 0
 
-    def __init__(self, compressLevel, request):
+    def __init__(self, compressLevel, request, factory=None):
         self._zlibCompressor = zlib.compressobj(
             compressLevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
         self._request = request
+        self._factory = factory
+
+
+    def _startCaching(self):
+        """
+        Look the response up in the cache of C{_factory}, before the first
+        data is written.
+        """
+        cache = getattr(self._factory, 'cache', None)
+        if cache is None:
+            return
+        self._cacheKey = _gzipCacheKey(self._request)
+        if self._cacheKey is None:
+            return
+        self._cached = cache.get(self._cacheKey)
+        if self._cached is None:
+            self._chunks = []
+            self._chunksSize = 0
+
+
+    def _keep(self, data):
+        """
+        Remember compressed C{data} so the whole body can be cached.
+        """
+        if self._chunks is not None and data:
+            self._chunksSize += len(data)
+            if self._chunksSize > self._factory.maxCachedBodySize:
+                self._chunks = None
+            else:
+                self._chunks.append(data)
+        return data
 
 
     def encode(self, data):
@@ -502,10 +617,19 @@ class _GzipEncoder(object):
         Write to the request, automatically compressing data on the fly.
         """
         if not self._request.startedWriting:
+            self._startCaching()
+            if self._cached is not None:
+                # Send the cached body, and ignore what the resource writes.
+                self._request.responseHeaders.setRawHeaders(
+                    b'content-length', [intToBytes(len(self._cached))])
+                cached, self._cached = self._cached, b''
+                return cached
             # Remove the content-length header, we can't honor it
             # because we compress on the fly.
             self._request.responseHeaders.removeHeader(b'content-length')
-        return self._zlibCompressor.compress(data)
+        if self._cached is not None:
+            return b''
+        return self._keep(self._zlibCompressor.compress(data))
 
 
     def finish(self):
@@ -515,6 +639,12 @@ class _GzipEncoder(object):
         """
         remain = self._zlibCompressor.flush()
         self._zlibCompressor = None
+        if self._cached is not None:
+            return b''
+        self._keep(remain)
+        if self._chunks is not None:
+            self._factory.cache[self._cacheKey] = b''.join(self._chunks)
+            self._chunks = None
         return remain
 
 
@@ -8,11 +8,13 @@ Static resources for L{twisted.web}.
 from __future__ import division
 
 import os
+import stat
 import warnings
 import urllib
 import itertools
 import cgi
 import time
+from cStringIO import StringIO
 
 from zope.interface import implements
 
@@ -22,7 +24,8 @@ from twisted.web import http
 from twisted.web.util import redirectTo
 
 from twisted.python import components, filepath, log
-from twisted.internet import abstract, interfaces
+from twisted.python._lru import LRUCache
+from twisted.internet import abstract, interfaces, tcp
 from twisted.persisted import styles
 from twisted.python.util import InsensitiveDict
 from twisted.python.runtime import platformType
@@ -149,6 +152,260 @@ def getTypeAndEncoding(filename, types, encodings, defaultType):
 
 
 
+def _acceptsGzip(request):
+    """
+    Determine whether the I{Accept-Encoding} headers of C{request} allow a
+    gzip-encoded response.
+
+    @return: C{True} if gzip is listed without a quality value of C{0}.
+    """
+    for value in request.requestHeaders.getRawHeaders('accept-encoding', []):
+        for coding in value.split(','):
+            params = coding.split(';')
+            if params[0].strip().lower() != 'gzip':
+                continue
+            for param in params[1:]:
+                name, _, quality = param.partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        return float(quality) > 0
+                    except ValueError:
+                        return False
+            return True
+    return False
+
+
+
+class _FileCacheEntry(object):
+    """
+    What a L{FileCache} knows about one path.
+
+    @ivar statinfo: The result of L{os.stat} for the path, or C{0} if it
+        failed.
+    @ivar error: The L{OSError} raised by L{os.stat}, or C{None}.
+    @ivar expires: The time after which the entry must be revalidated, or
+        C{None} if it never expires.
+    @ivar typeAndEncoding: The result of L{getTypeAndEncoding} for the path,
+        or C{None} if it has not been computed.
+    @ivar listing: The sorted names in the directory at the path, or C{None}
+        if they have not been listed.
+    @ivar contents: The contents of the file at the path, or C{None} if they
+        are not cached.
+    """
+    typeAndEncoding = None
+    listing = None
+    contents = None
+
+    def __init__(self, statinfo, error, expires):
+        self.statinfo = statinfo
+        self.error = error
+        self.expires = expires
+
+
+
+def _sameFile(first, second):
+    """
+    Determine whether two results of L{os.stat} describe the same unchanged
+    file, comparing C{0} for a path which does not exist equal to itself.
+    """
+    if not first or not second:
+        return first == second
+    return ((first.st_ino, first.st_dev, first.st_size, first.st_mtime) ==
+            (second.st_ino, second.st_dev, second.st_size, second.st_mtime))
+
+
+
+class FileCache(object):
+    """
+    A bounded, least recently used cache of file system information for
+    L{File} resources.
+
+    Without a cache every request served by a L{File} stats the path it
+    resolves to (usually more than once), opens the file and, for
+    directories, lists them.  A L{FileCache} shared by a tree of L{File}
+    resources (see L{File.cache}) remembers the result of L{os.stat}
+    (including failures, so missing paths are cheap too), the content type
+    and encoding, directory listings and, optionally, the whole contents of
+    small files.
+
+    Each entry is revalidated with L{os.stat} once it is C{ttl} seconds old,
+    and its listing and contents are discarded if the path has changed.
+    Alternatively, L{watch} can be used to invalidate entries as soon as
+    inotify reports changes, in which case C{ttl} can be C{None}.
+
+    @ivar maxEntries: The largest number of paths to remember.
+    @ivar ttl: The number of seconds for which an entry is used without
+        revalidating it, or C{None} to use entries until they are invalidated.
+    @ivar maxFileSize: The largest file, in bytes, whose contents are kept in
+        memory.  C{0} disables caching contents.  At most
+        C{maxEntries * maxFileSize} bytes are cached.
+    @ivar hits: The number of lookups answered from the cache.
+    @ivar misses: The number of lookups which called L{os.stat}.
+    """
+
+    def __init__(self, maxEntries=1024, ttl=1.0, maxFileSize=0, clock=None):
+        """
+        @param maxEntries: See L{FileCache.maxEntries}.
+        @param ttl: See L{FileCache.ttl}.
+        @param maxFileSize: See L{FileCache.maxFileSize}.
+        @param clock: An L{IReactorTime} provider used to expire entries.
+            Defaults to the global reactor.
+        """
+        if clock is None:
+            from twisted.internet import reactor as clock
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        self.maxFileSize = maxFileSize
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = LRUCache(maxEntries)
+
+
+    def _lookup(self, path):
+        """
+        Get the entry for C{path}, creating or revalidating it if necessary.
+
+        @rtype: L{_FileCacheEntry}
+        """
+        now = self._clock.seconds()
+        entry = self._entries.get(path)
+        if entry is not None and (entry.expires is None or now < entry.expires):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        try:
+            statinfo, error = os.stat(path), None
+        except OSError, e:
+            statinfo, error = 0, e
+        if self.ttl is None:
+            expires = None
+        else:
+            expires = now + self.ttl
+        if entry is not None and _sameFile(entry.statinfo, statinfo):
+            entry.statinfo, entry.error = statinfo, error
+            entry.expires = expires
+        else:
+            entry = _FileCacheEntry(statinfo, error, expires)
+            self._entries[path] = entry
+        return entry
+
+
+    def restat(self, filePath, reraise=True):
+        """
+        Set the C{statinfo} of C{filePath} from the cache, like
+        L{FilePath.restat}.
+
+        @param filePath: The L{FilePath} to update.
+        @param reraise: If C{True}, raise the L{OSError} from L{os.stat} if
+            the path could not be stat'd.
+        @return: The new value of C{filePath.statinfo}.
+        """
+        entry = self._lookup(filePath.path)
+        filePath.statinfo = entry.statinfo
+        if entry.error is not None and reraise:
+            raise entry.error
+        return entry.statinfo
+
+
+    def getTypeAndEncoding(self, fileResource):
+        """
+        Look up the content type and encoding of C{fileResource} as
+        L{getTypeAndEncoding} does.
+
+        @param fileResource: A L{File}.
+        @return: A C{(type, encoding)} tuple.
+        """
+        entry = self._lookup(fileResource.path)
+        if entry.typeAndEncoding is None:
+            entry.typeAndEncoding = getTypeAndEncoding(
+                fileResource.basename(), fileResource.contentTypes,
+                fileResource.contentEncodings, fileResource.defaultType)
+        return entry.typeAndEncoding
+
+
+    def listNames(self, fileResource):
+        """
+        List the names in the directory C{fileResource}, sorted.
+
+        @param fileResource: A L{File} referring to a directory.
+        @return: A new C{list} of C{str}.
+        """
+        entry = self._lookup(fileResource.path)
+        if entry.listing is None:
+            listing = fileResource.listdir()
+            listing.sort()
+            entry.listing = listing
+        return entry.listing[:]
+
+
+    def openForReading(self, fileResource):
+        """
+        Open C{fileResource} for reading, from memory if it is a regular file
+        no bigger than C{maxFileSize} bytes.
+
+        @param fileResource: A L{File}.
+        @return: A file-like object.
+        """
+        entry = self._lookup(fileResource.path)
+        if entry.contents is None:
+            statinfo = entry.statinfo
+            if not (statinfo and stat.S_ISREG(statinfo.st_mode) and
+                    statinfo.st_size <= self.maxFileSize):
+                return fileResource.open()
+            fileObject = fileResource.open()
+            try:
+                contents = fileObject.read(self.maxFileSize + 1)
+            finally:
+                fileObject.close()
+            if len(contents) > self.maxFileSize:
+                # It grew since it was stat'd.
+                return fileResource.open()
+            entry.contents = contents
+        return StringIO(entry.contents)
+
+
+    def invalidate(self, path=None):
+        """
+        Forget what is known about C{path}, or about every path if C{path} is
+        C{None}.
+
+        @type path: C{str}
+        """
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+
+
+    def watch(self, notifier, filePath):
+        """
+        Invalidate entries as soon as inotify reports changes below the
+        directory C{filePath}.
+
+        @param notifier: A L{twisted.internet.inotify.INotify} which has
+            been started.
+        @param filePath: The L{FilePath} of the directory to watch,
+            recursively.
+        """
+        notifier.watch(filePath, autoAdd=True, recursive=True,
+                       callbacks=[self._notified])
+
+
+    def _notified(self, ignored, filePath, mask):
+        """
+        Invalidate the entries for a path inotify reported a change to, and
+        for its parent directory whose listing has probably changed as well.
+        """
+        from twisted.internet.inotify import IN_Q_OVERFLOW
+        if mask & IN_Q_OVERFLOW:
+            self.invalidate()
+        else:
+            self.invalidate(filePath.path)
+            self.invalidate(filePath.dirname())
+
+
+
 class File(resource.Resource, styles.Versioned, filepath.FilePath):
     """
     File is a resource that represents a plain non-interpreted file
@@ -167,10 +424,31 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
     return the contents of /tmp/foo/bar.html .
 
     @cvar childNotFound: L{Resource} used to render 404 Not Found error pages.
+
+    @cvar useSendfile: If C{True}, and the request's transport is a plain
+        TCP connection which supports it, the contents of the file are sent
+        with L{SendfileStaticProducer} rather than being read into memory.
+        C{False} by default.
+
+    @cvar cache: A L{FileCache} used to avoid system calls when looking up
+        children and serving files, or C{None}.  It is passed on to the
+        L{File} instances created for children.
+
+    @cvar servePrecompressed: If C{True}, a request for I{foo.js} from a
+        client which accepts gzip is answered with the contents of
+        I{foo.js.gz}, if that exists and is not older than I{foo.js}, with a
+        I{Content-Encoding} of gzip.  Any encoder applied to the request (see
+        L{resource.EncodingResourceWrapper}) is skipped.
     """
 
     contentTypes = loadMimeTypes()
 
+    useSendfile = False
+
+    cache = None
+
+    servePrecompressed = False
+
     contentEncodings = {
         ".gz" : "gzip",
         ".bz2": "bzip2"
@@ -299,7 +577,11 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
             if fpath is None:
                 return self.directoryListing()
 
-        if not fpath.exists():
+        if self.cache is not None:
+            exists = self.cache.restat(fpath, reraise=False)
+        else:
+            exists = fpath.exists()
+        if not exists:
             fpath = fpath.siblingExtensionSearch(*self.ignoredExts)
             if fpath is None:
                 return self.childNotFound
@@ -315,9 +597,22 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
         return self.createSimilarFile(fpath.path)
 
 
+    def restat(self, reraise=True):
+        """
+        Re-calculate cached effects of 'stat', through L{File.cache} if it is
+        set.  See L{filepath.FilePath.restat}.
+        """
+        if self.cache is None:
+            filepath.FilePath.restat(self, reraise)
+        else:
+            self.cache.restat(self, reraise)
+
+
     # methods to allow subclasses to e.g. decrypt files on the fly:
     def openForReading(self):
         """Open a file and return it."""
+        if self.cache is not None:
+            return self.cache.openForReading(self)
         return self.open()
 
 
@@ -567,21 +862,20 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
         """
         byteRange = request.getHeader('range')
         if byteRange is None:
-            self._setContentHeaders(request)
-            request.setResponseCode(http.OK)
-            return NoRangeStaticProducer(request, fileForReading)
+            return self._makeNoRangeProducer(request, fileForReading)
         try:
             parsedRanges = self._parseRangeHeader(byteRange)
         except ValueError:
             log.msg("Ignoring malformed Range header %r" % (byteRange,))
-            self._setContentHeaders(request)
-            request.setResponseCode(http.OK)
-            return NoRangeStaticProducer(request, fileForReading)
+            return self._makeNoRangeProducer(request, fileForReading)
 
         if len(parsedRanges) == 1:
             offset, size = self._doSingleRangeRequest(
                 request, parsedRanges[0])
             self._setContentHeaders(request, size)
+            if self._canSendfile(request, fileForReading):
+                return SendfileStaticProducer(
+                    request, fileForReading, offset, size)
             return SingleRangeStaticProducer(
                 request, fileForReading, offset, size)
         else:
@@ -590,6 +884,56 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
                 request, fileForReading, rangeInfo)
 
 
+    def _makeNoRangeProducer(self, request, fileForReading):
+        """
+        Make a L{StaticProducer} for a response containing the whole file,
+        and set the response code and Content-* headers accordingly.
+
+        @param request: The L{Request} object.
+        @param fileForReading: The file object containing the resource.
+        @return: A L{StaticProducer}.
+        """
+        self._setContentHeaders(request)
+        request.setResponseCode(http.OK)
+        if self._canSendfile(request, fileForReading):
+            return SendfileStaticProducer(
+                request, fileForReading, 0, self.getFileSize())
+        return NoRangeStaticProducer(request, fileForReading)
+
+
+    def _canSendfile(self, request, fileForReading):
+        """
+        Determine whether the response can be sent with
+        L{SendfileStaticProducer}.
+
+        That requires a real file, a transport which supports sendfile (see
+        L{twisted.internet.tcp.Connection.canSendfile}), and a request which
+        will send the file contents unchanged, that is, one which is neither
+        being encoded nor having a faked HEAD response generated.
+
+        The transport must be an instance of one of L{_sendfileTransports}
+        exactly.  Wrappers such as
+        L{twisted.protocols.tls.TLSMemoryBIOProtocol} and those made by
+        L{twisted.protocols.policies.WrappingFactory} pass attribute lookups
+        through to the connection they wrap, so they appear to support
+        sendfile, but the data they write must go through their own
+        C{write}.
+
+        @param request: The L{Request} object.
+        @param fileForReading: The file object containing the resource.
+        @return: C{True} if L{SendfileStaticProducer} can be used.
+        """
+        if not self.useSendfile or not isinstance(fileForReading, file):
+            return False
+        if (getattr(request, '_encoder', None) is not None or
+            getattr(request, '_inFakeHead', False)):
+            return False
+        transport = getattr(request, 'transport', None)
+        if type(transport) not in _sendfileTransports:
+            return False
+        return transport.canSendfile()
+
+
     def render_GET(self, request):
         """
         Begin sending the contents of this L{File} (or a subset of the
@@ -598,10 +942,12 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
         self.restat(False)
 
         if self.type is None:
-            self.type, self.encoding = getTypeAndEncoding(self.basename(),
-                                                          self.contentTypes,
-                                                          self.contentEncodings,
-                                                          self.defaultType)
+            if self.cache is not None:
+                self.type, self.encoding = self.cache.getTypeAndEncoding(self)
+            else:
+                self.type, self.encoding = getTypeAndEncoding(
+                    self.basename(), self.contentTypes, self.contentEncodings,
+                    self.defaultType)
 
         if not self.exists():
             return self.childNotFound.render(request)
@@ -609,6 +955,11 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
         if self.isdir():
             return self.redirect(request)
 
+        if self.servePrecompressed and self.encoding is None:
+            precompressed = self._precompressedSibling(request)
+            if precompressed is not None:
+                return precompressed.render_GET(request)
+
         request.setHeader('accept-ranges', 'bytes')
 
         try:
@@ -635,6 +986,38 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
     render_HEAD = render_GET
 
 
+    def _precompressedSibling(self, request):
+        """
+        Find the gzip-compressed copy of this file to send in response to
+        C{request}, as described for L{File.servePrecompressed}.
+
+        A I{Vary} header is set whenever a copy exists, since the response
+        then depends on the I{Accept-Encoding} header.
+
+        @param request: The L{Request} object.
+        @return: A L{File} for the compressed copy, or C{None}.
+        """
+        sibling = self.siblingExtension('.gz')
+        if self.cache is not None:
+            statinfo = self.cache.restat(sibling, reraise=False)
+        else:
+            sibling.restat(reraise=False)
+            statinfo = sibling.statinfo
+        if (not statinfo or not stat.S_ISREG(statinfo.st_mode) or
+            statinfo.st_mtime < self.getModificationTime()):
+            return None
+        request.setHeader('vary', 'accept-encoding')
+        if not _acceptsGzip(request):
+            return None
+        if getattr(request, '_encoder', None) is not None:
+            # The contents are already compressed.
+            request._encoder = None
+        precompressed = self.createSimilarFile(sibling.path)
+        precompressed.type = self.type
+        precompressed.encoding = 'gzip'
+        return precompressed
+
+
     def redirect(self, request):
         return redirectTo(addSlash(request), request)
 
@@ -642,6 +1025,8 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
     def listNames(self):
         if not self.isdir():
             return []
+        if self.cache is not None:
+            return self.cache.listNames(self)
         directory = self.listdir()
         directory.sort()
         return directory
@@ -656,6 +1041,9 @@ class File(resource.Resource, styles.Versioned, filepath.FilePath):
         f.processors = self.processors
         f.indexNames = self.indexNames[:]
         f.childNotFound = self.childNotFound
+        f.cache = self.cache
+        f.useSendfile = self.useSendfile
+        f.servePrecompressed = self.servePrecompressed
         return f
 
 
@@ -768,6 +1156,93 @@ class SingleRangeStaticProducer(StaticProducer):
 
 
 
+# The transports which write straight to their socket, and so may be given
+# file contents with sendfile(2).
+_sendfileTransports = (tcp.Connection, tcp.Server, tcp.Client)
+
+
+
+class SendfileStaticProducer(StaticProducer):
+    """
+    A L{StaticProducer} that has the kernel copy a chunk of a file straight to
+    the request's transport with sendfile(2), without reading it into memory.
+
+    The transport must provide C{sendfile} as
+    L{twisted.internet.tcp.Connection} does, and the response must not be
+    chunked or otherwise encoded.  If the transport's C{sendfile} fails, the
+    rest of the chunk is read from the file and written to the request, as
+    L{SingleRangeStaticProducer} does.
+
+    @ivar sendfileFailed: C{True} once the transport's C{sendfile} has failed.
+    """
+
+    sendfileFailed = False
+
+    def __init__(self, request, fileObject, offset, size):
+        """
+        Initialize the instance.
+
+        @param request: See L{StaticProducer}.
+        @param fileObject: See L{StaticProducer}.
+        @param offset: The offset into the file of the chunk to be written.
+        @param size: The size of the chunk to write.
+        """
+        StaticProducer.__init__(self, request, fileObject)
+        self.offset = offset
+        self.size = size
+
+
+    def start(self):
+        self.bytesWritten = 0
+        # Write the response headers; the body bypasses request.write.
+        self.request.write('')
+        self.request.registerProducer(self, False)
+
+
+    def resumeProducing(self):
+        if not self.request:
+            return
+        if self.bytesWritten < self.size and not self.sendfileFailed:
+            try:
+                sent = self.request.transport.sendfile(
+                    self.fileObject, self.offset + self.bytesWritten,
+                    self.size - self.bytesWritten)
+            except (OSError, IOError):
+                self.sendfileFailed = True
+                self.fileObject.seek(self.offset + self.bytesWritten)
+            else:
+                self.bytesWritten += sent
+                self.request.sentLength += sent
+                if not sent and self._truncated():
+                    # The file shrank.  Stop early, as NoRangeStaticProducer
+                    # does when it runs out of data to read.
+                    self.size = self.bytesWritten
+        if self.bytesWritten < self.size and self.sendfileFailed:
+            data = self.fileObject.read(
+                min(self.bufferSize, self.size - self.bytesWritten))
+            if data:
+                self.bytesWritten += len(data)
+                # this .write will spin the reactor, calling .doWrite and then
+                # .resumeProducing again, so be prepared for a re-entrant call
+                self.request.write(data)
+            else:
+                self.size = self.bytesWritten
+        if self.request and self.bytesWritten == self.size:
+            self.request.unregisterProducer()
+            self.request.finish()
+            self.stopProducing()
+
+
+    def _truncated(self):
+        """
+        Determine whether the file has shrunk so that nothing is left to send
+        from it.
+        """
+        return (os.fstat(self.fileObject.fileno()).st_size <=
+                self.offset + self.bytesWritten)
+
+
+
 class MultipleRangeStaticProducer(StaticProducer):
     """
     A L{StaticProducer} that writes several chunks of a file to the request.
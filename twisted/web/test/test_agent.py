@@ -25,6 +25,7 @@ from twisted.internet.error import ConnectionRefusedError, ConnectionDone
 from twisted.internet.protocol import Protocol, Factory
 from twisted.internet.defer import Deferred, succeed
 from twisted.internet.endpoints import TCP4ClientEndpoint, SSL4ClientEndpoint
+from twisted.internet.endpoints import HostnameEndpoint, CachingHostResolver
 from twisted.web.client import FileBodyProducer, Request, HTTPConnectionPool
 from twisted.web.client import _WebToNormalContextFactory
 from twisted.web.client import WebClientContextFactory, _HTTP11ClientFactory
@@ -372,11 +373,45 @@ class BadEndpoint(object):
         raise RuntimeError("This endpoint should not have been used.")
 
 
+class PendingEndpoint(object):
+    """
+    An endpoint whose connection attempts only succeed or fail when the test
+    says so.
+
+    @ivar attempts: A C{list} of C{(factory, Deferred)} tuples, one for each
+        connection attempt.
+    """
+
+    def __init__(self):
+        self.attempts = []
+
+
+    def connect(self, factory):
+        d = Deferred()
+        self.attempts.append((factory, d))
+        return d
+
+
+    def succeed(self, index=-1):
+        """
+        Make a connection attempt succeed with a protocol connected to a
+        L{StringTransport}.
+
+        @return: The protocol.
+        """
+        factory, d = self.attempts[index]
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(StringTransport())
+        d.callback(protocol)
+        return protocol
+
+
+
 class DummyFactory(Factory):
     """
     Create C{StubHTTPProtocol} instances.
     """
-    def __init__(self, quiescentCallback):
+    def __init__(self, quiescentCallback, connectionLostCallback=None):
         pass
 
     protocol = StubHTTPProtocol
@@ -564,14 +599,14 @@ class HTTPConnectionPoolTests(unittest.TestCase, FakeReactorAndConnectMixin):
             pool._putConnection(key, p)
         self.assertEqual(pool._connections[key], origCached)
 
-        # We close the first one:
-        origCached[0].state = "DISCONNECTED"
+        # We close the most recently cached one:
+        origCached[1].state = "DISCONNECTED"
 
-        # Now, when we retrive connections we should get the *second* one:
+        # Now, when we retrive connections we should get the *first* one:
         result = []
         self.pool.getConnection(key,
                                 BadEndpoint()).addCallback(result.append)
-        self.assertIdentical(result[0], origCached[1])
+        self.assertIdentical(result[0], origCached[0])
 
         # And both the disconnected and removed connections should be out of
         # the cache:
@@ -673,6 +708,231 @@ class HTTPConnectionPoolTests(unittest.TestCase, FakeReactorAndConnectMixin):
 
 
 
+class HTTPConnectionPoolLimitTests(unittest.TestCase,
+                                    FakeReactorAndConnectMixin):
+    """
+    Tests for the connection limits, wait queue and statistics of
+    L{HTTPConnectionPool}.
+    """
+
+    def setUp(self):
+        self.fakeReactor = self.Reactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.pool.retryAutomatically = False
+        self.key = ("http", "example.com", 80)
+
+
+    def getConnection(self, key=None, endpoint=None):
+        """
+        Get a connection from the pool, using a L{DummyEndpoint} by default.
+
+        @return: A C{list} which will hold the connection once the pool gives
+            it.
+        """
+        if key is None:
+            key = self.key
+        if endpoint is None:
+            endpoint = DummyEndpoint()
+        result = []
+        self.pool.getConnection(key, endpoint).addCallback(result.append)
+        return result
+
+
+    def release(self, connection):
+        """
+        Finish the request made with C{connection}, returning it to the pool.
+        """
+        connection._state = "QUIESCENT"
+        connection._quiescentCallback(connection)
+
+
+    def test_reuseMostRecentlyCached(self):
+        """
+        L{HTTPConnectionPool.getConnection} gives the most recently cached
+        connection, leaving the others to time out.
+        """
+        first = self.getConnection()[0]
+        second = self.getConnection()[0]
+        self.release(first)
+        self.release(second)
+        self.assertEqual(self.getConnection()[0], second)
+        self.assertEqual(self.pool._connections[self.key], [first])
+
+
+    def test_statistics(self):
+        """
+        L{HTTPConnectionPool} counts the requests given a cached connection in
+        C{hits}, those given a new connection in C{misses} and the cached
+        connections closed by a timeout in C{evictions}.
+        """
+        connection = self.getConnection()[0]
+        self.release(connection)
+        self.getConnection()
+        self.getConnection()
+        self.assertEqual((self.pool.hits, self.pool.misses), (1, 2))
+
+        self.release(connection)
+        self.fakeReactor.advance(self.pool.cachedConnectionTimeout)
+        self.assertTrue(connection.transport.disconnecting)
+        self.assertEqual(self.pool.evictions, 1)
+        self.assertEqual(self.pool.waits, 0)
+
+
+    def test_unlimitedByDefault(self):
+        """
+        By default L{HTTPConnectionPool} opens as many connections as
+        requested.
+        """
+        for i in range(10):
+            self.assertEqual(len(self.getConnection()), 1)
+        self.assertEqual(self.pool._openConnectionCount, 10)
+        self.assertEqual(self.pool.waits, 0)
+
+
+    def test_maxConnectionsPerHost(self):
+        """
+        Once C{maxConnectionsPerHost} connections are open for a key, further
+        requests for it wait until a connection is returned to the pool,
+        while requests for other keys are not affected.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        connection = self.getConnection()[0]
+        waiting = self.getConnection()
+        self.assertEqual(waiting, [])
+        self.assertEqual(self.pool.waits, 1)
+
+        other = self.getConnection(("http", "example.org", 80))
+        self.assertEqual(len(other), 1)
+
+        self.release(connection)
+        # The connection is not ready for a new request until its quiescent
+        # callback has returned.
+        self.assertEqual(waiting, [])
+        self.fakeReactor.advance(0)
+        self.assertEqual(waiting, [connection])
+        self.assertEqual(self.pool._connections[self.key], [])
+        self.assertEqual(self.pool.hits, 1)
+
+
+    def test_waitersServedInOrder(self):
+        """
+        Requests waiting for a connection are given one in the order they
+        were made.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        connection = self.getConnection()[0]
+        first = self.getConnection()
+        second = self.getConnection()
+
+        connection.connectionLost(Failure(ConnectionDone()))
+        self.fakeReactor.advance(0)
+        self.assertEqual(len(first), 1)
+        self.assertNotIdentical(first[0], connection)
+        self.assertEqual(second, [])
+
+        self.release(first[0])
+        self.fakeReactor.advance(0)
+        self.assertEqual(second, first)
+
+
+    def test_connectionLostReleasesSlot(self):
+        """
+        A connection lost while in use or while cached no longer counts
+        against the connection limits.
+        """
+        busy = self.getConnection()[0]
+        idle = self.getConnection()[0]
+        self.release(idle)
+        self.assertEqual(self.pool._openConnections, {self.key: 2})
+
+        busy.connectionLost(Failure(ConnectionDone()))
+        idle.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(self.pool._openConnections, {})
+        self.assertEqual(self.pool._openConnectionCount, 0)
+        self.assertEqual(self.pool._connections[self.key], [])
+        self.assertEqual(self.pool._timeouts, {})
+
+
+    def test_pendingConnectionsCount(self):
+        """
+        Connections which are still being established count against the
+        connection limits, and a failed attempt frees its slot for a waiting
+        request.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        endpoint = PendingEndpoint()
+        first = []
+        self.pool.getConnection(self.key, endpoint).addErrback(first.append)
+        second = self.getConnection(endpoint=endpoint)
+        self.assertEqual(len(endpoint.attempts), 1)
+
+        endpoint.attempts[0][1].errback(ConnectionRefusedError())
+        self.assertEqual(len(first), 1)
+        first[0].trap(ConnectionRefusedError)
+        self.fakeReactor.advance(0)
+        self.assertEqual(len(endpoint.attempts), 2)
+
+        protocol = endpoint.succeed()
+        self.assertEqual(second, [protocol])
+        self.assertEqual(self.pool._openConnections, {self.key: 1})
+
+
+    def test_maxConnections(self):
+        """
+        Once C{maxConnections} connections are open, requests for any key wait
+        until a connection is released.
+        """
+        self.pool.maxConnections = 1
+        connection = self.getConnection()[0]
+        waiting = self.getConnection(("http", "example.org", 80))
+        self.assertEqual(waiting, [])
+
+        connection.connectionLost(Failure(ConnectionDone()))
+        self.fakeReactor.advance(0)
+        self.assertEqual(len(waiting), 1)
+        self.assertEqual(self.pool.waits, 1)
+        self.assertEqual(self.pool.misses, 2)
+
+
+    def test_maxConnectionsEvictsIdle(self):
+        """
+        If C{maxConnections} is reached but some connections are cached, the
+        least recently used one is closed to make room for a new connection.
+        """
+        self.pool.maxConnections = 2
+        first = self.getConnection()[0]
+        second = self.getConnection(("http", "example.net", 80))[0]
+        self.release(first)
+        self.fakeReactor.advance(1)
+        self.release(second)
+
+        other = self.getConnection(("http", "example.org", 80))
+        self.assertEqual(len(other), 1)
+        self.assertTrue(first.transport.disconnecting)
+        self.assertFalse(second.transport.disconnecting)
+        self.assertEqual(self.pool.evictions, 1)
+        self.assertEqual(self.pool.waits, 0)
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling the L{Deferred} of a waiting request removes it from the
+        queue.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        connection = self.getConnection()[0]
+        d = self.pool.getConnection(self.key, BadEndpoint())
+        d.cancel()
+        self.assertFailure(d, defer.CancelledError)
+        self.assertEqual(self.pool._waiting, [])
+
+        self.release(connection)
+        self.fakeReactor.advance(0)
+        self.assertEqual(self.pool._connections[self.key], [connection])
+        return d
+
+
+
 class AgentTests(unittest.TestCase, FakeReactorAndConnectMixin):
     """
     Tests for the new HTTP client API provided by L{Agent}.
@@ -830,6 +1090,29 @@ class AgentTests(unittest.TestCase, FakeReactorAndConnectMixin):
         test_connectHTTPS.skip = "OpenSSL not present"
 
 
+    def test_connectWithHostResolver(self):
+        """
+        If a L{CachingHostResolver} is passed to L{Agent.__init__},
+        L{Agent._getEndpoint} returns a L{HostnameEndpoint} using it for
+        C{'http'} URIs, and one which connects with SSL for C{'https'} URIs.
+        """
+        resolver = CachingHostResolver(self.reactor)
+        agent = client.Agent(self.reactor, connectTimeout=5,
+                             hostResolver=resolver)
+        endpoint = agent._getEndpoint('http', 'example.com', 1234)
+        self.assertIdentical(endpoint.__class__, HostnameEndpoint)
+        self.assertIdentical(endpoint._resolver, resolver)
+        self.assertEqual(
+            (endpoint._host, endpoint._port, endpoint._timeout),
+            ('example.com', 1234, 5))
+
+        endpoint = agent._getEndpoint('https', 'example.com', 4321)
+        self.assertIsInstance(endpoint, HostnameEndpoint)
+        self.assertIdentical(endpoint._resolver, resolver)
+        self.assertIsInstance(endpoint._sslContextFactory,
+                              _WebToNormalContextFactory)
+
+
     def test_connectHTTPSCustomContextFactory(self):
         """
         If a context factory is passed to L{Agent.__init__} it will be used to
@@ -1105,9 +1388,11 @@ class HTTPConnectionPoolRetryTests(unittest.TestCase, FakeReactorAndConnectMixin
         d = pool.getConnection(123, DummyEndpoint())
 
         def gotConnection(connection):
-            # Don't want to use isinstance since potentially the wrapper might
-            # subclass it at some point:
-            self.assertIdentical(connection.__class__, HTTP11ClientProtocol)
+            # The pool's own protocol subclass is fine, the retrying wrapper
+            # is not:
+            self.assertIsInstance(connection, HTTP11ClientProtocol)
+            self.assertNotIsInstance(
+                connection, client._RetryingHTTP11ClientProtocol)
         return d.addCallback(gotConnection)
 
 
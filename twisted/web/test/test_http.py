@@ -107,6 +107,8 @@ class ResponseTestMixin(object):
 
 
 class HTTP1_0TestCase(unittest.TestCase, ResponseTestMixin):
+    channelFactory = http.HTTPChannel
+
     requests = (
         b"GET / HTTP/1.0\r\n"
         b"\r\n"
@@ -127,7 +129,7 @@ class HTTP1_0TestCase(unittest.TestCase, ResponseTestMixin):
         Send requests over a channel and check responses match what is expected.
         """
         b = StringTransport()
-        a = http.HTTPChannel()
+        a = self.channelFactory()
         a.requestFactory = DummyHTTPHandler
         a.makeConnection(b)
         # one byte at a time, to stress it.
@@ -145,7 +147,7 @@ class HTTP1_0TestCase(unittest.TestCase, ResponseTestMixin):
         """
         clock = Clock()
         transport = StringTransport()
-        protocol = http.HTTPChannel()
+        protocol = self.channelFactory()
         protocol.timeOut = 100
         protocol.callLater = clock.callLater
         protocol.makeConnection(transport)
@@ -237,6 +239,7 @@ class HTTP0_9TestCase(HTTP1_0TestCase):
 
 
 class HTTPLoopbackTestCase(unittest.TestCase):
+    channelFactory = http.HTTPChannel
 
     expectedHeaders = {b'request': b'/foo/bar',
                        b'command': b'GET',
@@ -265,7 +268,7 @@ class HTTPLoopbackTestCase(unittest.TestCase):
         self.assertEqual(self.numHeaders, 4)
 
     def testLoopback(self):
-        server = http.HTTPChannel()
+        server = self.channelFactory()
         server.requestFactory = DummyHTTPHandler
         client = LoopbackHTTPClient()
         client.handleResponse = self._handleResponse
@@ -657,6 +660,8 @@ class ParsingTestCase(unittest.TestCase):
     """
     Tests for protocol parsing in L{HTTPChannel}.
     """
+    channelFactory = http.HTTPChannel
+
     def setUp(self):
         self.didRequest = False
 
@@ -664,7 +669,7 @@ class ParsingTestCase(unittest.TestCase):
     def runRequest(self, httpRequest, requestClass, success=1):
         httpRequest = httpRequest.replace(b"\n", b"\r\n")
         b = StringTransport()
-        a = http.HTTPChannel()
+        a = self.channelFactory()
         a.requestFactory = requestClass
         a.makeConnection(b)
         # one byte at a time, to stress it.
@@ -1775,6 +1780,7 @@ class Expect100ContinueServerTests(unittest.TestCase, ResponseTestMixin):
     code can run before the body of a POST is processed this should be
     extended to support overriding this behavior.
     """
+    channelFactory = http.HTTPChannel
 
     def test_HTTP10(self):
         """
@@ -1782,7 +1788,7 @@ class Expect100ContinueServerTests(unittest.TestCase, ResponseTestMixin):
         100-continue' is included (RFC 2616 10.1.1).
         """
         transport = StringTransport()
-        channel = http.HTTPChannel()
+        channel = self.channelFactory()
         channel.requestFactory = DummyHTTPHandler
         channel.makeConnection(transport)
         channel.dataReceived(b"GET / HTTP/1.0\r\n")
@@ -1810,7 +1816,7 @@ class Expect100ContinueServerTests(unittest.TestCase, ResponseTestMixin):
         will send an additional response code.
         """
         transport = StringTransport()
-        channel = http.HTTPChannel()
+        channel = self.channelFactory()
         channel.requestFactory = DummyHTTPHandler
         channel.makeConnection(transport)
         channel.dataReceived(b"GET / HTTP/1.1\r\n")
@@ -1846,7 +1852,7 @@ class Expect100ContinueServerTests(unittest.TestCase, ResponseTestMixin):
         the response to the second request.
         """
         transport = StringTransport()
-        channel = http.HTTPChannel()
+        channel = self.channelFactory()
         channel.requestFactory = DummyHTTPHandler
         channel.makeConnection(transport)
         channel.dataReceived(
@@ -1877,3 +1883,270 @@ class Expect100ContinueServerTests(unittest.TestCase, ResponseTestMixin):
               b"Version: HTTP/1.1",
               b"Request: /foo",
               b"'''\n4\ndefg'''\n")])
+
+
+
+class PipeliningTests(unittest.TestCase):
+    """
+    Tests for the processing of pipelined requests by L{http.HTTPChannel}.
+    """
+    channelFactory = http.HTTPChannel
+
+    requests = (
+        b"GET /a HTTP/1.1\r\n\r\n"
+        b"GET /b HTTP/1.1\r\n\r\n"
+        b"GET /c HTTP/1.1\r\n\r\n")
+
+    def setUp(self):
+        processed = self.processed = []
+        class SlowRequest(http.Request):
+            def process(self):
+                processed.append(self)
+
+        self.transport = StringTransport()
+        self.channel = self.channelFactory()
+        self.channel.requestFactory = SlowRequest
+        self.channel.makeConnection(self.transport)
+
+
+    def respond(self, request):
+        """
+        Finish C{request} with its URI as the body.
+        """
+        request.setHeader(b"content-length", intToBytes(len(request.uri)))
+        request.write(request.uri)
+        request.finish()
+
+
+    def bodies(self):
+        """
+        @return: The bodies of the responses written to the transport.
+        """
+        return [response.split(b"\r\n\r\n", 1)[1]
+                for response in self.transport.value().split(b"HTTP/1.1 ")[1:]]
+
+
+    def test_concurrentProcessing(self):
+        """
+        Pipelined requests are processed without waiting for the responses
+        to earlier ones, and the responses are written in order.
+        """
+        self.channel.dataReceived(self.requests)
+        self.assertEqual(
+            [b"/a", b"/b", b"/c"], [r.uri for r in self.processed])
+        first, second, third = self.processed
+        self.respond(third)
+        self.respond(second)
+        self.assertEqual(b"", self.transport.value())
+        self.respond(first)
+        self.assertEqual([b"/a", b"/b", b"/c"], self.bodies())
+
+
+    def test_maxPipelinedRequests(self):
+        """
+        Once C{maxPipelinedRequests} requests are outstanding, no more
+        requests are read until the oldest response is finished.
+        """
+        self.channel.maxPipelinedRequests = 2
+        self.channel.dataReceived(self.requests)
+        self.assertEqual([b"/a", b"/b"], [r.uri for r in self.processed])
+        self.assertEqual("paused", self.transport.producerState)
+
+        first, second = self.processed
+        self.respond(second)
+        self.assertEqual(2, len(self.processed))
+        self.respond(first)
+        self.assertEqual(
+            [b"/a", b"/b", b"/c"], [r.uri for r in self.processed])
+        self.assertEqual("producing", self.transport.producerState)
+        self.respond(self.processed[2])
+        self.assertEqual([b"/a", b"/b", b"/c"], self.bodies())
+
+
+    def test_oneAtATime(self):
+        """
+        With a C{maxPipelinedRequests} of C{1}, each request is processed
+        once the previous response has been finished.
+        """
+        self.channel.maxPipelinedRequests = 1
+        self.channel.dataReceived(self.requests)
+        for uri in [b"/a", b"/b", b"/c"]:
+            self.assertEqual(uri, self.processed[-1].uri)
+            self.respond(self.processed[-1])
+        self.assertEqual([b"/a", b"/b", b"/c"], self.bodies())
+
+
+    def test_factory(self):
+        """
+        L{http.HTTPFactory} sets the C{maxPipelinedRequests} of the channels it
+        builds to its own, if that is not C{None}.
+        """
+        factory = http.HTTPFactory()
+        self.assertEqual(
+            None, factory.buildProtocol(None).maxPipelinedRequests)
+        factory.maxPipelinedRequests = 3
+        self.assertEqual(3, factory.buildProtocol(None).maxPipelinedRequests)
+
+
+
+class HeaderBlockPipeliningTests(PipeliningTests):
+    """
+    L{PipeliningTests} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockHTTP1_0TestCase(HTTP1_0TestCase):
+    """
+    L{HTTP1_0TestCase} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockHTTP1_1TestCase(HTTP1_1TestCase):
+    """
+    L{HTTP1_1TestCase} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockHTTP1_1_close_TestCase(HTTP1_1_close_TestCase):
+    """
+    L{HTTP1_1_close_TestCase} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockHTTP0_9TestCase(HTTP0_9TestCase):
+    """
+    L{HTTP0_9TestCase} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockHTTPLoopbackTestCase(HTTPLoopbackTestCase):
+    """
+    L{HTTPLoopbackTestCase} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockExpect100ContinueServerTests(Expect100ContinueServerTests):
+    """
+    L{Expect100ContinueServerTests} for L{http.HeaderBlockHTTPChannel}.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+
+
+class HeaderBlockParsingTestCase(ParsingTestCase):
+    """
+    L{ParsingTestCase} for L{http.HeaderBlockHTTPChannel}, and tests for its
+    own behavior.
+    """
+    channelFactory = http.HeaderBlockHTTPChannel
+
+    def connect(self, requestFactory):
+        """
+        Connect a L{http.HeaderBlockHTTPChannel} to a L{StringTransport}.
+
+        @param requestFactory: The C{requestFactory} for the channel.
+        @return: The channel.
+        """
+        channel = http.HeaderBlockHTTPChannel()
+        channel.requestFactory = requestFactory
+        channel.makeConnection(StringTransport())
+        return channel
+
+
+    def test_continuationLines(self):
+        """
+        A header line starting with a space or tab continues the value of the
+        previous header.
+        """
+        processed = []
+        class MyRequest(http.Request):
+            def process(self):
+                processed.append(self)
+                self.finish()
+
+        channel = self.connect(MyRequest)
+        channel.dataReceived(
+            b"GET / HTTP/1.1\r\n"
+            b"X-Multiline: line-0\r\n"
+            b"\tline-1\r\n"
+            b"Foo: bar\r\n"
+            b"\r\n")
+        [request] = processed
+        self.assertEqual(
+            [b"line-0\n\tline-1"],
+            request.requestHeaders.getRawHeaders(b"x-multiline"))
+        self.assertEqual([b"bar"], request.requestHeaders.getRawHeaders(b"foo"))
+
+
+    def test_continuationWithoutHeader(self):
+        """
+        A continuation line before any header makes the request invalid.
+        """
+        channel = self.connect(http.Request)
+        channel.dataReceived(b"GET / HTTP/1.1\r\n\tfoo\r\n\r\n")
+        self.assertEqual(
+            b"HTTP/1.1 400 Bad Request\r\n\r\n", channel.transport.value())
+        self.assertTrue(channel.transport.disconnecting)
+
+
+    def test_headerWithoutColon(self):
+        """
+        A header line without a colon makes the request invalid.
+        """
+        channel = self.connect(http.Request)
+        channel.dataReceived(b"GET / HTTP/1.1\r\nfoo\r\n\r\n")
+        self.assertEqual(
+            b"HTTP/1.1 400 Bad Request\r\n\r\n", channel.transport.value())
+        self.assertTrue(channel.transport.disconnecting)
+
+
+    def test_headerBlockTooLong(self):
+        """
+        If more than C{maxHeaderBlockLength} bytes are received without the
+        end of the headers, the connection is dropped.
+        """
+        channel = self.connect(http.Request)
+        channel.maxHeaderBlockLength = 20
+        channel.dataReceived(b"GET / HTTP/1.1\r\n")
+        self.assertFalse(channel.transport.disconnecting)
+        channel.dataReceived(b"Foo: barbazquux\r\n")
+        self.assertTrue(channel.transport.disconnecting)
+
+
+    def test_pipelinedInOneChunk(self):
+        """
+        Several requests, with bodies, received in one chunk are all
+        processed, in order.
+        """
+        processed = []
+        class MyRequest(http.Request):
+            def process(self):
+                processed.append((self.uri, self.content.read()))
+                self.finish()
+
+        channel = self.connect(MyRequest)
+        channel.dataReceived(
+            b"POST /a HTTP/1.1\r\n"
+            b"Content-Length: 3\r\n"
+            b"\r\n"
+            b"abc"
+            b"POST /b HTTP/1.1\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"\r\n"
+            b"2\r\nde\r\n0\r\n\r\n"
+            b"GET /c HTTP/1.1\r\n"
+            b"\r\n")
+        self.assertEqual(
+            [(b"/a", b"abc"), (b"/b", b"de"), (b"/c", b"")], processed)
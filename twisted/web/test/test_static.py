@@ -5,21 +5,32 @@
 Tests for L{twisted.web.static}.
 """
 
-import os, re, StringIO
+import errno, os, re, StringIO
 
 from zope.interface.verify import verifyObject
 
 from twisted.internet import abstract, interfaces
+from twisted.internet.protocol import Factory, Protocol
+from twisted.internet.task import Clock
 from twisted.python.compat import set
 from twisted.python.runtime import platform
 from twisted.python.filepath import FilePath
 from twisted.python import log
 from twisted.trial.unittest import TestCase
+from twisted.protocols import policies
 from twisted.web import static, http, script, resource
 from twisted.web.server import UnsupportedMethod
+from twisted.web.http_headers import Headers
 from twisted.web.test.test_web import DummyRequest
 from twisted.web.test._util import _render
 
+try:
+    from twisted.protocols.tls import TLSMemoryBIOFactory
+except ImportError:
+    TLSMemoryBIOFactory = None
+else:
+    from twisted.test.ssl_helpers import ServerTLSContext
+
 
 class StaticDataTests(TestCase):
     """
@@ -310,6 +321,319 @@ class StaticFileTests(TestCase):
 
 
 
+class FileCacheTests(TestCase):
+    """
+    Tests for L{static.FileCache} and its use by L{static.File}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = static.FileCache(
+            maxEntries=4, ttl=10, maxFileSize=16, clock=self.clock)
+        self.base = FilePath(self.mktemp())
+        self.base.makedirs()
+        self.base.child('a.txt').setContent('hello')
+
+
+    def test_restat(self):
+        """
+        L{FileCache.restat} sets the C{statinfo} of a path, only calling
+        L{os.stat} again once the entry is C{ttl} seconds old.
+        """
+        path = self.base.child('a.txt')
+        self.assertEqual(5, self.cache.restat(path).st_size)
+        self.assertEqual(5, path.statinfo.st_size)
+        self.cache.restat(FilePath(path.path))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.clock.advance(10)
+        self.cache.restat(path)
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+
+
+    def test_restatMissing(self):
+        """
+        L{FileCache.restat} remembers that a path does not exist, setting its
+        C{statinfo} to C{0} and raising L{OSError} if C{reraise} is C{True}.
+        """
+        path = self.base.child('missing')
+        self.assertEqual(0, self.cache.restat(path, reraise=False))
+        self.assertEqual(0, path.statinfo)
+        self.assertRaises(OSError, self.cache.restat, path)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+
+    def test_maxEntries(self):
+        """
+        L{FileCache} forgets the least recently used path once it holds
+        C{maxEntries} paths.
+        """
+        paths = [self.base.child(str(i)) for i in range(5)]
+        for path in paths:
+            self.cache.restat(path, reraise=False)
+        self.cache.restat(paths[4], reraise=False)
+        self.cache.restat(paths[0], reraise=False)
+        self.assertEqual((1, 6), (self.cache.hits, self.cache.misses))
+
+
+    def test_getTypeAndEncoding(self):
+        """
+        L{FileCache.getTypeAndEncoding} returns what L{getTypeAndEncoding}
+        does for a L{File}.
+        """
+        fileResource = static.File(self.base.child('a.txt.gz').path)
+        self.assertEqual(
+            ('text/plain', 'gzip'),
+            self.cache.getTypeAndEncoding(fileResource))
+
+
+    def test_openForReading(self):
+        """
+        L{FileCache.openForReading} keeps the contents of small files in
+        memory until they change.
+        """
+        path = self.base.child('a.txt')
+        fileResource = static.File(path.path)
+        self.assertEqual('hello', self.cache.openForReading(fileResource).read())
+        path.setContent('hello, world')
+        self.assertEqual('hello', self.cache.openForReading(fileResource).read())
+        self.clock.advance(10)
+        self.assertEqual(
+            'hello, world', self.cache.openForReading(fileResource).read())
+
+
+    def test_openForReadingLargeFile(self):
+        """
+        L{FileCache.openForReading} opens files bigger than C{maxFileSize}
+        bytes rather than keeping them in memory.
+        """
+        path = self.base.child('b.txt')
+        path.setContent('x' * 17)
+        fileObject = self.cache.openForReading(static.File(path.path))
+        self.addCleanup(fileObject.close)
+        self.assertIsInstance(fileObject, file)
+
+
+    def test_listNames(self):
+        """
+        L{FileCache.listNames} remembers the sorted names in a directory until
+        it is invalidated.
+        """
+        fileResource = static.File(self.base.path)
+        self.assertEqual(['a.txt'], self.cache.listNames(fileResource))
+        self.base.child('b.txt').setContent('')
+        self.assertEqual(['a.txt'], self.cache.listNames(fileResource))
+        self.cache.invalidate(self.base.path)
+        self.assertEqual(
+            ['a.txt', 'b.txt'], self.cache.listNames(fileResource))
+
+
+    def test_invalidateAll(self):
+        """
+        L{FileCache.invalidate} forgets every path when called with no path.
+        """
+        self.cache.restat(self.base)
+        self.cache.invalidate()
+        self.cache.restat(self.base)
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+
+    def test_watch(self):
+        """
+        L{FileCache.watch} watches a directory recursively and invalidates
+        the paths inotify reports changes to, and their parents.
+        """
+        watched = []
+        class FakeNotifier(object):
+            def watch(self, *args, **kwargs):
+                watched.append((args, kwargs))
+        self.cache.watch(FakeNotifier(), self.base)
+        [(args, kwargs)] = watched
+        self.assertEqual((self.base,), args)
+        self.assertTrue(kwargs['recursive'])
+        self.assertTrue(kwargs['autoAdd'])
+
+        path = self.base.child('a.txt')
+        self.cache.restat(path)
+        self.cache.restat(self.base)
+        self.cache.restat(self.base.parent())
+        [callback] = kwargs['callbacks']
+        callback(None, path, 0x2)
+        self.cache.restat(path)
+        self.cache.restat(self.base)
+        self.cache.restat(self.base.parent())
+        self.assertEqual((1, 5), (self.cache.hits, self.cache.misses))
+
+
+    def test_watchOverflow(self):
+        """
+        L{FileCache} forgets every path when inotify reports that its event
+        queue overflowed.
+        """
+        self.cache.restat(self.base)
+        self.cache._notified(None, FilePath('/'), 0x4000)
+        self.cache.restat(self.base)
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+
+    def test_fileUsesCache(self):
+        """
+        A L{File} with a C{cache} looks up children, and passes the cache on
+        to them, and serves files through it.
+        """
+        fileResource = static.File(self.base.path)
+        fileResource.cache = self.cache
+        request = DummyRequest(['a.txt'])
+        child = resource.getChildForRequest(fileResource, request)
+        self.assertIdentical(self.cache, child.cache)
+        d = _render(child, request)
+        def cbRendered(ignored):
+            self.assertEqual('hello', ''.join(request.written))
+            self.assertEqual(
+                'text/plain', request.outgoingHeaders['content-type'])
+            # Each path was only stat'd once.
+            self.assertEqual(2, self.cache.misses)
+        d.addCallback(cbRendered)
+        return d
+
+
+    def test_fileMissingChild(self):
+        """
+        A L{File} with a C{cache} returns C{childNotFound} for a missing
+        child.
+        """
+        fileResource = static.File(self.base.path)
+        fileResource.cache = self.cache
+        request = DummyRequest(['missing'])
+        child = resource.getChildForRequest(fileResource, request)
+        self.assertIdentical(fileResource.childNotFound, child)
+
+
+    def test_fileListNames(self):
+        """
+        L{File.listNames} uses the C{cache} of the L{File}.
+        """
+        fileResource = static.File(self.base.path)
+        fileResource.cache = self.cache
+        self.assertEqual(['a.txt'], fileResource.listNames())
+        self.base.child('b.txt').setContent('')
+        self.assertEqual(['a.txt'], fileResource.listNames())
+
+
+
+class PrecompressedTests(TestCase):
+    """
+    Tests for L{static.File.servePrecompressed}.
+    """
+
+    def setUp(self):
+        self.base = FilePath(self.mktemp())
+        self.base.makedirs()
+        self.original = self.base.child('app.js')
+        self.original.setContent('plain')
+        self.compressed = self.base.child('app.js.gz')
+        self.compressed.setContent('compressed')
+        os.utime(self.original.path, (1000, 1000))
+        self.resource = static.File(self.base.path)
+        self.resource.servePrecompressed = True
+
+
+    def render(self, acceptEncoding=None):
+        """
+        Render the I{app.js} child of C{self.resource}.
+
+        @param acceptEncoding: The value of the I{Accept-Encoding} header, or
+            C{None} to leave it out.
+        @return: A L{Deferred} firing with the L{DummyRequest}.
+        """
+        request = DummyRequest(['app.js'])
+        request.requestHeaders = Headers()
+        if acceptEncoding is not None:
+            request.requestHeaders.setRawHeaders(
+                'accept-encoding', [acceptEncoding])
+        child = resource.getChildForRequest(self.resource, request)
+        d = _render(child, request)
+        d.addCallback(lambda ignored: request)
+        return d
+
+
+    def test_gzipAccepted(self):
+        """
+        If the client accepts gzip, the compressed sibling is sent with the
+        content type of the original and a I{Content-Encoding} of gzip.
+        """
+        def cbRendered(request):
+            self.assertEqual('compressed', ''.join(request.written))
+            self.assertEqual(
+                'gzip', request.outgoingHeaders['content-encoding'])
+            self.assertEqual(
+                self.resource.contentTypes['.js'],
+                request.outgoingHeaders['content-type'])
+            self.assertEqual(
+                'accept-encoding', request.outgoingHeaders['vary'])
+        return self.render('deflate, gzip').addCallback(cbRendered)
+
+
+    def test_gzipNotAccepted(self):
+        """
+        If the client does not accept gzip, the original is sent, with a
+        I{Vary} header since the response depends on I{Accept-Encoding}.
+        """
+        def cbRendered(request):
+            self.assertEqual('plain', ''.join(request.written))
+            self.assertNotIn('content-encoding', request.outgoingHeaders)
+            self.assertEqual(
+                'accept-encoding', request.outgoingHeaders['vary'])
+        return self.render().addCallback(cbRendered)
+
+
+    def test_gzipRefused(self):
+        """
+        If the client gives gzip a quality value of C{0}, the original is
+        sent.
+        """
+        def cbRendered(request):
+            self.assertEqual('plain', ''.join(request.written))
+        return self.render('gzip;q=0, identity').addCallback(cbRendered)
+
+
+    def test_staleSibling(self):
+        """
+        A compressed sibling older than the original is ignored.
+        """
+        os.utime(self.compressed.path, (500, 500))
+        def cbRendered(request):
+            self.assertEqual('plain', ''.join(request.written))
+            self.assertNotIn('vary', request.outgoingHeaders)
+        return self.render('gzip').addCallback(cbRendered)
+
+
+    def test_disabled(self):
+        """
+        Compressed siblings are not used unless C{servePrecompressed} is
+        C{True}.
+        """
+        self.resource.servePrecompressed = False
+        def cbRendered(request):
+            self.assertEqual('plain', ''.join(request.written))
+        return self.render('gzip').addCallback(cbRendered)
+
+
+    def test_encoderSkipped(self):
+        """
+        When the compressed sibling is sent, the encoder of the request is
+        removed so the contents are not compressed a second time.
+        """
+        request = DummyRequest([''])
+        request.requestHeaders = Headers({'accept-encoding': ['gzip']})
+        request._encoder = object()
+        fileResource = static.File(self.original.path)
+        fileResource.servePrecompressed = True
+        precompressed = fileResource._precompressedSibling(request)
+        self.assertEqual(self.compressed.path, precompressed.path)
+        self.assertIdentical(None, request._encoder)
+
+
+
 class StaticMakeProducerTests(TestCase):
     """
     Tests for L{File.makeProducer}.
@@ -602,6 +926,280 @@ class StaticMakeProducerTests(TestCase):
             http.PARTIAL_CONTENT, request.responseCode)
 
 
+    def makeSendfileResource(self, content):
+        """
+        Make a L{static.File} resource that has C{content} for its content
+        and uses sendfile, and let it use sendfile with L{SendfileTransport}.
+        """
+        self.patch(static, '_sendfileTransports', (SendfileTransport,))
+        resource = self.makeResourceWithContent(content)
+        resource.useSendfile = True
+        return resource
+
+
+    def test_noRangeSendfileTransport(self):
+        """
+        makeProducer when no Range header is set returns a
+        L{SendfileStaticProducer} for the whole file if the request's
+        transport supports sendfile.
+        """
+        request = DummyRequest([])
+        request.transport = SendfileTransport()
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.SendfileStaticProducer)
+        self.assertEqual((0, 6), (producer.offset, producer.size))
+
+
+    def test_singleRangeSendfileTransport(self):
+        """
+        makeProducer when the Range header requests a single, satisfiable byte
+        range returns a L{SendfileStaticProducer} for that range if the
+        request's transport supports sendfile.
+        """
+        request = DummyRequest([])
+        request.headers['range'] = 'bytes=1-3'
+        request.transport = SendfileTransport()
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.SendfileStaticProducer)
+        self.assertEqual((1, 3), (producer.offset, producer.size))
+
+
+    def test_multipleRangeSendfileTransport(self):
+        """
+        makeProducer when the Range header requests multiple ranges returns a
+        L{MultipleRangeStaticProducer} even if the request's transport
+        supports sendfile.
+        """
+        request = DummyRequest([])
+        request.headers['range'] = 'bytes=1-3,5-6'
+        request.transport = SendfileTransport()
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.MultipleRangeStaticProducer)
+
+
+    def test_sendfileUnsupported(self):
+        """
+        makeProducer returns a L{NoRangeStaticProducer} if the request's
+        transport cannot currently use sendfile.
+        """
+        request = DummyRequest([])
+        request.transport = SendfileTransport()
+        request.transport.supported = False
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.NoRangeStaticProducer)
+
+
+    def test_sendfileEncodedRequest(self):
+        """
+        makeProducer returns a L{NoRangeStaticProducer} if the response is
+        being encoded, since sendfile would bypass the encoder.
+        """
+        request = DummyRequest([])
+        request.transport = SendfileTransport()
+        request._encoder = object()
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.NoRangeStaticProducer)
+
+
+    def test_sendfileDisabled(self):
+        """
+        makeProducer returns a L{NoRangeStaticProducer} if
+        L{static.File.useSendfile} is C{False}, as it is by default.
+        """
+        request = DummyRequest([])
+        request.transport = SendfileTransport()
+        resource = self.makeSendfileResource('abcdef')
+        del resource.useSendfile
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.NoRangeStaticProducer)
+
+
+    def test_sendfileWrappedTransport(self):
+        """
+        makeProducer returns a L{NoRangeStaticProducer} if the request's
+        transport is a L{policies.ProtocolWrapper}, even though the wrapper
+        passes the lookup of C{canSendfile} through to the transport it
+        wraps, since sendfile would bypass the wrapper's C{write}.
+        """
+        factory = Factory()
+        factory.protocol = Protocol
+        wrapper = policies.WrappingFactory(factory).buildProtocol(None)
+        wrapper.makeConnection(SendfileTransport())
+        self.assertTrue(wrapper.canSendfile())
+        request = DummyRequest([])
+        request.transport = wrapper
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.NoRangeStaticProducer)
+
+
+    def test_sendfileTLSTransport(self):
+        """
+        makeProducer returns a L{NoRangeStaticProducer} if the request's
+        transport is a L{TLSMemoryBIOProtocol}, since sendfile would send the
+        file unencrypted.
+        """
+        factory = Factory()
+        factory.protocol = Protocol
+        tlsFactory = TLSMemoryBIOFactory(ServerTLSContext(), False, factory)
+        tlsProtocol = tlsFactory.buildProtocol(None)
+        tlsProtocol.makeConnection(SendfileTransport())
+        self.assertTrue(tlsProtocol.canSendfile())
+        request = DummyRequest([])
+        request.transport = tlsProtocol
+        resource = self.makeSendfileResource('abcdef')
+        producer = resource.makeProducer(request, resource.openForReading())
+        self.assertIsInstance(producer, static.NoRangeStaticProducer)
+    if TLSMemoryBIOFactory is None:
+        test_sendfileTLSTransport.skip = (
+            "pyOpenSSL 0.10 or newer required for twisted.protocol.tls")
+
+
+
+class SendfileTransport(object):
+    """
+    A fake transport which implements C{canSendfile} and C{sendfile} like
+    L{twisted.internet.tcp.Connection}.
+
+    @ivar supported: The value C{canSendfile} returns.
+    @ivar chunkSize: The largest number of bytes C{sendfile} sends at once.
+    @ivar written: A list of the strings sent with C{sendfile}.
+    @ivar failAfter: The number of calls to C{sendfile} which succeed before
+        it starts raising L{OSError}, or C{None} if it never fails.
+    """
+    supported = True
+    chunkSize = 2
+    failAfter = None
+
+    def __init__(self):
+        self.written = []
+
+
+    def canSendfile(self):
+        return self.supported
+
+
+    def sendfile(self, fileObject, offset, count):
+        if self.failAfter is not None:
+            if not self.failAfter:
+                raise OSError(errno.EINVAL, os.strerror(errno.EINVAL))
+            self.failAfter -= 1
+        fileObject.seek(offset)
+        data = fileObject.read(min(count, self.chunkSize))
+        self.written.append(data)
+        return len(data)
+
+
+
+class SendfileStaticProducerTests(TestCase):
+    """
+    Tests for L{SendfileStaticProducer}.
+    """
+
+    def setUp(self):
+        self.request = DummyRequest([])
+        self.request.sentLength = 0
+        self.request.transport = SendfileTransport()
+        self.fileObject = StringIO.StringIO('abcdefgh')
+
+
+    def test_implementsIPullProducer(self):
+        """
+        L{SendfileStaticProducer} implements L{IPullProducer}.
+        """
+        verifyObject(
+            interfaces.IPullProducer,
+            static.SendfileStaticProducer(None, None, None, None))
+
+
+    def test_startWritesHeaders(self):
+        """
+        L{SendfileStaticProducer.start} writes an empty string to the request
+        so that the response headers are sent before the file contents.
+        """
+        producer = static.SendfileStaticProducer(
+            self.request, self.fileObject, 0, 8)
+        producer.start()
+        self.assertEqual([''], self.request.written)
+
+
+    def test_resumeProducingSendsContent(self):
+        """
+        L{SendfileStaticProducer.resumeProducing} has the transport send the
+        given amount of content, starting at the given offset, and counts it
+        in the request's C{sentLength}.
+        """
+        producer = static.SendfileStaticProducer(
+            self.request, self.fileObject, 1, 5)
+        # DummyRequest.registerProducer pulls all output from the producer, so
+        # we just need to call start.
+        producer.start()
+        self.assertEqual(
+            ['bc', 'de', 'f'], self.request.transport.written)
+        self.assertEqual(5, self.request.sentLength)
+
+
+    def test_finishCalledWhenDone(self):
+        """
+        L{SendfileStaticProducer.resumeProducing} calls finish() on the request
+        and closes the file after it is done producing content.
+        """
+        finishDeferred = self.request.notifyFinish()
+        callbackList = []
+        finishDeferred.addCallback(callbackList.append)
+        producer = static.SendfileStaticProducer(
+            self.request, self.fileObject, 1, 1)
+        producer.start()
+        self.assertEqual([None], callbackList)
+        self.assertTrue(self.fileObject.closed)
+
+
+    def test_truncatedFile(self):
+        """
+        If the file has shrunk so that the transport sends nothing,
+        L{SendfileStaticProducer.resumeProducing} finishes the request rather
+        than trying again.
+        """
+        fileName = self.mktemp()
+        fileObject = open(fileName, 'wb')
+        fileObject.write('abc')
+        fileObject.close()
+        fileObject = open(fileName, 'rb')
+        finishDeferred = self.request.notifyFinish()
+        callbackList = []
+        finishDeferred.addCallback(callbackList.append)
+        producer = static.SendfileStaticProducer(
+            self.request, fileObject, 0, 10)
+        producer.start()
+        self.assertEqual([None], callbackList)
+        self.assertEqual(['ab', 'c', ''], self.request.transport.written)
+
+
+    def test_sendfileFails(self):
+        """
+        If the transport's C{sendfile} raises L{OSError},
+        L{SendfileStaticProducer.resumeProducing} writes the rest of the
+        chunk to the request from the file instead, and then finishes the
+        request.
+        """
+        self.request.transport.failAfter = 1
+        finishDeferred = self.request.notifyFinish()
+        callbackList = []
+        finishDeferred.addCallback(callbackList.append)
+        producer = static.SendfileStaticProducer(
+            self.request, self.fileObject, 1, 5)
+        producer.start()
+        self.assertEqual(['bc'], self.request.transport.written)
+        self.assertEqual(['', 'def'], self.request.written)
+        self.assertEqual([None], callbackList)
+        self.assertTrue(self.fileObject.closed)
+
+
 
 class StaticProducerTests(TestCase):
     """
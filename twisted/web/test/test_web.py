@@ -10,7 +10,7 @@ import zlib
 from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
-from twisted.python.compat import (_PY3, networkString,
+from twisted.python.compat import (_PY3, networkString, intToBytes,
                                    NativeStringIO as StringIO)
 from twisted.trial import unittest
 from twisted.internet import reactor
@@ -624,6 +624,218 @@ class GzipEncoderTests(unittest.TestCase):
 
 
 
+class ETagData(resource.Resource):
+    """
+    A resource which renders C{data} with an I{ETag} header.
+
+    @ivar data: The body of the response.
+    @ivar etag: The entity tag of the response.
+    @ivar headers: A C{dict} of extra response headers.
+    """
+    isLeaf = True
+
+    def __init__(self, data, etag):
+        resource.Resource.__init__(self)
+        self.data = data
+        self.etag = etag
+        self.headers = {}
+
+
+    def render_GET(self, request):
+        request.setETag(self.etag)
+        request.setHeader(b"content-type", b"text/plain")
+        for name, value in self.headers.items():
+            request.setHeader(name, value)
+        return self.data
+
+
+
+class GzipEncoderCacheTests(unittest.TestCase):
+    """
+    Tests for the cache of compressed response bodies of
+    L{server.GzipEncoderFactory}.
+    """
+
+    if _PY3:
+        skip = "GzipEncoder not ported to Python 3 yet."
+
+    def setUp(self):
+        self.factory = server.GzipEncoderFactory(cacheSize=10)
+        self.data = ETagData(b"Some data" * 10, b'"v1"')
+        wrapped = resource.EncodingResourceWrapper(
+            self.data, [self.factory])
+        root = resource.Resource()
+        root.putChild(b"foo", wrapped)
+        self.site = server.Site(root)
+
+
+    def get(self, method=b"GET", headers={}):
+        """
+        Make a request for I{/foo} which accepts gzip.
+
+        @param headers: A C{dict} of extra request headers.
+
+        @return: A C{tuple} of the response headers and body.
+        """
+        channel = DummyChannel()
+        channel.site = self.site
+        request = server.Request(channel, False)
+        request.gotLength(0)
+        request.requestHeaders.setRawHeaders(b"Accept-Encoding", [b"gzip"])
+        for name, value in headers.items():
+            request.requestHeaders.setRawHeaders(name, [value])
+        request.requestReceived(method, b'/foo', b'HTTP/1.0')
+        data = channel.transport.written.getvalue()
+        separator = data.find(b"\r\n\r\n")
+        return data[:separator], data[separator + 4:]
+
+
+    def test_disabledByDefault(self):
+        """
+        L{server.GzipEncoderFactory} does not cache anything by default.
+        """
+        self.assertIdentical(None, server.GzipEncoderFactory().cache)
+
+
+    def test_cached(self):
+        """
+        The compressed body of a response with a validator is cached, and
+        sent with a I{Content-Length} instead of compressing the body written
+        by the resource again.
+        """
+        headers, body = self.get()
+        self.assertEqual(
+            b"Some data" * 10, zlib.decompress(body, 16 + zlib.MAX_WBITS))
+        self.assertEqual(1, len(self.factory.cache))
+
+        self.data.data = b"Other data"
+        headers, cachedBody = self.get()
+        self.assertEqual(body, cachedBody)
+        self.assertIn(
+            b"Content-Length: " + intToBytes(len(body)) + b"\r\n", headers)
+        self.assertIn(b"Content-Encoding: gzip\r\n", headers)
+
+
+    def test_newValidator(self):
+        """
+        A response with a different validator is not answered from the cache.
+        """
+        self.get()
+        self.data.data = b"Other data"
+        self.data.etag = b'"v2"'
+        headers, body = self.get()
+        self.assertEqual(
+            b"Other data", zlib.decompress(body, 16 + zlib.MAX_WBITS))
+        self.assertEqual(2, len(self.factory.cache))
+
+
+    def test_noValidator(self):
+        """
+        A response without an I{ETag} or I{Last-Modified} header is not
+        cached.
+        """
+        self.data.etag = None
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_tooLarge(self):
+        """
+        A compressed body bigger than C{maxCachedBodySize} is not cached.
+        """
+        self.factory.maxCachedBodySize = 5
+        headers, body = self.get()
+        self.assertEqual(
+            b"Some data" * 10, zlib.decompress(body, 16 + zlib.MAX_WBITS))
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_head(self):
+        """
+        The response to a I{HEAD} request is not cached.
+        """
+        self.get(b"HEAD")
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_varyAcceptEncoding(self):
+        """
+        A response which only varies on I{Accept-Encoding} is cached.
+        """
+        self.data.headers[b"vary"] = b"Accept-Encoding"
+        self.get()
+        self.assertEqual(1, len(self.factory.cache))
+
+
+    def test_vary(self):
+        """
+        A response which varies on a request header other than
+        I{Accept-Encoding} is not cached.
+        """
+        self.data.headers[b"vary"] = b"Accept-Encoding, Accept-Language"
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_cacheControlPrivate(self):
+        """
+        A response marked I{private} by I{Cache-Control} is not cached.
+        """
+        self.data.headers[b"cache-control"] = b"max-age=60, private"
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_cacheControlNoStore(self):
+        """
+        A response marked I{no-store} by I{Cache-Control} is not cached.
+        """
+        self.data.headers[b"cache-control"] = b"no-store"
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_setCookie(self):
+        """
+        A response with a I{Set-Cookie} header is not cached.
+        """
+        self.data.headers[b"set-cookie"] = b"session=abc"
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_addCookie(self):
+        """
+        A response which sets a cookie with L{server.Request.addCookie} is
+        not cached.
+        """
+        render = self.data.render_GET
+        def renderWithCookie(request):
+            request.addCookie(b"session", b"abc")
+            return render(request)
+        self.data.render_GET = renderWithCookie
+        self.get()
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_authorization(self):
+        """
+        The response to a request with an I{Authorization} header is not
+        cached.
+        """
+        self.get(headers={b"authorization": b"Basic Zm9vOmJhcg=="})
+        self.assertEqual(0, len(self.factory.cache))
+
+
+    def test_cookie(self):
+        """
+        The response to a request with a I{Cookie} header is not cached.
+        """
+        self.get(headers={b"cookie": b"session=abc"})
+        self.assertEqual(0, len(self.factory.cache))
+
+
+
 class RootResource(resource.Resource):
     isLeaf=0
     def getChildWithDefault(self, name, request):
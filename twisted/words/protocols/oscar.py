@@ -324,7 +324,6 @@ class SNACBased(OscarConnection):
         reqid=self.lastID
         self.lastID=reqid+1
         d = defer.Deferred()
-        d.reqid = reqid
 
         #d.addErrback(self._ebDeferredError,fam,sub,data) # XXX for testing
 
@@ -6,8 +6,10 @@ Tests for L{twisted.words.protocols.oscar}.
 """
 
 from twisted.trial.unittest import TestCase
+from twisted.internet.defer import Deferred
+from twisted.test.proto_helpers import StringTransport
 
-from twisted.words.protocols.oscar import encryptPasswordMD5
+from twisted.words.protocols.oscar import encryptPasswordMD5, SNACBased
 
 
 class PasswordTests(TestCase):
@@ -22,3 +24,24 @@ class PasswordTests(TestCase):
         self.assertEqual(
             encryptPasswordMD5('foo', 'bar').encode('hex'),
             'd73475c370a7b18c6c20386bcf1339f2')
+
+
+
+class SNACBasedTests(TestCase):
+    """
+    Tests for L{SNACBased}.
+    """
+    def test_sendSNAC(self):
+        """
+        L{SNACBased.sendSNAC} writes a SNAC with a new request id to the
+        transport and returns a L{Deferred} which is kept in
+        C{requestCallbacks} under that request id.
+        """
+        protocol = SNACBased('cookie')
+        protocol.seqnum = 0
+        protocol.transport = StringTransport()
+        first = protocol.sendSNAC(0x01, 0x02, 'data')
+        second = protocol.sendSNAC(0x01, 0x02, 'data')
+        self.assertIsInstance(first, Deferred)
+        self.assertEqual({0: first, 1: second}, protocol.requestCallbacks)
+        self.assertNotEqual('', protocol.transport.value())